@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Accident, AccidentImage
+from .models import Accident, AccidentHotspot, AccidentImage, HeatmapTile
 
 class AccidentImageInline(admin.TabularInline):
     """Inline admin for AccidentImage model."""
@@ -39,4 +39,29 @@ class AccidentAdmin(admin.ModelAdmin):
             'fields': ('notes',),
             'classes': ('collapse',),
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(AccidentHotspot)
+class AccidentHotspotAdmin(admin.ModelAdmin):
+    """Hotspots are computed (accidents/hotspots.py); read-only here."""
+    list_display = ('window', 'latitude', 'longitude', 'accident_count', 'radius_m', 'last_date_time')
+    list_filter = ('window',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(HeatmapTile)
+class HeatmapTileAdmin(admin.ModelAdmin):
+    """Heatmap tiles are computed (accidents/hotspots.py); read-only here."""
+    list_display = ('window', 'geohash', 'latitude', 'longitude', 'accident_count')
+    list_filter = ('window',)
+    search_fields = ('geohash',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AccidentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accidents'
+
+    def ready(self):
+        import accidents.signals
@@ -1,5 +1,7 @@
 # accidents/forms.py
 
+from decimal import Decimal
+
 from django import forms
 from django.utils import timezone
 from django.forms import inlineformset_factory
@@ -7,6 +9,15 @@ from .models import Accident, AccidentImage
 from vehicles.models import Vehicle
 from trips.models import Trip
 
+class CoordinateField(forms.DecimalField):
+    """Rounds a GPS reading to the column's 7 decimal places (about 1 cm) instead of rejecting the extra digits."""
+    
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value is not None:
+            value = value.quantize(Decimal(1).scaleb(-self.decimal_places))
+        return value
+
 class AccidentForm(forms.ModelForm):
     """Form for creating a new accident report."""
     
@@ -18,6 +29,7 @@ class AccidentForm(forms.ModelForm):
             'police_report_number', 'injuries', 'injuries_description',
             'estimated_cost', 'insurance_claim_number', 'notes'
         ]
+        field_classes = {'latitude': CoordinateField, 'longitude': CoordinateField}
         widgets = {
             'date_time': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'},
@@ -104,6 +116,7 @@ class AccidentUpdateForm(forms.ModelForm):
             'injuries_description', 'estimated_cost', 'actual_cost',
             'insurance_claim_number', 'status', 'resolution_date', 'notes'
         ]
+        field_classes = {'latitude': CoordinateField, 'longitude': CoordinateField}
         widgets = {
             'resolution_date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
@@ -0,0 +1,69 @@
+"""
+Geohash encoding: a point's cell in a grid that halves longitude and latitude
+in turn, written in base 32, so a code's prefixes are the cells around it at
+coarser precisions.
+"""
+import numpy as np
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DIGITS = np.array(list(BASE32))
+
+# Stored on Accident: cells about 5 m across
+PRECISION = 9
+
+
+def _bits(precision):
+    """(longitude bits, latitude bits) of a code; longitude takes the first and every other bit."""
+    total = precision * 5
+    return (total + 1) // 2, total // 2
+
+
+def encode_many(latitudes, longitudes, precision=PRECISION):
+    """Geohashes of arrays of points, as an array of strings."""
+    lng_bits, lat_bits = _bits(precision)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    if not len(latitudes):
+        return np.array([], dtype=f'<U{precision}')
+    rows = np.clip(np.floor((latitudes + 90) / 180 * (1 << lat_bits)), 0, (1 << lat_bits) - 1).astype(np.int64)
+    cols = np.clip(np.floor((longitudes + 180) / 360 * (1 << lng_bits)), 0, (1 << lng_bits) - 1).astype(np.int64)
+
+    code = np.zeros(len(latitudes), dtype=np.int64)
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            code = (code << 1) | ((cols >> (lng_bits - 1 - bit // 2)) & 1)
+        else:
+            code = (code << 1) | ((rows >> (lat_bits - 1 - bit // 2)) & 1)
+    digits = [_DIGITS[(code >> (5 * (precision - 1 - n))) & 31] for n in range(precision)]
+    return np.array([''.join(chars) for chars in zip(*digits)])
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Geohash of one point; '' if it has no coordinates."""
+    if latitude is None or longitude is None:
+        return ''
+    return str(encode_many([float(latitude)], [float(longitude)], precision)[0])
+
+
+def bounds(geohash):
+    """(south, west, north, east) of a geohash cell."""
+    lng_bits, lat_bits = _bits(len(geohash))
+    rows = cols = 0
+    bit = 0
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            if bit % 2 == 0:
+                cols = (cols << 1) | ((value >> shift) & 1)
+            else:
+                rows = (rows << 1) | ((value >> shift) & 1)
+            bit += 1
+    lat_size, lng_size = 180 / (1 << lat_bits), 360 / (1 << lng_bits)
+    south, west = rows * lat_size - 90, cols * lng_size - 180
+    return south, west, south + lat_size, west + lng_size
+
+
+def center(geohash):
+    """(latitude, longitude) of the middle of a geohash cell."""
+    south, west, north, east = bounds(geohash)
+    return (south + north) / 2, (west + east) / 2
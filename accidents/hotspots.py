@@ -0,0 +1,342 @@
+"""
+Accident hotspots and heatmap tiles, precomputed per time window.
+
+* Heatmap tiles count accidents per geohash cell of HOTSPOT_TILE_PRECISION
+  characters (6: about 1.2 x 0.6 km), a prefix of Accident.geohash.
+* Hotspots are DBSCAN clusters: an accident with HOTSPOT_MIN_ACCIDENTS
+  (itself included) within HOTSPOT_RADIUS_METERS is a core, cores that close
+  to each other share a cluster and accidents that close to a core join it.
+  Accidents are bucketed into cells at least the radius across, so each is
+  only compared with the 3x3 cells around it.
+
+The windows are the last 30, 90 and 365 days and all time. Saving or
+deleting an accident recounts the tiles it is and was in and re-clusters only
+the area around it (accidents/signals.py); `manage.py rebuild_hotspots`
+rebuilds everything and runs daily, so the rolling windows move on.
+"""
+import math
+from collections import namedtuple
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import geohash
+from .models import Accident, AccidentHotspot, HeatmapTile
+
+EARTH_RADIUS_M = 6371008.8
+
+WINDOWS = {'30d': 30, '90d': 90, '365d': 365, 'all': None}
+
+Points = namedtuple('Points', 'ids latitudes longitudes date_times geohashes')
+
+
+def radius_m():
+    return getattr(settings, 'HOTSPOT_RADIUS_METERS', 250)
+
+
+def min_accidents():
+    return getattr(settings, 'HOTSPOT_MIN_ACCIDENTS', 3)
+
+
+def tile_precision():
+    return min(getattr(settings, 'HOTSPOT_TILE_PRECISION', 6), geohash.PRECISION)
+
+
+def window_accidents(window, now=None):
+    """Accidents with coordinates in `window` as of `now`."""
+    accidents = Accident.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    if WINDOWS[window] is not None:
+        accidents = accidents.filter(date_time__gte=(now or timezone.now()) - timedelta(days=WINDOWS[window]))
+    return accidents
+
+
+def in_window(window, date_time, now=None):
+    return WINDOWS[window] is None or date_time >= (now or timezone.now()) - timedelta(days=WINDOWS[window])
+
+
+def load_points(accidents):
+    rows = list(accidents.order_by().values_list('pk', 'latitude', 'longitude', 'date_time', 'geohash'))
+    ids, latitudes, longitudes, date_times, geohashes = zip(*rows) if rows else ([], [], [], [], [])
+    return Points(
+        np.array(ids, dtype=np.int64),
+        np.array(latitudes, dtype=float),
+        np.array(longitudes, dtype=float),
+        np.array(date_times, dtype=object),
+        np.array(geohashes, dtype=object),
+    )
+
+
+def distances_m(lat1, lng1, lat2, lng2):
+    """Metres between points given in radians; equirectangular, which is plenty at hotspot distances."""
+    x = (lng2 - lng1) * np.cos((lat1 + lat2) / 2)
+    return EARTH_RADIUS_M * np.hypot(x, lat2 - lat1)
+
+
+def neighbour_pairs(latitudes, longitudes, radius):
+    """Index arrays (i, j) of every ordered pair of points within `radius` metres, each point paired with itself too."""
+    lat, lng = np.radians(latitudes), np.radians(longitudes)
+    cell_lat = radius / EARTH_RADIUS_M
+    # Wide enough where longitude degrees are shortest, so no neighbour lies beyond the next cell
+    cell_lng = cell_lat / max(math.cos(min(np.abs(lat).max() + cell_lat, math.pi / 2)), 1e-6)
+    rows = np.floor(lat / cell_lat).astype(np.int64)
+    cols = np.floor(lng / cell_lng).astype(np.int64)
+    # A margin column either side keeps neighbouring keys from wrapping onto the next row
+    width = cols.max() - cols.min() + 3
+    keys = (rows - rows.min() + 1) * width + (cols - cols.min() + 1)
+
+    order = np.argsort(keys, kind='stable')
+    cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    first, second = [], []
+    for offset in [row * width + col for row in (-1, 0, 1) for col in (-1, 0, 1)]:
+        wanted = keys + offset
+        at = np.minimum(np.searchsorted(cells, wanted), len(cells) - 1)
+        points = np.flatnonzero(cells[at] == wanted)
+        sizes = counts[at[points]]
+        first.append(np.repeat(points, sizes))
+        # Each point's run of the neighbouring cell's members within `order`
+        runs = np.repeat(starts[at[points]] - (np.cumsum(sizes) - sizes), sizes) + np.arange(sizes.sum())
+        second.append(order[runs])
+    i, j = np.concatenate(first), np.concatenate(second)
+    close = distances_m(lat[i], lng[i], lat[j], lng[j]) <= radius
+    return i[close], j[close]
+
+
+def dbscan(latitudes, longitudes, radius, min_points):
+    """Cluster label of each point (the lowest index among its cluster's cores), -1 for noise."""
+    count = len(latitudes)
+    labels = np.full(count, -1, dtype=np.int64)
+    if not count:
+        return labels
+    i, j = neighbour_pairs(latitudes, longitudes, radius)
+    core = np.bincount(i, minlength=count) >= min_points
+
+    # Spread the lowest index through linked cores, jumping along the chain each round
+    component = np.arange(count)
+    linked = core[i] & core[j]
+    a, b = i[linked], j[linked]
+    while True:
+        lowest = component.copy()
+        np.minimum.at(lowest, a, component[b])
+        lowest = lowest[lowest]
+        if np.array_equal(lowest, component):
+            break
+        component = lowest
+    labels[core] = component[core]
+
+    # Border accidents join the cluster of a core they're near (the lowest, if several)
+    border = ~core[i] & core[j]
+    joined = np.full(count, count, dtype=np.int64)
+    np.minimum.at(joined, i[border], component[j[border]])
+    labels[joined < count] = joined[joined < count]
+    return labels
+
+
+def find_hotspots(window, points):
+    """AccidentHotspot rows for the clusters among `points`."""
+    labels = dbscan(points.latitudes, points.longitudes, radius_m(), min_accidents())
+    clustered = np.flatnonzero(labels >= 0)
+    order = clustered[np.argsort(labels[clustered], kind='stable')]
+    _, starts = np.unique(labels[order], return_index=True)
+    return [summarize(window, points, members) for members in np.split(order, starts[1:]) if len(members)]
+
+
+def summarize(window, points, members):
+    latitudes, longitudes = points.latitudes[members], points.longitudes[members]
+    latitude, longitude = latitudes.mean(), longitudes.mean()
+    spread = distances_m(
+        math.radians(latitude), math.radians(longitude), np.radians(latitudes), np.radians(longitudes)
+    ).max()
+    date_times = points.date_times[members]
+    return AccidentHotspot(
+        window=window,
+        key=f'{window}:{points.ids[members].min()}',
+        latitude=round(float(latitude), 7),
+        longitude=round(float(longitude), 7),
+        radius_m=round(float(spread), 1),
+        south=float(latitudes.min()),
+        west=float(longitudes.min()),
+        north=float(latitudes.max()),
+        east=float(longitudes.max()),
+        accident_count=len(members),
+        first_date_time=min(date_times),
+        last_date_time=max(date_times),
+    )
+
+
+def count_tiles(window, points):
+    """HeatmapTile rows for `points`."""
+    precision = tile_precision()
+    cells, counts = np.unique([code[:precision] for code in points.geohashes if code], return_counts=True)
+    tiles = []
+    for cell, count in zip(cells, counts):
+        latitude, longitude = geohash.center(cell)
+        tiles.append(HeatmapTile(
+            window=window, geohash=str(cell), latitude=latitude, longitude=longitude, accident_count=int(count)
+        ))
+    return tiles
+
+
+def save_hotspots(hotspots, stale):
+    """Upsert `hotspots`, deleting the ones in `stale` that weren't among them."""
+    with transaction.atomic():
+        stale.exclude(key__in=[hotspot.key for hotspot in hotspots]).delete()
+        if hotspots:
+            # MySQL upserts on any unique key and rejects an explicit conflict target
+            unique_fields = ['key'] if connection.features.supports_update_conflicts_with_target else None
+            AccidentHotspot.objects.bulk_create(
+                hotspots,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=[
+                    'latitude', 'longitude', 'radius_m', 'south', 'west', 'north', 'east',
+                    'accident_count', 'first_date_time', 'last_date_time',
+                ],
+            )
+    return len(hotspots)
+
+
+def save_tiles(tiles, stale):
+    """Upsert `tiles`, deleting the ones in `stale` that weren't among them."""
+    with transaction.atomic():
+        stale.exclude(geohash__in=[tile.geohash for tile in tiles]).delete()
+        if tiles:
+            unique_fields = ['window', 'geohash'] if connection.features.supports_update_conflicts_with_target else None
+            HeatmapTile.objects.bulk_create(
+                tiles,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['latitude', 'longitude', 'accident_count'],
+            )
+    return len(tiles)
+
+
+def rebuild_window(window, now=None):
+    """Recompute a window's hotspots and tiles from scratch; returns (accidents, hotspots, tiles)."""
+    points = load_points(window_accidents(window, now))
+    hotspots = save_hotspots(find_hotspots(window, points), AccidentHotspot.objects.filter(window=window))
+    tiles = save_tiles(count_tiles(window, points), HeatmapTile.objects.filter(window=window))
+    return len(points.ids), hotspots, tiles
+
+
+def expand(box, metres):
+    """A (south, west, north, east) box grown by `metres` on every side."""
+    south, west, north, east = box
+    margin = math.degrees(metres / EARTH_RADIUS_M)
+    # Longitude degrees are shortest on the edge farthest from the equator
+    lng_margin = margin / math.cos(math.radians(min(max(abs(south), abs(north)) + margin, 89.9)))
+    return south - margin, west - lng_margin, north + margin, east + lng_margin
+
+
+def overlapping(boxes):
+    """Q for hotspots whose bounding box overlaps any of `boxes`."""
+    return reduce(or_, [
+        Q(south__lte=north, north__gte=south, west__lte=east, east__gte=west) for south, west, north, east in boxes
+    ])
+
+
+def inside(boxes):
+    """Q for accidents inside any of `boxes`."""
+    return reduce(or_, [
+        Q(latitude__range=(south, north), longitude__range=(west, east)) for south, west, north, east in boxes
+    ])
+
+
+def recluster(window, places, now=None):
+    """
+    Re-cluster `window` around `places` ((latitude, longitude) pairs where
+    accidents arrived or left). An accident can only change which accidents
+    are cores within one radius of it, and so which clusters link up within
+    two; the area grows by every hotspot overlapping it until none is left
+    out, then it is clustered afresh (with a radius of margin, so accidents
+    near its edge see all their neighbours) and its hotspots replaced.
+    """
+    radius = radius_m()
+    region = [expand((latitude, longitude, latitude, longitude), 2 * radius) for latitude, longitude in places]
+    affected = {}
+    while True:
+        found = list(
+            AccidentHotspot.objects.filter(window=window)
+            .filter(overlapping([expand(box, radius) for box in region]))
+            .exclude(pk__in=list(affected))
+        )
+        if not found:
+            break
+        for hotspot in found:
+            affected[hotspot.pk] = hotspot
+            region.append((hotspot.south, hotspot.west, hotspot.north, hotspot.east))
+
+    points = load_points(window_accidents(window, now).filter(inside([expand(box, radius) for box in region])))
+    hotspots = [
+        hotspot for hotspot in find_hotspots(window, points)
+        if any(
+            hotspot.north >= south and hotspot.south <= north and hotspot.east >= west and hotspot.west <= east
+            for south, west, north, east in region
+        )
+    ]
+    return save_hotspots(hotspots, AccidentHotspot.objects.filter(pk__in=list(affected)))
+
+
+def recount_tiles(window, places, now=None):
+    """Recount the tiles of `window` holding `places`."""
+    cells = {geohash.encode(latitude, longitude, tile_precision()) for latitude, longitude in places}
+    accidents = window_accidents(window, now).filter(reduce(or_, [Q(geohash__startswith=cell) for cell in cells]))
+    stale = HeatmapTile.objects.filter(window=window, geohash__in=cells)
+    return save_tiles(count_tiles(window, load_points(accidents)), stale)
+
+
+def refresh(positions, now=None):
+    """
+    Bring every window up to date after accidents at `positions`
+    ((latitude, longitude, date_time) of where they are now and where they
+    were) were saved or deleted.
+    """
+    for window in WINDOWS:
+        places = {
+            (float(latitude), float(longitude))
+            for latitude, longitude, date_time in positions
+            if latitude is not None and longitude is not None and date_time is not None
+            and in_window(window, date_time, now)
+        }
+        if places:
+            recluster(window, places, now)
+            recount_tiles(window, places, now)
+
+
+def rebuild(now=None, progress=None):
+    """Rebuild every window. `progress` is called with each window and its (accidents, hotspots, tiles)."""
+    results = {}
+    for window in WINDOWS:
+        results[window] = rebuild_window(window, now)
+        if progress:
+            progress(window, results[window])
+    return results
+
+
+def map_data(window, box=None):
+    """
+    Hotspots and heatmap tiles of `window`, within the (south, west, north,
+    east) `box` if given, as plain values: tiles are [latitude, longitude,
+    count] triples, the shape heatmap layers take.
+    """
+    hotspots = AccidentHotspot.objects.filter(window=window)
+    tiles = HeatmapTile.objects.filter(window=window)
+    if box is not None:
+        south, west, north, east = box
+        hotspots = hotspots.filter(overlapping([box]))
+        tiles = tiles.filter(latitude__range=(south, north), longitude__range=(west, east))
+    return {
+        'window': window,
+        'tile_precision': tile_precision(),
+        'hotspots': list(hotspots.values(
+            'latitude', 'longitude', 'radius_m', 'accident_count', 'first_date_time', 'last_date_time'
+        )),
+        'tiles': [list(tile) for tile in tiles.order_by().values_list('latitude', 'longitude', 'accident_count')],
+    }
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accidents', '0003_alter_accident_latitude_alter_accident_longitude'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accident',
+            index=models.Index(fields=['date_time'], name='accidents_a_date_ti_729e7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accident',
+            index=models.Index(fields=['status'], name='accidents_a_status_58b5d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accident',
+            index=models.Index(fields=['vehicle', 'status'], name='accidents_a_vehicle_6c3f74_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:36
+
+import math
+
+from django.db import migrations, models
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    # A frozen copy of accidents.geohash.encode() as it was when this migration was written
+    total = precision * 5
+    lng_bits, lat_bits = (total + 1) // 2, total // 2
+    row = min(max(math.floor((latitude + 90) / 180 * (1 << lat_bits)), 0), (1 << lat_bits) - 1)
+    col = min(max(math.floor((longitude + 180) / 360 * (1 << lng_bits)), 0), (1 << lng_bits) - 1)
+    code = 0
+    for bit in range(total):
+        if bit % 2 == 0:
+            code = (code << 1) | ((col >> (lng_bits - 1 - bit // 2)) & 1)
+        else:
+            code = (code << 1) | ((row >> (lat_bits - 1 - bit // 2)) & 1)
+    return ''.join(BASE32[(code >> (5 * (precision - 1 - n))) & 31] for n in range(precision))
+
+
+def backfill_geohash(apps, schema_editor):
+    Accident = apps.get_model('accidents', 'Accident')
+    accidents = list(Accident.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude'))
+    for accident in accidents:
+        accident.geohash = encode(float(accident.latitude), float(accident.longitude))
+    Accident.objects.bulk_update(accidents, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accidents', '0004_accident_accidents_a_date_ti_729e7c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accident',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='accident',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='accident',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='AccidentHotspot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('30d', 'Last 30 days'), ('90d', 'Last 90 days'), ('365d', 'Last 365 days'), ('all', 'All time')], max_length=4)),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('radius_m', models.FloatField(help_text='Distance from the centre to the farthest accident')),
+                ('south', models.FloatField()),
+                ('west', models.FloatField()),
+                ('north', models.FloatField()),
+                ('east', models.FloatField()),
+                ('accident_count', models.PositiveIntegerField()),
+                ('first_date_time', models.DateTimeField()),
+                ('last_date_time', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['window', '-accident_count'],
+                'indexes': [models.Index(fields=['window', '-accident_count'], name='accidents_a_window_288636_idx'), models.Index(fields=['window', 'south'], name='accidents_a_window_ed23f6_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HeatmapTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('30d', 'Last 30 days'), ('90d', 'Last 90 days'), ('365d', 'Last 365 days'), ('all', 'All time')], max_length=4)),
+                ('geohash', models.CharField(max_length=12)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('accident_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['window', 'geohash'],
+                'constraints': [models.UniqueConstraint(fields=('window', 'geohash'), name='unique_heatmap_tile')],
+            },
+        ),
+    ]
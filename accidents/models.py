@@ -3,6 +3,7 @@
 from django.db import models
 from vehicles.models import Vehicle
 from django.conf import settings
+from . import geohash
 
 class AccidentImage(models.Model):
     """Images related to vehicle accidents."""
@@ -37,17 +38,19 @@ class Accident(models.Model):
     date_time = models.DateTimeField()
     location = models.CharField(max_length=255)
     latitude = models.DecimalField(
-        max_digits=50, 
-        decimal_places=20,
+        max_digits=10, 
+        decimal_places=7,
         null=True,
         blank=True
     )
     longitude = models.DecimalField(
-        max_digits=50, 
-        decimal_places=20,
+        max_digits=10, 
+        decimal_places=7,
         null=True,
         blank=True
     )
+    # Cell of latitude/longitude (accidents.geohash), set on save; heatmap tiles are its prefixes
+    geohash = models.CharField(max_length=12, blank=True, editable=False, db_index=True)
     description = models.TextField()
     damage_description = models.TextField()
     third_party_involved = models.BooleanField(default=False)
@@ -77,32 +80,102 @@ class Accident(models.Model):
     
     class Meta:
         ordering = ['-date_time']
+        indexes = [
+            # Report date ranges and default ordering
+            models.Index(fields=['date_time']),
+            # Status counts on the accident list
+            models.Index(fields=['status']),
+            # Unresolved accidents for a vehicle
+            models.Index(fields=['vehicle', 'status']),
+        ]
     
     def __str__(self):
         return f"Accident involving {self.vehicle} on {self.date_time.date()}"
     
-    def save(self, *args, **kwargs):
-        """Override save to update vehicle status if needed."""
-        # If this is a new accident, set vehicle to maintenance
-        if not self.pk and self.vehicle.status == 'in_use':
-            self.vehicle.status = 'maintenance'
-            self.vehicle.save()
-            
-        # If status is changing to resolved, update vehicle status
-        elif self.pk:
-            try:
-                old_accident = Accident.objects.get(pk=self.pk)
-                if old_accident.status != 'resolved' and self.status == 'resolved':
-                    # If there are no other unresolved accidents, set vehicle to available
-                    other_accidents = Accident.objects.filter(
-                        vehicle=self.vehicle,
-                        status__in=['reported', 'under_investigation', 'repair_scheduled', 'repair_in_progress']
-                    ).exclude(pk=self.pk).count()
-                    
-                    if other_accidents == 0:
-                        self.vehicle.status = 'available'
-                        self.vehicle.save()
-            except Accident.DoesNotExist:
-                pass
-                
-        super().save(*args, **kwargs)
\ No newline at end of file
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Where and when the row was, so a moved accident's old hotspot and tile get rebuilt
+        instance._loaded_position = tuple(instance.__dict__.get(field) for field in ('latitude', 'longitude', 'date_time'))
+        # The stored status, so a transition is seen without re-reading the row
+        if 'status' in instance.__dict__:
+            instance._loaded_status = instance.status
+        return instance
+    
+    def save(self, *args, sync_vehicle=True, **kwargs):
+        """
+        Save, keeping the vehicle's status in line (accidents.services).
+        
+        accidents.services saves under its own vehicle lock and passes
+        sync_vehicle=False.
+        """
+        if sync_vehicle:
+            from .services import save_accident
+            save_accident(self, *args, **kwargs)
+            return
+        
+        self.geohash = geohash.encode(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+class AccidentHotspot(models.Model):
+    """
+    A cluster of accidents close together within one time window, found by
+    accidents/hotspots.py. Kept up to date as accidents are saved; rolling
+    windows are re-cut by `manage.py rebuild_hotspots`.
+    """
+    
+    WINDOW_CHOICES = (
+        ('30d', 'Last 30 days'),
+        ('90d', 'Last 90 days'),
+        ('365d', 'Last 365 days'),
+        ('all', 'All time'),
+    )
+    
+    window = models.CharField(max_length=4, choices=WINDOW_CHOICES)
+    # Window and the cluster's lowest accident id, so a rebuild updates rather than replaces it
+    key = models.CharField(max_length=32, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius_m = models.FloatField(help_text="Distance from the centre to the farthest accident")
+    # Bounding box of the cluster's accidents
+    south = models.FloatField()
+    west = models.FloatField()
+    north = models.FloatField()
+    east = models.FloatField()
+    accident_count = models.PositiveIntegerField()
+    first_date_time = models.DateTimeField()
+    last_date_time = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['window', '-accident_count']
+        indexes = [
+            # Worst hotspots of a window
+            models.Index(fields=['window', '-accident_count']),
+            # Hotspots near a saved accident
+            models.Index(fields=['window', 'south']),
+        ]
+    
+    def __str__(self):
+        return f"{self.accident_count} accidents near {self.latitude:.4f}, {self.longitude:.4f} ({self.get_window_display()})"
+
+class HeatmapTile(models.Model):
+    """Accident count of one geohash cell (HOTSPOT_TILE_PRECISION characters) within one time window."""
+    window = models.CharField(max_length=4, choices=AccidentHotspot.WINDOW_CHOICES)
+    geohash = models.CharField(max_length=12)
+    # Centre of the cell
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    accident_count = models.PositiveIntegerField()
+    
+    class Meta:
+        ordering = ['window', 'geohash']
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'geohash'], name='unique_heatmap_tile'),
+        ]
+    
+    def __str__(self):
+        return f"{self.geohash}: {self.accident_count} ({self.get_window_display()})"
@@ -0,0 +1,69 @@
+"""
+Accidents and their vehicle's status.
+
+* Reporting an accident on a vehicle in use takes it out of service
+  (maintenance).
+* Scheduling or starting a repair does the same.
+* Resolving the vehicle's last open accident makes it available again.
+
+Saves run in a transaction holding a row lock on the vehicle, so two
+accidents of one vehicle resolved at the same time can't each see the other
+still open, nor both write the vehicle. The accident's stored status is kept
+from when it was loaded, so a transition is seen without re-reading the row;
+other open accidents are one EXISTS query, and only the vehicle's status
+column is written, when it changes.
+"""
+from django.db import transaction
+
+from vehicles.models import Vehicle
+from .models import Accident
+
+OPEN_STATUSES = ['reported', 'under_investigation', 'repair_scheduled', 'repair_in_progress']
+REPAIR_STATUSES = ['repair_scheduled', 'repair_in_progress']
+
+
+def _lock_vehicle(vehicle_id):
+    return Vehicle.objects.select_for_update().get(pk=vehicle_id)
+
+
+def _set_vehicle_status(vehicle, status):
+    if vehicle.status != status:
+        vehicle.status = status
+        vehicle.save(update_fields=['status'])
+
+
+def vehicle_status_after(accident, vehicle, previous_status):
+    """
+    The status `vehicle` should take now `accident` moved from
+    `previous_status` (None for a new accident), or None to leave it.
+    """
+    if previous_status == accident.status:
+        return None
+    if previous_status is None:
+        return 'maintenance' if vehicle.status == 'in_use' else None
+    if accident.status in REPAIR_STATUSES:
+        return 'maintenance'
+    if accident.status == 'resolved' and vehicle.status == 'maintenance':
+        still_open = Accident.objects.filter(vehicle_id=vehicle.pk, status__in=OPEN_STATUSES).exclude(pk=accident.pk)
+        return None if still_open.exists() else 'available'
+    return None
+
+
+def save_accident(accident, *args, **kwargs):
+    """Save `accident` (new or changed) and bring its vehicle's status in line, under a lock on the vehicle."""
+    with transaction.atomic():
+        vehicle = _lock_vehicle(accident.vehicle_id)
+        if accident._state.adding:
+            previous_status = None
+        elif hasattr(accident, '_loaded_status'):
+            previous_status = accident._loaded_status
+        else:
+            # Loaded with status deferred
+            previous_status = Accident.objects.filter(pk=accident.pk).values_list('status', flat=True).first()
+
+        accident.save(*args, sync_vehicle=False, **kwargs)
+        status = vehicle_status_after(accident, vehicle, previous_status)
+        if status:
+            _set_vehicle_status(vehicle, status)
+    accident.vehicle = vehicle
+    return accident
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import hotspots
+from .models import Accident
+
+
+@receiver([post_save, post_delete], sender=Accident)
+def refresh_hotspots(sender, instance, raw=False, **kwargs):
+    """Recount and re-cluster where the accident is and where it was, if either changed"""
+    if raw:
+        return
+    position = (instance.latitude, instance.longitude, instance.date_time)
+    loaded = getattr(instance, '_loaded_position', None)
+    if kwargs.get('signal') is post_save and position == loaded:
+        return
+    positions = [position]
+    if loaded is not None and kwargs.get('signal') is post_save:
+        positions.append(loaded)
+    hotspots.refresh(positions)
+    instance._loaded_position = position
@@ -1,3 +1,144 @@
+import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser
+from vehicles.models import Vehicle, VehicleType
+from . import hotspots
+from .forms import AccidentUpdateForm
+from .models import Accident, AccidentHotspot, HeatmapTile
+
+# Two junctions in Kochi, about 3 km apart
+JUNCTION = (9.9816, 76.2999)
+BRIDGE = (9.9570, 76.2830)
+
+
+class HotspotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', user_type='driver', approval_status='approved'
+        )
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Car', category='personal'), make='Maruti', model='Swift',
+            year=2021, license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+
+    def accident(self, place, metres_north=0, days_ago=1):
+        return Accident.objects.create(
+            vehicle=self.vehicle, driver=self.driver, date_time=timezone.now() - datetime.timedelta(days=days_ago),
+            location='Junction', latitude=round(place[0] + metres_north / 111195, 7), longitude=place[1],
+            description='Collision', damage_description='Bumper',
+        )
+
+    def stored(self, window):
+        return sorted(AccidentHotspot.objects.filter(window=window).values_list('key', 'accident_count'))
+
+    def test_dbscan_joins_chains_of_cores_and_their_border_points(self):
+        # 0-3 are cores 100 m apart, 4 is 200 m past the last core, 5 is alone
+        latitudes = [9.98 + metres / 111195 for metres in (0, 100, 200, 300, 500, 5000)]
+        labels = hotspots.dbscan(latitudes, [76.3] * 6, radius=250, min_points=3)
+        self.assertEqual(list(labels), [0, 0, 0, 0, 0, -1])
+
+    def test_saves_update_the_windows_they_fall_in(self):
+        first = [self.accident(JUNCTION, metres) for metres in (0, 60, 120)]
+        old = self.accident(BRIDGE, days_ago=200)
+        self.assertEqual(self.stored('30d'), [(f'30d:{first[0].pk}', 3)])
+        self.assertEqual(self.stored('all'), [(f'all:{first[0].pk}', 3)])
+
+        # Two more at the bridge make a second hotspot, but only in the windows reaching back to the old one
+        self.accident(BRIDGE, 50)
+        self.accident(BRIDGE, -50)
+        self.assertEqual(len(self.stored('30d')), 1)
+        self.assertEqual(self.stored('365d'), [(f'365d:{first[0].pk}', 3), (f'365d:{old.pk}', 3)])
+
+        # Moving an accident away breaks its hotspot up; its old and new tiles are recounted
+        old.latitude, old.longitude = JUNCTION[0] + 0.5, JUNCTION[1]
+        old.save()
+        self.assertEqual(self.stored('365d'), [(f'365d:{first[0].pk}', 3)])
+        first[1].delete()
+        self.assertEqual(self.stored('all'), [])
+
+        incremental = {window: self.stored(window) for window in hotspots.WINDOWS}
+        tiles = sorted(HeatmapTile.objects.values_list('window', 'geohash', 'accident_count'))
+        hotspots.rebuild()
+        self.assertEqual({window: self.stored(window) for window in hotspots.WINDOWS}, incremental)
+        self.assertEqual(sorted(HeatmapTile.objects.values_list('window', 'geohash', 'accident_count')), tiles)
+
+    def test_api_returns_hotspots_and_tiles_of_a_window(self):
+        for metres in (0, 60, 120):
+            self.accident(JUNCTION, metres)
+        self.accident(BRIDGE)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=self.driver).key}'
+
+        data = self.client.get('/api/v1/accident-hotspots/', {'window': '30d'}).json()
+        self.assertEqual([hotspot['accident_count'] for hotspot in data['hotspots']], [3])
+        self.assertEqual(sorted(count for _, _, count in data['tiles']), [1, 3])
+
+        box = {'south': 9.95, 'west': 76.27, 'north': 9.97, 'east': 76.29}
+        data = self.client.get('/api/v1/accident-hotspots/', box).json()
+        self.assertEqual((data['hotspots'], [count for _, _, count in data['tiles']]), ([], [1]))
+        self.assertEqual(self.client.get('/api/v1/accident-hotspots/', {'south': 9.95}).status_code, 400)
+
+    def test_form_rounds_gps_readings_to_the_column(self):
+        accident = self.accident(JUNCTION)
+        form = AccidentUpdateForm(instance=accident, data={
+            'location': 'Junction', 'latitude': '9.98160123456789', 'longitude': '76.29990987654321',
+            'description': 'Collision', 'damage_description': 'Bumper', 'status': 'reported',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(str(form.cleaned_data['latitude']), '9.9816012')
+
+
+class AccidentStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Car', category='personal'), make='Maruti', model='Swift',
+            year=2021, license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), status='in_use',
+        )
+
+    def report(self):
+        return Accident.objects.create(
+            vehicle=self.vehicle, driver=self.driver, date_time=timezone.now(), location='Junction',
+            description='Collision', damage_description='Bumper',
+        )
+
+    def vehicle_status(self):
+        return Vehicle.objects.values_list('status', flat=True).get(pk=self.vehicle.pk)
+
+    def test_the_vehicle_is_available_once_its_last_accident_is_resolved(self):
+        first, second = self.report(), self.report()
+        self.assertEqual(self.vehicle_status(), 'maintenance')
+
+        first = Accident.objects.get(pk=first.pk)
+        first.status = 'resolved'
+        first.save()
+        self.assertEqual(self.vehicle_status(), 'maintenance')
+
+        second = Accident.objects.get(pk=second.pk)
+        second.status = 'resolved'
+        # Savepoint, vehicle lock, accident UPDATE, open-accident EXISTS, vehicle status UPDATE, release
+        with self.assertNumQueries(6):
+            second.save()
+        self.assertEqual(self.vehicle_status(), 'available')
+
+        # Saving again without a transition leaves the vehicle alone
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(status='in_use')
+        second.notes = 'Closed'
+        second.save(update_fields=['notes'])
+        self.assertEqual(self.vehicle_status(), 'in_use')
 
-# Create your tests here.
+    def test_a_scheduled_repair_takes_the_vehicle_out_of_service(self):
+        accident = self.report()
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(status='available')
+        accident.status = 'repair_scheduled'
+        accident.save()
+        self.assertEqual(self.vehicle_status(), 'maintenance')
@@ -143,14 +143,9 @@ class AccidentCreateView(LoginRequiredMixin, CreateView):
         image_formset = context['image_formset']
         
         if image_formset.is_valid():
+            # Saving takes a vehicle in use out of service (accidents.services)
             self.object = form.save()
             
-            # Set the vehicle status to 'maintenance' if it's currently in use
-            vehicle = self.object.vehicle
-            if vehicle.status == 'in_use':
-                vehicle.status = 'maintenance'
-                vehicle.save()
-            
             # Save the accident images
             image_formset.instance = self.object
             image_formset.save()
@@ -190,24 +185,9 @@ class AccidentUpdateView(VehicleManagerRequiredMixin, UpdateView):
         image_formset = context['image_formset']
         
         if image_formset.is_valid():
+            # Status changes move the vehicle in and out of maintenance (accidents.services)
             self.object = form.save()
             
-            # Handle status changes affecting vehicle
-            old_status = form.initial.get('status')
-            new_status = form.cleaned_data.get('status')
-            
-            if old_status != new_status:
-                vehicle = self.object.vehicle
-                
-                if new_status == 'resolved' and vehicle.status == 'maintenance':
-                    # If accident is resolved, set vehicle to available
-                    vehicle.status = 'available'
-                    vehicle.save()
-                elif new_status in ['repair_scheduled', 'repair_in_progress'] and vehicle.status != 'maintenance':
-                    # If accident is being repaired, set vehicle to maintenance
-                    vehicle.status = 'maintenance'
-                    vehicle.save()
-            
             # Save the accident images
             image_formset.save()
                 
@@ -1,10 +1,9 @@
 # accounts/backends.py - Fixed to extract name from StyleHR username field
-import requests
 import logging
 from django.contrib.auth.backends import BaseBackend, ModelBackend
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-import json
+from . import stylehr
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -58,53 +57,12 @@ class StyleHRAuthBackend(BaseBackend):
             return None
     
     def _authenticate_with_stylehr(self, username, password):
-        """Authenticate with StyleHR API"""
+        """Verify the credentials with StyleHR (accounts.stylehr: pooled, circuit-broken, cached)"""
         try:
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            payload = {
-                'email': username,
-                'password': password
-            }
-            
-            response = requests.post(
-                'https://stylehr.in/api/login/',
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    logger.info(f"StyleHR raw response for {username}: {response_data}")
-                    
-                    if isinstance(response_data, dict) and self._is_valid_response(response_data):
-                        return response_data
-                except json.JSONDecodeError:
-                    pass
-            
+            return stylehr.get_client().verify(username, password)
+        except stylehr.StyleHRUnavailable as e:
+            logger.error(f"StyleHR API unavailable: {str(e)}")
             return None
-            
-        except requests.RequestException as e:
-            logger.error(f"StyleHR API request failed: {str(e)}")
-            return None
-    
-    def _is_valid_response(self, response_data):
-        """Check if response contains valid employee data"""
-        # Check for common employee data fields
-        required_fields = ['employee_id', 'email', 'id', 'user_id', 'username']
-        
-        # At least one required field should be present
-        has_required = any(field in response_data for field in required_fields)
-        
-        # Should not be an error message
-        is_not_error = 'Invalid username/password' not in str(response_data).lower()
-        
-        return has_required and is_not_error
     
     def _is_driver(self, hr_user_data):
         """
@@ -1,6 +1,7 @@
 # accounts/management/commands/test_hr_auth.py
 from django.core.management.base import BaseCommand
 from django.contrib.auth import authenticate, get_user_model
+from accounts import stylehr
 from accounts.backends import StyleHRAuthBackend
 from accounts.utils import StyleHRAPIClient, check_hr_system_health
 import json
@@ -123,11 +124,17 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.ERROR('   ✗ StyleHR backend not found in AUTHENTICATION_BACKENDS'))
         
-        stylehr_timeout = getattr(settings, 'STYLEHR_API_TIMEOUT', None)
-        if stylehr_timeout:
-            self.stdout.write(self.style.SUCCESS(f'   ✓ API timeout configured: {stylehr_timeout} seconds'))
+        client = stylehr.get_client()
+        connect_timeout, read_timeout = client.timeout
+        self.stdout.write(self.style.SUCCESS(
+            f'   ✓ API timeouts: {connect_timeout}s to connect, {read_timeout}s to read'
+        ))
+        if client.breaker.state == 'closed':
+            self.stdout.write(self.style.SUCCESS('   ✓ Circuit breaker closed'))
         else:
-            self.stdout.write(self.style.WARNING('   ! API timeout not configured (using default)'))
+            self.stdout.write(self.style.WARNING(
+                f'   ! Circuit breaker {client.breaker.state} after {client.breaker.failures} failures'
+            ))
         
         # Test 4: System health check
         self.stdout.write('\n4. Overall system health...')
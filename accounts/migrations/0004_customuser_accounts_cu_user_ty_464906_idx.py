@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_add_hr_employee_fields'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['user_type', 'approval_status', 'hr_authenticated_at'], name='accounts_cu_user_ty_464906_idx'),
+        ),
+    ]
@@ -69,6 +69,10 @@ class CustomUser(AbstractUser):
         ordering = ['username']
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Pending approval lists/counts (context processor runs on every page)
+            models.Index(fields=['user_type', 'approval_status', 'hr_authenticated_at']),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_user_type_display()})"
@@ -0,0 +1,179 @@
+"""
+StyleHR login client, used by accounts.backends.StyleHRAuthBackend.
+
+* One requests.Session per process, so logins reuse keep-alive connections
+  from a pool of STYLEHR_POOL_SIZE.
+* Short timeouts: STYLEHR_CONNECT_TIMEOUT to connect, STYLEHR_READ_TIMEOUT
+  for the answer.
+* A circuit breaker: after STYLEHR_FAILURE_THRESHOLD failures in a row
+  (connection errors, timeouts, 5xx) logins fail at once for
+  STYLEHR_RESET_SECONDS. Then one login is let through as a probe
+  (half-open); if it gets an answer the circuit closes, if not it opens again.
+* Accepted credentials are cached for STYLEHR_VERIFICATION_CACHE_SECONDS
+  under a salted hash of username and password, so logging in again soon
+  after doesn't call StyleHR. A password changed in StyleHR still works here
+  until the entry expires.
+
+The breaker is per process; each worker trips on its own failures.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import salted_hmac
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Any of these marks a response as employee data rather than an error
+EMPLOYEE_FIELDS = ['employee_id', 'email', 'id', 'user_id', 'username']
+
+
+class StyleHRUnavailable(Exception):
+    """StyleHR couldn't be asked: the request failed, or the circuit is open."""
+
+
+def is_employee_data(data):
+    """Whether a login response is an employee record rather than an error message."""
+    return (
+        isinstance(data, dict)
+        and any(field in data for field in EMPLOYEE_FIELDS)
+        and 'invalid username/password' not in str(data).lower()
+    )
+
+
+class CircuitBreaker:
+    """Closed until `threshold` failures in a row; open for `reset_seconds`; then half-open for one probe."""
+
+    def __init__(self, threshold, reset_seconds, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.probing or self.clock() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Whether a request may go out now; in half-open state only the first caller (the probe) may."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or self.clock() - self.opened_at < self.reset_seconds:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                logger.warning(f"StyleHR circuit opened after {self.failures} failures in a row")
+                self.opened_at = self.clock()
+                self.probing = False
+
+
+class StyleHRClient:
+    """Verifies driver credentials against StyleHR's login endpoint."""
+
+    def __init__(self):
+        self.url = getattr(settings, 'STYLEHR_API_URL', 'https://stylehr.in/api/login/')
+        self.timeout = (
+            getattr(settings, 'STYLEHR_CONNECT_TIMEOUT', 3),
+            getattr(settings, 'STYLEHR_READ_TIMEOUT', 8),
+        )
+        self.cache_seconds = getattr(settings, 'STYLEHR_VERIFICATION_CACHE_SECONDS', 300)
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'STYLEHR_FAILURE_THRESHOLD', 5),
+            getattr(settings, 'STYLEHR_RESET_SECONDS', 30),
+        )
+
+        pool_size = getattr(settings, 'STYLEHR_POOL_SIZE', 10)
+        self.session = requests.Session()
+        # No retries: a login is retried by the user, and the breaker counts every failure
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+
+    @staticmethod
+    def cache_key(username, password):
+        digest = salted_hmac('accounts.stylehr.verification', f'{username}\0{password}', algorithm='sha256')
+        return f'stylehr_verified_{digest.hexdigest()}'
+
+    def verify(self, username, password, use_cache=True):
+        """
+        The employee's HR data if StyleHR accepts the credentials, None if it
+        rejects them. Raises StyleHRUnavailable if it can't be asked.
+        """
+        key = self.cache_key(username, password)
+        if use_cache and self.cache_seconds:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self.breaker.allow():
+            raise StyleHRUnavailable('circuit open')
+        try:
+            response = self.session.post(
+                self.url, json={'email': username, 'password': password}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise StyleHRUnavailable(str(e)) from e
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise StyleHRUnavailable(f'HTTP {response.status_code}')
+        self.breaker.record_success()
+
+        if response.status_code != 200:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        if not is_employee_data(data):
+            return None
+        if self.cache_seconds:
+            cache.set(key, data, self.cache_seconds)
+        return data
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """This process's client (and so its connection pool and breaker)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = StyleHRClient()
+        return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    """Pick up changed STYLEHR_* settings (override_settings in tests) with a fresh client."""
+    global _client
+    if setting.startswith('STYLEHR_'):
+        _client = None
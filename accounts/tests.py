@@ -1,3 +1,113 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import stylehr
+from .backends import StyleHRAuthBackend
+from .models import CustomUser
+
+EMPLOYEE = {'employee_id': 'E10051', 'email': 'bala@example.com', 'username': 'Balachandran R'}
+
+
+class StubStyleHR(BaseHTTPRequestHandler):
+    """Answers logins with the server's `status` and `body`, after `delay` seconds; records who asked."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(self.client_address[1])
+        time.sleep(self.server.delay)
+        body = json.dumps(self.server.body).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StyleHRClientTests(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubStyleHR)
+        self.server.requests, self.server.status, self.server.body, self.server.delay = [], 200, EMPLOYEE, 0
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings = override_settings(
+            STYLEHR_API_URL=f'http://127.0.0.1:{self.server.server_port}/api/login/',
+            STYLEHR_READ_TIMEOUT=0.5, STYLEHR_FAILURE_THRESHOLD=2, STYLEHR_RESET_SECONDS=30,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.now = 1000.0
+        self.client = stylehr.get_client()
+        self.client.breaker.clock = lambda: self.now
+
+    def test_logins_reuse_one_connection_and_cached_verifications(self):
+        self.assertEqual(self.client.verify('10051', 'secret'), EMPLOYEE)
+        self.assertEqual(self.client.verify('10051', 'secret'), EMPLOYEE)
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.assertEqual(self.client.verify('10051', 'secret', use_cache=False), EMPLOYEE)
+        self.assertEqual(self.client.verify('10052', 'secret'), EMPLOYEE)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+        # Rejected credentials are answered but not cached
+        self.server.body = {'message': 'Invalid username/password'}
+        self.assertIsNone(self.client.verify('10051', 'wrong'))
+        self.assertIsNone(self.client.verify('10051', 'wrong'))
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_circuit_opens_after_failures_and_a_probe_closes_it(self):
+        self.server.status = 503
+        for _ in range(2):
+            with self.assertRaises(stylehr.StyleHRUnavailable):
+                self.client.verify('10051', 'secret')
+        self.assertEqual(self.client.breaker.state, 'open')
+
+        # Open: fails at once without asking StyleHR
+        with self.assertRaises(stylehr.StyleHRUnavailable):
+            self.client.verify('10051', 'secret')
+        self.assertEqual(len(self.server.requests), 2)
+
+        # Half-open: a failed probe opens it again
+        self.now += 30
+        self.assertEqual(self.client.breaker.state, 'half-open')
+        with self.assertRaises(stylehr.StyleHRUnavailable):
+            self.client.verify('10051', 'secret')
+        self.assertEqual(self.client.breaker.state, 'open')
+
+        self.now += 30
+        self.server.status = 200
+        self.assertEqual(self.client.verify('10051', 'secret'), EMPLOYEE)
+        self.assertEqual(self.client.breaker.state, 'closed')
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_read_timeouts_count_as_failures(self):
+        self.server.delay = 1
+        for _ in range(2):
+            with self.assertRaises(stylehr.StyleHRUnavailable):
+                self.client.verify('10051', 'secret')
+        self.assertEqual(self.client.breaker.state, 'open')
+
+    def test_backend_creates_a_pending_driver_named_from_hr(self):
+        user = StyleHRAuthBackend().authenticate(None, username='10051', password='secret')
+        self.assertEqual(user, CustomUser.objects.get(username='10051'))
+        self.assertEqual((user.first_name, user.last_name, user.email), ('Balachandran', 'R', 'bala@example.com'))
+        self.assertEqual((user.user_type, user.approval_status), ('driver', 'pending'))
+
+        # StyleHR down: the login fails rather than waiting on it
+        self.server.status = 503
+        self.assertIsNone(StyleHRAuthBackend().authenticate(None, username='10053', password='secret'))
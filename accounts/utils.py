@@ -4,6 +4,8 @@ from django.conf import settings
 from datetime import datetime, timedelta
 from django.core.cache import cache
 
+from . import stylehr
+
 logger = logging.getLogger(__name__)
 
 class StyleHRAPIClient:
@@ -13,67 +15,23 @@ class StyleHRAPIClient:
     
     def __init__(self):
         self.api_url = getattr(settings, 'STYLEHR_API_URL', 'https://stylehr.in/api/login/')
-        self.timeout = getattr(settings, 'STYLEHR_API_TIMEOUT', 30)
     
     def authenticate_user(self, username, password):
         """
-        Authenticate user with StyleHR API
+        Authenticate user with StyleHR API, always asking StyleHR (no verification cache)
         """
+        logger.info(f"Attempting StyleHR authentication for: {username}")
         try:
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            payload = {
-                'email': username,
-                'password': password
-            }
-            
-            logger.info(f"Attempting StyleHR authentication for: {username}")
-            
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                headers=headers,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    if isinstance(response_data, dict) and self._is_valid_response(response_data):
-                        logger.info(f"StyleHR authentication successful for: {username}")
-                        return response_data
-                except ValueError:
-                    logger.error(f"Invalid JSON response from StyleHR for: {username}")
-            
-            # Log the actual response for debugging
-            logger.warning(f"StyleHR authentication failed for {username}. Status: {response.status_code}, Response: {response.text[:200]}")
-            return None
-            
-        except requests.RequestException as e:
+            response_data = stylehr.get_client().verify(username, password, use_cache=False)
+        except stylehr.StyleHRUnavailable as e:
             logger.error(f"StyleHR API request failed for {username}: {str(e)}")
             return None
-        except Exception as e:
-            logger.error(f"Unexpected error during StyleHR authentication for {username}: {str(e)}")
-            return None
-    
-    def _is_valid_response(self, response_data):
-        """
-        Check if the response contains valid employee data
-        """
-        # Check for common employee data fields
-        required_fields = ['employee_id', 'email']  # Adjust based on actual StyleHR response
-        optional_fields = ['first_name', 'last_name', 'role', 'department']
-        
-        # At least one required field should be present
-        has_required = any(field in response_data for field in required_fields)
-        
-        # Should not be an error message
-        is_not_error = 'Invalid username/password' not in str(response_data)
         
-        return has_required and is_not_error
+        if response_data:
+            logger.info(f"StyleHR authentication successful for: {username}")
+        else:
+            logger.warning(f"StyleHR authentication failed for {username}")
+        return response_data
     
     def validate_driver_role(self, hr_user_data):
         """
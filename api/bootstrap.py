@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from .serializers import (
+    UserSerializer,
+    VehicleSerializer,
+    TripSerializer,
+    FuelTransactionSerializer,
+    FuelStationSerializer,
+)
+
+from vehicles.models import Vehicle
+from trips.models import Trip
+from fuel.models import FuelTransaction, FuelStation
+from vehicle_management.cache_versions import bump_version, get_version
+
+BOOTSTRAP_CACHE_TIMEOUT = getattr(settings, 'API_BOOTSTRAP_CACHE_TIMEOUT', 60)
+BOOTSTRAP_RECENT_FUEL_COUNT = getattr(settings, 'API_BOOTSTRAP_RECENT_FUEL_COUNT', 10)
+
+# Bumped whenever data shared by every user's payload (vehicles, stations) changes
+SHARED_VERSION_KEY = 'api_bootstrap_version'
+
+
+def _cache_key(user_id):
+    version = get_version(SHARED_VERSION_KEY)
+    return f"api_bootstrap_{user_id}_v{version}"
+
+
+def invalidate_user(user_id):
+    """Drop the cached bootstrap payload of a single user."""
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_all():
+    """Invalidate every user's cached bootstrap payload."""
+    bump_version(SHARED_VERSION_KEY)
+
+
+def with_ongoing_trips(queryset, vehicle_lookup=''):
+    """
+    Prefetch ongoing trips so VehicleSerializer.get_current_driver doesn't query per row.
+    `vehicle_lookup` is the path to the vehicle for querysets of related models, e.g. 'vehicle__'.
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            f'{vehicle_lookup}trips',
+            queryset=Trip.objects.filter(status='ongoing').select_related('driver'),
+            to_attr='ongoing_trips',
+        )
+    )
+
+
+def build_bootstrap_data(user, request=None):
+    """
+    Everything the mobile home screen needs, in one payload:
+    profile, assignable vehicles, active trip, recent fuel and stations.
+    """
+    vehicles = list(with_ongoing_trips(
+        Vehicle.objects.filter(
+            Q(assigned_driver__iexact=user.get_full_name()) | Q(status='available')
+        ).select_related('vehicle_type')
+    ))
+
+    active_trip = with_ongoing_trips(
+        Trip.objects.filter(driver=user, status='ongoing')
+        .select_related('vehicle__vehicle_type', 'driver'),
+        'vehicle__'
+    ).first()
+
+    recent_fuel = list(with_ongoing_trips(
+        FuelTransaction.objects.filter(driver=user)
+        .select_related('vehicle__vehicle_type', 'driver', 'fuel_station')
+        .order_by('-date', '-id')[:BOOTSTRAP_RECENT_FUEL_COUNT],
+        'vehicle__'
+    ))
+
+    stations = FuelStation.objects.all()
+
+    context = {'request': request}
+
+    return {
+        'user': UserSerializer(user, context=context).data,
+        'vehicles': VehicleSerializer(vehicles, many=True, context=context).data,
+        'active_trip': TripSerializer(active_trip, context=context).data if active_trip else None,
+        'recent_fuel_transactions': FuelTransactionSerializer(recent_fuel, many=True, context=context).data,
+        'fuel_stations': FuelStationSerializer(stations, many=True, context=context).data,
+        'generated_at': timezone.now(),
+    }
+
+
+def get_bootstrap_data(user, request=None):
+    """Return the bootstrap payload for `user`, served from cache when possible."""
+    key = _cache_key(user.id)
+    data = cache.get(key)
+    if data is None:
+        data = build_bootstrap_data(user, request)
+        cache.set(key, data, BOOTSTRAP_CACHE_TIMEOUT)
+    return data
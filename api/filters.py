@@ -0,0 +1,52 @@
+import django_filters
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework import filters
+
+from documents.models import ExpiryEntry
+from search.index import ranked_ids
+from vehicles.models import Vehicle
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the full-text search documents, best matches first.
+
+    Models without a search index, and queries the index can't match (e.g.
+    only very short words), fall back to the usual `search_fields` lookups.
+    The match runs inside the queryset it's given, so list it after the
+    other filter backends: the SEARCH_MAX_RESULTS best matches are then the
+    best of the user's own, filtered rows.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        ids = ranked_ids(queryset.model, query, within=queryset) if query else None
+        if ids is None:
+            return super().filter_queryset(request, queryset, view)
+        if not ids:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        )
+        return queryset.filter(pk__in=ids).order_by(rank, '-pk')
+
+
+class VehicleFilter(django_filters.FilterSet):
+    """Vehicle list filters; ?compliance=valid|expiring|expired reads the stored compliance status."""
+    compliance = django_filters.ChoiceFilter(field_name='compliance_status', choices=Vehicle.COMPLIANCE_CHOICES)
+
+    class Meta:
+        model = Vehicle
+        fields = ['status', 'vehicle_type', 'fuel_type', 'company_owned', 'usage_type', 'compliance']
+
+
+class ExpiryFilter(django_filters.FilterSet):
+    """Expiry calendar filters; ?kind= is repeatable."""
+    kind = django_filters.MultipleChoiceFilter(choices=ExpiryEntry.KIND_CHOICES)
+    vehicle_type = django_filters.NumberFilter(field_name='vehicle__vehicle_type')
+
+    class Meta:
+        model = ExpiryEntry
+        fields = ['kind', 'vehicle', 'user', 'vehicle_type']
+
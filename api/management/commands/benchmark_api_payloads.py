@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    VehicleSerializer,
+    TripSerializer,
+    FuelTransactionSerializer,
+    FuelStationSerializer,
+)
+from vehicles.models import Vehicle
+from trips.models import Trip
+from fuel.models import FuelTransaction, FuelStation
+import json
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = 'Compare payload size and serialization time of the stock and orjson API renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=settings.REST_FRAMEWORK['PAGE_SIZE'],
+            help='Number of rows in each list payload (default: one API page)'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of times each payload is rendered for timing'
+        )
+
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the results as JSON instead of a table'
+        )
+
+    def get_payloads(self, rows):
+        """Build representative /api/v1/ list payloads from the database."""
+        return {
+            'vehicles': VehicleSerializer(
+                Vehicle.objects.select_related('vehicle_type')[:rows], many=True
+            ).data,
+            'trips': TripSerializer(
+                Trip.objects.select_related('vehicle__vehicle_type', 'driver')[:rows], many=True
+            ).data,
+            'fuel-transactions': FuelTransactionSerializer(
+                FuelTransaction.objects.select_related(
+                    'vehicle__vehicle_type', 'driver', 'fuel_station'
+                )[:rows], many=True
+            ).data,
+            'fuel-stations': FuelStationSerializer(
+                FuelStation.objects.all()[:rows], many=True
+            ).data,
+        }
+
+    def time_render(self, renderer, data, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            content = renderer.render(data)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+        return content, elapsed_ms
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        renderers = [('json', JSONRenderer()), ('orjson', ORJSONRenderer())]
+        results = []
+
+        for name, data in self.get_payloads(rows).items():
+            result = {'payload': name, 'rows': len(data)}
+            for label, renderer in renderers:
+                content, elapsed_ms = self.time_render(renderer, data, repeat)
+                result[f'{label}_ms'] = round(elapsed_ms, 3)
+                result[f'{label}_bytes'] = len(content)
+
+            # Wire size is independent of the renderer once compressed
+            content = ORJSONRenderer().render(data)
+            result['gzip_bytes'] = len(compress_string(content))
+            result['br_bytes'] = len(brotli.compress(content, quality=5)) if brotli else None
+            results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'payload':<20}{'rows':>6}{'json ms':>10}{'orjson ms':>11}"
+            f"{'json B':>10}{'orjson B':>10}{'gzip B':>10}{'br B':>10}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['payload']:<20}{r['rows']:>6}{r['json_ms']:>10}{r['orjson_ms']:>11}"
+                f"{r['json_bytes']:>10}{r['orjson_bytes']:>10}{r['gzip_bytes']:>10}"
+                f"{r['br_bytes'] if r['br_bytes'] is not None else '-':>10}"
+            )
+        if not any(r['rows'] for r in results):
+            self.stdout.write(self.style.WARNING("No rows found - load some data first for meaningful numbers"))
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional - fall back to gzip only
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into a {coding: qvalue} dict.
+    Codings with q=0 are explicitly refused and kept out of the result.
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted[coding] = q
+    return accepted
+
+
+class APICompressionMiddleware(MiddlewareMixin):
+    """
+    Compress REST API responses with brotli or gzip, depending on what the
+    client accepts. Only responses under API_COMPRESSION_PATH_PREFIX and
+    larger than API_COMPRESSION_MIN_SIZE bytes are compressed - small
+    payloads are not worth the CPU on either end.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.path_prefix = getattr(settings, 'API_COMPRESSION_PATH_PREFIX', '/api/')
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'API_COMPRESSION_BROTLI_QUALITY', 5)
+
+    def choose_encoding(self, request):
+        """Pick the best coding we support from the request's Accept-Encoding."""
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        candidates = ['gzip']
+        if brotli is not None:
+            # Brotli first so it wins ties
+            candidates.insert(0, 'br')
+
+        best, best_q = None, 0
+        for coding in candidates:
+            q = accepted.get(coding, accepted.get('*', 0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return compress_string(content)
+
+    def process_response(self, request, response):
+        if not request.path.startswith(self.path_prefix):
+            return response
+
+        # Streaming responses (file downloads) are left alone
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed_content = self.compress(response.content, encoding)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(compressed_content))
+
+        # A strong ETag no longer matches the encoded body
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
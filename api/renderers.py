@@ -0,0 +1,54 @@
+import decimal
+import uuid
+
+import orjson
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    datetime, date, time and UUID values are serialized natively by orjson.
+    Anything orjson does not know about (Decimal, lazy translation strings,
+    querysets, ...) falls back to the same coercion DRF's JSONEncoder uses,
+    so the output is interchangeable with rest_framework.renderers.JSONRenderer.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    _fallback_encoder = JSONEncoder()
+
+    @classmethod
+    def default(cls, obj):
+        """Coerce types orjson cannot serialize on its own."""
+        if isinstance(obj, decimal.Decimal):
+            # Same behaviour as DRF's encoder with COERCE_DECIMAL_TO_STRING off
+            return float(obj)
+        if isinstance(obj, Promise):
+            return str(obj)
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        return cls._fallback_encoder.default(obj)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        """Honour `; indent=N` in the Accept header, like JSONRenderer."""
+        if accepted_media_type and 'indent' in accepted_media_type.partition(';')[2]:
+            return True
+        return bool((renderer_context or {}).get('indent'))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON bytes."""
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=self.default, option=options)
@@ -4,11 +4,43 @@ from trips.models import Trip
 from maintenance.models import Maintenance
 from fuel.models import FuelTransaction, FuelStation # Added FuelStation
 from accounts.models import CustomUser
+from documents.models import ExpiryEntry
+from accidents.models import AccidentHotspot
+from uploads.models import ChunkedUpload
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from images.pipeline import variant_sizes, variant_url
+from uploads.serving import file_url
 
 User = get_user_model()
 
+class ImageVariantsField(serializers.Field):
+    """Read-only URLs of an uploaded image and its resized variants (the original until they're made)."""
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        urls = {'original': file_url(value)}
+        urls.update((variant, variant_url(value, variant)) for variant in variant_sizes())
+        request = self.context.get('request')
+        if request:
+            urls = {variant: request.build_absolute_uri(url) for variant, url in urls.items()}
+        return urls
+
+class ProtectedImageField(serializers.ImageField):
+    """An image upload whose URL is the permission-checked download (uploads.serving), not MEDIA_URL."""
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = file_url(value)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user accounts."""
     full_name = serializers.SerializerMethodField()
@@ -40,35 +72,44 @@ class VehicleSerializer(serializers.ModelSerializer):
     current_driver = serializers.SerializerMethodField() # Kept this, might be useful
     documents_valid = serializers.SerializerMethodField() # Kept this
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Vehicle
         fields = [
             'id', 'vehicle_type', 'vehicle_type_id', 'make', 'model', 'year', 
             'license_plate', 'vin', 'color', 'current_odometer', 'status', 
-            'status_display', 'image', 'image_url', 'acquisition_date', 
+            'status_display', 'image', 'image_url', 'image_variants', 'acquisition_date', 
             'fuel_type', 'seating_capacity', 'current_driver', 'documents_valid',
+            'compliance_status', 'compliance_next_expiry',
             'owner_name', 'rc_valid_till', 'insurance_expiry_date', 'fitness_expiry',
             'permit_expiry', 'pollution_cert_expiry', 'gps_fitted', 'gps_name',
             'driver_contact', 'assigned_driver', 'purpose_of_vehicle', 'company_owned',
             'usage_type', 'used_by'
         ]
-        read_only_fields = ['id', 'status_display', 'current_driver', 'documents_valid', 'image_url']
+        read_only_fields = [
+            'id', 'status_display', 'current_driver', 'documents_valid', 'compliance_status',
+            'compliance_next_expiry', 'image_url'
+        ]
     
     def get_status_display(self, obj):
         return obj.get_status_display() # Use model's get_status_display method
     
     def get_current_driver(self, obj):
-        # Assuming get_current_driver() method exists on Vehicle model
-        # and returns a User instance or None
-        driver = obj.get_current_driver() if hasattr(obj, 'get_current_driver') else None
+        # Use ongoing trips prefetched into `ongoing_trips` when the caller batched them
+        if hasattr(obj, 'ongoing_trips'):
+            driver = obj.ongoing_trips[0].driver if obj.ongoing_trips else None
+        else:
+            # Assuming get_current_driver() method exists on Vehicle model
+            # and returns a User instance or None
+            driver = obj.get_current_driver() if hasattr(obj, 'get_current_driver') else None
         if driver:
             return UserSerializer(driver).data
         return None
     
     def get_documents_valid(self, obj):
-        # Assuming get_document_status() method exists
-        return obj.get_document_status() if hasattr(obj, 'get_document_status') else None
+        # Stored on the vehicle, see documents/compliance.py
+        return obj.compliance_status != 'expired'
     
     def get_image_url(self, obj):
         if obj.image:
@@ -112,10 +153,10 @@ class TripSerializer(serializers.ModelSerializer):
         return obj.get_status_display() # Use model's get_status_display
     
     def get_duration_display(self, obj):
-        return obj.duration # Use model's duration property or method
+        return obj.duration() # Use model's duration method
     
     def get_distance(self, obj):
-        return obj.distance_traveled # Use model's distance_traveled property or method
+        return obj.distance_traveled() # Use model's distance_traveled method
     
     def validate(self, data):
         """
@@ -153,6 +194,7 @@ class MaintenanceSerializer(serializers.ModelSerializer):
         source='vehicle'
     )
     status_display = serializers.SerializerMethodField()
+    invoice_image_variants = ImageVariantsField(source='invoice_image')
     # Assuming maintenance_type and provider are CharFields or ForeignKeys that are handled by default
     # If they are ForeignKeys and need specific representation, create serializers for them.
     # For now, using PrimaryKeyRelatedField for provider if it's a FK.
@@ -164,7 +206,8 @@ class MaintenanceSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'vehicle', 'vehicle_id', 'maintenance_type', 'description', # Assuming maintenance_type is a FK to a MaintenanceType model or a choice field
             'status', 'status_display', 'scheduled_date', 'completion_date',
-            'odometer_reading', 'cost', 'provider', 'notes' # Assuming provider is FK to a Provider model or CharField
+            'odometer_reading', 'cost', 'provider', 'notes', # Assuming provider is FK to a Provider model or CharField
+            'invoice_image_variants'
         ]
         read_only_fields = ['id', 'status_display']
     
@@ -177,6 +220,58 @@ class FuelStationSerializer(serializers.ModelSerializer):
         model = FuelStation
         fields = ['id', 'name', 'address', 'latitude', 'longitude', 'station_type']
 
+class NearbyFuelStationQuerySerializer(serializers.Serializer):
+    """Query parameters of the nearby fuel stations endpoint."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    station_type = serializers.ChoiceField(choices=FuelStation.STATION_TYPE_CHOICES, required=False)
+    radius_km = serializers.FloatField(min_value=0, required=False)
+
+class ExpiryCalendarQuerySerializer(serializers.Serializer):
+    """Query parameters of the expiry calendar: `days` days from `start` (default today)."""
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
+
+class AccidentHotspotQuerySerializer(serializers.Serializer):
+    """Query parameters of the accident hotspot map: a window, optionally cut to a bounding box."""
+    window = serializers.ChoiceField(choices=AccidentHotspot.WINDOW_CHOICES, default='90d')
+    south = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    west = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    north = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    east = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    
+    def validate(self, data):
+        given = [side for side in ('south', 'west', 'north', 'east') if side in data]
+        if given and len(given) < 4:
+            raise serializers.ValidationError("Give all of south, west, north and east, or none.")
+        if given and (data['south'] > data['north'] or data['west'] > data['east']):
+            raise serializers.ValidationError("The box's south must not exceed north, nor west east.")
+        return data
+
+class ExpiryEntrySerializer(serializers.ModelSerializer):
+    """An expiry calendar entry and what it belongs to."""
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    label = serializers.CharField(read_only=True)
+    subject = serializers.CharField(read_only=True)
+    days_left = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExpiryEntry
+        fields = ['id', 'kind', 'kind_display', 'label', 'subject', 'expiry_date', 'days_left', 'vehicle', 'user', 'document']
+    
+    def get_days_left(self, obj):
+        return (obj.expiry_date - timezone.localdate()).days
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    """A resumable upload; created with purpose, object_id, filename and size, then fed chunks."""
+    completed = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'purpose', 'object_id', 'filename', 'size', 'offset', 'completed', 'stored_name', 'created_at']
+        read_only_fields = ['id', 'offset', 'stored_name', 'created_at']
+
 class FuelTransactionSerializer(serializers.ModelSerializer):
     """Serializer for fuel transactions, supporting both fuel and electric vehicles."""
     vehicle = VehicleSerializer(read_only=True)
@@ -200,7 +295,8 @@ class FuelTransactionSerializer(serializers.ModelSerializer):
         required=False
     )
     is_electric = serializers.SerializerMethodField()
-    receipt_image = serializers.ImageField(required=False, allow_null=True)
+    receipt_image = ProtectedImageField(required=False, allow_null=True)
+    receipt_image_variants = ImageVariantsField(source='receipt_image')
 
     class Meta:
         model = FuelTransaction
@@ -219,6 +315,7 @@ class FuelTransactionSerializer(serializers.ModelSerializer):
             'total_cost', 
             'odometer_reading', 
             'receipt_image', 
+            'receipt_image_variants',
             'notes',
             'is_electric'
         ]
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+
+from . import bootstrap
+from vehicles.models import Vehicle
+from trips.models import Trip
+from fuel.models import FuelTransaction, FuelStation
+from documents.compliance import compliance_changed
+
+User = get_user_model()
+
+@receiver([post_save, post_delete], sender=Vehicle)
+@receiver([post_save, post_delete], sender=FuelStation)
+def invalidate_shared_bootstrap(sender, instance, **kwargs):
+    """Vehicles and stations appear in every user's bootstrap payload"""
+    bootstrap.invalidate_all()
+
+@receiver(compliance_changed)
+def invalidate_compliance_bootstrap(sender, vehicle_ids, **kwargs):
+    """Vehicle payloads show documents_valid; compliance refreshes update vehicles in bulk"""
+    bootstrap.invalidate_all()
+
+@receiver([post_save, post_delete], sender=Trip)
+@receiver([post_save, post_delete], sender=FuelTransaction)
+def invalidate_driver_bootstrap(sender, instance, **kwargs):
+    """Trips and fuel transactions only affect their driver's payload"""
+    bootstrap.invalidate_user(instance.driver_id)
+
+@receiver(post_save, sender=User)
+def invalidate_user_bootstrap(sender, instance, **kwargs):
+    """Profile changes (and full-name based vehicle assignment)"""
+    bootstrap.invalidate_user(instance.pk)
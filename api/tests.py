@@ -0,0 +1,175 @@
+import datetime
+import gzip
+import uuid
+from decimal import Decimal
+
+import brotli
+import orjson
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser
+from documents.compliance import compliance_changed
+from fuel.models import FuelStation, FuelTransaction
+from trips.models import Trip
+from vehicles.models import Vehicle, VehicleType
+
+from .middleware import APICompressionMiddleware, parse_accept_encoding
+from .renderers import ORJSONRenderer
+
+BODY = b'{"license_plate": "KL-07-0001"}' * 100
+
+
+class CompressionTests(SimpleTestCase):
+
+    def respond(self, path='/api/v1/vehicles/', accept_encoding='gzip, br', response=None):
+        request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+        middleware = APICompressionMiddleware(lambda request: response or HttpResponse(BODY))
+        return middleware(request)
+
+    def test_parses_qvalues_and_drops_refused_codings(self):
+        self.assertEqual(parse_accept_encoding('gzip;q=0.5, br;q=0, *;q=0.1, , deflate'), {
+            'gzip': 0.5, '*': 0.1, 'deflate': 1.0,
+        })
+
+    def test_prefers_brotli_and_honours_refusals(self):
+        response = self.respond()
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+        response = self.respond(accept_encoding='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(self.respond(accept_encoding='gzip;q=0.9, br;q=0.5')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.respond(accept_encoding='*')['Content-Encoding'], 'br')
+
+        response = self.respond(accept_encoding='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_leaves_small_non_api_encoded_and_streaming_responses_alone(self):
+        response = self.respond(response=HttpResponse(b'x' * 1023))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(self.respond(response=HttpResponse(b'x' * 1024))['Content-Encoding'], 'br')
+
+        self.assertFalse(self.respond(path='/dashboard/').has_header('Content-Encoding'))
+
+        encoded = HttpResponse(BODY, headers={'Content-Encoding': 'identity'})
+        self.assertEqual(self.respond(response=encoded).content, BODY)
+
+        streaming = self.respond(response=StreamingHttpResponse([BODY]))
+        self.assertFalse(streaming.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(streaming.streaming_content), BODY)
+
+    def test_keeps_existing_vary_and_weakens_etags(self):
+        response = HttpResponse(BODY, headers={'Vary': 'Cookie', 'ETag': '"abc"'})
+        response = self.respond(response=response)
+        self.assertEqual(response['Vary'], 'Cookie, Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_renders_decimals_datetimes_and_uuids(self):
+        key = uuid.UUID('12345678-1234-5678-1234-567812345678')
+        data = {
+            'total_cost': Decimal('4512.50'),
+            'start_time': datetime.datetime(2025, 3, 1, 8, 30, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2025, 3, 1),
+            'id': key,
+            7: 'non-string key',
+        }
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(orjson.loads(rendered), {
+            'total_cost': 4512.5,
+            'start_time': '2025-03-01T08:30:00+00:00',
+            'date': '2025-03-01',
+            'id': str(key),
+            '7': 'non-string key',
+        })
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indents_when_asked(self):
+        rendered = ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+
+class BootstrapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver, cls.other = [
+            CustomUser.objects.create_user(
+                username, f'{username}@example.com', 'pw', user_type='driver', approval_status='approved',
+                first_name=username.title(), last_name='Kumar',
+            )
+            for username in ['rajesh', 'suresh']
+        ]
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Car', category='personal'), make='Maruti', model='Swift',
+            year=2021, license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+        )
+        cls.station = FuelStation.objects.create(name='Kochi Fuels', address='Kochi')
+
+    def setUp(self):
+        # Cached payloads outlive the rolled back data of other tests
+        cache.clear()
+
+    def bootstrap(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        response = self.client.get('/api/v1/bootstrap/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_payloads_are_cached_per_user(self):
+        mine = self.bootstrap(self.driver)
+        self.assertEqual(mine['user']['username'], 'rajesh')
+        self.assertEqual(self.bootstrap(self.driver)['generated_at'], mine['generated_at'])
+
+        theirs = self.bootstrap(self.other)
+        self.assertEqual(theirs['user']['username'], 'suresh')
+        self.assertNotEqual(theirs['generated_at'], mine['generated_at'])
+
+    def test_trips_and_fuel_invalidate_their_driver_only(self):
+        trip = Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, start_time=timezone.now(), start_odometer=1000,
+            origin='Kochi', destination='Aluva', purpose='Delivery',
+        )
+        self.assertEqual(self.bootstrap(self.driver)['active_trip']['purpose'], 'Delivery')
+        theirs = self.bootstrap(self.other)
+
+        trip.purpose = 'Pickup'
+        trip.save()
+        self.assertEqual(self.bootstrap(self.driver)['active_trip']['purpose'], 'Pickup')
+        self.assertEqual(self.bootstrap(self.other)['generated_at'], theirs['generated_at'])
+
+        transaction = FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, fuel_station=self.station, date=datetime.date.today(),
+            fuel_type='Petrol', quantity=Decimal('20'), cost_per_liter=Decimal('104'), odometer_reading=1050,
+        )
+        self.assertEqual(
+            [fuel['id'] for fuel in self.bootstrap(self.driver)['recent_fuel_transactions']], [transaction.pk]
+        )
+        self.assertEqual(self.bootstrap(self.other)['generated_at'], theirs['generated_at'])
+
+    def test_vehicles_stations_and_compliance_invalidate_everyone(self):
+        mine, theirs = self.bootstrap(self.driver), self.bootstrap(self.other)
+
+        self.vehicle.color = 'red'
+        self.vehicle.save()
+        self.assertEqual(self.bootstrap(self.other)['vehicles'][0]['color'], 'red')
+        self.assertNotEqual(self.bootstrap(self.driver)['generated_at'], mine['generated_at'])
+
+        theirs = self.bootstrap(self.other)
+        FuelStation.objects.create(name='Aluva Charge', address='Aluva', station_type='charging')
+        self.assertEqual(len(self.bootstrap(self.other)['fuel_stations']), 2)
+
+        theirs = self.bootstrap(self.other)
+        compliance_changed.send(sender=Vehicle, vehicle_ids=[self.vehicle.pk])
+        self.assertNotEqual(self.bootstrap(self.other)['generated_at'], theirs['generated_at'])
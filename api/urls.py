@@ -8,7 +8,12 @@ from .views import (
     FuelTransactionViewSet,
     FuelStationViewSet, # Added FuelStationViewSet
     UserViewSet,
-    CustomAuthToken
+    ExpiryCalendarViewSet,
+    CustomAuthToken,
+    BootstrapView,
+    AccidentHotspotView,
+    ChunkedUploadCreateView,
+    ChunkedUploadView
 )
 
 router = DefaultRouter()
@@ -19,10 +24,15 @@ router.register(r'maintenance', MaintenanceViewSet, basename='maintenance')
 router.register(r'fuel-transactions', FuelTransactionViewSet, basename='fueltransaction')
 router.register(r'fuel-stations', FuelStationViewSet, basename='fuelstation') # Added FuelStationViewSet
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'expiries', ExpiryCalendarViewSet, basename='expiry')
 
 
 urlpatterns = [
     path('', include(router.urls)),
     path('login/', CustomAuthToken.as_view(), name='api_login'),
+    path('bootstrap/', BootstrapView.as_view(), name='api_bootstrap'),
+    path('accident-hotspots/', AccidentHotspotView.as_view(), name='api_accident_hotspots'),
+    path('uploads/', ChunkedUploadCreateView.as_view(), name='api_upload_create'),
+    path('uploads/<uuid:pk>/', ChunkedUploadView.as_view(), name='api_upload'),
     # path('logout/', LogoutView.as_view(), name='api_logout'), # Example: ensure a proper DRF logout view if needed
 ]
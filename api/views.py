@@ -1,6 +1,8 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, permissions, filters, serializers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
@@ -17,8 +19,15 @@ from .serializers import (
     MaintenanceSerializer,
     FuelTransactionSerializer,
     FuelStationSerializer, # Added FuelStationSerializer
+    NearbyFuelStationQuerySerializer,
+    ExpiryCalendarQuerySerializer,
+    ExpiryEntrySerializer,
+    AccidentHotspotQuerySerializer,
+    ChunkedUploadSerializer,
     UserSerializer
 )
+from .filters import ExpiryFilter, FullTextSearchFilter, VehicleFilter
+from .bootstrap import get_bootstrap_data, with_ongoing_trips
 from .permissions import (
     IsAdminOrReadOnly,
     IsOwnerOrAdmin,
@@ -31,11 +40,18 @@ from .permissions import (
 
 from vehicles.models import Vehicle, VehicleType
 from trips.models import Trip
+from trips import services as trip_services
 from maintenance.models import Maintenance
 from fuel.models import FuelTransaction, FuelStation # Added FuelStation
+from fuel.proximity import nearest_stations
+from documents.expiry import entries_between
+from accidents.hotspots import map_data as hotspot_map_data
+from uploads import chunked
+from uploads.models import ChunkedUpload
 
 User = get_user_model()
 
+
 class CustomAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
         username = request.data.get('username')
@@ -60,6 +76,18 @@ class CustomAuthToken(ObtainAuthToken):
                 'detail': 'Invalid credentials or inactive account'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+class BootstrapView(APIView):
+    """
+    Everything the mobile home screen needs in a single round trip:
+    profile, assignable vehicles, active trip, recent fuel and fuel stations.
+    The payload is cached per user and invalidated when the underlying data changes.
+    """
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+
+    def get(self, request):
+        return Response(get_bootstrap_data(request.user, request))
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     API endpoint for users.
@@ -118,9 +146,9 @@ class VehicleViewSet(viewsets.ModelViewSet):
     serializer_class = VehicleSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     permission_classes = [IsActiveUser]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['make', 'model', 'license_plate', 'vin']
-    filterset_fields = ['status', 'vehicle_type', 'fuel_type', 'company_owned', 'usage_type']
+    filterset_class = VehicleFilter
 
     def get_permissions(self):
         """
@@ -138,14 +166,15 @@ class VehicleViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager']):
-            return Vehicle.objects.all()
+            queryset = Vehicle.objects.all()
         else:
             # Drivers see vehicles assigned to them by full name OR any 'available' vehicle
             # Ensure user.get_full_name() is a reliable field for assignment comparison.
             # If assigned_driver stores user ID, then Q(assigned_driver=user) or Q(assigned_driver_id=user.id)
-            return Vehicle.objects.filter(
+            queryset = Vehicle.objects.filter(
                 Q(assigned_driver__iexact=user.get_full_name()) | Q(status='available') # Assuming assigned_driver is a CharField storing name
             ).distinct()
+        return with_ongoing_trips(queryset.select_related('vehicle_type'))
 
 
     @action(detail=True, methods=['get'])
@@ -154,7 +183,10 @@ class VehicleViewSet(viewsets.ModelViewSet):
         Return all trips for this vehicle.
         """
         vehicle = self.get_object()
-        trips_qs = Trip.objects.filter(vehicle=vehicle) # Renamed to avoid conflict
+        trips_qs = with_ongoing_trips(
+            Trip.objects.filter(vehicle=vehicle).select_related('vehicle__vehicle_type', 'driver'),
+            'vehicle__'
+        ) # Renamed to avoid conflict
 
         user = request.user
         if not (user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager'])):
@@ -162,9 +194,9 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
         page = self.paginate_queryset(trips_qs)
         if page is not None:
-            serializer = TripSerializer(page, many=True, context={'request': request})
+            serializer = TripSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
-        serializer = TripSerializer(trips_qs, many=True, context={'request': request})
+        serializer = TripSerializer(trips_qs, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
@@ -173,12 +205,15 @@ class VehicleViewSet(viewsets.ModelViewSet):
         Return all maintenance records for this vehicle.
         """
         vehicle = self.get_object()
-        maintenance_records = Maintenance.objects.filter(vehicle=vehicle)
+        maintenance_records = with_ongoing_trips(
+            Maintenance.objects.filter(vehicle=vehicle).select_related('vehicle__vehicle_type'),
+            'vehicle__'
+        )
         page = self.paginate_queryset(maintenance_records)
         if page is not None:
-            serializer = MaintenanceSerializer(page, many=True, context={'request': request})
+            serializer = MaintenanceSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
-        serializer = MaintenanceSerializer(maintenance_records, many=True, context={'request': request})
+        serializer = MaintenanceSerializer(maintenance_records, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
@@ -187,7 +222,11 @@ class VehicleViewSet(viewsets.ModelViewSet):
         Return all fuel transactions for this vehicle.
         """
         vehicle = self.get_object()
-        fuel_transactions_qs = FuelTransaction.objects.filter(vehicle=vehicle) # Renamed
+        fuel_transactions_qs = with_ongoing_trips(
+            FuelTransaction.objects.filter(vehicle=vehicle)
+            .select_related('vehicle__vehicle_type', 'driver', 'fuel_station'),
+            'vehicle__'
+        ) # Renamed
 
         user = request.user
         if not (user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager'])):
@@ -195,9 +234,9 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
         page = self.paginate_queryset(fuel_transactions_qs)
         if page is not None:
-            serializer = FuelTransactionSerializer(page, many=True, context={'request': request})
+            serializer = FuelTransactionSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
-        serializer = FuelTransactionSerializer(fuel_transactions_qs, many=True, context={'request': request})
+        serializer = FuelTransactionSerializer(fuel_transactions_qs, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
@@ -234,7 +273,7 @@ class TripViewSet(viewsets.ModelViewSet):
     serializer_class = TripSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     permission_classes = [IsActiveUser]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['origin', 'destination', 'purpose', 'vehicle__license_plate', 'driver__username']
     filterset_fields = ['status', 'vehicle', 'driver']
 
@@ -244,8 +283,10 @@ class TripViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager']):
-            return Trip.objects.all()
-        return Trip.objects.filter(driver=user)
+            queryset = Trip.objects.all()
+        else:
+            queryset = Trip.objects.filter(driver=user)
+        return with_ongoing_trips(queryset.select_related('vehicle__vehicle_type', 'driver'), 'vehicle__')
 
     def get_permissions(self):
         """
@@ -259,23 +300,23 @@ class TripViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """
-        Set the driver to the current user if not provided.
-        Update vehicle status to 'in_use' and set current_odometer.
+        Start the trip through the trip service, which sets the driver to the
+        current user if not provided and marks the vehicle as in use.
         """
-        if 'driver' not in serializer.validated_data and hasattr(self.request.user, 'id'):
-            serializer.validated_data['driver'] = self.request.user
-        
-        trip = serializer.save()
-
-        # Update vehicle status and odometer
-        vehicle = trip.vehicle
-        if hasattr(vehicle, 'status'):
-            vehicle.status = 'in_use'
-        if hasattr(vehicle, 'current_odometer') and trip.start_odometer is not None:
-            # Only update if new odometer is greater or it's the first reading
-            if vehicle.current_odometer is None or trip.start_odometer > vehicle.current_odometer:
-                 vehicle.current_odometer = trip.start_odometer
-        vehicle.save()
+        data = serializer.validated_data
+        try:
+            serializer.instance = trip_services.start_trip(
+                vehicle=data['vehicle'],
+                driver=data.get('driver') or self.request.user,
+                start_odometer=data['start_odometer'],
+                origin=data['origin'],
+                destination=data['destination'],
+                purpose=data['purpose'],
+                notes=data.get('notes', ''),
+                start_time=data.get('start_time'),
+            )
+        except ValidationError as e:
+            raise serializers.ValidationError(e.messages)
 
 
     @action(detail=True, methods=['post'])
@@ -308,17 +349,7 @@ class TripViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            trip.end_odometer = end_odometer
-            trip.end_time = timezone.now()
-            trip.notes = notes
-            trip.status = 'completed'
-            trip.save()
-
-            if hasattr(trip.vehicle, 'status'):
-                trip.vehicle.status = 'available'
-            if hasattr(trip.vehicle, 'current_odometer'):
-                trip.vehicle.current_odometer = end_odometer
-            trip.vehicle.save()
+            trip_services.end_trip(trip, end_odometer, notes=notes)
 
             serializer = self.get_serializer(trip)
             return Response(serializer.data)
@@ -328,6 +359,10 @@ class TripViewSet(viewsets.ModelViewSet):
                 {"detail": "End odometer must be a valid number."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except ValidationError as e:
+            return Response(
+                {"detail": " ".join(e.messages)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -349,17 +384,14 @@ class TripViewSet(viewsets.ModelViewSet):
         reason = request.data.get('reason', 'Trip cancelled by user')
 
         try:
-            trip.status = 'cancelled'
-            trip.end_time = timezone.now() # Or keep null if cancellation means it never effectively ended
-            trip.notes = f"Cancelled: {reason}. {trip.notes or ''}".strip()
-            trip.save()
-
-            if hasattr(trip.vehicle, 'status'):
-                trip.vehicle.status = 'available'
-            trip.vehicle.save()
+            trip_services.cancel_trip(trip, reason=reason)
 
             serializer = self.get_serializer(trip)
             return Response(serializer.data)
+        except ValidationError as e:
+            return Response(
+                {"detail": " ".join(e.messages)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -369,11 +401,13 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
     """
     API endpoint for maintenance records.
     """
-    queryset = Maintenance.objects.all()
+    queryset = with_ongoing_trips(
+        Maintenance.objects.select_related('vehicle__vehicle_type'), 'vehicle__'
+    )
     serializer_class = MaintenanceSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     permission_classes = [IsActiveUser]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['description', 'provider__name', 'notes', 'vehicle__license_plate']
     filterset_fields = ['status', 'vehicle', 'maintenance_type']
 
@@ -415,6 +449,154 @@ class FuelStationViewSet(viewsets.ModelViewSet):
             return [IsActiveUser(), IsManagerOrAdmin()]
         return [IsActiveUser()]
 
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Stations nearest to ?lat=&lng=, closest first.
+        Optional: limit (default 5, max 50), station_type (charging includes
+        'both' stations, as does fuel) and radius_km.
+        """
+        params = NearbyFuelStationQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        stations = nearest_stations(
+            params['lat'], params['lng'],
+            limit=params['limit'],
+            station_type=params.get('station_type'),
+            max_distance_km=params.get('radius_km'),
+        )
+        return Response([
+            {**station._asdict(), 'distance_km': round(distance, 2)}
+            for station, distance in stations
+        ])
+
+class ExpiryCalendarViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the expiry calendar: documents, driving licences and
+    vehicle certificates expiring in `days` days (default 30, max 366) from
+    `start` (default today), soonest first. Filter with kind, vehicle, user
+    and vehicle_type.
+    """
+    serializer_class = ExpiryEntrySerializer
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ExpiryFilter
+
+    def get_queryset(self):
+        """
+        One range scan of the expiry index. Admins/Managers see every entry;
+        drivers see their own licence and the vehicles assigned to them.
+        """
+        params = ExpiryCalendarQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        start = params.validated_data.get('start') or timezone.localdate()
+        queryset = entries_between(start, start + timezone.timedelta(days=params.validated_data['days']))
+
+        user = self.request.user
+        if not (user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager'])):
+            mine = Q(user=user)
+            if user.get_full_name():
+                mine |= Q(vehicle__assigned_driver__iexact=user.get_full_name())
+            queryset = queryset.filter(mine)
+        return queryset
+
+class AccidentHotspotView(APIView):
+    """
+    Precomputed accident hotspots and heatmap tiles for one window (30d, 90d,
+    365d or all; default 90d), optionally within a south/west/north/east box.
+    Plain values rather than serialized rows, so a map can poll it cheaply.
+    """
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+
+    def get(self, request):
+        params = AccidentHotspotQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        box = (data['south'], data['west'], data['north'], data['east']) if 'south' in data else None
+        return Response(hotspot_map_data(data['window'], box))
+
+def upload_response(upload, status_code=status.HTTP_200_OK):
+    """The upload as JSON, with its offset and length in tus-style headers."""
+    response = Response(ChunkedUploadSerializer(upload).data, status=status_code)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+class ChunkedUploadCreateView(APIView):
+    """
+    Start a resumable upload of a document file, fuel receipt or accident
+    photo: POST {"purpose", "object_id", "filename", "size"}. The type and
+    size are checked here, before any bytes are sent.
+    """
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+
+    def post(self, request):
+        serializer = ChunkedUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = chunked.start_upload(request.user, **serializer.validated_data)
+        except ValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        response = upload_response(upload, status.HTTP_201_CREATED)
+        response['Location'] = request.build_absolute_uri(f'{upload.pk}/')
+        return response
+
+class ChunkedUploadView(APIView):
+    """
+    GET/HEAD: the upload and its current offset, to resume from.
+    PATCH: append the request body (Content-Type: application/offset+octet-stream)
+    at the Upload-Offset header, which must equal the current offset (409 and
+    the current offset otherwise). The last chunk attaches the file.
+    DELETE: abandon an unfinished upload.
+    """
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+
+    def get_upload(self, pk):
+        upload = ChunkedUpload.objects.filter(pk=pk, user=self.request.user).first()
+        if upload is None:
+            raise NotFound()
+        return upload
+
+    def get(self, request, pk):
+        return upload_response(self.get_upload(pk))
+
+    def patch(self, request, pk):
+        if request.content_type != 'application/offset+octet-stream':
+            return Response(
+                {"detail": "Send chunks as application/offset+octet-stream."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response({"detail": "Upload-Offset header is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read the underlying request as a stream; request.data would buffer the whole chunk
+            upload = chunked.append_chunk(pk, request.user, offset, request._request)
+        except ChunkedUpload.DoesNotExist:
+            raise NotFound()
+        except chunked.OffsetMismatch as e:
+            response = upload_response(self.get_upload(pk), status.HTTP_409_CONFLICT)
+            response.data = {"detail": str(e), **response.data}
+            return response
+        except ValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return upload_response(upload)
+
+    def delete(self, request, pk):
+        upload = self.get_upload(pk)
+        if upload.completed:
+            return Response({"detail": "The upload is already finished."}, status=status.HTTP_409_CONFLICT)
+        chunked.cancel(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class FuelTransactionViewSet(viewsets.ModelViewSet):
     """
     API endpoint for fuel transactions.
@@ -422,7 +604,7 @@ class FuelTransactionViewSet(viewsets.ModelViewSet):
     queryset = FuelTransaction.objects.all()
     serializer_class = FuelTransactionSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['vehicle__license_plate', 'driver__username', 'fuel_station__name', 'notes']
     filterset_fields = ['vehicle', 'driver', 'fuel_type', 'fuel_station']
 
@@ -432,8 +614,12 @@ class FuelTransactionViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.is_staff or (hasattr(user, 'user_type') and user.user_type in ['admin', 'manager', 'vehicle_manager']):
-            return FuelTransaction.objects.all()
-        return FuelTransaction.objects.filter(driver=user)
+            queryset = FuelTransaction.objects.all()
+        else:
+            queryset = FuelTransaction.objects.filter(driver=user)
+        return with_ongoing_trips(
+            queryset.select_related('vehicle__vehicle_type', 'driver', 'fuel_station'), 'vehicle__'
+        )
 
     def get_permissions(self):
         """
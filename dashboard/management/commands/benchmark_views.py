@@ -0,0 +1,233 @@
+from contextlib import ExitStack
+from datetime import datetime
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+
+from accidents.models import Accident
+from accounts.models import CustomUser
+from documents.models import Document
+from fuel.models import FuelTransaction
+from geolocation.models import LocationLog
+from maintenance.models import Maintenance
+from trips.models import Trip
+from vehicle_management.middleware import QueryRecorder
+from vehicles.models import Vehicle
+
+REPORTS = ['vehicle_report', 'driver_report', 'maintenance_report', 'fuel_report']
+API_ENDPOINTS = [
+    ('api vehicles', '/api/v1/vehicles/'),
+    ('api trips', '/api/v1/trips/'),
+    ('api fuel-transactions', '/api/v1/fuel-transactions/'),
+    ('api maintenance', '/api/v1/maintenance/'),
+    ('api fuel-stations', '/api/v1/fuel-stations/'),
+]
+
+
+def git_revision():
+    """Current commit and whether the tree has local changes, if git is available."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Time the dashboard, reports, report exports and hot API endpoints and print the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per case (default: 5)')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per case before timing')
+        parser.add_argument('--only', help='Only run cases whose name contains this text')
+        parser.add_argument(
+            '--cold-cache',
+            action='store_true',
+            help='Clear the cache before every request instead of measuring warm-cache behaviour'
+        )
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument(
+            '--compare',
+            help='Earlier JSON results to compare against; prints the change in median time per case'
+        )
+
+    def get_users(self):
+        """One active user per role; the benchmark needs all of them to cover every view."""
+        users = {}
+        for role in ['admin', 'manager', 'vehicle_manager', 'driver']:
+            queryset = CustomUser.objects.filter(user_type=role, is_active=True)
+            if role == 'driver':
+                queryset = queryset.filter(approval_status='approved')
+            users[role] = queryset.order_by('id').first()
+        return users
+
+    def get_cases(self, users):
+        """(name, path, user, auth) for each case; auth is 'session' or 'token'."""
+        cases = []
+        for role in ['admin', 'manager', 'vehicle_manager', 'driver']:
+            cases.append((f'dashboard {role}', reverse('dashboard'), users[role], 'session'))
+
+        for name in REPORTS:
+            path = reverse(name)
+            cases.append((f'report {name}', path, users['manager'], 'session'))
+            if hasattr(resolve(path).func.view_class, 'get_export_data'):
+                for export_format in ['csv', 'excel']:
+                    cases.append((
+                        f'export {name} {export_format}', f'{path}?export={export_format}', users['manager'], 'session'
+                    ))
+
+        for name, path in API_ENDPOINTS:
+            cases.append((f'{name} manager', path, users['manager'], 'token'))
+            cases.append((f'{name} driver', path, users['driver'], 'token'))
+        cases.append(('api bootstrap driver', reverse('api_bootstrap'), users['driver'], 'token'))
+        return cases
+
+    def dataset_size(self):
+        return {
+            model._meta.model_name: model.objects.count()
+            for model in [CustomUser, Vehicle, Trip, LocationLog, FuelTransaction, Maintenance, Document, Accident]
+        }
+
+    def run_case(self, client, path, headers, repeat, warmup, cold_cache):
+        timings, queries, db_times = [], [], []
+        status, size = None, 0
+
+        for run in range(warmup + repeat):
+            if cold_cache:
+                cache.clear()
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(recorder))
+                start = time.perf_counter()
+                response = client.get(path, **headers)
+                content = b''.join(response) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+
+            status, size = response.status_code, len(content)
+            if run >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(recorder.count)
+                db_times.append(recorder.duration * 1000)
+
+        return {
+            'status': status,
+            'bytes': size,
+            'queries': max(queries),
+            'min_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'db_median_ms': round(statistics.median(db_times), 2),
+        }
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        users = self.get_users()
+        missing = [role for role, user in users.items() if user is None]
+        if missing:
+            raise CommandError(
+                f"No active user for: {', '.join(missing)}. Run generate_fleet_data first."
+            )
+
+        cases = self.get_cases(users)
+        if options['only']:
+            cases = [case for case in cases if options['only'] in case[0]]
+
+        commit, dirty = git_revision()
+        results = {
+            'meta': {
+                'commit': commit,
+                'dirty': dirty,
+                'created_at': datetime.now().astimezone().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+                'cold_cache': options['cold_cache'],
+                'dataset': self.dataset_size(),
+            },
+            'results': [],
+        }
+
+        tokens = {}
+        # Query counts are part of the results, so the per-request query log is just noise here
+        query_logger = logging.getLogger('vehicle_management.queries')
+        was_disabled, query_logger.disabled = query_logger.disabled, True
+        try:
+            # The test client's host has to pass ALLOWED_HOSTS; errors are recorded, not raised
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name, path, user, auth in cases:
+                    client = Client(raise_request_exception=False)
+                    headers = {}
+                    if auth == 'token':
+                        if user.pk not in tokens:
+                            tokens[user.pk] = Token.objects.get_or_create(user=user)[0].key
+                        headers['HTTP_AUTHORIZATION'] = f'Token {tokens[user.pk]}'
+                    else:
+                        client.force_login(user)
+
+                    self.stderr.write(f'{name}...', ending='')
+                    result = self.run_case(
+                        client, path, headers, options['repeat'], options['warmup'], options['cold_cache']
+                    )
+                    result = {'name': name, 'path': path, 'user': user.username, **result}
+                    results['results'].append(result)
+                    self.stderr.write(f" {result['median_ms']} ms, {result['queries']} queries")
+        finally:
+            query_logger.disabled = was_disabled
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.print_comparison(options['compare'], results)
+
+    def print_comparison(self, baseline_path, results):
+        with open(baseline_path) as f:
+            baseline = {r['name']: r for r in json.load(f)['results']}
+
+        self.stderr.write(f"\n{'case':<40}{'before ms':>12}{'after ms':>12}{'change':>10}{'queries':>12}")
+        for result in results['results']:
+            before = baseline.get(result['name'])
+            if before is None:
+                continue
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+            line = (
+                f"{result['name']:<40}{before['median_ms']:>12}{result['median_ms']:>12}{change:>+9.1f}%"
+                f"{before['queries']:>6} -> {result['queries']:<4}"
+            )
+            style = self.style.SUCCESS if change < -5 else self.style.ERROR if change > 5 else str
+            self.stderr.write(style(line))
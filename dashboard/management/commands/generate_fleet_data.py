@@ -0,0 +1,580 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+import math
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accidents import geohash
+from accidents.models import Accident
+from accounts.models import CustomUser
+from documents.compliance import refresh_compliance
+from documents.models import Document, DocumentType
+from fuel.models import FuelStation, FuelTransaction
+from geolocation.models import LocationLog
+from maintenance.models import Maintenance, MaintenanceProvider, MaintenanceType
+from trips.models import Trip
+from vehicles.models import Vehicle, VehicleType
+
+FIRST_NAMES = [
+    'Arun', 'Anjali', 'Rahul', 'Priya', 'Vishnu', 'Lakshmi', 'Arjun', 'Divya', 'Nikhil', 'Meera',
+    'Suresh', 'Kavya', 'Manoj', 'Asha', 'Rohit', 'Sneha', 'Joseph', 'Fathima', 'Abdul', 'Neha',
+]
+LAST_NAMES = [
+    'Nair', 'Menon', 'Pillai', 'Kumar', 'Thomas', 'Varghese', 'Das', 'Iyer', 'Krishnan', 'Joseph',
+    'Mathew', 'Rajan', 'George', 'Rahman', 'Shetty', 'Reddy', 'Sharma', 'Kurian', 'Babu', 'Paul',
+]
+PLACES = [
+    ('Kochi', 9.9312, 76.2673), ('Thiruvananthapuram', 8.5241, 76.9366),
+    ('Kozhikode', 11.2588, 75.7804), ('Thrissur', 10.5276, 76.2144),
+    ('Kollam', 8.8932, 76.6141), ('Kannur', 11.8745, 75.3704),
+    ('Alappuzha', 9.4981, 76.3388), ('Kottayam', 9.5916, 76.5222),
+    ('Palakkad', 10.7867, 76.6548), ('Malappuram', 11.0510, 76.0711),
+]
+# (make, model, vehicle type name, weight)
+MODELS = [
+    ('Maruti', 'Swift', 'Car', 20), ('Hyundai', 'i20', 'Car', 12), ('Honda', 'City', 'Car', 8),
+    ('Toyota', 'Innova', 'SUV', 10), ('Mahindra', 'Bolero', 'SUV', 8),
+    ('Maruti', 'Eeco', 'Van', 6), ('Force', 'Traveller', 'Van', 4),
+    ('Tata', 'Ace', 'Truck', 5), ('Ashok Leyland', 'Dost', 'Truck', 3),
+    ('Honda', 'Activa', 'Motorcycle', 6),
+]
+EV_MODELS = [('Tata', 'Nexon EV'), ('MG', 'ZS EV'), ('Tata', 'Tiago EV'), ('Hyundai', 'Kona Electric')]
+MAINTENANCE_WEIGHTS = {
+    'Oil Change': 30, 'Tire Rotation': 15, 'Brake Service': 12, 'Air Filter Replacement': 10,
+    'Battery Replacement': 5, 'Transmission Service': 3, 'Coolant Flush': 5, 'General Inspection': 20,
+}
+REQUIRED_DOCUMENTS = ['Vehicle Registration', 'Insurance Policy', 'Pollution Certificate', 'Fitness Certificate']
+OPTIONAL_DOCUMENTS = ['Tax Receipt', 'Permit', 'Purchase Invoice', 'Service Book']
+ACCIDENT_STATUS_WEIGHTS = {
+    'resolved': 70, 'repair_in_progress': 8, 'repair_scheduled': 7, 'under_investigation': 8, 'reported': 7,
+}
+
+
+@contextmanager
+def without_auto_now_add(model, field_name):
+    """Let bulk_create store historical values in an auto_now_add field."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def coordinate(value):
+    return Decimal(value).quantize(Decimal('0.0000001'))
+
+
+class BulkWriter:
+    """
+    Buffers unsaved model instances and writes them with bulk_create.
+    Buffers are always flushed in the order the models were registered,
+    so parents reach the database before the rows that reference them.
+    """
+
+    def __init__(self, models, batch_size):
+        self.batch_size = batch_size
+        self.buffers = {model: [] for model in models}
+        self.counts = {model: 0 for model in models}
+
+    def add(self, obj):
+        buffer = self.buffers[type(obj)]
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for model, buffer in self.buffers.items():
+                if buffer:
+                    model.objects.bulk_create(buffer, batch_size=self.batch_size)
+                    self.counts[model] += len(buffer)
+                    buffer.clear()
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic fleet (vehicles, drivers, trips, GPS points, fuel, maintenance, documents, accidents) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=1000, help='Number of vehicles (default: 1000)')
+        parser.add_argument('--drivers', type=int, default=2000, help='Number of drivers (default: 2000)')
+        parser.add_argument('--trips', type=int, default=2000000, help='Total number of trips (default: 2,000,000)')
+        parser.add_argument(
+            '--location-points',
+            type=int,
+            default=20000000,
+            help='Approximate total number of GPS location points (default: 20,000,000)'
+        )
+        parser.add_argument('--days', type=int, default=730, help='Length of the generated history in days')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are reproducible')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument(
+            '--prefix',
+            default='SYN',
+            help='Prefix for license plates, usernames and names so generated data can be found again'
+        )
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help='Delete data generated earlier with the same prefix before generating'
+        )
+
+    def handle(self, *args, **options):
+        if options['vehicles'] < 1 or options['drivers'] < 1:
+            raise CommandError('--vehicles and --drivers must be at least 1')
+
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+        self.history_start = self.now - timedelta(days=options['days'])
+        started = time.perf_counter()
+
+        if options['flush']:
+            self.flush_previous()
+        elif Vehicle.objects.filter(license_plate__startswith=f'{self.prefix}-').exists():
+            raise CommandError(
+                f'Data with prefix "{self.prefix}" already exists - use --flush to replace it or pick another --prefix'
+            )
+
+        self.create_reference_data()
+
+        writer = BulkWriter(
+            [CustomUser, Vehicle, Trip, LocationLog, FuelTransaction, Maintenance, Document, Accident],
+            options['batch_size'],
+        )
+        self.next_ids = {
+            model: (model.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+            for model in (CustomUser, Vehicle, Trip)
+        }
+
+        drivers, managers = self.create_users(writer, options['drivers'])
+        self.stdout.write(f"Created {len(drivers)} approved drivers and {len(managers)} managers")
+
+        # Vehicles differ a lot in how hard they are used
+        intensities = [self.rng.lognormvariate(0, 0.6) for _ in range(options['vehicles'])]
+        total_intensity = sum(intensities)
+        mean_distance = math.exp(3.2 + 0.7 ** 2 / 2)
+        points_per_km = options['location_points'] / max(options['trips'], 1) / mean_distance
+
+        with without_auto_now_add(LocationLog, 'timestamp'):
+            for index, intensity in enumerate(intensities):
+                trip_count = round(options['trips'] * intensity / total_intensity)
+                self.create_vehicle(writer, index, trip_count, drivers, managers, points_per_km)
+                if (index + 1) % 50 == 0:
+                    self.stdout.write(f"  {index + 1}/{options['vehicles']} vehicles generated")
+            writer.flush()
+
+        self.reset_sequences()
+
+        # Vehicles are bulk inserted too, so none had its compliance worked out from its documents
+        generated = Vehicle.objects.filter(license_plate__startswith=f'{self.prefix}-').values_list('pk', flat=True)
+        refresh_compliance(generated)
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(writer.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 0.001):.0f} rows/s)"
+        ))
+        for model, count in writer.counts.items():
+            self.stdout.write(f"  {model._meta.verbose_name_plural}: {count}")
+        # Rows are bulk inserted, so the search and efficiency signals never saw them
+        self.stdout.write(
+            "Vehicle compliance has been refreshed (as `manage.py refresh_compliance` would). "
+            "Run `manage.py rebuild_search_index`, `manage.py rebuild_fuel_efficiency`, `manage.py rebuild_expiry_index` "
+            "and `manage.py rebuild_hotspots` to index the new rows."
+        )
+
+    def flush_previous(self):
+        """Remove rows created by an earlier run with the same prefix."""
+        self.stdout.write(f'Deleting existing "{self.prefix}" data...')
+        # Trips, fuel, maintenance, documents and accidents cascade from vehicles and users
+        Vehicle.objects.filter(license_plate__startswith=f'{self.prefix}-').delete()
+        CustomUser.objects.filter(username__startswith=f'{self.prefix.lower()}_').delete()
+        FuelStation.objects.filter(name__startswith=f'{self.prefix} ').delete()
+        MaintenanceProvider.objects.filter(name__startswith=f'{self.prefix} ').delete()
+
+    def create_reference_data(self):
+        """Types and lookups shared by the fleet, matching fixtures/initial_data."""
+        self.vehicle_types = {
+            name: VehicleType.objects.get_or_create(name=name, defaults={'category': category})[0]
+            for name, category in [
+                ('Car', 'personal'), ('SUV', 'personal'), ('Van', 'commercial'),
+                ('Truck', 'commercial'), ('Motorcycle', 'personal'), ('Electric Car', 'electric'),
+            ]
+        }
+        self.document_types = [
+            DocumentType.objects.get_or_create(name=name, defaults={'required': name in REQUIRED_DOCUMENTS})[0]
+            for name in REQUIRED_DOCUMENTS + OPTIONAL_DOCUMENTS
+        ]
+        self.maintenance_types = [
+            (MaintenanceType.objects.get_or_create(name=name)[0], weight)
+            for name, weight in MAINTENANCE_WEIGHTS.items()
+        ]
+
+        providers = []
+        for i in range(20):
+            place = PLACES[i % len(PLACES)]
+            providers.append(MaintenanceProvider(
+                name=f'{self.prefix} {place[0]} Motors {i + 1}', address=f'{place[0]}, Kerala',
+            ))
+        MaintenanceProvider.objects.bulk_create(providers)
+        self.providers = list(MaintenanceProvider.objects.filter(name__startswith=f'{self.prefix} '))
+
+        stations = []
+        for i in range(60):
+            name, lat, lng = PLACES[i % len(PLACES)]
+            station_type = self.rng.choices(['fuel', 'charging', 'both'], [65, 15, 20])[0]
+            stations.append(FuelStation(
+                name=f'{self.prefix} {name} {station_type.title()} {i + 1}',
+                address=f'{name}, Kerala',
+                latitude=coordinate(lat + self.rng.uniform(-0.08, 0.08)),
+                longitude=coordinate(lng + self.rng.uniform(-0.08, 0.08)),
+                station_type=station_type,
+            ))
+        FuelStation.objects.bulk_create(stations)
+        stations = list(FuelStation.objects.filter(name__startswith=f'{self.prefix} '))
+        self.fuel_stations = [s for s in stations if s.station_type in ('fuel', 'both')]
+        self.charging_stations = [s for s in stations if s.station_type in ('charging', 'both')]
+
+    def allocate_id(self, model):
+        # Explicit primary keys: bulk_create can't return ids on MySQL
+        pk = self.next_ids[model]
+        self.next_ids[model] += 1
+        return pk
+
+    def create_users(self, writer, driver_count):
+        password = make_password(None)
+        manager_count = max(3, driver_count // 100)
+        drivers, managers = [], []
+
+        for i in range(driver_count + manager_count):
+            is_driver = i < driver_count
+            first_name = self.rng.choice(FIRST_NAMES)
+            last_name = self.rng.choice(LAST_NAMES)
+            if is_driver:
+                user_type = 'driver'
+                # The first driver is always approved so every vehicle has someone to drive it
+                approval_status = 'approved' if i == 0 else self.rng.choices(
+                    ['approved', 'pending', 'rejected'], [90, 7, 3])[0]
+            else:
+                user_type = ['admin', 'manager', 'vehicle_manager'][i % 3]
+                approval_status = 'approved'
+            joined = self.history_start + timedelta(days=self.rng.uniform(-365, 30))
+
+            user = CustomUser(
+                id=self.allocate_id(CustomUser),
+                username=f'{self.prefix.lower()}_{user_type}_{i:06d}',
+                email=f'{self.prefix.lower()}_{i:06d}@example.com',
+                password=password,
+                first_name=first_name,
+                last_name=f'{last_name} {i}',
+                user_type=user_type,
+                approval_status=approval_status,
+                is_active=approval_status != 'rejected',
+                date_joined=joined,
+                approved_at=joined if approval_status == 'approved' else None,
+                hr_employee_id=f'{self.prefix}{i:06d}',
+                hr_authenticated_at=joined if approval_status == 'approved' else None,
+                license_number=f'KL{self.rng.randint(1, 99):02d}{self.rng.randint(2000, 2024)}{i:07d}' if is_driver else '',
+                license_expiry=(self.now + timedelta(days=self.rng.randint(-60, 3650))).date() if is_driver else None,
+            )
+            writer.add(user)
+            if not is_driver:
+                managers.append(user)
+            elif approval_status == 'approved':
+                drivers.append(user)
+
+        writer.flush()
+        return drivers, managers
+
+    def create_vehicle(self, writer, index, trip_count, drivers, managers, points_per_km):
+        rng = self.rng
+        electric = rng.random() < 0.15
+        if electric:
+            make, model = rng.choice(EV_MODELS)
+            vehicle_type = self.vehicle_types['Electric Car']
+        else:
+            make, model, type_name, _ = rng.choices(MODELS, [m[3] for m in MODELS])[0]
+            vehicle_type = self.vehicle_types[type_name]
+
+        # A small pool of regular drivers per vehicle, one of them assigned
+        pool = rng.sample(drivers, min(len(drivers), rng.randint(1, 4)))
+        acquired = self.history_start - timedelta(days=rng.randint(0, 1500))
+        vehicle = Vehicle(
+            id=self.allocate_id(Vehicle),
+            vehicle_type=vehicle_type,
+            make=make,
+            model=model,
+            year=min(acquired.year, self.now.year),
+            license_plate=f'{self.prefix}-{index + 1:06d}',
+            vin=f'{self.prefix}{index + 1:014d}',
+            color=rng.choice(['White', 'Silver', 'Grey', 'Black', 'Red', 'Blue']),
+            acquisition_date=acquired.date(),
+            assigned_driver=pool[0].get_full_name(),
+            fuel_type='Electric' if electric else rng.choices(['Petrol', 'Diesel', 'CNG'], [55, 40, 5])[0],
+            fuel_capacity=None if electric else money(rng.choice([35, 40, 45, 55, 60])),
+            average_mileage=None if electric else money(rng.uniform(10, 22)),
+            battery_capacity_kwh=money(rng.choice([26, 30.2, 40.5, 50.3])) if electric else None,
+            range_per_charge=rng.randint(250, 450) if electric else None,
+            charging_type='CCS2' if electric else '',
+            seating_capacity=rng.choice([2, 5, 7]),
+            gps_fitted=rng.choices(['yes', 'no'], [70, 30])[0],
+            insurance_expiry_date=(self.now + timedelta(days=rng.randint(-30, 365))).date(),
+            pollution_cert_expiry=(self.now + timedelta(days=rng.randint(-30, 180))).date(),
+        )
+        odometer = rng.randint(1000, 60000)
+
+        trips, side_records, odometer = self.simulate_trips(vehicle, trip_count, pool, odometer, points_per_km)
+        if trips and trips[-1]['status'] == 'ongoing':
+            vehicle.status = 'in_use'
+        else:
+            vehicle.status = rng.choices(['available', 'maintenance', 'retired'], [95, 4, 1])[0]
+        vehicle.current_odometer = odometer
+        writer.add(vehicle)
+
+        for trip_data in trips:
+            points = trip_data.pop('points')
+            trip = Trip(id=self.allocate_id(Trip), vehicle_id=vehicle.id, **trip_data)
+            trip.update_metrics()
+            writer.add(trip)
+            for lat, lng, speed, timestamp in points:
+                writer.add(LocationLog(
+                    trip_id=trip.id, latitude=coordinate(lat), longitude=coordinate(lng),
+                    speed=money(speed), timestamp=timestamp,
+                ))
+
+        for record in side_records:
+            record.vehicle_id = vehicle.id
+            writer.add(record)
+
+        for record in self.create_maintenance(vehicle, odometer, managers):
+            writer.add(record)
+        for record in self.create_documents(vehicle):
+            writer.add(record)
+
+    def simulate_trips(self, vehicle, trip_count, pool, odometer, points_per_km):
+        """
+        Lay the vehicle's trips end to end over the history window, with
+        fuel stops and the odd accident along the way. Returns trip field
+        dicts (each with its GPS points), the fuel/accident instances and
+        the final odometer reading.
+        """
+        rng = self.rng
+        electric = vehicle.fuel_type == 'Electric'
+        trips, side_records = [], []
+        if trip_count == 0:
+            return trips, side_records, odometer
+
+        window = (self.now - self.history_start).total_seconds()
+        slot = window / trip_count
+        cursor = self.history_start
+        since_refuel = 0.0
+        refuel_range = (vehicle.range_per_charge or 0) * 0.7 if electric else float(
+            vehicle.fuel_capacity * vehicle.average_mileage) * 0.8
+
+        for i in range(trip_count):
+            driver = pool[0] if rng.random() < 0.6 else rng.choice(pool)
+            distance = min(rng.lognormvariate(3.2, 0.7), 600)
+            speed = rng.uniform(22, 55)
+            duration = timedelta(hours=distance / speed)
+            # One trip per slot across the whole window, never overlapping the previous one
+            start = self.history_start + timedelta(seconds=slot * i)
+            start += timedelta(seconds=rng.uniform(0, max(slot - duration.total_seconds(), 0) * 0.8))
+            if slot > 12 * 3600 and not 6 <= start.hour <= 21:
+                # Low-usage vehicles are driven during working hours
+                start = start.replace(hour=min(max(int(rng.gauss(12, 3)), 6), 21))
+            if start < cursor:
+                start = cursor + timedelta(minutes=rng.randint(5, 30))
+            end = start + duration
+            if end > self.now:
+                break
+            cursor = end
+
+            start_odometer = odometer
+            odometer += max(int(round(distance)), 1)
+            destination = rng.choice(PLACES)
+            trips.append(self.trip_data(
+                driver, start, duration, speed, start_odometer, odometer, destination, points_per_km, distance,
+                status=rng.choices(['completed', 'cancelled'], [97, 3])[0],
+            ))
+
+            since_refuel += distance
+            if since_refuel >= refuel_range:
+                side_records.append(self.refuel(vehicle, driver, end, odometer, since_refuel))
+                since_refuel = 0.0
+
+            if rng.random() < 1 / 2500:
+                side_records.append(self.accident(driver, start + duration / 2, destination))
+
+        # A few vehicles are out on a trip right now
+        if rng.random() < 0.05 and cursor < self.now - timedelta(hours=1):
+            driver = pool[0]
+            start = self.now - timedelta(minutes=rng.randint(10, 50))
+            distance = rng.uniform(5, 30)
+            speed = rng.uniform(22, 55)
+            elapsed = self.now - start
+            trips.append(self.trip_data(
+                driver, start, elapsed, speed, odometer, None, rng.choice(PLACES), points_per_km,
+                speed * elapsed.total_seconds() / 3600, status='ongoing',
+            ))
+
+        return trips, side_records, odometer
+
+    def trip_data(self, driver, start, duration, speed, start_odometer, end_odometer, destination,
+                  points_per_km, distance, status):
+        """Field values for one Trip, with its GPS points under 'points'."""
+        rng = self.rng
+        origin = rng.choice(PLACES)
+        ongoing = status == 'ongoing'
+        point_count = min(int(distance * points_per_km * rng.uniform(0.7, 1.3)), 2000)
+        return {
+            'driver_id': driver.id,
+            'start_time': start,
+            'end_time': None if ongoing else start + duration,
+            'start_odometer': start_odometer,
+            'end_odometer': end_odometer,
+            'origin': origin[0],
+            'destination': destination[0],
+            'purpose': rng.choice(['Client visit', 'Delivery', 'Staff transport', 'Site inspection', 'Pickup']),
+            'status': status,
+            'points': self.track(origin, destination, start, duration, speed, point_count),
+        }
+
+    def track(self, origin, destination, start, duration, speed, count):
+        """GPS points along a slightly noisy straight line from origin to destination."""
+        rng = self.rng
+        points = []
+        for n in range(count):
+            f = (n + 1) / (count + 1)
+            points.append((
+                origin[1] + (destination[1] - origin[1]) * f + rng.gauss(0, 0.002),
+                origin[2] + (destination[2] - origin[2]) * f + rng.gauss(0, 0.002),
+                max(rng.gauss(speed, 10), 0),
+                start + duration * f,
+            ))
+        return points
+
+    def refuel(self, vehicle, driver, when, odometer, distance):
+        rng = self.rng
+        if vehicle.fuel_type == 'Electric':
+            energy = distance / vehicle.range_per_charge * float(vehicle.battery_capacity_kwh) * rng.uniform(0.9, 1.2)
+            rate = rng.uniform(8, 18)
+            record = FuelTransaction(
+                vehicle=vehicle, driver_id=driver.id,
+                fuel_station=rng.choice(self.charging_stations) if self.charging_stations else None,
+                date=when.date(), fuel_type='Electric',
+                energy_consumed=money(energy), cost_per_kwh=money(rate), total_cost=money(energy * rate),
+                charging_duration_minutes=rng.randint(30, 240), odometer_reading=odometer,
+            )
+        else:
+            litres = distance / float(vehicle.average_mileage) * rng.uniform(0.9, 1.15)
+            price = {'Petrol': 104, 'Diesel': 94, 'CNG': 86}[vehicle.fuel_type] + rng.uniform(-3, 3)
+            record = FuelTransaction(
+                vehicle=vehicle, driver_id=driver.id,
+                fuel_station=rng.choice(self.fuel_stations) if self.fuel_stations else None,
+                date=when.date(), fuel_type=vehicle.fuel_type,
+                quantity=money(litres), cost_per_liter=money(price), total_cost=money(litres * price),
+                odometer_reading=odometer,
+            )
+        # Set by save(), which bulk inserts skip
+        record.energy_kind = record.detect_energy_kind()
+        return record
+
+    def accident(self, driver, when, place):
+        rng = self.rng
+        status = rng.choices(list(ACCIDENT_STATUS_WEIGHTS), list(ACCIDENT_STATUS_WEIGHTS.values()))[0]
+        estimated = rng.lognormvariate(9.5, 1)
+        latitude, longitude = coordinate(place[1] + rng.gauss(0, 0.03)), coordinate(place[2] + rng.gauss(0, 0.03))
+        return Accident(
+            driver_id=driver.id, date_time=when,
+            location=f'Near {place[0]}',
+            latitude=latitude, longitude=longitude, geohash=geohash.encode(latitude, longitude),
+            description='Collision while driving', damage_description='Body damage',
+            third_party_involved=rng.random() < 0.4, injuries=rng.random() < 0.1,
+            estimated_cost=money(estimated),
+            actual_cost=money(estimated * rng.uniform(0.7, 1.4)) if status == 'resolved' else None,
+            status=status,
+            resolution_date=(when + timedelta(days=rng.randint(3, 60))).date() if status == 'resolved' else None,
+        )
+
+    def create_maintenance(self, vehicle, odometer, managers):
+        """Service history roughly every 10,000 km plus a few upcoming jobs."""
+        rng = self.rng
+        types, weights = zip(*self.maintenance_types)
+        records = []
+        services = int(odometer // 10000)
+        span = (self.now - self.history_start).days
+        for n in range(services):
+            reported = self.history_start + timedelta(days=span * (n + rng.random()) / max(services, 1))
+            records.append(Maintenance(
+                vehicle_id=vehicle.id,
+                maintenance_type=rng.choices(types, weights)[0],
+                provider=rng.choice(self.providers),
+                reported_by_id=rng.choice(managers).id,
+                date_reported=reported.date(),
+                description='Scheduled service',
+                odometer_reading=int(odometer * (n + 1) / (services + 1)),
+                status='completed',
+                scheduled_date=reported.date(),
+                completion_date=(reported + timedelta(days=rng.randint(0, 5))).date(),
+                cost=money(rng.lognormvariate(8, 0.8)),
+            ))
+        if rng.random() < 0.3:
+            scheduled = self.now + timedelta(days=rng.randint(0, 45))
+            records.append(Maintenance(
+                vehicle_id=vehicle.id,
+                maintenance_type=rng.choices(types, weights)[0],
+                provider=rng.choice(self.providers),
+                reported_by_id=rng.choice(managers).id,
+                date_reported=self.now.date(),
+                description='Upcoming service',
+                odometer_reading=odometer,
+                status=rng.choices(['scheduled', 'in_progress'], [85, 15])[0],
+                scheduled_date=scheduled.date(),
+            ))
+        return records
+
+    def create_documents(self, vehicle):
+        """Required documents for every vehicle, optional ones for some; a few expired or expiring."""
+        rng = self.rng
+        today = self.now.date()
+        records = []
+        for document_type in self.document_types:
+            if not document_type.required and rng.random() < 0.6:
+                continue
+            bucket = rng.choices(['expired', 'expiring', 'valid'], [8, 10, 82])[0]
+            if bucket == 'expired':
+                expiry = today - timedelta(days=rng.randint(1, 180))
+            elif bucket == 'expiring':
+                expiry = today + timedelta(days=rng.randint(0, 30))
+            else:
+                expiry = today + timedelta(days=rng.randint(31, 730))
+            records.append(Document(
+                vehicle_id=vehicle.id,
+                document_type=document_type,
+                document_number=f'{document_type.name[:3].upper()}-{vehicle.license_plate}',
+                issue_date=expiry - timedelta(days=365),
+                expiry_date=expiry,
+                issuing_authority=rng.choice(['RTO Ernakulam', 'RTO Thiruvananthapuram', 'RTO Kozhikode']),
+            ))
+        return records
+
+    def reset_sequences(self):
+        """Move sequences past the explicit ids (a no-op on MySQL and SQLite)."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [CustomUser, Vehicle, Trip])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
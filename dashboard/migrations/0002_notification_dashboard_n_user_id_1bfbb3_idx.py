@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'read', 'timestamp'], name='dashboard_n_user_id_1bfbb3_idx'),
+        ),
+    ]
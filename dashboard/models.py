@@ -25,6 +25,10 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Unread notifications for the navbar (runs on every page)
+            models.Index(fields=['user', 'read', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.text} ({self.user.username})"
\ No newline at end of file
@@ -1,3 +1,146 @@
+import json
+import logging
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from accidents.models import Accident
+from accounts.models import CustomUser
+from dashboard.management.commands.benchmark_views import Command as BenchmarkCommand
+from dashboard.models import Notification
+from documents.models import Document, DocumentType
+from fuel.models import FuelTransaction
+from maintenance.models import Maintenance
+from trips.models import Trip
+from vehicles.models import Vehicle
+
+
+def explain(queryset):
+    """Return the database's query plan rows for `queryset`."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}', params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def full_scans(plan, table):
+    """Plan rows that read every row of `table` without any usable index."""
+    if connection.vendor == 'sqlite':
+        return [
+            row for row in plan
+            if row.startswith(f'SCAN {table}') and 'INDEX' not in row
+        ]
+    # MySQL: type=ALL with no candidate key means there was nothing to use.
+    # Tiny test tables may still pick ALL when a key exists, which is fine.
+    return [
+        row for row in plan
+        if row.get('table') == table and row.get('type') == 'ALL' and not row.get('possible_keys')
+    ]
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    The filters behind the dashboard, reports, list views and management
+    commands must be served by an index rather than a full table scan.
+    """
+
+    def hot_queries(self):
+        today = timezone.now().date()
+        now = timezone.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        driver = CustomUser(pk=1)
+        vehicle = Vehicle(pk=1)
+
+        return [
+            # Trips
+            ('dashboard active trips', Trip.objects.filter(status='ongoing'), Trip),
+            ('auto_end_trips stale trips', Trip.objects.filter(
+                status='ongoing', start_time__lt=now - timedelta(hours=24)), Trip),
+            ('driver monthly stats', Trip.objects.filter(
+                driver=driver, status='completed', start_time__gte=month_start), Trip),
+            ('driver active trip', Trip.objects.filter(driver=driver, status='ongoing'), Trip),
+            ('vehicle active trip', Trip.objects.filter(vehicle=vehicle, status='ongoing'), Trip),
+            ('vehicle report trips', Trip.objects.filter(
+                start_time__gte=now - timedelta(days=30), start_time__lte=now), Trip),
+            # Fuel
+            ('dashboard daily fuel', FuelTransaction.objects.filter(date=today), FuelTransaction),
+            ('fuel report range', FuelTransaction.objects.filter(
+                date__gte=today - timedelta(days=30), date__lte=today), FuelTransaction),
+            ('vehicle fuel history', FuelTransaction.objects.filter(
+                vehicle=vehicle, date__gte=today - timedelta(days=30)), FuelTransaction),
+            ('driver recent fuel', FuelTransaction.objects.filter(driver=driver), FuelTransaction),
+            # Maintenance
+            ('upcoming maintenance', Maintenance.objects.filter(
+                status='scheduled', scheduled_date__gte=today), Maintenance),
+            ('maintenance schedule', Maintenance.objects.filter(
+                scheduled_date__range=[today, today + timedelta(days=6)]), Maintenance),
+            ('maintenance report range', Maintenance.objects.filter(
+                date_reported__gte=today - timedelta(days=30), date_reported__lte=today), Maintenance),
+            # Documents
+            ('expiring documents', Document.objects.filter(
+                expiry_date__range=[today, today + timedelta(days=30)]), Document),
+            ('expired documents', Document.objects.filter(expiry_date__lt=today), Document),
+            ('vehicle valid document', Document.objects.filter(
+                vehicle=vehicle, document_type=DocumentType(pk=1), expiry_date__gt=today), Document),
+            # Accidents
+            ('accident report range', Accident.objects.filter(
+                date_time__gte=now - timedelta(days=30), date_time__lte=now), Accident),
+            ('accident status count', Accident.objects.filter(status='reported'), Accident),
+            ('vehicle unresolved accidents', Accident.objects.filter(
+                vehicle=vehicle, status__in=['reported', 'under_investigation']), Accident),
+            # Users and notifications
+            ('pending approvals', CustomUser.objects.filter(
+                user_type='driver', approval_status='pending'), CustomUser),
+            ('unread notifications', Notification.objects.filter(user=driver, read=False), Notification),
+            # Vehicles
+            ('available vehicles', Vehicle.objects.filter(status='available'), Vehicle),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        failures = []
+        for name, queryset, model in self.hot_queries():
+            plan = explain(queryset.order_by())
+            scans = full_scans(plan, model._meta.db_table)
+            if scans:
+                failures.append(f"{name}: {scans}")
+
+        self.assertFalse(failures, "Full table scans:\n" + "\n".join(failures))
+
+
+class FleetCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Enough vehicles for the default seed to draw some electric ones
+        call_command('generate_fleet_data', vehicles=40, drivers=5, trips=200, location_points=1000, stdout=StringIO())
+
+    def test_generated_rows_carry_what_save_would_set(self):
+        transactions = FuelTransaction.objects.all()
+        self.assertTrue(transactions.filter(fuel_type='Electric').exists())
+        self.assertFalse(transactions.filter(fuel_type='Electric').exclude(energy_kind='electric').exists())
+        self.assertFalse(transactions.exclude(fuel_type='Electric').exclude(energy_kind='fuel').exists())
+        statuses = set(Vehicle.objects.values_list('compliance_status', flat=True))
+        self.assertIn('valid', statuses)
+
+    def test_benchmark_times_every_case(self):
+        stdout = StringIO()
+        call_command('benchmark_views', repeat=1, warmup=0, stdout=stdout, stderr=StringIO())
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(results['meta']['dataset']['vehicle'], 40)
+        self.assertEqual({result['status'] for result in results['results']}, {200})
+        self.assertFalse(logging.getLogger('vehicle_management.queries').disabled)
 
-# Create your tests here.
+    def test_benchmark_restores_the_query_log_when_a_case_fails(self):
+        with mock.patch.object(BenchmarkCommand, 'run_case', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                call_command('benchmark_views', only='dashboard admin', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(logging.getLogger('vehicle_management.queries').disabled)
@@ -1,7 +1,7 @@
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Sum, F, ExpressionWrapper, fields
-from django.db.models.functions import Extract
+from django.db.models import Count, Sum
+from django.db.models.functions import Extract, TruncMonth
 from django.utils import timezone
 from datetime import timedelta, date, datetime, time
 from pytz import timezone as pytz_timezone
@@ -11,8 +11,9 @@ from vehicles.models import Vehicle
 from trips.models import Trip
 from maintenance.models import Maintenance
 from fuel.models import FuelTransaction
+from fuel.efficiency import rolling_efficiency
 from accidents.models import Accident
-from documents.models import Document
+from documents.expiry import REMINDER_KINDS, expiring_within
 import json
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -39,7 +40,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
     
     def get_completed_trips_with_duration(self, filter_params=None):
-        """Helper method to get completed trips and safely calculate duration"""
+        """Helper method to get completed trips with their stored duration"""
         # Start with base query for completed trips
         query = Trip.objects.filter(status='completed', end_time__isnull=False)
         
@@ -47,23 +48,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         if filter_params:
             query = query.filter(**filter_params)
             
-        # Fetch the trips
-        trips = list(query)
+        # Fetch only what the hour charts need
+        trips = list(query.only('start_time', 'end_time', 'duration_seconds'))
         
-        # Calculate duration for each trip
         for trip in trips:
-            if trip.start_time and trip.end_time:
-                try:
-                    # Calculate duration as timedelta - use calculated_duration instead of duration
-                    trip.calculated_duration = trip.end_time - trip.start_time
-                    # Also calculate hours as float for easier aggregation
-                    trip.duration_hours = trip.calculated_duration.total_seconds() / 3600
-                except Exception as e:
-                    trip.calculated_duration = timedelta(seconds=0)
-                    trip.duration_hours = 0
-            else:
-                trip.calculated_duration = timedelta(seconds=0)
-                trip.duration_hours = 0
+            trip.calculated_duration = trip.get_duration_timedelta() or timedelta(seconds=0)
+            trip.duration_hours = trip.calculated_duration.total_seconds() / 3600
                 
         return trips
     
@@ -86,12 +76,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             scheduled_date__gte=timezone.now().date()
         ).order_by('scheduled_date')[:5]
         
-        # Upcoming document renewals
-        today = timezone.now().date()
-        next_month = today + timedelta(days=30)
-        context['expiring_documents'] = Document.objects.filter(
-            expiry_date__range=[today, next_month]
-        ).order_by('expiry_date')[:5]
+        # Upcoming document and driving licence renewals, from the expiry calendar
+        context['expiring_documents'] = expiring_within(30, REMINDER_KINDS)[:5]
         
         # Add fuel expenses data
         self.add_fuel_expenses_data(context)
@@ -105,28 +91,22 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         ).order_by('-trip_count')[:10]
         
         # Driver performance (total distance driven this month)
-        # Updated to include duration calculation
         driver_performance = Trip.objects.filter(
             start_time__gte=first_of_month,
             status='completed'
-        ).annotate(
-            trip_duration=ExpressionWrapper(
-                F('end_time') - F('start_time'),
-                output_field=fields.DurationField()
-            )
         ).values(
             'driver__first_name', 
             'driver__last_name'
         ).annotate(
-            total_distance=Sum(F('end_odometer') - F('start_odometer')),
-            total_duration=Sum('trip_duration')
+            total_distance=Sum('distance_km'),
+            total_duration=Sum('duration_seconds')
         ).order_by('-total_distance')[:10]
         
         # Convert to list and format the duration
         driver_perf_list = []
         for driver in driver_performance:
             if driver['total_duration']:
-                total_seconds = driver['total_duration'].total_seconds()
+                total_seconds = driver['total_duration']
                 hours = int(total_seconds // 3600)
                 minutes = int((total_seconds % 3600) // 60)
                 formatted_duration = f"{hours}h {minutes}m"
@@ -182,17 +162,22 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                     'total': 1000 + (i * 150)
                 })
         
+        # Daily totals for the weekly and daily charts, fetched in one grouped query
+        daily_totals = dict(
+            FuelTransaction.objects.filter(
+                date__gte=min(last_twelve_weeks, last_thirty_days), date__lte=today
+            ).values('date').annotate(total=Sum('total_cost')).values_list('date', 'total')
+        )
+        
         # Weekly fuel expenses
         weekly_fuel = []
         # Start from 12 weeks ago
         for i in range(12):
             week_start = today - timedelta(weeks=12-i)
-            week_end = week_start + timedelta(days=6)
             
-            # Query transactions for this week
-            week_total = FuelTransaction.objects.filter(
-                date__range=[week_start, week_end]
-            ).aggregate(total=Sum('total_cost'))['total'] or 0
+            week_total = sum(
+                daily_totals.get(week_start + timedelta(days=d)) or 0 for d in range(7)
+            )
             
             weekly_fuel.append({
                 'week_start': week_start,
@@ -224,9 +209,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         for i in range(30):
             # Start from 30 days ago and work forward to today
             day = today - timedelta(days=29-i)  # Changed from (30-i) to (29-i)
-            day_total = FuelTransaction.objects.filter(
-                date=day
-            ).aggregate(total=Sum('total_cost'))['total'] or 0
+            day_total = daily_totals.get(day) or 0
             
             daily_fuel.append({
                 'day': day,
@@ -273,38 +256,18 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context['available_vehicles'] = Vehicle.objects.filter(status='available').count()
         context['unavailable_vehicles'] = Vehicle.objects.exclude(status='available').count()
         
-        # Document renewals
-        today = timezone.now().date()
-        next_month = today + timedelta(days=30)
-        context['expiring_documents'] = Document.objects.filter(
-            expiry_date__range=[today, next_month]
-        ).order_by('expiry_date')[:10]
-        
-        # Fuel efficiency by vehicle
-        context['fuel_efficiency'] = []
-        for vehicle in Vehicle.objects.all():
-            trips = Trip.objects.filter(
-                vehicle=vehicle,
-                status='completed'
-            ).aggregate(
-                total_distance=Sum('end_odometer') - Sum('start_odometer')
-            )
-            
-            fuel = FuelTransaction.objects.filter(
-                vehicle=vehicle
-            ).aggregate(
-                total_fuel=Sum('quantity')
-            )
-            
-            total_distance = trips.get('total_distance') or 0
-            total_fuel = fuel.get('total_fuel') or 0
-            
-            if total_fuel > 0:
-                efficiency = total_distance / total_fuel
-                context['fuel_efficiency'].append({
-                    'vehicle': vehicle,
-                    'efficiency': round(efficiency, 2)  # km per liter
-                })
+        # Document and driving licence renewals, from the expiry calendar
+        context['expiring_documents'] = expiring_within(30, REMINDER_KINDS)[:10]
+        
+        # Fuel efficiency by vehicle, from the stored fill-to-fill series
+        efficiency_by_vehicle = rolling_efficiency(energy_kind='fuel')
+        context['fuel_efficiency'] = [
+            {
+                'vehicle': vehicle,
+                'efficiency': efficiency_by_vehicle[vehicle.id][0]  # km per liter
+            }
+            for vehicle in Vehicle.objects.filter(id__in=efficiency_by_vehicle)
+        ]
         
         # For the fuel efficiency chart
         context['fuel_efficiency_detailed'] = context['fuel_efficiency'][:10]  # Limit to top 10 for chart
@@ -358,30 +321,20 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         
         # Add duration and distance to trips
         for trip in recent_trips:
-            # Calculate distance
-            if trip.end_odometer and trip.start_odometer:
-                trip.distance = trip.end_odometer - trip.start_odometer
-            else:
-                trip.distance = None
+            trip.distance = trip.distance_km
                 
-            # Calculate duration
+            # Format the stored duration
             if trip.end_time and trip.start_time:
-                try:
-                    # Calculate duration as timedelta
-                    trip.calculated_duration = trip.end_time - trip.start_time
-                    total_seconds = trip.calculated_duration.total_seconds()
-                    
-                    # Format duration as string (e.g., "2h 30m")
-                    hours = int(total_seconds // 3600)
-                    minutes = int((total_seconds % 3600) // 60)
-                    trip.formatted_duration = f"{hours}h {minutes}m"
-                    
-                    # Also keep the hours as float for calculations
-                    trip.duration_hours = round(total_seconds / 3600, 1)
-                except Exception as e:
-                    trip.calculated_duration = timedelta(seconds=0)
-                    trip.duration_hours = 0
-                    trip.formatted_duration = "0h 0m"
+                trip.calculated_duration = trip.get_duration_timedelta()
+                total_seconds = trip.calculated_duration.total_seconds()
+                
+                # Format duration as string (e.g., "2h 30m")
+                hours = int(total_seconds // 3600)
+                minutes = int((total_seconds % 3600) // 60)
+                trip.formatted_duration = f"{hours}h {minutes}m"
+                
+                # Also keep the hours as float for calculations
+                trip.duration_hours = round(total_seconds / 3600, 1)
             else:
                 trip.calculated_duration = None
                 trip.duration_hours = None
@@ -396,7 +349,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             start_time__gte=first_of_month,
             status='completed'
         ).aggregate(
-            total_distance=Sum(F('end_odometer') - F('start_odometer')),
+            total_distance=Sum('distance_km'),
             trip_count=Count('id')
         )
         
@@ -493,15 +446,24 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         daily_start = end_date - timedelta(days=14)  # Last 14 days
         weekly_start = end_date - timedelta(days=42)  # Last 6 weeks
         
-        # Get all completed trips for this driver with durations - don't filter by date to ensure we get all data
-        monthly_trips = self.get_completed_trips_with_duration({
+        # Hours and distance per month over the driver's whole history, summed in the database
+        monthly_totals = Trip.objects.filter(
+            driver=driver,
+            status='completed',
+            end_time__isnull=False
+        ).annotate(
+            month=TruncMonth('start_time')
+        ).order_by().values('month').annotate(
+            seconds=Sum('duration_seconds'),
+            distance=Sum('distance_km')
+        )
+        
+        # The daily and weekly charts need trip start/end times, but only for the last six weeks
+        weekly_trips = self.get_completed_trips_with_duration({
             'driver': driver,
-            'status': 'completed'
+            'start_time__date__gte': weekly_start
         })
-        
-        # Filter trips for different timeframes
-        daily_trips = [trip for trip in monthly_trips if trip.start_time.date() >= daily_start]
-        weekly_trips = [trip for trip in monthly_trips if trip.start_time.date() >= weekly_start]
+        daily_trips = [trip for trip in weekly_trips if trip.start_time.date() >= daily_start]
         
         # Get current month for reference
         current_month = timezone.now().date().month
@@ -521,10 +483,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             monthly_hours_dict[month_date] = 0
         
         # Add real trip data hours
-        for trip in monthly_trips:
-            # Get first day of month from the trip date
-            trip_month = trip.start_time.date().replace(day=1)
-            hours = trip.duration_hours
+        for row in monthly_totals:
+            trip_month = row['month'].date()
+            hours = (row['seconds'] or 0) / 3600
             
             if trip_month in monthly_hours_dict:
                 monthly_hours_dict[trip_month] += hours
@@ -564,15 +525,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             start_date = start_time_ist.date()
             end_date = end_time_ist.date()
             
-            print(f"Trip: {start_time_ist} to {end_time_ist} - Duration: {trip.duration_hours:.2f}h")
-            
             # If trip is within the same day in IST
             if start_date == end_date:
                 if start_date in daily_activity_dict:
                     daily_activity_dict[start_date] += trip.duration_hours
                 else:
                     daily_activity_dict[start_date] = trip.duration_hours
-                print(f"  → Single day: All {trip.duration_hours:.2f}h added to {start_date}")
             else:
                 # For multi-day trips, we need to calculate hours per day
                 current_date = start_date
@@ -597,17 +555,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                             daily_activity_dict[current_date] = day_hours
                             
                         total_hours_accounted += day_hours
-                        print(f"  → Day {current_date}: {day_trip_start.strftime('%H:%M')} to {day_trip_end.strftime('%H:%M')} = {day_hours:.2f}h")
                     
                     # Move to next day
                     current_date += timedelta(days=1)
-                    
-                # Verification
-                print(f"  → Total trip hours: {trip.duration_hours:.2f}h, Sum of distributed: {total_hours_accounted:.2f}h")
-                
-                # If there's a significant difference, log a warning
-                if abs(trip.duration_hours - total_hours_accounted) > 0.1:
-                    print(f"  ⚠️ WARNING: Hours mismatch by {trip.duration_hours - total_hours_accounted:.2f}h")
         
         # Convert to list format for chart
         context['driver_daily_activity'] = [
@@ -675,10 +625,10 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             month_date = date(year_num, month_num, 1)
             monthly_distances_dict[month_date] = 0
         
-        # Calculate real distance by month from trips
-        for trip in monthly_trips:
-            trip_month = trip.start_time.date().replace(day=1)
-            distance = trip.end_odometer - trip.start_odometer if trip.end_odometer and trip.start_odometer else 0
+        # Add real distance by month
+        for row in monthly_totals:
+            trip_month = row['month'].date()
+            distance = row['distance'] or 0
             
             if trip_month in monthly_distances_dict:
                 monthly_distances_dict[trip_month] += distance
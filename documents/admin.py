@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document, DocumentType
+from .models import Document, DocumentType, ExpiryEntry
 
 @admin.register(DocumentType)
 class DocumentTypeAdmin(admin.ModelAdmin):
@@ -38,4 +38,21 @@ class DocumentAdmin(admin.ModelAdmin):
         return obj.expiry_date < timezone.now().date()
     
     is_expired.boolean = True
-    is_expired.short_description = "Expired"
\ No newline at end of file
+    is_expired.short_description = "Expired"
+
+@admin.register(ExpiryEntry)
+class ExpiryEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the expiry calendar; entries follow their sources."""
+    
+    list_display = ('expiry_date', 'kind', 'vehicle', 'user', 'document')
+    list_filter = ('kind',)
+    search_fields = ('vehicle__license_plate', 'user__username', 'user__first_name', 'user__last_name')
+    date_hierarchy = 'expiry_date'
+    list_select_related = ('vehicle', 'user', 'document__document_type')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
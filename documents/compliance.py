@@ -0,0 +1,94 @@
+"""
+Document compliance of vehicles, stored on the vehicle.
+
+A vehicle is compliant while it holds an unexpired document of every
+required DocumentType. Each required type counts by its document expiring
+last (renewals), and the earliest of those is compliance_next_expiry:
+
+* expired  - a required type is missing, or its latest document has run out
+* expiring - the next expiry is within EXPIRING_SOON_DAYS
+* valid    - otherwise
+
+Document, DocumentType and new Vehicle saves refresh it (documents/signals.py);
+the refresh_compliance command rolls it over daily as dates pass. Refreshes
+write in bulk, without post_save, and send compliance_changed instead.
+"""
+import datetime
+
+from django.db.models import Max
+from django.dispatch import Signal
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from .models import Document, DocumentType
+
+# Same window as Document.is_expiring_soon
+EXPIRING_SOON_DAYS = 30
+
+# Sent with sender=Vehicle and the `vehicle_ids` whose stored compliance changed
+compliance_changed = Signal()
+
+
+def compute_compliance(vehicle_ids, today=None):
+    """{vehicle_id: (compliance_status, compliance_next_expiry)} in two queries."""
+    today = today or timezone.localdate()
+    required = set(DocumentType.objects.filter(required=True).values_list('pk', flat=True))
+    latest = {vehicle_id: {} for vehicle_id in vehicle_ids}
+    if required and latest:
+        rows = Document.objects.filter(
+            vehicle_id__in=latest, document_type_id__in=required
+        ).values('vehicle_id', 'document_type_id').annotate(latest=Max('expiry_date')).order_by()
+        for row in rows:
+            latest[row['vehicle_id']][row['document_type_id']] = row['latest']
+
+    expiring_by = today + datetime.timedelta(days=EXPIRING_SOON_DAYS)
+    compliance = {}
+    for vehicle_id, expiry_dates in latest.items():
+        next_expiry = min(expiry_dates.values()) if expiry_dates else None
+        # Like Vehicle.get_document_status always did: a document expiring today no longer counts
+        if len(expiry_dates) < len(required) or (next_expiry is not None and next_expiry <= today):
+            status = 'expired'
+        elif next_expiry is not None and next_expiry <= expiring_by:
+            status = 'expiring'
+        else:
+            status = 'valid'
+        compliance[vehicle_id] = (status, next_expiry)
+    return compliance
+
+
+def refresh_compliance(vehicle_ids=None, chunk_size=1000, today=None):
+    """
+    Recompute and store the compliance of `vehicle_ids` (every vehicle if
+    None) as of `today`. Only vehicles whose status or next expiry changed
+    are written. Returns how many changed.
+    """
+    if vehicle_ids is None:
+        vehicle_ids = Vehicle.objects.order_by('pk').values_list('pk', flat=True)
+    vehicle_ids = sorted(set(vehicle_ids))
+    today = today or timezone.localdate()
+
+    changed = []
+    for offset in range(0, len(vehicle_ids), chunk_size):
+        chunk = vehicle_ids[offset:offset + chunk_size]
+        compliance = compute_compliance(chunk, today)
+        stored = Vehicle.objects.filter(pk__in=chunk).order_by().values_list(
+            'pk', 'compliance_status', 'compliance_next_expiry'
+        )
+        for pk, status, next_expiry in stored:
+            if compliance[pk] != (status, next_expiry):
+                status, next_expiry = compliance[pk]
+                changed.append(Vehicle(pk=pk, compliance_status=status, compliance_next_expiry=next_expiry))
+
+    if changed:
+        Vehicle.objects.bulk_update(changed, ['compliance_status', 'compliance_next_expiry'], batch_size=500)
+        compliance_changed.send(sender=Vehicle, vehicle_ids=[vehicle.pk for vehicle in changed])
+    return len(changed)
+
+
+def rollover(today=None):
+    """Refresh the vehicles whose status can have changed just because days passed."""
+    today = today or timezone.localdate()
+    vehicle_ids = Vehicle.objects.exclude(compliance_status='expired').filter(
+        compliance_next_expiry__lte=today + datetime.timedelta(days=EXPIRING_SOON_DAYS)
+    ).values_list('pk', flat=True)
+    return refresh_compliance(vehicle_ids, today=today)
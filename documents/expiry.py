@@ -0,0 +1,108 @@
+"""
+The expiry calendar: one ExpiryEntry per expiry date anywhere in the system.
+
+Sources are documents (expiry_date), users (license_expiry) and the
+certificate dates kept on vehicles (rc_valid_till, insurance_expiry_date,
+fitness_expiry, permit_expiry, pollution_cert_expiry). Saves re-index their
+own entries (documents/signals.py), bulk document sync indexes what it wrote,
+and `manage.py rebuild_expiry_index` backfills everything.
+
+Entries are upserted on source_key, so re-indexing is safe to repeat.
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from .models import Document, ExpiryEntry
+
+VEHICLE_KINDS = [kind for kind, _ in ExpiryEntry.KIND_CHOICES if kind not in ('document', 'license')]
+
+# Vehicle certificate dates are mirrored by documents (documents.sync); listing both would repeat them
+REMINDER_KINDS = ['document', 'license']
+
+
+def save_entries(entries, stale=None):
+    """Upsert `entries`, deleting the entries in `stale` that weren't among them."""
+    with transaction.atomic():
+        if stale is not None:
+            stale.exclude(source_key__in=[entry.source_key for entry in entries]).delete()
+        if entries:
+            # MySQL upserts on any unique key and rejects an explicit conflict target
+            unique_fields = ['source_key'] if connection.features.supports_update_conflicts_with_target else None
+            ExpiryEntry.objects.bulk_create(
+                entries,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['kind', 'expiry_date', 'vehicle', 'user', 'document'],
+            )
+    return len(entries)
+
+
+def index_documents(documents):
+    """Index a Document queryset. A document always has an expiry date, and deleting it cascades."""
+    entries = [
+        ExpiryEntry(
+            kind='document', expiry_date=expiry_date, source_key=f'document:{pk}',
+            vehicle_id=vehicle_id, document_id=pk,
+        )
+        for pk, vehicle_id, expiry_date in documents.order_by().values_list('pk', 'vehicle_id', 'expiry_date')
+    ]
+    return save_entries(entries)
+
+
+def index_vehicles(vehicle_ids):
+    entries = []
+    rows = Vehicle.objects.filter(pk__in=vehicle_ids).order_by().values_list('pk', *VEHICLE_KINDS)
+    for pk, *dates in rows:
+        entries.extend(
+            ExpiryEntry(kind=kind, expiry_date=date, source_key=f'vehicle:{pk}:{kind}', vehicle_id=pk)
+            for kind, date in zip(VEHICLE_KINDS, dates)
+            if date
+        )
+    return save_entries(entries, ExpiryEntry.objects.filter(vehicle_id__in=vehicle_ids, kind__in=VEHICLE_KINDS))
+
+
+def index_users(user_ids):
+    rows = get_user_model().objects.filter(pk__in=user_ids, license_expiry__isnull=False).order_by().values_list(
+        'pk', 'license_expiry'
+    )
+    entries = [
+        ExpiryEntry(kind='license', expiry_date=expiry_date, source_key=f'license:{pk}', user_id=pk)
+        for pk, expiry_date in rows
+    ]
+    return save_entries(entries, ExpiryEntry.objects.filter(user_id__in=user_ids, kind='license'))
+
+
+def rebuild(chunk_size=1000, progress=None):
+    """Re-index every source, `chunk_size` rows at a time. `progress` is called with the entries done so far."""
+    indexed = 0
+    sources = [
+        (Document.objects.all(), lambda ids: index_documents(Document.objects.filter(pk__in=ids))),
+        (Vehicle.objects.all(), index_vehicles),
+        (get_user_model().objects.all(), index_users),
+    ]
+    for queryset, index in sources:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        for offset in range(0, len(ids), chunk_size):
+            indexed += index(ids[offset:offset + chunk_size])
+            if progress:
+                progress(indexed)
+    return indexed
+
+
+def entries_between(start, end, kinds=None):
+    """Entries expiring from `start` to `end` inclusive, soonest first, with what they belong to."""
+    entries = ExpiryEntry.objects.filter(expiry_date__range=(start, end))
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+    return entries.select_related('vehicle', 'user', 'document__document_type').order_by('expiry_date', 'pk')
+
+
+def expiring_within(days, kinds=None, today=None):
+    """Entries expiring today or in the next `days` days."""
+    today = today or timezone.localdate()
+    return entries_between(today, today + datetime.timedelta(days=days), kinds)
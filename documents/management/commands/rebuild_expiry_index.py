@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from documents.expiry import rebuild
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the expiry calendar from documents, driving licences and vehicle certificate dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows indexed per batch'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(indexed):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{indexed} entries ({indexed / elapsed:.0f} entries/s)")
+
+        indexed = rebuild(options['chunk_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} expiry dates in {time.monotonic() - started:.1f}s"
+        ))
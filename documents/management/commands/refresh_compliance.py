@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from documents.compliance import refresh_compliance, rollover
+import time
+
+
+class Command(BaseCommand):
+    help = 'Roll vehicle document compliance over as documents run out (schedule daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every vehicle, not just those with documents running out'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = refresh_compliance() if options['full'] else rollover()
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the compliance of {changed} vehicles in {time.monotonic() - started:.1f}s"
+        ))
@@ -2,15 +2,14 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from documents.models import Document
+from documents.expiry import REMINDER_KINDS, expiring_within
 from accounts.models import CustomUser
-import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Send notifications for documents that are about to expire'
+    help = 'Send notifications for documents and driving licences that are about to expire'
     
     def add_arguments(self, parser):
         parser.add_argument(
@@ -31,16 +30,13 @@ class Command(BaseCommand):
         dry_run = options['dry_run']
         
         today = timezone.now().date()
-        expiry_date = today + datetime.timedelta(days=days)
         
-        # Get documents expiring within the specified days
-        expiring_documents = Document.objects.filter(
-            expiry_date__range=[today, expiry_date]
-        ).select_related('vehicle', 'document_type')
+        # Documents and driving licences expiring within the specified days, from the expiry calendar
+        expiring_documents = list(expiring_within(days, REMINDER_KINDS, today))
         
-        self.stdout.write(f"Found {expiring_documents.count()} documents expiring in the next {days} days")
+        self.stdout.write(f"Found {len(expiring_documents)} documents expiring in the next {days} days")
         
-        if expiring_documents.count() == 0:
+        if not expiring_documents:
             return
         
         # Get admin and manager users to notify
@@ -53,10 +49,10 @@ class Command(BaseCommand):
         # Generate notification summary for all expiring documents
         notification_summary = "The following documents are expiring soon:\n\n"
         
-        for document in expiring_documents:
-            days_until_expiry = (document.expiry_date - today).days
-            notification_summary += f"- {document.document_type.name} for {document.vehicle.license_plate}: "
-            notification_summary += f"Expires in {days_until_expiry} days ({document.expiry_date})\n"
+        for entry in expiring_documents:
+            days_until_expiry = (entry.expiry_date - today).days
+            notification_summary += f"- {entry.label} for {entry.subject}: "
+            notification_summary += f"Expires in {days_until_expiry} days ({entry.expiry_date})\n"
         
         # Send notification emails
         for user in admins_managers:
@@ -82,18 +78,18 @@ class Command(BaseCommand):
         if not dry_run:
             from dashboard.models import Notification
             
-            for document in expiring_documents:
-                days_until_expiry = (document.expiry_date - today).days
+            for entry in expiring_documents:
+                days_until_expiry = (entry.expiry_date - today).days
                 
-                notification_text = f"{document.document_type.name} for {document.vehicle.license_plate} expires in {days_until_expiry} days"
+                notification_text = f"{entry.label} for {entry.subject} expires in {days_until_expiry} days"
                 
                 for user in admins_managers:
                     Notification.objects.create(
                         user=user,
                         text=notification_text,
-                        link=f'/documents/{document.id}/',
+                        link=entry.get_absolute_url(),
                         icon='file-alt',
                         level='warning'
                     )
         
-        self.stdout.write(self.style.SUCCESS(f"Successfully sent notifications for {expiring_documents.count()} expiring documents"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Successfully sent notifications for {len(expiring_documents)} expiring documents"))
\ No newline at end of file
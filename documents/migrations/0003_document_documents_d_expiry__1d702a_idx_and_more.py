@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_alter_document_file'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['expiry_date'], name='documents_d_expiry__1d702a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['vehicle', 'document_type', 'expiry_date'], name='documents_d_vehicle_a32adc_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+VEHICLE_KINDS = ['rc_valid_till', 'insurance_expiry_date', 'fitness_expiry', 'permit_expiry', 'pollution_cert_expiry']
+
+
+def backfill_expiry_entries(apps, schema_editor):
+    # Same entries as documents.expiry.rebuild(), against the historical models
+    ExpiryEntry = apps.get_model('documents', 'ExpiryEntry')
+    Document = apps.get_model('documents', 'Document')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    entries = [
+        ExpiryEntry(
+            kind='document', expiry_date=expiry_date, source_key=f'document:{pk}',
+            vehicle_id=vehicle_id, document_id=pk,
+        )
+        for pk, vehicle_id, expiry_date in Document.objects.order_by().values_list('pk', 'vehicle_id', 'expiry_date')
+        if expiry_date
+    ]
+    for pk, *dates in Vehicle.objects.order_by().values_list('pk', *VEHICLE_KINDS):
+        entries.extend(
+            ExpiryEntry(kind=kind, expiry_date=date, source_key=f'vehicle:{pk}:{kind}', vehicle_id=pk)
+            for kind, date in zip(VEHICLE_KINDS, dates)
+            if date
+        )
+    entries.extend(
+        ExpiryEntry(kind='license', expiry_date=expiry_date, source_key=f'license:{pk}', user_id=pk)
+        for pk, expiry_date in User.objects.filter(license_expiry__isnull=False).order_by().values_list(
+            'pk', 'license_expiry'
+        )
+    )
+    ExpiryEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_document_documents_d_expiry__1d702a_idx_and_more'),
+        ('vehicles', '0007_vehicle_compliance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('document', 'Document'), ('license', 'Driving Licence'), ('rc_valid_till', 'Registration Certificate'), ('insurance_expiry_date', 'Insurance Policy'), ('fitness_expiry', 'Fitness Certificate'), ('permit_expiry', 'Permit'), ('pollution_cert_expiry', 'Pollution Certificate')], max_length=30)),
+                ('expiry_date', models.DateField()),
+                ('source_key', models.CharField(max_length=60, unique=True)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expiry_entry', to='documents.document')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expiry_entries', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expiry_entries', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name_plural': 'expiry entries',
+                'indexes': [models.Index(fields=['expiry_date', 'kind'], name='documents_e_expiry__3a7e23_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_expiry_entries, migrations.RunPython.noop),
+    ]
@@ -1,52 +1,15 @@
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 from vehicles.models import Vehicle
 
 class DocumentManager(models.Manager):
     def sync_with_vehicle(self, vehicle):
         """Sync documents with vehicle expiry dates"""
-        
-        # Map of vehicle fields to document types
-        doc_mappings = {
-            'rc_valid_till': 'Registration Certificate',
-            'insurance_expiry_date': 'Insurance Policy',
-            'fitness_expiry': 'Fitness Certificate',
-            'permit_expiry': 'Permit',
-            'pollution_cert_expiry': 'Pollution Certificate'
-        }
-        
-        # Update existing documents or create new ones
-        updated_docs = []
-        for field, type_name in doc_mappings.items():
-            date_value = getattr(vehicle, field, None)
-            if date_value:
-                # Get or create document type
-                doc_type, _ = DocumentType.objects.get_or_create(
-                    name=type_name,
-                    defaults={'description': f'Auto-generated {type_name}', 'required': True}
-                )
-                
-                # Get or create document
-                doc, created = self.get_or_create(
-                    vehicle=vehicle,
-                    document_type=doc_type,
-                    defaults={
-                        'document_number': f'AUTO-{vehicle.license_plate}',
-                        'issue_date': vehicle.acquisition_date or timezone.now().date(),
-                        'expiry_date': date_value,
-                        'issuing_authority': vehicle.owner_name or 'Unknown',
-                        'notes': f'Auto-generated from vehicle data'
-                    }
-                )
-                
-                # If document exists, update expiry date if it changed
-                if not created and doc.expiry_date != date_value:
-                    doc.expiry_date = date_value
-                    doc.save()
-                    
-                updated_docs.append(doc)
-                
-        return updated_docs
+        from .sync import sync_vehicle_documents
+        return sync_vehicle_documents([vehicle])
 
 
 class DocumentType(models.Model):
@@ -60,30 +23,31 @@ class DocumentType(models.Model):
     def __str__(self):
         return self.name
     
+    @cached_property
+    def expiry_stats(self):
+        """Document counts of this type by expiry bucket (documents.stats)."""
+        from .stats import type_stats
+        return type_stats(self.pk)
+    
     @property
     def document_count(self):
         """Count documents of this type."""
-        return self.document_set.count()
+        return self.expiry_stats.total
     
     @property
     def expired_count(self):
         """Count expired documents of this type."""
-        return self.document_set.filter(expiry_date__lt=timezone.now().date()).count()
+        return self.expiry_stats.expired
     
     @property
     def expiring_soon_count(self):
         """Count documents of this type expiring in the next 30 days."""
-        today = timezone.now().date()
-        thirty_days_later = today + timezone.timedelta(days=30)
-        return self.document_set.filter(
-            expiry_date__range=[today, thirty_days_later]
-        ).count()
+        return self.expiry_stats.expiring_soon
     
     @property
     def valid_count(self):
         """Count valid documents of this type (not expired or expiring soon)."""
-        thirty_days_later = timezone.now().date() + timezone.timedelta(days=30)
-        return self.document_set.filter(expiry_date__gt=thirty_days_later).count()
+        return self.expiry_stats.valid
 
 
 class Document(models.Model):
@@ -102,9 +66,24 @@ class Document(models.Model):
     # Add the custom manager
     objects = DocumentManager()
     
+    class Meta:
+        indexes = [
+            # Expiry buckets, expiring documents on the dashboard and notifications
+            models.Index(fields=['expiry_date']),
+            # Per-vehicle "valid document of this type" checks
+            models.Index(fields=['vehicle', 'document_type', 'expiry_date']),
+        ]
+    
     def __str__(self):
         return f"{self.document_type.name} for {self.vehicle}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # So moving a document to another vehicle also refreshes the old vehicle's compliance
+        instance._loaded_vehicle_id = instance.__dict__.get('vehicle_id')
+        return instance
+    
     def is_expired(self):
         """Check if document is expired."""
         return self.expiry_date < timezone.now().date()
@@ -149,93 +128,22 @@ class Document(models.Model):
     
     @classmethod
     def create_from_vehicle(cls, vehicle):
-        """Create documents from vehicle data using real information"""
-        from django.utils import timezone
-        
-        # Map of vehicle fields to document types with appropriate document number fields
-        doc_type_mappings = {
-            'rc_valid_till': {
-                'name': 'Registration Certificate',
-                'number_field': 'license_plate'  # Use license plate as the document number
-            },
-            'insurance_expiry_date': {
-                'name': 'Insurance Policy',
-                'number_field': 'license_plate'  # Use license plate as the policy number
-            },
-            'fitness_expiry': {
-                'name': 'Fitness Certificate',
-                'number_field': 'license_plate'  # Use license plate as certificate number
-            },
-            'permit_expiry': {
-                'name': 'Permit',
-                'number_field': 'license_plate'  # Use license plate as permit number
-            },
-            'pollution_cert_expiry': {
-                'name': 'Pollution Certificate',
-                'number_field': 'license_plate'  # Use license plate as certificate number
-            }
-        }
-        
-        # Get or create document types
-        doc_types = {}
-        for field, info in doc_type_mappings.items():
-            doc_type, created = DocumentType.objects.get_or_create(
-                name=info['name'],
-                defaults={'description': f'{info["name"]}', 'required': True}
-            )
-            doc_types[field] = {
-                'type': doc_type,
-                'number_field': info['number_field']
-            }
-        
-        # Create documents for each field if date exists
-        docs_created = []
-        for field, type_info in doc_types.items():
-            date_value = getattr(vehicle, field, None)
-            if date_value:
-                # Check if document already exists
-                existing = cls.objects.filter(
-                    vehicle=vehicle,
-                    document_type=type_info['type']
-                ).first()
-                
-                if not existing:
-                    # Use the specified vehicle field value as the document number
-                    document_number = getattr(vehicle, type_info['number_field'])
-                    
-                    # Create new document
-                    doc = cls.objects.create(
-                        vehicle=vehicle,
-                        document_type=type_info['type'],
-                        document_number=document_number,
-                        issue_date=vehicle.acquisition_date or timezone.now().date(),
-                        expiry_date=date_value,
-                        issuing_authority=vehicle.owner_name or 'Unknown',
-                        notes=''  # No notes needed, this represents the real document
-                    )
-                    docs_created.append(doc)
-                    
-        return docs_created 
+        """Create (or update the expiry date of) the documents recorded on the vehicle itself."""
+        from .sync import sync_vehicle_documents
+        return sync_vehicle_documents([vehicle])
     
     @classmethod
     def sync_all_vehicles(cls):
         """Sync documents for all vehicles in the system."""
-        updated_docs = []
-        for vehicle in Vehicle.objects.all():
-            docs = cls.create_from_vehicle(vehicle)
-            updated_docs.extend(docs)
-        return updated_docs
+        from .sync import sync_all_vehicles
+        return sync_all_vehicles()
     
     def update_from_vehicle_data(self):
         """Update this document from vehicle data."""
+        from .sync import VEHICLE_DOCUMENT_TYPES
+        
         # Map document types to vehicle fields
-        type_to_field_map = {
-            'Registration Certificate': 'rc_valid_till',
-            'Insurance Policy': 'insurance_expiry_date',
-            'Fitness Certificate': 'fitness_expiry',
-            'Permit': 'permit_expiry',
-            'Pollution Certificate': 'pollution_cert_expiry'
-        }
+        type_to_field_map = {name: field for field, name in VEHICLE_DOCUMENT_TYPES.items()}
         
         # Find the corresponding field for this document type
         field_name = type_to_field_map.get(self.document_type.name)
@@ -246,4 +154,63 @@ class Document(models.Model):
                 self.expiry_date = date_value
                 self.save()
                 return True
-        return False
\ No newline at end of file
+        return False
+
+
+class ExpiryEntry(models.Model):
+    """
+    One expiry date from anywhere in the system (documents, driving licences
+    and the certificate dates kept on vehicles), so calendars and reminders
+    read a single indexed table. Maintained by documents/expiry.py.
+    """
+    KIND_CHOICES = (
+        ('document', 'Document'),
+        ('license', 'Driving Licence'),
+        ('rc_valid_till', 'Registration Certificate'),
+        ('insurance_expiry_date', 'Insurance Policy'),
+        ('fitness_expiry', 'Fitness Certificate'),
+        ('permit_expiry', 'Permit'),
+        ('pollution_cert_expiry', 'Pollution Certificate'),
+    )
+    
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    expiry_date = models.DateField()
+    # e.g. "document:12", "license:4", "vehicle:7:permit_expiry"
+    source_key = models.CharField(max_length=60, unique=True)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, null=True, blank=True, related_name='expiry_entries')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='expiry_entries'
+    )
+    document = models.OneToOneField(
+        Document, on_delete=models.CASCADE, null=True, blank=True, related_name='expiry_entry'
+    )
+    
+    class Meta:
+        verbose_name_plural = 'expiry entries'
+        indexes = [
+            # Date range scans of the calendar, dashboard and reminders, optionally by kind
+            models.Index(fields=['expiry_date', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.label} for {self.subject} ({self.expiry_date})"
+    
+    @property
+    def label(self):
+        if self.kind == 'document':
+            return self.document.document_type.name
+        return self.get_kind_display()
+    
+    @property
+    def subject(self):
+        if self.vehicle_id:
+            return self.vehicle.license_plate
+        return self.user.get_full_name() or self.user.username
+    
+    def get_absolute_url(self):
+        if self.kind == 'document':
+            return reverse('document_detail', args=[self.document_id])
+        if self.kind == 'license':
+            return reverse('user_detail', args=[self.user_id])
+        return reverse('vehicle_detail', args=[self.vehicle_id])
+
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from vehicles.models import Vehicle
+from . import expiry, stats
+from .compliance import refresh_compliance
+from .models import Document, DocumentType
+
+
+@receiver([post_save, post_delete], sender=Document)
+def refresh_vehicle_compliance(sender, instance, raw=False, **kwargs):
+    """Recompute the compliance of the document's vehicle (and the one it moved from)"""
+    if raw:
+        return
+    vehicle_ids = {instance.vehicle_id, getattr(instance, '_loaded_vehicle_id', None)} - {None}
+    refresh_compliance(vehicle_ids)
+    stats.invalidate()
+    instance._loaded_vehicle_id = instance.vehicle_id
+
+
+@receiver([post_save, post_delete], sender=DocumentType)
+def refresh_all_compliance(sender, instance, created=False, raw=False, **kwargs):
+    """A type becoming (or ceasing to be) required changes every vehicle"""
+    if raw or (created and not instance.required):
+        return
+    refresh_compliance()
+
+
+@receiver(post_save, sender=Vehicle)
+def set_new_vehicle_compliance(sender, instance, created=False, raw=False, **kwargs):
+    """A new vehicle has no documents yet, which may or may not make it non-compliant"""
+    if raw or not created:
+        return
+    refresh_compliance([instance.pk])
+
+
+@receiver(post_save, sender=Document)
+def index_document_expiry(sender, instance, raw=False, **kwargs):
+    """Keep the document's expiry calendar entry in step; deleting the document cascades"""
+    if raw:
+        return
+    expiry.index_documents(Document.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Vehicle)
+def index_vehicle_expiry(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index the certificate dates kept on the vehicle, unless the save didn't touch them"""
+    if raw or (update_fields is not None and not set(update_fields) & set(expiry.VEHICLE_KINDS)):
+        return
+    expiry.index_vehicles([instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_license_expiry(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index the user's driving licence expiry, unless the save didn't touch it"""
+    if raw or (update_fields is not None and 'license_expiry' not in update_fields):
+        return
+    expiry.index_users([instance.pk])
+
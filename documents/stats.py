@@ -0,0 +1,83 @@
+"""
+Document counts by expiry bucket, per DocumentType and overall.
+
+Every bucket comes from one conditional-aggregate query grouped by type:
+
+* expired       - expiry date before today
+* expiring_soon - expiring today or within EXPIRING_SOON_DAYS
+* valid         - expiring after that
+
+The result is cached until the next document write (documents/signals.py
+and bulk sync call invalidate()), for at most DOCUMENT_STATS_CACHE_TIMEOUT
+seconds, and never past the end of the day, as the buckets shift with the
+date. The timeout bounds how stale another worker's counts can get when
+the cache isn't shared (vehicle_management/cache_versions.py).
+"""
+import datetime
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from vehicle_management.cache_versions import bump_version, get_version
+from .compliance import EXPIRING_SOON_DAYS
+from .models import Document
+
+VERSION_KEY = 'document_stats_version'
+
+Buckets = namedtuple('Buckets', 'total expired expiring_soon valid')
+EMPTY = Buckets(0, 0, 0, 0)
+DocumentStats = namedtuple('DocumentStats', 'types totals')
+
+
+def compute_stats(today=None):
+    """DocumentStats of every document as of `today`, in one query."""
+    today = today or timezone.localdate()
+    soon = today + datetime.timedelta(days=EXPIRING_SOON_DAYS)
+    rows = Document.objects.values('document_type_id').annotate(
+        total=Count('pk'),
+        expired=Count('pk', filter=Q(expiry_date__lt=today)),
+        expiring_soon=Count('pk', filter=Q(expiry_date__gte=today, expiry_date__lte=soon)),
+        valid=Count('pk', filter=Q(expiry_date__gt=soon)),
+    ).order_by()
+
+    types = {}
+    for row in rows:
+        types[row['document_type_id']] = Buckets(row['total'], row['expired'], row['expiring_soon'], row['valid'])
+    totals = Buckets(*(sum(column) for column in zip(EMPTY, *types.values())))
+    return DocumentStats(types, totals)
+
+
+def document_stats():
+    """Today's DocumentStats, from the cache when no document changed since they were counted."""
+    now = timezone.localtime()
+    today = now.date()
+    version = get_version(VERSION_KEY)
+    key = f'document_stats_{today.isoformat()}_v{version}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(today)
+        midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time(), now.tzinfo)
+        timeout = getattr(settings, 'DOCUMENT_STATS_CACHE_TIMEOUT', 300)
+        cache.set(key, stats, max(min(int((midnight - now).total_seconds()), timeout), 1))
+    return stats
+
+
+def type_stats(document_type_id):
+    """Buckets of one DocumentType."""
+    return document_stats().types.get(document_type_id, EMPTY)
+
+
+def attach(document_types):
+    """Fill in the `expiry_stats` of `document_types` from a single lookup."""
+    types = document_stats().types
+    for document_type in document_types:
+        document_type.expiry_stats = types.get(document_type.pk, EMPTY)
+    return document_types
+
+
+def invalidate():
+    """Recount on the next lookup."""
+    bump_version(VERSION_KEY)
@@ -0,0 +1,132 @@
+"""
+Documents that mirror the expiry dates kept on the vehicle itself (RC,
+insurance, fitness, permit and pollution certificate).
+
+sync_vehicle_documents() brings the documents of many vehicles in line with
+their vehicle fields in a handful of queries: the document types are
+resolved once, the existing documents of every (vehicle, type) pair are read
+in one query, missing documents are bulk created and later expiry dates
+bulk updated.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from . import expiry, stats
+from .compliance import refresh_compliance
+from .models import Document, DocumentType
+
+# Vehicle field -> name of the document type it is the expiry date of
+VEHICLE_DOCUMENT_TYPES = {
+    'rc_valid_till': 'Registration Certificate',
+    'insurance_expiry_date': 'Insurance Policy',
+    'fitness_expiry': 'Fitness Certificate',
+    'permit_expiry': 'Permit',
+    'pollution_cert_expiry': 'Pollution Certificate',
+}
+VEHICLE_FIELDS = ['pk', 'license_plate', 'acquisition_date', 'owner_name', *VEHICLE_DOCUMENT_TYPES]
+
+SyncResult = namedtuple('SyncResult', 'created updated')
+
+
+def document_types():
+    """{vehicle field: DocumentType}, creating the types that don't exist yet."""
+    names = list(VEHICLE_DOCUMENT_TYPES.values())
+    types = {}
+    # Names aren't unique; the oldest type of a name wins
+    for doc_type in DocumentType.objects.filter(name__in=names).order_by('-pk'):
+        types[doc_type.name] = doc_type
+    missing = [name for name in names if name not in types]
+    if missing:
+        DocumentType.objects.bulk_create([DocumentType(name=name, description=name, required=True) for name in missing])
+        # MySQL doesn't return the new ids
+        for doc_type in DocumentType.objects.filter(name__in=missing).order_by('-pk'):
+            types[doc_type.name] = doc_type
+    return {field: types[name] for field, name in VEHICLE_DOCUMENT_TYPES.items()}
+
+
+def sync_vehicle_documents(vehicles, types=None):
+    """
+    Create the missing documents of `vehicles` and move the expiry date of
+    existing ones forward to the vehicle's. Where a vehicle has several
+    documents of a type (renewals), the one expiring last is the current one.
+    Only documents the sync made (numbered with the license plate) are ever
+    updated; uploaded documents and renewals are left as entered.
+    """
+    vehicles = list(vehicles)
+    if not vehicles:
+        return SyncResult(0, 0)
+    types = types or document_types()
+
+    current = {}
+    existing = Document.objects.filter(
+        vehicle_id__in=[vehicle.pk for vehicle in vehicles],
+        document_type_id__in=[doc_type.pk for doc_type in types.values()],
+    ).only('pk', 'vehicle_id', 'document_type_id', 'document_number', 'expiry_date').order_by('expiry_date', 'pk')
+    for document in existing:
+        current[document.vehicle_id, document.document_type_id] = document
+
+    today = timezone.localdate()
+    to_create, to_update = [], []
+    for vehicle in vehicles:
+        for field, doc_type in types.items():
+            expiry_date = getattr(vehicle, field)
+            if not expiry_date:
+                continue
+            document = current.get((vehicle.pk, doc_type.pk))
+            if document is None:
+                to_create.append(Document(
+                    vehicle_id=vehicle.pk,
+                    document_type=doc_type,
+                    document_number=vehicle.license_plate,
+                    issue_date=vehicle.acquisition_date or today,
+                    expiry_date=expiry_date,
+                    issuing_authority=vehicle.owner_name or 'Unknown',
+                ))
+            elif document.document_number == vehicle.license_plate and document.expiry_date < expiry_date:
+                document.expiry_date = expiry_date
+                to_update.append(document)
+
+    with transaction.atomic():
+        if to_create:
+            last_pk = Document.objects.aggregate(last=Max('pk'))['last'] or 0
+            Document.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            Document.objects.bulk_update(to_update, ['expiry_date'], batch_size=500)
+
+    if to_create:
+        # Bulk inserts skip post_save, so the new documents aren't searchable yet
+        from search.index import registry
+        index = registry[Document]
+        new_documents = Document.objects.filter(pk__gt=last_pk, vehicle_id__in=[vehicle.pk for vehicle in vehicles])
+        for _ in index.update_queryset(new_documents):
+            pass
+    if to_create or to_update:
+        # ...and so do compliance, the expiry counts and the expiry calendar
+        refresh_compliance({document.vehicle_id for document in to_create + to_update})
+        stats.invalidate()
+        written = Q(pk__in=[document.pk for document in to_update])
+        if to_create:
+            written |= Q(pk__gt=last_pk, vehicle_id__in=[vehicle.pk for vehicle in vehicles])
+        expiry.index_documents(Document.objects.filter(written))
+
+    return SyncResult(len(to_create), len(to_update))
+
+
+def sync_all_vehicles(chunk_size=500):
+    """sync_vehicle_documents() for the whole fleet, `chunk_size` vehicles at a time."""
+    types = document_types()
+    vehicles = Vehicle.objects.only(*VEHICLE_FIELDS).order_by('pk')
+    created = updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(vehicles.filter(pk__gt=last_pk)[:chunk_size])
+        result = sync_vehicle_documents(chunk, types)
+        created += result.created
+        updated += result.updated
+        if len(chunk) < chunk_size:
+            return SyncResult(created, updated)
+        last_pk = chunk[-1].pk
@@ -1,3 +1,262 @@
+import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser
+from vehicles.models import Vehicle, VehicleType
+from . import stats
+from .compliance import rollover
+from .expiry import expiring_within, rebuild
+from .models import Document, DocumentType, ExpiryEntry
+from .sync import sync_all_vehicles
+
+
+class DocumentSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicles = [
+            Vehicle.objects.create(
+                vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+                license_plate=f'KL-07-{number:04}', vin=f'VIN{number:014}', color='white',
+                acquisition_date=datetime.date(2021, 1, 1), owner_name='Fleet Ltd',
+                rc_valid_till=datetime.date(2036, 1, 1), insurance_expiry_date=datetime.date(2025, 6, 1),
+            )
+            for number in range(20)
+        ]
+
+    def documents(self, vehicle):
+        return sorted(vehicle.documents.values_list('document_type__name', 'expiry_date', 'document_number'))
+
+    def test_full_fleet_sync_takes_a_few_queries(self):
+        # Document types (created here), vehicles, existing documents, the insert, indexing the new
+        # documents for search, refreshing the vehicles' compliance and the expiry calendar
+        with self.assertNumQueries(20):
+            result = sync_all_vehicles()
+        self.assertEqual(result, (40, 0))
+        self.assertEqual(self.documents(self.vehicles[0]), [
+            ('Insurance Policy', datetime.date(2025, 6, 1), 'KL-07-0000'),
+            ('Registration Certificate', datetime.date(2036, 1, 1), 'KL-07-0000'),
+        ])
+
+    def test_sync_updates_changed_expiry_dates_only(self):
+        sync_all_vehicles()
+        vehicle = self.vehicles[3]
+        vehicle.insurance_expiry_date = datetime.date(2026, 6, 1)
+        vehicle.permit_expiry = datetime.date(2027, 1, 1)
+        vehicle.save()
+        Document.objects.create(
+            vehicle=vehicle, document_type=DocumentType.objects.get(name='Registration Certificate'),
+            document_number='RC-OLD', issue_date=datetime.date(2011, 1, 1), expiry_date=datetime.date(2021, 1, 1),
+            issuing_authority='RTO',
+        )
+
+        self.assertEqual(sync_all_vehicles(), (1, 1))
+        self.assertEqual(self.documents(vehicle), [
+            ('Insurance Policy', datetime.date(2026, 6, 1), 'KL-07-0003'),
+            ('Permit', datetime.date(2027, 1, 1), 'KL-07-0003'),
+            ('Registration Certificate', datetime.date(2021, 1, 1), 'RC-OLD'),
+            ('Registration Certificate', datetime.date(2036, 1, 1), 'KL-07-0003'),
+        ])
+        self.assertEqual(sync_all_vehicles(), (0, 0))
+
+    def test_sync_leaves_renewals_alone(self):
+        sync_all_vehicles()
+        vehicle = self.vehicles[5]
+        Document.objects.create(
+            vehicle=vehicle, document_type=DocumentType.objects.get(name='Insurance Policy'),
+            document_number='NEW-POLICY', issue_date=datetime.date(2025, 5, 1), expiry_date=datetime.date(2026, 6, 1),
+            issuing_authority='Insurer',
+        )
+        vehicle.color = 'red'
+        vehicle.save()
+        self.assertEqual(Document.create_from_vehicle(vehicle), (0, 0))
+
+        # Nor is a sync-made document moved back when the vehicle's date is corrected
+        vehicle.rc_valid_till = datetime.date(2035, 1, 1)
+        vehicle.save()
+        self.assertEqual(Document.create_from_vehicle(vehicle), (0, 0))
+        self.assertEqual(self.documents(vehicle), [
+            ('Insurance Policy', datetime.date(2025, 6, 1), 'KL-07-0005'),
+            ('Insurance Policy', datetime.date(2026, 6, 1), 'NEW-POLICY'),
+            ('Registration Certificate', datetime.date(2036, 1, 1), 'KL-07-0005'),
+        ])
+
+
+class ComplianceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.insurance = DocumentType.objects.create(name='Insurance Policy', required=True)
+        cls.permit = DocumentType.objects.create(name='Permit', required=True)
+        cls.brochure = DocumentType.objects.create(name='Brochure', required=False)
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+
+    def document(self, document_type, days):
+        return Document.objects.create(
+            vehicle=self.vehicle, document_type=document_type, document_number='X', issue_date=self.today,
+            expiry_date=self.today + datetime.timedelta(days=days), issuing_authority='RTO',
+        )
+
+    def compliance(self):
+        self.vehicle.refresh_from_db()
+        return self.vehicle.compliance_status, self.vehicle.compliance_next_expiry
+
+    def test_status_follows_documents_and_types(self):
+        self.assertEqual(self.compliance(), ('expired', None))
+        self.document(self.insurance, 400)
+        self.document(self.brochure, -5)
+        self.assertEqual(self.compliance()[0], 'expired')
+
+        permit = self.document(self.permit, 20)
+        self.assertEqual(self.compliance(), ('expiring', permit.expiry_date))
+        # A renewal counts instead of the document it replaces
+        renewal = self.document(self.permit, 200)
+        self.assertEqual(self.compliance(), ('valid', renewal.expiry_date))
+        renewal.delete()
+        self.assertEqual(self.compliance()[0], 'expiring')
+
+        self.permit.required = False
+        self.permit.save()
+        self.assertEqual(self.compliance(), ('valid', self.today + datetime.timedelta(days=400)))
+
+    def test_daily_rollover(self):
+        self.document(self.insurance, 400)
+        permit = self.document(self.permit, 31)
+        self.assertEqual(self.compliance(), ('valid', permit.expiry_date))
+        self.assertEqual(rollover(), 0)
+
+        self.assertEqual(rollover(self.today + datetime.timedelta(days=1)), 1)
+        self.assertEqual(self.compliance(), ('expiring', permit.expiry_date))
+        self.assertEqual(rollover(permit.expiry_date), 1)
+        self.assertEqual(self.compliance(), ('expired', permit.expiry_date))
+
+    def test_api_filter_and_documents_valid(self):
+        self.document(self.insurance, 400)
+        self.document(self.permit, 400)
+        user = CustomUser.objects.create_user('admin', 'admin@example.com', 'pw', user_type='admin')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=user).key}'
+
+        self.assertEqual(self.client.get('/api/v1/vehicles/?compliance=expired').json()['results'], [])
+        vehicle = self.client.get('/api/v1/vehicles/?compliance=valid').json()['results'][0]
+        self.assertEqual(
+            (vehicle['documents_valid'], vehicle['compliance_status']), (True, 'valid')
+        )
+
+
+class DocumentStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+        cls.types = [DocumentType.objects.create(name=name) for name in ('Insurance Policy', 'Permit', 'Brochure')]
+        for doc_type, days in ((cls.types[0], -3), (cls.types[0], 0), (cls.types[0], 90), (cls.types[1], 31)):
+            Document.objects.create(
+                vehicle=vehicle, document_type=doc_type, document_number='X', issue_date=today,
+                expiry_date=today + datetime.timedelta(days=days), issuing_authority='RTO',
+            )
+
+    def setUp(self):
+        # The cache outlives the rolled back data of other tests
+        stats.invalidate()
+
+    def test_buckets_come_from_one_cached_query(self):
+        # The types and every count
+        with self.assertNumQueries(2):
+            types = stats.attach(DocumentType.objects.order_by('pk'))
+        self.assertEqual(
+            [(t.document_count, t.expired_count, t.expiring_soon_count, t.valid_count) for t in types],
+            [(3, 1, 1, 1), (1, 0, 0, 1), (0, 0, 0, 0)],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(stats.document_stats().totals, (4, 1, 1, 2))
+
+        Document.objects.filter(document_type=self.types[1]).first().delete()
+        self.assertEqual(stats.document_stats().totals, (3, 1, 1, 1))
+        self.assertEqual(DocumentType.objects.get(pk=self.types[0].pk).expiring_soon_count, 1)
+
+
+class ExpiryIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', first_name='Anu', last_name='Das', user_type='driver',
+            license_expiry=cls.today + datetime.timedelta(days=10),
+        )
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicles = [
+            Vehicle.objects.create(
+                vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+                license_plate=f'KL-07-{number:04}', vin=f'VIN{number:014}', color='white',
+                acquisition_date=datetime.date(2021, 1, 1), assigned_driver='Anu Das' if number == 0 else '',
+                permit_expiry=cls.today + datetime.timedelta(days=5 + number),
+            )
+            for number in range(2)
+        ]
+        cls.insurance = DocumentType.objects.create(name='Insurance Policy')
+
+    def calendar(self, days=30):
+        return [(entry.kind, entry.subject, entry.expiry_date) for entry in expiring_within(days)]
+
+    def test_saves_keep_the_index_current(self):
+        document = Document.objects.create(
+            vehicle=self.vehicles[1], document_type=self.insurance, document_number='X', issue_date=self.today,
+            expiry_date=self.today + datetime.timedelta(days=20), issuing_authority='RTO',
+        )
+        day = lambda days: self.today + datetime.timedelta(days=days)
+        self.assertEqual(self.calendar(), [
+            ('permit_expiry', 'KL-07-0000', day(5)),
+            ('permit_expiry', 'KL-07-0001', day(6)),
+            ('license', 'Anu Das', day(10)),
+            ('document', 'KL-07-0001', day(20)),
+        ])
+
+        self.vehicles[0].permit_expiry = None
+        self.vehicles[0].save()
+        self.driver.license_expiry = day(60)
+        self.driver.save()
+        document.expiry_date = day(3)
+        document.save()
+        self.assertEqual(self.calendar(), [
+            ('document', 'KL-07-0001', day(3)),
+            ('permit_expiry', 'KL-07-0001', day(6)),
+        ])
+        self.assertEqual(self.calendar(60)[-1], ('license', 'Anu Das', day(60)))
+
+        # Bulk writes skip the signals; the rebuild catches up and is safe to repeat
+        Vehicle.objects.filter(pk=self.vehicles[1].pk).update(permit_expiry=day(1))
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(self.calendar()[0], ('permit_expiry', 'KL-07-0001', day(1)))
+        self.assertEqual(ExpiryEntry.objects.count(), 3)
+
+    def test_calendar_api_is_scoped_to_the_driver(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=self.driver).key}'
+        entries = self.client.get('/api/v1/expiries/').json()['results']
+        self.assertEqual([(entry['kind'], entry['subject'], entry['days_left']) for entry in entries], [
+            ('permit_expiry', 'KL-07-0000', 5),
+            ('license', 'Anu Das', 10),
+        ])
+
+        start = (self.today + datetime.timedelta(days=6)).isoformat()
+        entries = self.client.get(f'/api/v1/expiries/?start={start}&days=10&kind=license').json()['results']
+        self.assertEqual([entry['label'] for entry in entries], ['Driving Licence'])
+        self.assertEqual(self.client.get('/api/v1/expiries/?days=0').status_code, 400)
 
-# Create your tests here.
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FuelTransaction, FuelStation
+from .models import FuelTransaction, FuelStation, FuelAnomaly, FuelAnomalyScan
 
 @admin.register(FuelStation)
 class FuelStationAdmin(admin.ModelAdmin):
@@ -12,8 +12,9 @@ class FuelStationAdmin(admin.ModelAdmin):
 class FuelTransactionAdmin(admin.ModelAdmin):
     """Admin configuration for FuelTransaction model."""
     
-    list_display = ('id', 'vehicle', 'driver', 'date', 'fuel_type', 'quantity', 'total_cost', 'odometer_reading')
-    list_filter = ('fuel_type', 'vehicle', 'driver', 'date')
+    list_display = ('id', 'vehicle', 'driver', 'date', 'energy_kind', 'fuel_type', 'quantity', 'total_cost', 'odometer_reading')
+    list_select_related = ('vehicle', 'driver')
+    list_filter = ('energy_kind', 'fuel_type', 'vehicle', 'driver', 'date')
     search_fields = ('vehicle__license_plate', 'driver__username', 'fuel_station__name')
     readonly_fields = ('total_cost',)
     fieldsets = (
@@ -30,4 +31,17 @@ class FuelTransactionAdmin(admin.ModelAdmin):
             'fields': ('receipt_image', 'notes'),
             'classes': ('collapse',),
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(FuelAnomaly)
+class FuelAnomalyAdmin(admin.ModelAdmin):
+    list_display = ['transaction', 'vehicle', 'kind', 'value', 'expected', 'detected_at', 'resolved']
+    list_filter = ['kind', 'resolved']
+    search_fields = ['vehicle__license_plate']
+    list_select_related = ['transaction__vehicle', 'vehicle']
+    list_editable = ['resolved']
+    readonly_fields = ['transaction', 'vehicle', 'kind', 'value', 'expected', 'related_transaction', 'detected_at']
+
+@admin.register(FuelAnomalyScan)
+class FuelAnomalyScanAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'finished_at', 'full', 'transactions_scored', 'transactions_loaded', 'anomalies_found']
@@ -0,0 +1,216 @@
+"""
+Suspicious fuel transactions, found in bulk.
+
+Transactions are loaded into a pandas DataFrame (one row per transaction,
+with the vehicle's capacities and the stored fill-to-fill efficiency joined
+in) and scored with vectorised checks:
+
+* over_capacity - more litres (kWh) than the vehicle's fuel_capacity
+                  (battery_capacity_kwh) holds
+* unit_price    - unit price far from the median of the same station, date
+                  and fuel type
+* efficiency    - km/L (km/kWh) with a z-score beyond FUEL_ANOMALY_ZSCORE
+                  against the vehicle's other fills
+* duplicate     - a second fill of the same vehicle on the same day within
+                  FUEL_ANOMALY_DUPLICATE_KM of the first
+
+Transactions only have a date, so duplicates are told apart by odometer
+rather than by time of day, and the one entered later is the repeat.
+"""
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import FuelAnomaly, FuelAnomalyScan, FuelTransaction
+
+COLUMNS = {
+    'id': 'pk',
+    'vehicle_id': 'vehicle_id',
+    'station_id': 'fuel_station_id',
+    'date': 'date',
+    'fuel_type': 'fuel_type',
+    'energy_kind': 'energy_kind',
+    'quantity': 'quantity',
+    'energy_consumed': 'energy_consumed',
+    'cost_per_liter': 'cost_per_liter',
+    'cost_per_kwh': 'cost_per_kwh',
+    'total_cost': 'total_cost',
+    'odometer': 'odometer_reading',
+    'fuel_capacity': 'vehicle__fuel_capacity',
+    'battery_capacity': 'vehicle__battery_capacity_kwh',
+    'efficiency': 'efficiency__efficiency',
+}
+DECIMALS = [
+    'quantity', 'energy_consumed', 'cost_per_liter', 'cost_per_kwh', 'total_cost',
+    'fuel_capacity', 'battery_capacity', 'efficiency',
+]
+
+
+def load_frame(transactions):
+    """`transactions` as a DataFrame, with amount (L or kWh), unit price and capacity picked by energy kind."""
+    rows = transactions.order_by().values_list(*COLUMNS.values()).iterator(chunk_size=5000)
+    frame = pd.DataFrame.from_records(list(rows), columns=list(COLUMNS))
+    for column in DECIMALS:
+        frame[column] = frame[column].astype(float)
+    frame['odometer'] = frame['odometer'].astype(float)
+
+    electric = (frame['energy_kind'] == 'electric').to_numpy()
+    frame['amount'] = np.where(electric, frame['energy_consumed'], frame['quantity'])
+    frame['capacity'] = np.where(electric, frame['battery_capacity'], frame['fuel_capacity'])
+    unit_price = np.where(electric, frame['cost_per_kwh'], frame['cost_per_liter'])
+    # Entered without a unit price: the total tells it
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['unit_price'] = np.where(np.isnan(unit_price), frame['total_cost'] / frame['amount'], unit_price)
+    return frame
+
+
+def over_capacity(frame):
+    tolerance = getattr(settings, 'FUEL_ANOMALY_CAPACITY_TOLERANCE', 0.05)
+    flagged = frame[frame['amount'] > frame['capacity'] * (1 + tolerance)]
+    return flagged.assign(value=flagged['amount'], expected=flagged['capacity'])
+
+
+def unit_price_outliers(frame):
+    tolerance = getattr(settings, 'FUEL_ANOMALY_PRICE_TOLERANCE', 0.1)
+    priced = frame[frame['station_id'].notna() & (frame['unit_price'] > 0)]
+    groups = priced.groupby(['station_id', 'date', 'fuel_type'])['unit_price']
+    median = groups.transform('median')
+    # Two prices can't say which one is off
+    enough = groups.transform('size') >= 3
+    flagged = priced[enough & ((priced['unit_price'] - median).abs() > median * tolerance)]
+    return flagged.assign(value=flagged['unit_price'], expected=median[flagged.index])
+
+
+def efficiency_outliers(frame):
+    """Compared with the mean and spread of the vehicle's other fills, so one bad fill can't hide itself."""
+    threshold = getattr(settings, 'FUEL_ANOMALY_ZSCORE', 3.0)
+    min_fills = getattr(settings, 'FUEL_ANOMALY_MIN_FILLS', 5)
+    scored = frame[frame['efficiency'].notna()]
+    groups = scored.groupby(['vehicle_id', 'energy_kind'])['efficiency']
+    count = groups.transform('size')
+    others = count - 1
+    efficiency = scored['efficiency']
+    total = groups.transform('sum') - efficiency
+    squares = scored.assign(square=efficiency ** 2).groupby(['vehicle_id', 'energy_kind'])['square'].transform('sum')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / others
+        std = np.sqrt(((squares - efficiency ** 2) / others - mean ** 2).clip(lower=0))
+        zscore = (efficiency - mean) / std
+    flagged = scored[(count >= min_fills) & (std > 0) & (zscore.abs() > threshold)]
+    return flagged.assign(value=flagged['efficiency'], expected=mean[flagged.index])
+
+
+def duplicates(frame):
+    """The later entered (higher pk) of two same-day fills, whichever has the lower odometer."""
+    within_km = getattr(settings, 'FUEL_ANOMALY_DUPLICATE_KM', 10)
+    ordered = frame.sort_values(['vehicle_id', 'date', 'odometer', 'id'])
+    previous = ordered.shift(1)
+    repeat = (
+        (ordered['vehicle_id'] == previous['vehicle_id'])
+        & (ordered['date'] == previous['date'])
+        & ((ordered['odometer'] - previous['odometer']).abs() <= within_km)
+    )
+    lower, higher = previous[repeat], ordered[repeat]
+    newer = higher['id'] > lower['id']
+    # Both halves keep the labels of `higher`, so each repeat and its original line up
+    flagged = pd.concat([higher[newer], lower[~newer]])
+    original = pd.concat([lower[newer], higher[~newer]])
+    flagged = flagged.assign(
+        value=flagged['odometer'],
+        expected=original['odometer'],
+        related_id=original['id'],
+    )
+    return flagged.drop_duplicates('id')
+
+
+CHECKS = {
+    'over_capacity': over_capacity,
+    'unit_price': unit_price_outliers,
+    'efficiency': efficiency_outliers,
+    'duplicate': duplicates,
+}
+
+
+def find_anomalies(frame, score_ids=None):
+    """FuelAnomaly rows for `frame`, limited to transactions in `score_ids` if given."""
+    anomalies = []
+    if frame.empty:
+        return anomalies
+    for kind, check in CHECKS.items():
+        flagged = check(frame)
+        if score_ids is not None:
+            flagged = flagged[flagged['id'].isin(score_ids)]
+        related = flagged['related_id'] if 'related_id' in flagged else [None] * len(flagged)
+        for pk, vehicle_id, value, expected, related_id in zip(
+            flagged['id'], flagged['vehicle_id'], flagged['value'], flagged['expected'], related
+        ):
+            anomalies.append(FuelAnomaly(
+                transaction_id=int(pk),
+                vehicle_id=int(vehicle_id),
+                kind=kind,
+                value=round(float(value), 2),
+                expected=round(float(expected), 2),
+                related_transaction_id=None if related_id is None else int(related_id),
+            ))
+    return anomalies
+
+
+def context_for(new_transactions):
+    """
+    The transactions new ones are scored against: the same vehicles' history
+    (capacity, efficiency, duplicates) and the same station-days (prices).
+    """
+    vehicle_ids = set(new_transactions.values_list('vehicle_id', flat=True))
+    station_ids, dates = set(), set()
+    for station_id, date in new_transactions.filter(fuel_station__isnull=False).values_list('fuel_station_id', 'date'):
+        station_ids.add(station_id)
+        dates.add(date)
+    # A superset of the station-days; prices are grouped by station and date anyway
+    return FuelTransaction.objects.filter(
+        Q(vehicle_id__in=vehicle_ids) | Q(fuel_station_id__in=station_ids, date__in=dates)
+    )
+
+
+def run_scan(full=False):
+    """
+    Score the transactions added since the last scan (every transaction if
+    `full` or on the first run) and record the run. Open anomalies of the
+    scored transactions are replaced; resolved ones are kept and not
+    reported again.
+    """
+    started_at = timezone.now()
+    # Taken before reading, so rows added while this runs are scored next time
+    last_id = FuelTransaction.objects.aggregate(last=Max('pk'))['last'] or 0
+    previous = FuelAnomalyScan.objects.order_by('-started_at').first()
+    full = full or previous is None
+
+    if full:
+        frame = load_frame(FuelTransaction.objects.filter(pk__lte=last_id))
+        score_ids = None
+        scored = len(frame)
+    else:
+        new_transactions = FuelTransaction.objects.filter(pk__gt=previous.last_transaction_id, pk__lte=last_id)
+        score_ids = list(new_transactions.values_list('pk', flat=True))
+        frame = load_frame(context_for(new_transactions)) if score_ids else load_frame(FuelTransaction.objects.none())
+        scored = len(score_ids)
+
+    anomalies = find_anomalies(frame, score_ids)
+    with transaction.atomic():
+        stale = FuelAnomaly.objects.filter(resolved=False)
+        if not full:
+            stale = stale.filter(transaction_id__in=score_ids)
+        stale.delete()
+        FuelAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+
+    return FuelAnomalyScan.objects.create(
+        started_at=started_at,
+        finished_at=timezone.now(),
+        full=full,
+        last_transaction_id=last_id,
+        transactions_loaded=len(frame),
+        transactions_scored=scored,
+        anomalies_found=len(anomalies),
+    )
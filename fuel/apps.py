@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FuelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fuel'
+
+    def ready(self):
+        import fuel.signals
@@ -0,0 +1,130 @@
+"""
+Fill-to-fill fuel efficiency.
+
+Each transaction's efficiency is the odometer distance since the vehicle's
+previous transaction divided by the litres (or kWh) of this one, i.e. what it
+took to top the tank back up. Transactions are ordered by date, then odometer.
+
+The series is stored in FuelEfficiency. Saving or deleting a transaction
+recomputes that vehicle's series from the transaction's date onwards (its
+old date too, if it moved), so back-dated entries fix up their neighbours.
+Reports and the dashboard read rolling averages from the stored series.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+
+from .models import FuelEfficiency, FuelTransaction
+
+ORDER = ('date', 'odometer_reading', 'pk')
+
+
+def compute_series(rows, previous=None):
+    """
+    FuelEfficiency rows for `rows` (pk, date, odometer, energy_kind, quantity,
+    energy_consumed, vehicle_id tuples in series order), `previous` being the
+    transaction just before them. Pairs that can't give a figure (odometer not moving
+    forward, nothing filled, or a switch between fuel and electric) are left out.
+    """
+    series = []
+    for row in rows:
+        pk, date, odometer, energy_kind, quantity, energy_consumed, vehicle_id = row
+        amount = energy_consumed if energy_kind == 'electric' else quantity
+        if previous is not None and previous[3] == energy_kind and amount:
+            distance = odometer - previous[2]
+            if distance > 0:
+                series.append(FuelEfficiency(
+                    transaction_id=pk,
+                    vehicle_id=vehicle_id,
+                    date=date,
+                    energy_kind=energy_kind,
+                    distance_km=distance,
+                    amount=amount,
+                    efficiency=(Decimal(distance) / amount).quantize(Decimal('0.01'), ROUND_HALF_UP),
+                ))
+        previous = row
+    return series
+
+
+def refresh_vehicle(vehicle_id, since=None):
+    """Recompute the stored series of a vehicle for transactions dated `since` or later (all if None)."""
+    transactions = FuelTransaction.objects.filter(vehicle_id=vehicle_id)
+    fields = ('pk', 'date', 'odometer_reading', 'energy_kind', 'quantity', 'energy_consumed', 'vehicle_id')
+    previous = None
+    if since is not None:
+        previous = transactions.filter(date__lt=since).order_by(
+            *[f'-{field}' for field in ORDER]
+        ).values_list(*fields).first()
+        transactions = transactions.filter(date__gte=since)
+    rows = list(transactions.order_by(*ORDER).values_list(*fields))
+    series = compute_series(rows, previous)
+
+    stale = FuelEfficiency.objects.filter(vehicle_id=vehicle_id)
+    if since is not None:
+        stale = stale.filter(date__gte=since)
+    with transaction.atomic():
+        stale.exclude(pk__in=[row.pk for row in series]).delete()
+        save_series(series)
+    return len(series)
+
+
+def save_series(series):
+    if not series:
+        return
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    unique_fields = ['transaction'] if connection.features.supports_update_conflicts_with_target else None
+    FuelEfficiency.objects.bulk_create(
+        series,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['vehicle', 'date', 'energy_kind', 'distance_km', 'amount', 'efficiency'],
+    )
+
+
+def rolling_efficiency(vehicle_ids=None, window=None, energy_kind=None):
+    """
+    {vehicle_id: (km per unit, energy_kind)} over each vehicle's last `window`
+    fills (FUEL_EFFICIENCY_WINDOW, default 5). Distance-weighted: total
+    distance over total fuel, so a small top-up doesn't swing the average.
+    """
+    window = window or getattr(settings, 'FUEL_EFFICIENCY_WINDOW', 5)
+    series = FuelEfficiency.objects.all()
+    if vehicle_ids is not None:
+        series = series.filter(vehicle_id__in=vehicle_ids)
+    if energy_kind:
+        series = series.filter(energy_kind=energy_kind)
+    recent = series.annotate(
+        position=Window(RowNumber(), partition_by=F('vehicle_id'), order_by=[F('date').desc(), F('pk').desc()])
+    ).filter(position__lte=window).order_by('vehicle_id', 'position').values_list(
+        'vehicle_id', 'energy_kind', 'distance_km', 'amount'
+    )
+
+    totals = {}
+    for vehicle_id, kind, distance, amount in recent:
+        # The latest fill decides the unit
+        total = totals.setdefault(vehicle_id, [0, Decimal(0), kind])
+        if kind == total[2]:
+            total[0] += distance
+            total[1] += amount
+    return {
+        vehicle_id: (round(float(distance / amount), 2), kind)
+        for vehicle_id, (distance, amount, kind) in totals.items()
+        if amount
+    }
+
+
+def period_efficiency(series):
+    """{(vehicle_id, energy_kind): (distance, amount, km per unit)} over a filtered FuelEfficiency queryset."""
+    rows = series.values('vehicle_id', 'energy_kind').annotate(
+        distance=Sum('distance_km'), amount=Sum('amount')
+    ).order_by()
+    return {
+        (row['vehicle_id'], row['energy_kind']): (
+            row['distance'], row['amount'], round(float(row['distance'] / row['amount']), 2)
+        )
+        for row in rows
+        if row['amount']
+    }
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from fuel.efficiency import refresh_vehicle
+from fuel.models import FuelTransaction
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored fill-to-fill fuel efficiency series, e.g. after migrating or a bulk import'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vehicle',
+            type=int,
+            action='append',
+            help='Only this vehicle id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        vehicle_ids = options['vehicle'] or list(
+            FuelTransaction.objects.order_by('vehicle_id').values_list('vehicle_id', flat=True).distinct()
+        )
+
+        started = time.monotonic()
+        fills = 0
+        for done, vehicle_id in enumerate(vehicle_ids, 1):
+            fills += refresh_vehicle(vehicle_id)
+            if done % 100 == 0:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"{done}/{len(vehicle_ids)} vehicles, {fills} fills ({fills / elapsed:.0f} fills/s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {fills} fill-to-fill figures for {len(vehicle_ids)} vehicles in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from fuel.anomalies import run_scan
+import time
+
+
+class Command(BaseCommand):
+    help = 'Flag suspicious fuel transactions: over capacity, odd unit prices, efficiency outliers and duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Score every transaction, not just those added since the last scan'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        scan = run_scan(full=options['full'])
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full' if scan.full else 'Incremental'} scan scored {scan.transactions_scored} transactions "
+            f"({scan.transactions_loaded} loaded) and found {scan.anomalies_found} anomalies "
+            f"in {elapsed:.1f}s ({scan.transactions_loaded / elapsed:.0f} transactions/s)"
+        ))
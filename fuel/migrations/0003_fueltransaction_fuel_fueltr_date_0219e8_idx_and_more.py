@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel', '0002_fuelstation_station_type_and_more'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['date'], name='fuel_fueltr_date_0219e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['vehicle', 'date'], name='fuel_fueltr_vehicle_a322dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['driver', 'date'], name='fuel_fueltr_driver__e0dfc1_idx'),
+        ),
+    ]
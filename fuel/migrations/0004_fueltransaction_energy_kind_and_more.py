@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_energy_kind(apps, schema_editor):
+    FuelTransaction = apps.get_model('fuel', 'FuelTransaction')
+    FuelTransaction.objects.filter(
+        Q(fuel_type='Electric') | Q(vehicle__vehicle_type__category='electric')
+    ).update(energy_kind='electric')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel', '0003_fueltransaction_fuel_fueltr_date_0219e8_idx_and_more'),
+        ('vehicles', '0006_odometercheck_odometeranomaly'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fueltransaction',
+            name='energy_kind',
+            field=models.CharField(choices=[('fuel', 'Fuel'), ('electric', 'Electric')], default='fuel', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['energy_kind', 'date'], name='fuel_fueltr_energy__b01ab7_idx'),
+        ),
+        migrations.RunPython(backfill_energy_kind, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:08
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_efficiency(apps, schema_editor):
+    # Same series as fuel.efficiency.compute_series(), against the historical models
+    FuelTransaction = apps.get_model('fuel', 'FuelTransaction')
+    FuelEfficiency = apps.get_model('fuel', 'FuelEfficiency')
+
+    rows = FuelTransaction.objects.order_by('vehicle_id', 'date', 'odometer_reading', 'pk').values_list(
+        'pk', 'date', 'odometer_reading', 'energy_kind', 'quantity', 'energy_consumed', 'vehicle_id'
+    ).iterator(chunk_size=5000)
+    series = []
+    previous = None
+    for row in rows:
+        pk, date, odometer, energy_kind, quantity, energy_consumed, vehicle_id = row
+        amount = energy_consumed if energy_kind == 'electric' else quantity
+        if previous is not None and previous[6] == vehicle_id and previous[3] == energy_kind and amount:
+            distance = odometer - previous[2]
+            if distance > 0:
+                series.append(FuelEfficiency(
+                    transaction_id=pk,
+                    vehicle_id=vehicle_id,
+                    date=date,
+                    energy_kind=energy_kind,
+                    distance_km=distance,
+                    amount=amount,
+                    efficiency=(Decimal(distance) / amount).quantize(Decimal('0.01'), ROUND_HALF_UP),
+                ))
+        previous = row
+        if len(series) >= 1000:
+            FuelEfficiency.objects.bulk_create(series)
+            series = []
+    FuelEfficiency.objects.bulk_create(series)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel', '0004_fueltransaction_energy_kind_and_more'),
+        ('vehicles', '0006_odometercheck_odometeranomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuelEfficiency',
+            fields=[
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='efficiency', serialize=False, to='fuel.fueltransaction')),
+                ('date', models.DateField()),
+                ('energy_kind', models.CharField(choices=[('fuel', 'Fuel'), ('electric', 'Electric')], max_length=10)),
+                ('distance_km', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('efficiency', models.DecimalField(decimal_places=2, help_text='km/L or km/kWh', max_digits=8)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fuel_efficiency', to='vehicles.vehicle')),
+            ],
+            options={
+                'ordering': ['vehicle', 'date'],
+                'indexes': [models.Index(fields=['vehicle', 'date'], name='fuel_fuelef_vehicle_fdce0f_idx'), models.Index(fields=['date'], name='fuel_fuelef_date_84eb9f_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_efficiency, migrations.RunPython.noop),
+    ]
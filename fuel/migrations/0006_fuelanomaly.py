@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel', '0005_fuelefficiency'),
+        ('vehicles', '0006_odometercheck_odometeranomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuelAnomalyScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('full', models.BooleanField(default=False)),
+                ('last_transaction_id', models.PositiveBigIntegerField(default=0)),
+                ('transactions_loaded', models.PositiveIntegerField(default=0)),
+                ('transactions_scored', models.PositiveIntegerField(default=0)),
+                ('anomalies_found', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'get_latest_by': 'started_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='FuelAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('over_capacity', 'More than the tank/battery holds'), ('unit_price', 'Unit price unlike the station that day'), ('efficiency', "Efficiency far from the vehicle's usual"), ('duplicate', 'Possible duplicate fill')], max_length=20)),
+                ('value', models.FloatField()),
+                ('expected', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved', models.BooleanField(default=False, help_text='Reviewed; kept out of later scans')),
+                ('related_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fuel.fueltransaction')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='fuel.fueltransaction')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fuel_anomalies', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name_plural': 'fuel anomalies',
+                'ordering': ['-detected_at'],
+                'indexes': [models.Index(fields=['vehicle', 'resolved'], name='fuel_fuelan_vehicle_fae32a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('transaction', 'kind'), name='unique_fuel_anomaly')],
+            },
+        ),
+    ]
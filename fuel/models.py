@@ -73,16 +73,47 @@ class FuelTransaction(models.Model):
     receipt_image = models.ImageField(upload_to='fuel_receipts/', null=True, blank=True)
     notes = models.TextField(blank=True)
     
+    # Copied from the vehicle's type on save, so filters and reports don't join through it
+    ENERGY_KIND_CHOICES = [
+        ('fuel', 'Fuel'),
+        ('electric', 'Electric'),
+    ]
+    energy_kind = models.CharField(max_length=10, choices=ENERGY_KIND_CHOICES, default='fuel', editable=False)
+    
+    class Meta:
+        indexes = [
+            # Fuel/electric list filter and report splits
+            models.Index(fields=['energy_kind', 'date']),
+            # Dashboard daily/weekly/monthly totals and report date ranges
+            models.Index(fields=['date']),
+            # Per-vehicle fuel history
+            models.Index(fields=['vehicle', 'date']),
+            # Driver's recent fuel (dashboard, mobile bootstrap)
+            models.Index(fields=['driver', 'date']),
+        ]
+    
     def __str__(self):
         if self.is_electric_transaction():
             return f"Charging for {self.vehicle} on {self.date}"
         else:
             return f"Fuel for {self.vehicle} on {self.date}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Where the row sat in its vehicle's series, so a moved transaction's old neighbours get refreshed
+        instance._loaded_position = (instance.__dict__.get('vehicle_id'), instance.__dict__.get('date'))
+        return instance
+    
     def is_electric_transaction(self):
         """Check if this is an electric vehicle transaction."""
-        return (self.vehicle.is_electric() if hasattr(self.vehicle, 'is_electric') 
-                else self.fuel_type == 'Electric')
+        return self.energy_kind == 'electric'
+    
+    def detect_energy_kind(self):
+        """Work out energy_kind from the vehicle's type (or an 'Electric' fuel type)."""
+        if self.fuel_type == 'Electric' or (self.vehicle_id and self.vehicle.is_electric()):
+            return 'electric'
+        return 'fuel'
     
     def get_quantity_display(self):
         """Get appropriate quantity display based on vehicle type."""
@@ -99,6 +130,10 @@ class FuelTransaction(models.Model):
             return f"₹{self.cost_per_liter}/L" if self.cost_per_liter else "N/A"
     
     def save(self, *args, **kwargs):
+        self.energy_kind = self.detect_energy_kind()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'energy_kind'}
+        
         # Auto-calculate total cost if not provided
         if not self.total_cost or self.total_cost <= 0:
             if self.is_electric_transaction():
@@ -112,4 +147,90 @@ class FuelTransaction(models.Model):
         if self.is_electric_transaction() and not self.fuel_type:
             self.fuel_type = 'Electric'
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class FuelEfficiency(models.Model):
+    """
+    Fill-to-fill efficiency: the distance driven since the vehicle's previous
+    transaction, divided by the fuel (or energy) put back in. Maintained by
+    fuel/efficiency.py as transactions are saved and deleted.
+    """
+    transaction = models.OneToOneField(
+        FuelTransaction, on_delete=models.CASCADE, primary_key=True, related_name='efficiency'
+    )
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='fuel_efficiency')
+    date = models.DateField()
+    energy_kind = models.CharField(max_length=10, choices=FuelTransaction.ENERGY_KIND_CHOICES)
+    distance_km = models.PositiveIntegerField()
+    # Litres or kWh, depending on energy_kind
+    amount = models.DecimalField(max_digits=8, decimal_places=2)
+    efficiency = models.DecimalField(max_digits=8, decimal_places=2, help_text="km/L or km/kWh")
+    
+    class Meta:
+        ordering = ['vehicle', 'date']
+        indexes = [
+            # Rolling averages per vehicle and report date ranges
+            models.Index(fields=['vehicle', 'date']),
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        unit = 'km/kWh' if self.energy_kind == 'electric' else 'km/L'
+        return f"{self.efficiency} {unit} for {self.vehicle_id} on {self.date}"
+
+class FuelAnomaly(models.Model):
+    """
+    A suspicious fuel transaction found by the scan_fuel_anomalies command
+    (see fuel/anomalies.py).
+    """
+    KIND_CHOICES = (
+        ('over_capacity', 'More than the tank/battery holds'),
+        ('unit_price', 'Unit price unlike the station that day'),
+        ('efficiency', 'Efficiency far from the vehicle\'s usual'),
+        ('duplicate', 'Possible duplicate fill'),
+    )
+    
+    transaction = models.ForeignKey(FuelTransaction, on_delete=models.CASCADE, related_name='anomalies')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='fuel_anomalies')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # What was seen and what was expected: litres/kWh vs capacity, unit price vs the
+    # station's median, km/L vs the vehicle's mean, odometer vs the earlier fill's
+    value = models.FloatField()
+    expected = models.FloatField()
+    # The earlier fill a duplicate repeats
+    related_transaction = models.ForeignKey(
+        FuelTransaction, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    detected_at = models.DateTimeField(auto_now_add=True)
+    resolved = models.BooleanField(default=False, help_text="Reviewed; kept out of later scans")
+    
+    class Meta:
+        ordering = ['-detected_at']
+        constraints = [
+            models.UniqueConstraint(fields=['transaction', 'kind'], name='unique_fuel_anomaly'),
+        ]
+        indexes = [
+            # Open anomalies per vehicle
+            models.Index(fields=['vehicle', 'resolved']),
+        ]
+        verbose_name_plural = 'fuel anomalies'
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.transaction}"
+
+class FuelAnomalyScan(models.Model):
+    """One run of scan_fuel_anomalies; incremental runs score transactions added since the last one."""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    full = models.BooleanField(default=False)
+    last_transaction_id = models.PositiveBigIntegerField(default=0)
+    transactions_loaded = models.PositiveIntegerField(default=0)
+    transactions_scored = models.PositiveIntegerField(default=0)
+    anomalies_found = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+        get_latest_by = 'started_at'
+    
+    def __str__(self):
+        return f"Fuel anomaly scan at {self.started_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,179 @@
+"""
+Nearest fuel/charging station lookup.
+
+Stations are kept in memory in a grid of fixed-size lat/lng cells. A lookup
+scans rings of cells outward from the query point, skipping cells outside the
+stations' bounding box, and stops as soon as no unvisited cell can hold a
+closer station than the k-th best found so far. A lookup that would visit more
+cells than are occupied scans every station instead.
+
+Each process builds the grid lazily. Saving or deleting a FuelStation bumps a
+version number in the cache (see fuel/signals.py and
+vehicle_management/cache_versions.py), so workers sharing that cache rebuild
+on their next lookup. Without a shared cache a worker rebuilds its grid once
+it is FUEL_STATION_GRID_MAX_AGE seconds old.
+"""
+import heapq
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from vehicle_management.cache_versions import bump_version, get_version
+from .models import FuelStation
+
+VERSION_KEY = 'fuel_station_grid_version'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Station types that serve a requested type; 'both' serves either
+SERVES = {
+    'fuel': {'fuel', 'both'},
+    'charging': {'charging', 'both'},
+    'both': {'both'},
+}
+
+Station = namedtuple('Station', 'id name address station_type latitude longitude')
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationGrid:
+    """Stations bucketed into `cell_size` degree cells."""
+
+    def __init__(self, stations, cell_size=0.05):
+        self.cell_size = cell_size
+        self.cells = {}
+        for station in stations:
+            self.cells.setdefault(self._cell(station.latitude, station.longitude), []).append(station)
+        rows = [row for row, _ in self.cells] or [0]
+        cols = [col for _, col in self.cells] or [0]
+        self.bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self):
+        return sum(len(stations) for stations in self.cells.values())
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def _ring(self, row, col, radius):
+        """Cells at Chebyshev distance `radius` from (row, col) that lie inside the bounds."""
+        min_row, max_row, min_col, max_col = self.bounds
+        if radius == 0:
+            yield row, col
+            return
+        first_col, last_col = max(col - radius, min_col), min(col + radius, max_col)
+        for r in (row - radius, row + radius):
+            if min_row <= r <= max_row:
+                for c in range(first_col, last_col + 1):
+                    yield r, c
+        first_row, last_row = max(row - radius + 1, min_row), min(row + radius - 1, max_row)
+        for c in (col - radius, col + radius):
+            if min_col <= c <= max_col:
+                for r in range(first_row, last_row + 1):
+                    yield r, c
+
+    def _min_ring_distance(self, latitude, radius):
+        """Lower bound, in km, on the distance to any point in ring `radius`."""
+        degrees = (radius - 1) * self.cell_size
+        if degrees <= 0:
+            return 0.0
+        # Longitude degrees shrink towards the poles; use the highest latitude the ring reaches
+        highest = min(90.0, abs(latitude) + radius * self.cell_size)
+        along_parallel = 2 * EARTH_RADIUS_KM * math.asin(
+            min(1.0, math.cos(math.radians(highest)) * math.sin(math.radians(min(degrees, 180) / 2)))
+        )
+        return min(degrees * KM_PER_DEGREE, along_parallel)
+
+    def nearest(self, latitude, longitude, limit=5, station_type=None, max_distance_km=None):
+        """Up to `limit` (station, distance_km) pairs, nearest first."""
+        if not self.cells or limit < 1:
+            return []
+        allowed = SERVES.get(station_type) if station_type else None
+        row, col = self._cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = self.bounds
+        # Rings closer than the bounds hold no stations; rings past them hold none either
+        first_ring = max(min_row - row, row - max_row, min_col - col, col - max_col, 0)
+        last_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+        best = []  # max-heap of the closest `limit` stations as (-distance, id, station)
+
+        def consider(station):
+            if allowed is not None and station.station_type not in allowed:
+                return
+            distance = haversine_km(latitude, longitude, station.latitude, station.longitude)
+            if max_distance_km is not None and distance > max_distance_km:
+                return
+            item = (-distance, station.id, station)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, item)
+
+        # Sparse grids can need more empty cells than there are stations; scan those directly
+        budget = len(self.cells)
+        visited = 0
+        for radius in range(first_ring, last_ring + 1):
+            bound = self._min_ring_distance(latitude, radius)
+            if max_distance_km is not None and bound > max_distance_km:
+                break
+            if len(best) == limit and bound > -best[0][0]:
+                break
+            for cell in self._ring(row, col, radius):
+                visited += 1
+                if visited > budget:
+                    break
+                for station in self.cells.get(cell, ()):
+                    consider(station)
+            if visited > budget:
+                best.clear()
+                for stations in self.cells.values():
+                    for station in stations:
+                        consider(station)
+                break
+
+        return [(station, -negative) for negative, _, station in sorted(best, reverse=True)]
+
+def build_grid():
+    rows = FuelStation.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'name', 'address', 'station_type', 'latitude', 'longitude')
+    stations = [
+        Station(pk, name, address, station_type, float(latitude), float(longitude))
+        for pk, name, address, station_type, latitude, longitude in rows
+    ]
+    return StationGrid(stations, getattr(settings, 'FUEL_STATION_GRID_CELL_DEGREES', 0.05))
+
+
+_grid = None
+_grid_version = None
+_grid_built_at = None
+
+
+def get_grid():
+    """This process's grid, rebuilt if a station changed since it was built, or once it is too old."""
+    global _grid, _grid_version, _grid_built_at
+    version = get_version(VERSION_KEY)
+    now = time.monotonic()
+    max_age = getattr(settings, 'FUEL_STATION_GRID_MAX_AGE', 300)
+    if _grid is None or version != _grid_version or now - _grid_built_at >= max_age:
+        _grid, _grid_version, _grid_built_at = build_grid(), version, now
+    return _grid
+
+
+def invalidate():
+    """Make every process rebuild its grid on the next lookup."""
+    bump_version(VERSION_KEY)
+
+
+def nearest_stations(latitude, longitude, limit=5, station_type=None, max_distance_km=None):
+    """Up to `limit` (Station, distance_km) pairs near a point, nearest first."""
+    return get_grid().nearest(
+        float(latitude), float(longitude), limit=limit,
+        station_type=station_type, max_distance_km=max_distance_km
+    )
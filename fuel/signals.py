@@ -0,0 +1,61 @@
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from vehicles.models import Vehicle, VehicleType
+from . import efficiency, proximity
+from .models import FuelStation, FuelTransaction
+
+
+@receiver([post_save, post_delete], sender=FuelStation)
+def invalidate_station_grid(sender, instance, **kwargs):
+    """Station locations and types feed the nearest-station grid"""
+    proximity.invalidate()
+
+
+@receiver([post_save, post_delete], sender=FuelTransaction)
+def refresh_efficiency(sender, instance, raw=False, **kwargs):
+    """Recompute the fill-to-fill series from this transaction (and where it used to be) onwards"""
+    if raw:
+        return
+    positions = {(instance.vehicle_id, instance.date)}
+    if kwargs.get('signal') is post_save:
+        positions.add(getattr(instance, '_loaded_position', (None, None)))
+    earliest = {}
+    for vehicle_id, date in positions:
+        if vehicle_id is not None and date is not None:
+            earliest[vehicle_id] = min(date, earliest.get(vehicle_id, date))
+    for vehicle_id, date in earliest.items():
+        efficiency.refresh_vehicle(vehicle_id, since=date)
+    instance._loaded_position = (instance.vehicle_id, instance.date)
+
+
+@receiver(post_save, sender=Vehicle)
+def sync_vehicle_energy_kind(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """Keep FuelTransaction.energy_kind in line when a vehicle changes type"""
+    if raw or created or (update_fields is not None and 'vehicle_type' not in update_fields):
+        return
+    sync_energy_kind(FuelTransaction.objects.filter(vehicle=instance))
+
+
+@receiver(post_save, sender=VehicleType)
+def sync_vehicle_type_energy_kind(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """...or when a vehicle type changes category"""
+    if raw or created or (update_fields is not None and 'category' not in update_fields):
+        return
+    sync_energy_kind(FuelTransaction.objects.filter(vehicle__vehicle_type=instance))
+
+
+def sync_energy_kind(transactions):
+    """Set energy_kind of `transactions` with two UPDATEs, touching only the rows that are wrong."""
+    electric = Q(fuel_type='Electric') | Q(vehicle__vehicle_type__category='electric')
+    to_electric = transactions.filter(electric).exclude(energy_kind='electric')
+    to_fuel = transactions.exclude(electric).exclude(energy_kind='fuel')
+    changed = set(to_electric.values_list('vehicle_id', flat=True)) | set(to_fuel.values_list('vehicle_id', flat=True))
+    if not changed:
+        return
+    to_electric.update(energy_kind='electric')
+    to_fuel.update(energy_kind='fuel')
+    # The stored efficiency series is split by energy kind
+    for vehicle_id in changed:
+        efficiency.refresh_vehicle(vehicle_id)
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import datetime
+import random
+import time
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser
+from vehicles.models import Vehicle, VehicleType
+from .anomalies import run_scan
+from .efficiency import rolling_efficiency
+from .models import FuelAnomaly, FuelEfficiency, FuelStation, FuelTransaction
+from .proximity import Station, StationGrid, haversine_km, invalidate, nearest_stations
+
+
+class StationGridTests(TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        stations = [
+            Station(i, f'S{i}', '', rng.choice(['fuel', 'charging', 'both']),
+                    rng.uniform(8.0, 13.0), rng.uniform(74.5, 78.0))
+            for i in range(2000)
+        ]
+        grid = StationGrid(stations, cell_size=0.05)
+        for _ in range(50):
+            lat, lng = rng.uniform(7.0, 14.0), rng.uniform(74.0, 79.0)
+            station_type = rng.choice([None, 'fuel', 'charging'])
+            candidates = [
+                s for s in stations
+                if station_type is None or s.station_type in (station_type, 'both')
+            ]
+            expected = sorted(candidates, key=lambda s: haversine_km(lat, lng, s.latitude, s.longitude))[:5]
+            found = grid.nearest(lat, lng, limit=5, station_type=station_type)
+            self.assertEqual([s.id for s, _ in found], [s.id for s in expected])
+
+    def test_far_away_points_stay_fast(self):
+        rng = random.Random(11)
+        stations = [
+            Station(i, f'S{i}', '', 'fuel', rng.uniform(8.0, 13.0), rng.uniform(74.5, 78.0))
+            for i in range(2000)
+        ]
+        grid = StationGrid(stations, cell_size=0.05)
+        for lat, lng in [(0.0, 0.0), (-30.0, 0.0), (-60.0, -170.0)]:
+            started = time.perf_counter()
+            found = grid.nearest(lat, lng, limit=3)
+            self.assertLess(time.perf_counter() - started, 0.5)
+            expected = sorted(stations, key=lambda s: haversine_km(lat, lng, s.latitude, s.longitude))[:3]
+            self.assertEqual([s.id for s, _ in found], [s.id for s in expected])
+
+    def test_radius_limits_results(self):
+        grid = StationGrid([Station(1, 'Near', '', 'fuel', 10.0, 76.0), Station(2, 'Far', '', 'fuel', 10.5, 76.0)])
+        self.assertEqual([s.id for s, _ in grid.nearest(10.0, 76.01, max_distance_km=10)], [1])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NearbyStationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        cls.token = Token.objects.create(user=cls.user)
+        FuelStation.objects.create(name='Kochi Fuels', address='Kochi', latitude=9.97, longitude=76.28)
+        FuelStation.objects.create(
+            name='Kochi Charge', address='Kochi', latitude=9.98, longitude=76.29, station_type='charging'
+        )
+        FuelStation.objects.create(name='Chennai Fuels', address='Chennai', latitude=13.08, longitude=80.27)
+
+    def setUp(self):
+        # The grid outlives the rolled back data of other tests
+        invalidate()
+
+    def test_saving_a_station_rebuilds_the_grid(self):
+        self.assertEqual(nearest_stations(9.9, 76.2, limit=1)[0][0].name, 'Kochi Fuels')
+        FuelStation.objects.create(name='Closer', address='Kochi', latitude=9.9, longitude=76.2)
+        self.assertEqual(nearest_stations(9.9, 76.2, limit=1)[0][0].name, 'Closer')
+
+    def test_grids_expire_without_a_version_bump(self):
+        # Another worker's write with a per-process cache: no bump reaches this one
+        self.assertEqual(nearest_stations(9.9, 76.2, limit=1)[0][0].name, 'Kochi Fuels')
+        FuelStation.objects.filter(name='Chennai Fuels').update(latitude=9.9, longitude=76.2)
+        self.assertEqual(nearest_stations(9.9, 76.2, limit=1)[0][0].name, 'Kochi Fuels')
+        with override_settings(FUEL_STATION_GRID_MAX_AGE=0):
+            self.assertEqual(nearest_stations(9.9, 76.2, limit=1)[0][0].name, 'Chennai Fuels')
+
+    def test_nearby_endpoint(self):
+        response = self.client.get(
+            '/api/v1/fuel-stations/nearby/', {'lat': 9.96, 'lng': 76.27, 'station_type': 'fuel'},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['name'] for s in response.json()], ['Kochi Fuels', 'Chennai Fuels'])
+        self.assertLess(response.json()[0]['distance_km'], 2)
+
+    def test_nearby_endpoint_validates_coordinates(self):
+        response = self.client.get(
+            '/api/v1/fuel-stations/nearby/', {'lat': 91, 'lng': 76.27},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class EnergyKindTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        cls.ev_type = VehicleType.objects.create(name='EV', category='electric')
+        cls.car_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=cls.ev_type, make='Tata', model='Nexon EV', year=2023,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2023, 1, 1),
+        )
+
+    def charge(self):
+        return FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, date=datetime.date(2024, 1, 1),
+            energy_consumed=Decimal('30'), cost_per_kwh=Decimal('10'), total_cost=0, odometer_reading=100,
+        )
+
+    def test_set_on_save(self):
+        transaction = self.charge()
+        self.assertEqual((transaction.energy_kind, transaction.fuel_type), ('electric', 'Electric'))
+        self.assertEqual(transaction.total_cost, Decimal('300'))
+
+        transaction = FuelTransaction.objects.get(pk=transaction.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(transaction.get_quantity_display(), '30.00 kWh')
+
+    def test_follows_vehicle_type_changes(self):
+        transaction = self.charge()
+        transaction.fuel_type = 'Petrol'
+        transaction.save(update_fields=['fuel_type'])
+        self.vehicle.vehicle_type = self.car_type
+        self.vehicle.save()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.energy_kind, 'fuel')
+
+        self.car_type.category = 'electric'
+        self.car_type.save()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.energy_kind, 'electric')
+
+
+class FuelEfficiencyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+
+    def fill(self, day, odometer, litres):
+        return FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, date=datetime.date(2024, 1, day), fuel_type='Petrol',
+            quantity=Decimal(litres), cost_per_liter=Decimal('100'), total_cost=0, odometer_reading=odometer,
+        )
+
+    def series(self):
+        return list(FuelEfficiency.objects.order_by('date').values_list('distance_km', 'efficiency'))
+
+    def test_fill_to_fill_series(self):
+        self.fill(1, 1000, 30)
+        self.fill(5, 1400, 25)
+        self.fill(9, 1700, 20)
+        self.assertEqual(self.series(), [(400, Decimal('16.00')), (300, Decimal('15.00'))])
+        self.assertEqual(self.vehicle.get_fuel_efficiency(), 15.56)  # 700 km / 45 L
+
+    def test_back_dated_fill_updates_its_neighbour(self):
+        self.fill(1, 1000, 30)
+        last = self.fill(9, 1700, 20)
+        middle = self.fill(5, 1400, 25)
+        self.assertEqual(self.series(), [(400, Decimal('16.00')), (300, Decimal('15.00'))])
+
+        middle.date = datetime.date(2024, 1, 20)
+        middle.odometer_reading = 2000
+        middle.save()
+        self.assertEqual(self.series(), [(700, Decimal('35.00')), (300, Decimal('12.00'))])
+
+        last.delete()
+        self.assertEqual(self.series(), [(1000, Decimal('40.00'))])
+
+    def test_rolling_average_uses_recent_fills(self):
+        odometer = 1000
+        for day, litres in enumerate([10, 50, 50, 50], 1):
+            self.fill(day, odometer, litres)
+            odometer += 500
+        self.assertEqual(rolling_efficiency(window=2), {self.vehicle.pk: (10.0, 'fuel')})
+        self.assertEqual(rolling_efficiency(window=3), {self.vehicle.pk: (10.0, 'fuel')})
+
+    def test_migration_fills_in_existing_transactions(self):
+        other = Vehicle.objects.create(
+            vehicle_type=self.vehicle.vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0002', vin='VIN00000000000002', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+        self.fill(1, 1000, 30)
+        self.fill(5, 1400, 25)
+        self.fill(9, 1700, 20)
+        FuelTransaction.objects.create(
+            vehicle=other, driver=self.driver, date=datetime.date(2024, 1, 7), fuel_type='Petrol',
+            quantity=Decimal('10'), cost_per_liter=Decimal('100'), total_cost=0, odometer_reading=5000,
+        )
+        saved = self.series()
+        FuelEfficiency.objects.all().delete()
+
+        migration = import_module('fuel.migrations.0005_fuelefficiency')
+        migration.backfill_efficiency(apps, None)
+        self.assertEqual(self.series(), saved)
+
+
+class FuelAnomalyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), fuel_capacity=Decimal('40'),
+        )
+        cls.station = FuelStation.objects.create(name='Depot pump', address='Depot')
+
+    def fill(self, day, odometer, litres, price=100):
+        return FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, fuel_station=self.station, date=datetime.date(2024, 1, day),
+            fuel_type='Petrol', quantity=Decimal(litres), cost_per_liter=Decimal(price), total_cost=0,
+            odometer_reading=odometer,
+        )
+
+    def anomalies(self):
+        return sorted(FuelAnomaly.objects.values_list('kind', 'transaction_id'))
+
+    @override_settings(FUEL_ANOMALY_MIN_FILLS=100)
+    def test_flags_capacity_price_and_duplicates(self):
+        self.fill(1, 1000, 30)
+        self.fill(5, 1500, 30, price=100)
+        self.fill(5, 1600, 8, price=101)
+        expensive = self.fill(5, 1700, 8, price=130)
+        overfilled = self.fill(10, 2200, 60)
+        repeated = self.fill(10, 2205, 20)
+        scan = run_scan()
+        self.assertEqual(self.anomalies(), sorted([
+            ('unit_price', expensive.pk), ('over_capacity', overfilled.pk), ('duplicate', repeated.pk),
+        ]))
+        self.assertEqual((scan.full, scan.transactions_scored), (True, 6))
+        duplicate = FuelAnomaly.objects.get(kind='duplicate')
+        self.assertEqual((duplicate.related_transaction_id, duplicate.expected), (overfilled.pk, 2200))
+
+    def test_flags_efficiency_outliers(self):
+        odometer = 1000
+        for day, litres in enumerate([30, 33, 34, 32, 33, 10, 35, 33], 1):
+            odometer += 500
+            self.fill(day, odometer, litres)
+        run_scan()
+        outlier = FuelTransaction.objects.get(quantity=10)
+        self.assertEqual(self.anomalies(), [('efficiency', outlier.pk)])
+
+    def test_incremental_scan_scores_new_transactions_and_keeps_resolved(self):
+        self.fill(1, 1000, 30)
+        first = self.fill(5, 1500, 30)
+        run_scan()
+        self.assertEqual(self.anomalies(), [])
+
+        repeated = self.fill(5, 1502, 30)
+        scan = run_scan()
+        self.assertEqual((scan.full, scan.transactions_scored), (False, 1))
+        self.assertEqual(self.anomalies(), [('duplicate', repeated.pk)])
+
+        FuelAnomaly.objects.update(resolved=True)
+        run_scan(full=True)
+        self.assertEqual(list(FuelAnomaly.objects.values_list('kind', 'resolved')), [('duplicate', True)])
+        self.assertEqual(FuelAnomaly.objects.get().related_transaction_id, first.pk)
+
+    def test_repeat_entered_with_a_lower_odometer_is_flagged(self):
+        first = self.fill(5, 1505, 30)
+        run_scan()
+        repeated = self.fill(5, 1500, 30)
+        run_scan()
+        self.assertEqual(self.anomalies(), [('duplicate', repeated.pk)])
+        self.assertEqual(FuelAnomaly.objects.get().related_transaction_id, first.pk)
+
+        run_scan(full=True)
+        self.assertEqual(self.anomalies(), [('duplicate', repeated.pk)])
 
-# Create your tests here.
@@ -2,7 +2,7 @@
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum, Q
+from django.db.models import Count, Sum, Q
 from django.contrib import messages
 from django.shortcuts import redirect
 
@@ -18,9 +18,10 @@ except ImportError:
     class VehicleManagerRequiredMixin(LoginRequiredMixin):
         pass
 
-from .models import FuelTransaction, FuelStation
+from .models import FuelTransaction, FuelStation, FuelEfficiency
 from vehicles.models import Vehicle
 from .forms import FuelTransactionForm, FuelStationForm
+from search.index import search
 
 class FuelTransactionListView(LoginRequiredMixin, ListView):
     model = FuelTransaction
@@ -29,17 +30,21 @@ class FuelTransactionListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = super().get_queryset().select_related('vehicle', 'driver', 'fuel_station')
+        queryset = super().get_queryset().select_related('vehicle__vehicle_type', 'driver', 'fuel_station')
         
         # Search functionality
         search_query = self.request.GET.get('search', None)
         if search_query:
-            queryset = queryset.filter(
-                Q(vehicle__license_plate__icontains=search_query) |
-                Q(driver__first_name__icontains=search_query) |
-                Q(driver__last_name__icontains=search_query) |
-                Q(fuel_station__name__icontains=search_query)
-            )
+            matched = search(queryset, search_query)
+            if matched is not None:
+                queryset = matched
+            else:
+                queryset = queryset.filter(
+                    Q(vehicle__license_plate__icontains=search_query) |
+                    Q(driver__first_name__icontains=search_query) |
+                    Q(driver__last_name__icontains=search_query) |
+                    Q(fuel_station__name__icontains=search_query)
+                )
             
         # Filter by vehicle
         vehicle_filter = self.request.GET.get('vehicle', None)
@@ -58,16 +63,8 @@ class FuelTransactionListView(LoginRequiredMixin, ListView):
             
         # Filter by transaction type (fuel vs electric)
         transaction_type_filter = self.request.GET.get('transaction_type', None)
-        if transaction_type_filter == 'fuel':
-            queryset = queryset.filter(
-                Q(vehicle__vehicle_type__category__in=['personal', 'commercial']) |
-                Q(fuel_type__isnull=False) & ~Q(fuel_type='Electric')
-            )
-        elif transaction_type_filter == 'electric':
-            queryset = queryset.filter(
-                Q(vehicle__vehicle_type__category='electric') |
-                Q(fuel_type='Electric')
-            )
+        if transaction_type_filter in ('fuel', 'electric'):
+            queryset = queryset.filter(energy_kind=transaction_type_filter)
             
         # Filter by fuel type
         fuel_type_filter = self.request.GET.get('fuel_type', None)
@@ -88,7 +85,7 @@ class FuelTransactionListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['vehicles'] = Vehicle.objects.all().order_by('license_plate')
+        context['vehicles'] = Vehicle.objects.select_related('vehicle_type').order_by('license_plate')
         context['fuel_types'] = FuelTransaction.objects.values_list('fuel_type', flat=True).distinct().order_by('fuel_type')
         context['fuel_stations'] = FuelStation.objects.all().order_by('name')  # Add this for filtering
         
@@ -143,23 +140,17 @@ class FuelTransactionDetailView(LoginRequiredMixin, DetailView):
         context['previous_transactions'] = previous_transactions
         context['next_transactions'] = next_transactions
         
-        # Calculate efficiency if possible
-        if previous_transactions.exists():
-            previous_transaction = previous_transactions.first()
-            distance = self.object.odometer_reading - previous_transaction.odometer_reading
-            if distance > 0:
-                if hasattr(self.object.vehicle, 'is_electric') and self.object.vehicle.is_electric() and self.object.energy_consumed:
-                    # km/kWh for electric vehicles
-                    context['efficiency'] = round(distance / float(self.object.energy_consumed), 2)
-                    context['efficiency_unit'] = 'km/kWh'
-                    context['efficiency_label'] = 'Energy Efficiency'
-                elif not (hasattr(self.object.vehicle, 'is_electric') and self.object.vehicle.is_electric()) and self.object.quantity:
-                    # km/L for fuel vehicles
-                    context['efficiency'] = round(distance / float(self.object.quantity), 2)
-                    context['efficiency_unit'] = 'km/L'
-                    context['efficiency_label'] = 'Fuel Efficiency'
-                
-                context['distance_since_last'] = distance
+        # Fill-to-fill efficiency, stored by fuel.efficiency
+        efficiency = FuelEfficiency.objects.filter(transaction=self.object).first()
+        if efficiency:
+            context['efficiency'] = efficiency.efficiency
+            if efficiency.energy_kind == 'electric':
+                context['efficiency_unit'] = 'km/kWh'
+                context['efficiency_label'] = 'Energy Efficiency'
+            else:
+                context['efficiency_unit'] = 'km/L'
+                context['efficiency_label'] = 'Fuel Efficiency'
+            context['distance_since_last'] = efficiency.distance_km
         
         return context
 
@@ -267,17 +258,8 @@ class FuelStationListView(LoginRequiredMixin, ListView):
                 Q(address__icontains=search_query)
             )
         
-        return queryset.order_by('name')
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Add transaction counts for each station
-        stations = context['stations']
-        for station in stations:
-            station.transaction_count = FuelTransaction.objects.filter(fuel_station=station).count()
-            
-        return context
+        # Transaction counts for each station, in the same query
+        return queryset.annotate(transaction_count=Count('fueltransaction')).order_by('name')
 
 class FuelStationCreateView(VehicleManagerRequiredMixin, CreateView):
     model = FuelStation
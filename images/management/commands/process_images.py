@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from images.pipeline import IMAGE_FIELDS, process_image
+import time
+
+
+class Command(BaseCommand):
+    help = 'Strip EXIF from uploaded images and write their thumbnail and web variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite variants that already exist'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        checked = processed = 0
+        for label, field in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            storage = model._meta.get_field(field).storage
+            names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+            for name in names.iterator():
+                checked += 1
+                if process_image(storage, name, force=options['force']):
+                    processed += 1
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {checked} images checked so far")
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} of {checked} images in {elapsed:.1f}s ({checked / elapsed:.0f} images/s)"
+        ))
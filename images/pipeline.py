@@ -0,0 +1,194 @@
+"""
+Uploaded photo processing: receipts, invoices, accident photos, vehicle
+images and profile pictures.
+
+After an upload is committed, a background thread strips the original's
+EXIF data (GPS position, camera details) and writes resized JPEG variants
+next to it, e.g. fuel_receipts/abc.jpg gets fuel_receipts/abc.thumb.jpg
+and fuel_receipts/abc.web.jpg. Pages and API responses link the variants
+through variant_url(), which falls back to the original until they exist.
+Whether they exist is recorded in the cache when they are written (or the
+first time storage is asked), so rendering an image doesn't touch storage.
+
+The process_images command processes images uploaded before this existed,
+or missed because a worker stopped before getting to them.
+"""
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# (app_label.Model, image field) of every uploaded photo
+IMAGE_FIELDS = [
+    ('fuel.FuelTransaction', 'receipt_image'),
+    ('maintenance.Maintenance', 'invoice_image'),
+    ('accidents.AccidentImage', 'image'),
+    ('vehicles.Vehicle', 'image'),
+    ('accounts.CustomUser', 'profile_picture'),
+]
+
+
+def variant_sizes():
+    """{variant: (width, height, crop)}; cropped variants are exactly that size, others fit inside it."""
+    thumbnail = getattr(settings, 'IMAGE_THUMBNAIL_SIZE', 240)
+    web = getattr(settings, 'IMAGE_WEB_SIZE', 1280)
+    return {'thumb': (thumbnail, thumbnail, True), 'web': (web, web, False)}
+
+
+def variant_name(name, variant):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.jpg'
+
+
+def _processed_key(name):
+    return f'image_variants_{name}'
+
+
+def has_variants(storage, name):
+    """Whether the variants of `name` were made, asking storage only if the cache doesn't know."""
+    key = _processed_key(name)
+    processed = cache.get(key)
+    if processed is None:
+        processed = is_processed(storage, name)
+        # Variants stay once made; until then look again every so often
+        timeout = None if processed else getattr(settings, 'IMAGE_UNPROCESSED_RECHECK_SECONDS', 60)
+        cache.set(key, processed, timeout)
+    return processed
+
+
+def variant_url(field_file, variant):
+    """URL of a variant of `field_file`, or of the original while the variant hasn't been made."""
+    if not field_file:
+        return ''
+    # Protected files are served by a view that falls back to the original itself
+    from uploads.serving import protected_url
+    url = protected_url(field_file, variant)
+    if url:
+        return url
+    if has_variants(field_file.storage, field_file.name):
+        return field_file.storage.url(variant_name(field_file.name, variant))
+    return field_file.url
+
+
+def is_processed(storage, name):
+    # The variants are written last, so if they're there the original was already cleaned
+    return all(storage.exists(variant_name(name, variant)) for variant in variant_sizes())
+
+
+def encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format=image_format, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def replace(storage, name, content):
+    """Write `content` to `name`, only giving up the old file once the new bytes are stored."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        # Local files: write next to the target and rename over it, atomically
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            if storage.file_permissions_mode is not None:
+                os.chmod(temporary, storage.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return
+
+    # Remote storages can't rename; keep a copy of the new bytes until the swap is done
+    root, extension = os.path.splitext(name)
+    temporary = storage.save(f'{root}.tmp{extension}', content)
+    if storage.exists(name):
+        storage.delete(name)
+    with storage.open(temporary, 'rb') as file:
+        saved = storage.save(name, file)
+    storage.delete(temporary)
+    if saved != name:
+        logger.warning("Image %s was saved as %s", name, saved)
+
+
+def process_image(storage, name, force=False):
+    """Strip the metadata of image `name` and (re)write its variants. Returns False if there was nothing to do."""
+    if not force and is_processed(storage, name):
+        return False
+    try:
+        with storage.open(name, 'rb') as file:
+            image = Image.open(file)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as error:
+        logger.warning("Cannot process image %s: %s", name, error)
+        return False
+
+    image_format = image.format
+    quality = getattr(settings, 'IMAGE_JPEG_QUALITY', 85)
+    has_metadata = bool(image.getexif()) or any(key in image.info for key in ('exif', 'xmp', 'comment'))
+    # Phones store sideways pixels and an EXIF rotation; apply it before the EXIF goes
+    image = ImageOps.exif_transpose(image)
+    if has_metadata and image_format in ('JPEG', 'PNG', 'WEBP'):
+        # Re-encoded only when there is metadata to drop, so re-runs don't lose quality each time
+        original = image.convert('RGB') if image_format == 'JPEG' else image
+        replace(storage, name, encode(original, image_format, max(quality, 90)))
+
+    rgb = image.convert('RGB')
+    for variant, (width, height, crop) in variant_sizes().items():
+        if crop:
+            resized = ImageOps.fit(rgb, (width, height), Image.Resampling.LANCZOS)
+        else:
+            resized = rgb.copy()
+            resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+        replace(storage, variant_name(name, variant), encode(resized, 'JPEG', quality))
+    cache.set(_processed_key(name), True, None)
+    return True
+
+
+_executor = None
+
+
+def _run(storage, name):
+    try:
+        process_image(storage, name)
+    except Exception:
+        logger.exception("Processing image %s failed", name)
+
+
+def schedule(field_file):
+    """Process `field_file` once the current transaction commits, off the request thread."""
+    if not field_file:
+        return
+    storage, name = field_file.storage, field_file.name
+
+    def submit():
+        global _executor
+        workers = getattr(settings, 'IMAGE_PIPELINE_WORKERS', 2)
+        if workers <= 0:
+            _run(storage, name)
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+        _executor.submit(_run, storage, name)
+
+    transaction.on_commit(submit)
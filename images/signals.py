@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.db.models.signals import post_save
+
+from .pipeline import IMAGE_FIELDS, schedule
+
+
+def process_uploaded_image(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Queue the saved row's image; ones already processed are skipped by the worker"""
+    if raw:
+        return
+    field = image_fields[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    schedule(getattr(instance, field))
+
+
+image_fields = {}
+for label, field in IMAGE_FIELDS:
+    model = apps.get_model(label)
+    image_fields[model] = field
+    post_save.connect(process_uploaded_image, sender=model, dispatch_uid=f'images_{model._meta.label_lower}')
@@ -0,0 +1,11 @@
+from django import template
+
+from images.pipeline import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def variant(field_file, name):
+    """URL of a resized variant ('thumb' or 'web') of an uploaded image: {{ vehicle.image|variant:'thumb' }}"""
+    return variant_url(field_file, name)
@@ -0,0 +1,117 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from api.serializers import VehicleSerializer
+from vehicles.models import Vehicle, VehicleType
+from .pipeline import process_image, variant_name, variant_sizes
+
+
+def photo(width=3000, height=2000, orientation=None):
+    """A JPEG like a phone camera's, with EXIF camera details and optionally a rotation."""
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, format='JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImagePipelineTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_PIPELINE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # What's known about variants outlives the media roots of other tests
+        cache.clear()
+
+    def create_vehicle(self, image):
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        return Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), image=image,
+        )
+
+    def open(self, field_file, variant=None):
+        name = variant_name(field_file.name, variant) if variant else field_file.name
+        with field_file.storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+        return image
+
+    def test_upload_is_processed_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            vehicle = self.create_vehicle(photo(orientation=6))
+        # Until the variants exist, pages link the original
+        self.assertEqual(Template("{% load image_variants %}{{ image|variant:'thumb' }}").render(
+            Context({'image': vehicle.image})
+        ), vehicle.image.url)
+
+        for callback in callbacks:
+            callback()
+
+        original = self.open(vehicle.image)
+        self.assertEqual(len(original.getexif()), 0)
+        # The EXIF rotation was applied to the pixels before it was stripped
+        self.assertEqual(original.size, (2000, 3000))
+        self.assertEqual(self.open(vehicle.image, 'thumb').size, (240, 240))
+        self.assertEqual(self.open(vehicle.image, 'web').size, (853, 1280))
+
+        variants = VehicleSerializer(vehicle).data['image_variants']
+        self.assertEqual(variants['original'], vehicle.image.url)
+        self.assertTrue(variants['thumb'].endswith('.thumb.jpg'))
+        self.assertTrue(variants['web'].endswith('.web.jpg'))
+
+    def test_rendering_does_not_ask_storage_for_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle = self.create_vehicle(photo(width=800, height=600))
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError):
+            self.assertTrue(VehicleSerializer(vehicle).data['image_variants']['thumb'].endswith('.thumb.jpg'))
+
+        # Processed elsewhere (another worker, process_images): storage is asked once
+        cache.clear()
+        with mock.patch.object(FileSystemStorage, 'exists', return_value=True) as exists:
+            for _ in range(3):
+                VehicleSerializer(vehicle).data
+        self.assertEqual(exists.call_count, len(variant_sizes()))
+
+    def test_processed_images_are_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle = self.create_vehicle(photo(width=800, height=600))
+        self.assertFalse(process_image(vehicle.image.storage, vehicle.image.name))
+        self.assertTrue(process_image(vehicle.image.storage, vehicle.image.name, force=True))
+        self.assertEqual(self.open(vehicle.image, 'web').size, (800, 600))
+
+    def test_unreadable_file_is_left_alone(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle = self.create_vehicle(SimpleUploadedFile('photo.jpg', b'not an image'))
+        self.assertFalse(vehicle.image.storage.exists(variant_name(vehicle.image.name, 'thumb')))
+
+    def test_failed_write_keeps_the_original(self):
+        with self.captureOnCommitCallbacks():
+            vehicle = self.create_vehicle(photo(width=800, height=600))
+        with vehicle.image.open('rb') as file:
+            uploaded = file.read()
+
+        with mock.patch('images.pipeline.os.fsync', side_effect=OSError('No space left on device')):
+            with self.assertRaises(OSError):
+                process_image(vehicle.image.storage, vehicle.image.name)
+        with vehicle.image.open('rb') as file:
+            self.assertEqual(file.read(), uploaded)
+        _, _, files = next(os.walk(os.path.dirname(vehicle.image.path)))
+        self.assertEqual(files, [os.path.basename(vehicle.image.name)])
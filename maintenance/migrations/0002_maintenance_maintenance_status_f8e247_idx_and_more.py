@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0001_initial'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['status', 'scheduled_date'], name='maintenance_status_f8e247_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['scheduled_date'], name='maintenance_schedul_df169e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['date_reported'], name='maintenance_date_re_914469_idx'),
+        ),
+    ]
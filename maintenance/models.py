@@ -43,5 +43,15 @@ class Maintenance(models.Model):
     invoice_image = models.ImageField(upload_to='maintenance_invoices/', null=True, blank=True)
     notes = models.TextField(blank=True)
     
+    class Meta:
+        indexes = [
+            # Upcoming maintenance on the dashboard and send_maintenance_reminders
+            models.Index(fields=['status', 'scheduled_date']),
+            # Maintenance schedule by week (no status filter)
+            models.Index(fields=['scheduled_date']),
+            # Maintenance report date range and list ordering
+            models.Index(fields=['date_reported']),
+        ]
+    
     def __str__(self):
         return f"{self.maintenance_type.name} for {self.vehicle} on {self.date_reported}"
\ No newline at end of file
@@ -7,6 +7,7 @@ from accounts.permissions import AdminRequiredMixin, ManagerRequiredMixin, Vehic
 from .models import Maintenance, MaintenanceType, MaintenanceProvider
 from .forms import MaintenanceForm, MaintenanceTypeForm, MaintenanceProviderForm
 from vehicles.models import Vehicle
+from search.index import search
 
 class MaintenanceListView(LoginRequiredMixin, ListView):
     model = Maintenance
@@ -20,13 +21,17 @@ class MaintenanceListView(LoginRequiredMixin, ListView):
         # Search functionality
         search_query = self.request.GET.get('search', None)
         if search_query:
-            queryset = queryset.filter(
-                vehicle__license_plate__icontains=search_query
-            ) | queryset.filter(
-                maintenance_type__name__icontains=search_query
-            ) | queryset.filter(
-                provider__name__icontains=search_query
-            )
+            matched = search(queryset, search_query)
+            if matched is not None:
+                queryset = matched
+            else:
+                queryset = queryset.filter(
+                    vehicle__license_plate__icontains=search_query
+                ) | queryset.filter(
+                    maintenance_type__name__icontains=search_query
+                ) | queryset.filter(
+                    provider__name__icontains=search_query
+                )
             
         # Filter by status
         status_filter = self.request.GET.get('status', None)
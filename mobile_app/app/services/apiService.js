@@ -120,6 +120,11 @@ class ApiService {
     await this.removeToken();
   }
 
+  // Home screen data in a single round trip
+  async getBootstrap() {
+    return this.apiCall(API_CONFIG.ENDPOINTS.BOOTSTRAP);
+  }
+
   // User methods
   async getUserInfo() {
     return this.apiCall(API_CONFIG.ENDPOINTS.USER_ME);
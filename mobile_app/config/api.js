@@ -20,6 +20,9 @@ export const API_CONFIG = {
     USERS: '/users/',
     USER_ME: '/users/me/',
     
+    // Home screen data in one call (profile, vehicles, active trip, fuel, stations)
+    BOOTSTRAP: '/bootstrap/',
+    
     // Vehicle Management
     VEHICLES: '/vehicles/',
     VEHICLE_TYPES: '/vehicle-types/',
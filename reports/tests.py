@@ -1,3 +1,38 @@
+import datetime
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from trips.models import Trip
+from vehicles.models import Vehicle, VehicleType
+
+
+class DriverReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_user('manager', 'manager@example.com', 'pw', user_type='manager')
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', user_type='driver', approval_status='approved',
+        )
+        vehicle = Vehicle.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Car', category='car'), make='Maruti', model='Swift',
+            year=2021, license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+        )
+        start = timezone.now() - datetime.timedelta(days=1)
+        for odometer, end_odometer, hours, status in [(1000, 1080, 2, 'completed'), (1080, 1080, 3, 'cancelled')]:
+            Trip.objects.create(
+                vehicle=vehicle, driver=cls.driver, start_time=start, end_time=start + datetime.timedelta(hours=hours),
+                start_odometer=odometer, end_odometer=end_odometer, status=status,
+                origin='Depot', destination='Site', purpose='Delivery',
+            )
 
-# Create your tests here.
+    def test_average_speed_leaves_out_trips_that_never_moved(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('driver_report'))
+        row, = response.context['driver_report']
+        self.assertEqual((row['trip_count'], row['total_distance'], row['total_hours']), (2, 80, 5.0))
+        self.assertEqual(row['avg_speed'], 40.0)
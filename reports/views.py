@@ -2,7 +2,7 @@
 from django.views import View
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum, Count, Avg, F, ExpressionWrapper, FloatField, Q
+from django.db.models import Sum, Count, Avg, ExpressionWrapper, FloatField, Q
 from django.db.models.functions import TruncMonth, TruncYear, Coalesce
 from django.utils import timezone
 from django.http import HttpResponse, JsonResponse
@@ -10,7 +10,8 @@ from accounts.permissions import AdminRequiredMixin, ManagerRequiredMixin
 from vehicles.models import Vehicle, VehicleType
 from trips.models import Trip
 from maintenance.models import Maintenance
-from fuel.models import FuelTransaction
+from fuel.models import FuelTransaction, FuelEfficiency
+from fuel.efficiency import period_efficiency
 from accidents.models import Accident
 from accounts.models import CustomUser
 import csv
@@ -119,7 +120,7 @@ class VehicleReportView(ReportBaseView):
         # Filter by vehicle type
         vehicle_type = self.request.GET.get('vehicle_type')
         
-        vehicles = Vehicle.objects.all()
+        vehicles = Vehicle.objects.select_related('vehicle_type')
         if vehicle_type:
             vehicles = vehicles.filter(vehicle_type_id=vehicle_type)
         
@@ -128,47 +129,20 @@ class VehicleReportView(ReportBaseView):
             start_time__gte=start_datetime,
             start_time__lte=end_datetime,
             start_odometer__isnull=False,
-        ).select_related('vehicle')
+        )
         
-        # Calculate trip data for each vehicle
-        vehicle_trip_data = {}
-        for trip in all_trips:
-            vehicle_id = trip.vehicle.id
-            
-            if vehicle_id not in vehicle_trip_data:
-                vehicle_trip_data[vehicle_id] = {
-                    'trip_count': 0,
-                    'completed_trip_count': 0,
-                    'ongoing_trip_count': 0,
-                    'total_distance': 0,
-                    'distances': []
-                }
-            
-            # Count all trips
-            vehicle_trip_data[vehicle_id]['trip_count'] += 1
-            
-            # Count by status
-            if trip.status == 'completed':
-                vehicle_trip_data[vehicle_id]['completed_trip_count'] += 1
-            elif trip.status == 'ongoing':
-                vehicle_trip_data[vehicle_id]['ongoing_trip_count'] += 1
-            
-            # Calculate distance - Fixed logic for distance calculation
-            if trip.start_odometer is not None:
-                try:
-                    start_odo = float(trip.start_odometer)
-                    
-                    # For completed trips with end odometer
-                    if trip.end_odometer is not None and trip.status == 'completed':
-                        end_odo = float(trip.end_odometer)
-                        distance = end_odo - start_odo
-                        
-                        if distance >= 0:  # Allow zero distance trips
-                            vehicle_trip_data[vehicle_id]['total_distance'] += distance
-                            vehicle_trip_data[vehicle_id]['distances'].append(distance)
-                    
-                except (ValueError, TypeError) as e:
-                    pass
+        # Trip counts and distances per vehicle, aggregated in the database
+        completed = Q(status='completed', distance_km__isnull=False)
+        vehicle_trip_data = {
+            row['vehicle']: row
+            for row in all_trips.order_by().values('vehicle').annotate(
+                trip_count=Count('id'),
+                completed_trip_count=Count('id', filter=Q(status='completed')),
+                ongoing_trip_count=Count('id', filter=Q(status='ongoing')),
+                total_distance=Coalesce(Sum('distance_km', filter=completed), 0),
+                avg_distance=Avg('distance_km', filter=completed),
+            )
+        }
         
         # Get fuel data with timezone-aware filtering
         fuel_transactions = FuelTransaction.objects.filter(
@@ -192,6 +166,9 @@ class VehicleReportView(ReportBaseView):
             fuel_data_dict[vehicle_id]['total_energy'] += float(transaction.energy_consumed or 0)
             fuel_data_dict[vehicle_id]['total_fuel_cost'] += float(transaction.total_cost or 0)
         
+        # Fill-to-fill efficiency over the period, from the stored series
+        period = period_efficiency(FuelEfficiency.objects.filter(date__gte=start_date_obj, date__lte=end_date_obj))
+        
         # Get maintenance data with timezone-aware filtering
         maintenance_records = Maintenance.objects.filter(
             date_reported__gte=start_date_obj,
@@ -234,7 +211,7 @@ class VehicleReportView(ReportBaseView):
                 'completed_trip_count': 0,
                 'ongoing_trip_count': 0,
                 'total_distance': 0,
-                'distances': []
+                'avg_distance': 0
             })
             
             fuel_info = fuel_data_dict.get(vehicle_id, {
@@ -253,22 +230,13 @@ class VehicleReportView(ReportBaseView):
                 'accident_count': 0
             })
             
-            # Calculate averages
-            distances = trip_info.get('distances', [])
-            avg_distance = sum(distances) / len(distances) if distances else 0
+            avg_distance = float(trip_info.get('avg_distance') or 0)
             
-            # Calculate fuel efficiency
-            fuel_efficiency = 0
-            energy_efficiency = 0
             total_distance = trip_info.get('total_distance', 0)
             total_fuel = fuel_info.get('total_fuel', 0)
             total_energy = fuel_info.get('total_energy', 0)
-            
-            if total_distance > 0:
-                if total_fuel > 0:
-                    fuel_efficiency = total_distance / total_fuel
-                if total_energy > 0:
-                    energy_efficiency = total_distance / total_energy
+            fuel_efficiency = period.get((vehicle_id, 'fuel'), (0, 0, 0))[2]
+            energy_efficiency = period.get((vehicle_id, 'electric'), (0, 0, 0))[2]
             
             # Calculate cost per kilometer
             cost_per_km = 0
@@ -324,7 +292,7 @@ class VehicleReportView(ReportBaseView):
         
         # Add debug info to context
         context['debug_info'] = {
-            'total_trips_found': all_trips.count(),
+            'total_trips_found': sum(row['trip_count'] for row in vehicle_trip_data.values()),
             'vehicles_with_trips': len([v for v in vehicle_report if v['trip_count'] > 0]),
             'date_range': f"{start_date} to {end_date}",
             'timezone': str(timezone.get_current_timezone()),
@@ -380,61 +348,23 @@ class DriverReportView(ReportBaseView):
         
         drivers = CustomUser.objects.filter(user_type='driver')
         
-        # Get completed trips with drivers
-        completed_trips = Trip.objects.filter(
-            start_time__date__gte=start_date_obj,
-            start_time__date__lte=end_date_obj,
-            driver__isnull=False,
-            end_time__isnull=False
-        ).select_related('driver')
-        
-        # If no completed trips found, try with different status values
-        if completed_trips.count() == 0:
-            completed_trips = Trip.objects.filter(
+        # Trips that have ended, aggregated per driver in the database
+        moved = Q(distance_km__gt=0)
+        trip_lookup = {
+            row['driver']: row
+            for row in Trip.objects.filter(
                 start_time__date__gte=start_date_obj,
                 start_time__date__lte=end_date_obj,
                 driver__isnull=False,
                 end_time__isnull=False
-            ).select_related('driver')
-        
-        # Calculate trip data manually
-        driver_trip_data = {}
-        
-        for trip in completed_trips:
-            driver_id = trip.driver.id
-            
-            if driver_id not in driver_trip_data:
-                driver_trip_data[driver_id] = {
-                    'trip_count': 0,
-                    'total_distance': 0,
-                    'distances': []
-                }
-            
-            driver_trip_data[driver_id]['trip_count'] += 1
-            
-            if trip.start_odometer is not None and trip.end_odometer is not None:
-                try:
-                    start_odo = float(trip.start_odometer)
-                    end_odo = float(trip.end_odometer)
-                    distance = end_odo - start_odo
-                    
-                    if distance > 0:
-                        driver_trip_data[driver_id]['total_distance'] += distance
-                        driver_trip_data[driver_id]['distances'].append(distance)
-                except (ValueError, TypeError):
-                    pass
-        
-        # Calculate averages and create trip lookup
-        trip_lookup = {}
-        for driver_id, data in driver_trip_data.items():
-            distances = data['distances']
-            avg_distance = sum(distances) / len(distances) if distances else 0
-            
-            trip_lookup[driver_id] = {
-                'trip_count': data['trip_count'],
-                'total_distance': data['total_distance'],
-                'avg_distance': avg_distance
-            }
+            ).order_by().values('driver').annotate(
+                trip_count=Count('id'),
+                total_distance=Coalesce(Sum('distance_km', filter=moved), 0),
+                avg_distance=Avg('distance_km', filter=moved),
+                total_seconds=Coalesce(Sum('duration_seconds'), 0),
+                moving_seconds=Coalesce(Sum('duration_seconds', filter=moved), 0),
+            )
+        }
         
         # Get fuel data
         fuel_transactions = FuelTransaction.objects.filter(
@@ -484,7 +414,9 @@ class DriverReportView(ReportBaseView):
             trip_info = trip_lookup.get(driver_id, {
                 'trip_count': 0,
                 'total_distance': 0,
-                'avg_distance': 0
+                'avg_distance': 0,
+                'total_seconds': 0,
+                'moving_seconds': 0
             })
             
             fuel_info = fuel_lookup.get(driver_id, {
@@ -499,7 +431,11 @@ class DriverReportView(ReportBaseView):
             
             trip_count = trip_info.get('trip_count') or 0
             total_distance = trip_info.get('total_distance') or 0
-            avg_distance = trip_info.get('avg_distance') or 0
+            avg_distance = float(trip_info.get('avg_distance') or 0)
+            total_hours = trip_info.get('total_seconds', 0) / 3600
+            # Over the same trips as total_distance, so trips that never moved don't dilute it
+            moving_hours = trip_info.get('moving_seconds', 0) / 3600
+            avg_speed = total_distance / moving_hours if moving_hours > 0 else 0
             
             accident_count = accident_info.get('accident_count') or 0
             accidents_per_1000km = (accident_count * 1000 / total_distance) if total_distance > 0 else 0
@@ -513,8 +449,8 @@ class DriverReportView(ReportBaseView):
                 'trip_count': trip_count,
                 'total_distance': round(total_distance, 1) if total_distance else 0,
                 'avg_distance': round(avg_distance, 1) if avg_distance else 0,
-                'total_hours': 0,
-                'avg_speed': 0,
+                'total_hours': round(total_hours, 1),
+                'avg_speed': round(avg_speed, 1),
                 'fuel_count': fuel_info.get('fuel_count') or 0,
                 'total_fuel': fuel_info.get('total_fuel') or 0,
                 'total_fuel_cost': fuel_info.get('total_fuel_cost') or 0,
@@ -528,6 +464,7 @@ class DriverReportView(ReportBaseView):
         total_trips = sum(driver.get('trip_count', 0) for driver in driver_report)
         total_distance = sum(driver.get('total_distance', 0) for driver in driver_report)
         total_accidents = sum(driver.get('accident_count', 0) for driver in driver_report)
+        total_hours = sum(driver.get('total_hours', 0) for driver in driver_report)
         
         context.update({
             'driver_report': driver_report,
@@ -536,7 +473,7 @@ class DriverReportView(ReportBaseView):
             'total_trips': total_trips,
             'total_distance': round(total_distance, 1),
             'total_accidents': total_accidents,
-            'total_hours': 0,
+            'total_hours': round(total_hours, 1),
             'now': timezone.now()
         })
         
@@ -800,36 +737,40 @@ class FuelReportView(ReportBaseView):
         if fuel_type:
             fuel_transactions = fuel_transactions.filter(fuel_type=fuel_type)
         
-        # Separate fuel and electric transactions
-        fuel_only_transactions = fuel_transactions.exclude(fuel_type='Electric')
-        electric_transactions = fuel_transactions.filter(fuel_type='Electric')
+        # Fuel and electric totals in one pass
+        is_fuel, is_electric = Q(energy_kind='fuel'), Q(energy_kind='electric')
+        totals = fuel_transactions.aggregate(
+            fuel_count=Count('id', filter=is_fuel),
+            fuel_quantity=Sum('quantity', filter=is_fuel),
+            fuel_cost=Sum('total_cost', filter=is_fuel),
+            avg_cost_per_liter=Avg('cost_per_liter', filter=is_fuel),
+            electric_count=Count('id', filter=is_electric),
+            electric_energy=Sum('energy_consumed', filter=is_electric),
+            electric_cost=Sum('total_cost', filter=is_electric),
+            avg_cost_per_kwh=Avg('cost_per_kwh', filter=is_electric),
+            avg_charging_duration=Avg('charging_duration_minutes', filter=is_electric),
+        )
         
         # Summary data for fuel transactions
         fuel_summary = {
-            'total_count': fuel_only_transactions.count(),
-            'total_quantity': fuel_only_transactions.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-            'total_cost': fuel_only_transactions.aggregate(Sum('total_cost'))['total_cost__sum'] or 0,
-            'avg_cost_per_liter': fuel_only_transactions.aggregate(
-                avg=Avg('cost_per_liter')
-            )['avg'] or 0,
+            'total_count': totals['fuel_count'],
+            'total_quantity': totals['fuel_quantity'] or 0,
+            'total_cost': totals['fuel_cost'] or 0,
+            'avg_cost_per_liter': totals['avg_cost_per_liter'] or 0,
         }
         
         # Summary data for electric transactions
         electric_summary = {
-            'total_count': electric_transactions.count(),
-            'total_energy': electric_transactions.aggregate(Sum('energy_consumed'))['energy_consumed__sum'] or 0,
-            'total_cost': electric_transactions.aggregate(Sum('total_cost'))['total_cost__sum'] or 0,
-            'avg_cost_per_kwh': electric_transactions.aggregate(
-                avg=Avg('cost_per_kwh')
-            )['avg'] or 0,
-            'avg_charging_duration': electric_transactions.aggregate(
-                avg=Avg('charging_duration_minutes')
-            )['avg'] or 0,
+            'total_count': totals['electric_count'],
+            'total_energy': totals['electric_energy'] or 0,
+            'total_cost': totals['electric_cost'] or 0,
+            'avg_cost_per_kwh': totals['avg_cost_per_kwh'] or 0,
+            'avg_charging_duration': totals['avg_charging_duration'] or 0,
         }
         
         # Combined summary
         summary = {
-            'total_count': fuel_transactions.count(),
+            'total_count': fuel_summary['total_count'] + electric_summary['total_count'],
             'total_quantity': fuel_summary['total_quantity'],
             'total_energy': electric_summary['total_energy'],
             'total_cost': fuel_summary['total_cost'] + electric_summary['total_cost'],
@@ -870,8 +811,8 @@ class FuelReportView(ReportBaseView):
                 total_quantity=Sum('quantity'),
                 total_energy=Sum('energy_consumed'),
                 total_cost=Sum('total_cost'),
-                fuel_transactions=Count('id', filter=Q(fuel_type__isnull=False) & ~Q(fuel_type='Electric')),
-                electric_transactions=Count('id', filter=Q(fuel_type='Electric'))
+                fuel_transactions=Count('id', filter=is_fuel),
+                electric_transactions=Count('id', filter=is_electric)
             ).order_by('-total_cost')
         }
         
@@ -885,52 +826,37 @@ class FuelReportView(ReportBaseView):
             total_cost=Sum('total_cost'),
             avg_cost_per_liter=Avg('cost_per_liter'),
             avg_cost_per_kwh=Avg('cost_per_kwh'),
-            fuel_count=Count('id', filter=~Q(fuel_type='Electric')),
-            electric_count=Count('id', filter=Q(fuel_type='Electric'))
+            fuel_count=Count('id', filter=is_fuel),
+            electric_count=Count('id', filter=is_electric)
         ).order_by('month')
         
-        # Calculate efficiency for each vehicle
-        trips_in_period = Trip.objects.filter(
-            start_time__date__gte=start_date_obj,
-            end_time__date__lte=end_date_obj,
-            status='completed'
-        ).values('vehicle').annotate(
-            total_distance=Sum(F('end_odometer') - F('start_odometer'))
-        )
-        
-        # Create a lookup for trip distances
-        trip_distances = {item['vehicle']: item['total_distance'] for item in trips_in_period}
+        # Fill-to-fill efficiency over the period, from the stored series
+        efficiency_series = FuelEfficiency.objects.filter(date__gte=start_date_obj, date__lte=end_date_obj)
+        if vehicle_id:
+            efficiency_series = efficiency_series.filter(vehicle_id=vehicle_id)
+        if fuel_type:
+            efficiency_series = efficiency_series.filter(transaction__fuel_type=fuel_type)
+        period = period_efficiency(efficiency_series)
         
         # Calculate efficiency for each vehicle
         vehicle_efficiency = []
         for vehicle in summary['vehicle_breakdown']:
             vehicle_id = vehicle['vehicle__id']
-            distance = trip_distances.get(vehicle_id, 0)
-            fuel_quantity = vehicle['total_quantity'] or 0
-            energy_consumed = vehicle['total_energy'] or 0
+            fuel_distance, _, fuel_efficiency = period.get((vehicle_id, 'fuel'), (0, 0, 0))
+            electric_distance, _, energy_efficiency = period.get((vehicle_id, 'electric'), (0, 0, 0))
             
             vehicle_data = {
                 'vehicle': f"{vehicle['vehicle__license_plate']} ({vehicle['vehicle__make']} {vehicle['vehicle__model']})",
-                'distance': distance,
-                'fuel': fuel_quantity,
-                'energy': energy_consumed,
+                'distance': fuel_distance + electric_distance,
+                'fuel': vehicle['total_quantity'] or 0,
+                'energy': vehicle['total_energy'] or 0,
                 'fuel_transactions': vehicle['fuel_transactions'],
                 'electric_transactions': vehicle['electric_transactions'],
-                'total_cost': vehicle['total_cost']
+                'total_cost': vehicle['total_cost'],
+                'fuel_efficiency': fuel_efficiency,
+                'energy_efficiency': energy_efficiency,
             }
             
-            # Calculate fuel efficiency if applicable
-            if fuel_quantity > 0 and distance > 0:
-                vehicle_data['fuel_efficiency'] = round(distance / fuel_quantity, 2)
-            else:
-                vehicle_data['fuel_efficiency'] = 0
-            
-            # Calculate energy efficiency if applicable
-            if energy_consumed > 0 and distance > 0:
-                vehicle_data['energy_efficiency'] = round(distance / energy_consumed, 2)
-            else:
-                vehicle_data['energy_efficiency'] = 0
-            
             # Determine vehicle type based on transactions
             if vehicle['electric_transactions'] > 0 and vehicle['fuel_transactions'] > 0:
                 vehicle_data['vehicle_type'] = 'Hybrid'
@@ -958,7 +884,7 @@ class FuelReportView(ReportBaseView):
                 'charging_duration_minutes': transaction.charging_duration_minutes,
                 'total_cost': transaction.total_cost,
                 'odometer_reading': transaction.odometer_reading,
-                'is_electric': transaction.fuel_type == 'Electric'
+                'is_electric': transaction.is_electric_transaction()
             })
         
         # Station type analysis
@@ -966,8 +892,8 @@ class FuelReportView(ReportBaseView):
         if fuel_transactions.exists():
             stations_with_data = fuel_transactions.values('fuel_station__station_type', 'fuel_station__name').annotate(
                 transaction_count=Count('id'),
-                fuel_transactions=Count('id', filter=~Q(fuel_type='Electric')),
-                electric_transactions=Count('id', filter=Q(fuel_type='Electric')),
+                fuel_transactions=Count('id', filter=is_fuel),
+                electric_transactions=Count('id', filter=is_electric),
                 total_revenue=Sum('total_cost')
             )
             
@@ -0,0 +1,273 @@
+"""
+Full-text search over trips, vehicles, fuel transactions, maintenance and
+documents.
+
+Each indexed model has a SearchIndex describing the text that goes into its
+search document and which related rows (vehicle, driver, station...) that
+text depends on. search.signals keeps the documents current; the
+rebuild_search_index command (re)builds them in bulk.
+
+search() and ranked_ids() match every word of a query as a word prefix, so
+"kl07 raj" finds plate KL-07-1234 driven by Rajesh. Both match inside the
+caller's queryset, so permission and filter scoping never cut matches short.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from documents.models import Document, DocumentType
+from fuel.models import FuelStation, FuelTransaction
+from maintenance.models import Maintenance, MaintenanceProvider, MaintenanceType
+from trips.models import Trip
+from vehicles.models import Vehicle
+from .models import (
+    DocumentSearchDocument,
+    FuelTransactionSearchDocument,
+    MaintenanceSearchDocument,
+    TripSearchDocument,
+    VehicleSearchDocument,
+)
+
+User = get_user_model()
+
+NON_WORD = re.compile(r'\W+')
+
+
+def build_body(values):
+    """
+    Join the searchable values into one document. Words with punctuation are
+    also stored without it, so "KL07" finds "KL-07-AB-1234" by prefix.
+    """
+    text = ' '.join(str(value) for value in values if value)
+    compact = {NON_WORD.sub('', word) for word in text.split() if NON_WORD.search(word)}
+    compact.discard('')
+    return ' '.join([text, *sorted(compact)])
+
+
+def query_terms(query):
+    """Words of `query` that the full-text index can match, punctuation removed."""
+    # MySQL's FULLTEXT index leaves out words shorter than innodb_ft_min_token_size
+    min_length = getattr(settings, 'SEARCH_MIN_WORD_LENGTH', 3) if connection.vendor == 'mysql' else 1
+    terms = [NON_WORD.sub('', word) for word in query.split()]
+    return [term for term in terms if len(term) >= min_length]
+
+
+class SearchIndex:
+    """How the rows of one model become search documents."""
+    model = None
+    document_model = None
+    select_related = ()
+    # Fields of `model` that appear in the document; saves touching none of them skip re-indexing
+    fields = set()
+    # (related model, lookup from `model` to it, fields of the related model that appear in the document)
+    dependencies = ()
+
+    def get_values(self, obj):
+        raise NotImplementedError
+
+    def update(self, objects):
+        """Create or refresh the documents of `objects`."""
+        documents = [
+            self.document_model(object_id=obj.pk, body=build_body(self.get_values(obj)))
+            for obj in objects
+        ]
+        if documents:
+            # MySQL upserts on any unique key and rejects an explicit conflict target
+            unique_fields = ['object'] if connection.features.supports_update_conflicts_with_target else None
+            self.document_model.objects.bulk_create(
+                documents, update_conflicts=True, unique_fields=unique_fields, update_fields=['body']
+            )
+        return len(documents)
+
+    def update_queryset(self, queryset, batch_size=1000):
+        """Re-index every row of `queryset`, `batch_size` rows at a time. Yields the running total."""
+        queryset = queryset.select_related(*self.select_related).order_by('pk')
+        last_pk = None
+        updated = 0
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return
+            last_pk = batch[-1].pk
+            updated += self.update(batch)
+            yield updated
+
+    def _match(self, terms, within=None):
+        """
+        (SQL, params) selecting the ids of the documents matching every term,
+        and the ORDER BY clause ranking them (None if the database can't rank).
+        `within` limits them to the rows of that queryset, inside the query.
+        """
+        table = connection.ops.quote_name(self.document_model._meta.db_table)
+        if connection.vendor == 'mysql':
+            expression = ' '.join(f'+{term}*' for term in terms)
+            id_column, params = 'object_id', [expression]
+            sql = f'SELECT object_id FROM {table} WHERE MATCH(body) AGAINST (%s IN BOOLEAN MODE)'
+            order_by, order_params = 'MATCH(body) AGAINST (%s IN BOOLEAN MODE) DESC', [expression]
+        elif connection.vendor == 'sqlite':
+            fts_table = connection.ops.quote_name(f'{self.document_model._meta.db_table}_fts')
+            id_column, params = 'rowid', [' '.join(f'"{term}"*' for term in terms)]
+            sql = f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s'
+            order_by, order_params = 'rank', []
+        else:
+            # No full-text index on other databases: unranked substring match on the documents
+            documents = self.document_model.objects.all()
+            for term in terms:
+                documents = documents.filter(body__icontains=term)
+            if within is not None:
+                documents = documents.filter(object_id__in=within.values('pk'))
+            sql, params = documents.values('object_id').query.sql_with_params()
+            return sql, list(params), None, []
+
+        if within is not None:
+            within_sql, within_params = within.order_by().values('pk').query.sql_with_params()
+            sql += f' AND {id_column} IN ({within_sql})'
+            params += within_params
+        return sql, params, order_by, order_params
+
+    def filter(self, queryset, query):
+        """`queryset` narrowed to the rows matching `query` (all of them, unranked); None if it has no usable words."""
+        terms = query_terms(query)
+        if not terms:
+            return None
+        sql, params, _, _ = self._match(terms)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+    def ranked_ids(self, query, limit, within=None):
+        terms = query_terms(query)
+        if not terms:
+            return None
+        sql, params, order_by, order_params = self._match(terms, within)
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} LIMIT %s', [*params, *order_params, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TripIndex(SearchIndex):
+    model = Trip
+    document_model = TripSearchDocument
+    select_related = ('vehicle', 'driver')
+    fields = {'vehicle', 'driver', 'origin', 'destination', 'purpose'}
+    dependencies = (
+        (Vehicle, 'vehicle', {'license_plate', 'make', 'model'}),
+        (User, 'driver', {'username', 'first_name', 'last_name'}),
+    )
+
+    def get_values(self, trip):
+        return [
+            trip.vehicle.license_plate, trip.vehicle.make, trip.vehicle.model,
+            trip.driver.first_name, trip.driver.last_name, trip.driver.username,
+            trip.origin, trip.destination, trip.purpose,
+        ]
+
+
+class VehicleIndex(SearchIndex):
+    model = Vehicle
+    document_model = VehicleSearchDocument
+    fields = {'license_plate', 'make', 'model', 'vin'}
+
+    def get_values(self, vehicle):
+        return [vehicle.license_plate, vehicle.make, vehicle.model, vehicle.vin]
+
+
+class FuelTransactionIndex(SearchIndex):
+    model = FuelTransaction
+    document_model = FuelTransactionSearchDocument
+    select_related = ('vehicle', 'driver', 'fuel_station')
+    fields = {'vehicle', 'driver', 'fuel_station', 'notes'}
+    dependencies = (
+        (Vehicle, 'vehicle', {'license_plate'}),
+        (User, 'driver', {'username', 'first_name', 'last_name'}),
+        (FuelStation, 'fuel_station', {'name'}),
+    )
+
+    def get_values(self, transaction):
+        return [
+            transaction.vehicle.license_plate,
+            transaction.driver.first_name, transaction.driver.last_name, transaction.driver.username,
+            transaction.fuel_station.name if transaction.fuel_station else '',
+            transaction.notes,
+        ]
+
+
+class MaintenanceIndex(SearchIndex):
+    model = Maintenance
+    document_model = MaintenanceSearchDocument
+    select_related = ('vehicle', 'maintenance_type', 'provider')
+    fields = {'vehicle', 'maintenance_type', 'provider', 'description', 'notes'}
+    dependencies = (
+        (Vehicle, 'vehicle', {'license_plate'}),
+        (MaintenanceType, 'maintenance_type', {'name'}),
+        (MaintenanceProvider, 'provider', {'name'}),
+    )
+
+    def get_values(self, record):
+        return [
+            record.vehicle.license_plate,
+            record.maintenance_type.name,
+            record.provider.name if record.provider else '',
+            record.description,
+            record.notes,
+        ]
+
+
+class DocumentIndex(SearchIndex):
+    model = Document
+    document_model = DocumentSearchDocument
+    select_related = ('vehicle', 'document_type')
+    fields = {'vehicle', 'document_type', 'document_number', 'issuing_authority'}
+    dependencies = (
+        (Vehicle, 'vehicle', {'license_plate'}),
+        (DocumentType, 'document_type', {'name'}),
+    )
+
+    def get_values(self, document):
+        return [
+            document.vehicle.license_plate,
+            document.document_type.name,
+            document.document_number,
+            document.issuing_authority,
+        ]
+
+
+registry = {
+    index.model: index
+    for index in [TripIndex(), VehicleIndex(), FuelTransactionIndex(), MaintenanceIndex(), DocumentIndex()]
+}
+
+
+def search(queryset, query):
+    """
+    `queryset` narrowed to the rows matching `query`, however many there are,
+    for list views that apply their own scoping, filters and ordering.
+
+    Returns None when the model isn't indexed or the query has no words the
+    index can match (e.g. only 1-2 letter words on MySQL), so callers can
+    fall back to their icontains filters.
+    """
+    index = registry.get(queryset.model)
+    if index is None:
+        return None
+    return index.filter(queryset, query)
+
+
+def ranked_ids(model, query, limit=None, within=None):
+    """
+    Primary keys of `model` rows matching `query`, best match first, at most
+    `limit` (SEARCH_MAX_RESULTS) of them. Pass the caller's scoped and
+    filtered queryset as `within` so the limit applies to those rows only.
+
+    Returns None in the same cases as search().
+    """
+    index = registry.get(model)
+    if index is None:
+        return None
+    if limit is None:
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+    return index.ranked_ids(query, limit, within)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from search.index import registry
+import time
+
+
+class Command(BaseCommand):
+    help = 'Build or refresh the full-text search documents, e.g. after migrating or a bulk import'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            help='Only rebuild these models, as app_label.model (default: all indexed models)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows indexed per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        indexes = {model._meta.label_lower: index for model, index in registry.items()}
+        labels = [label.lower() for label in options['models']] or list(indexes)
+        unknown = [label for label in labels if label not in indexes]
+        if unknown:
+            raise CommandError(f"Not indexed: {', '.join(unknown)}. Choose from {', '.join(indexes)}")
+
+        for label in labels:
+            index = indexes[label]
+            started = time.monotonic()
+            updated = 0
+            for updated in index.update_queryset(index.model.objects.all(), options['batch_size']):
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"{label}: {updated} rows ({updated / elapsed:.0f} rows/s)")
+            self.stdout.write(self.style.SUCCESS(
+                f"Indexed {updated} {label} rows in {time.monotonic() - started:.1f}s"
+            ))
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('documents', '0003_document_documents_d_expiry__1d702a_idx_and_more'),
+        ('fuel', '0003_fueltransaction_fuel_fueltr_date_0219e8_idx_and_more'),
+        ('maintenance', '0002_maintenance_maintenance_status_f8e247_idx_and_more'),
+        ('trips', '0007_remove_trip_trips_trip_driver__20a0ae_idx_and_more'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSearchDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('object', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='documents.document')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='FuelTransactionSearchDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('object', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='fuel.fueltransaction')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MaintenanceSearchDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('object', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='maintenance.maintenance')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TripSearchDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('object', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='trips.trip')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleSearchDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('object', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='vehicles.vehicle')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
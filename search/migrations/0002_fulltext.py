@@ -0,0 +1,56 @@
+from django.db import migrations
+
+TABLES = [
+    'search_tripsearchdocument',
+    'search_vehiclesearchdocument',
+    'search_fueltransactionsearchdocument',
+    'search_maintenancesearchdocument',
+    'search_documentsearchdocument',
+]
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    for table in TABLES:
+        if connection.vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {table}_body_ft (body)')
+        elif connection.vendor == 'sqlite':
+            # External-content FTS5 table kept in step with the document table by triggers
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {table}_fts USING fts5(body, content='{table}', content_rowid='object_id')"
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_ai AFTER INSERT ON {table} BEGIN '
+                f'INSERT INTO {table}_fts(rowid, body) VALUES (new.object_id, new.body); END'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_ad AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {table}_fts({table}_fts, rowid, body) VALUES ('delete', old.object_id, old.body); END"
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_au AFTER UPDATE ON {table} BEGIN '
+                f"INSERT INTO {table}_fts({table}_fts, rowid, body) VALUES ('delete', old.object_id, old.body); "
+                f'INSERT INTO {table}_fts(rowid, body) VALUES (new.object_id, new.body); END'
+            )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    for table in TABLES:
+        if connection.vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {table}_body_ft')
+        elif connection.vendor == 'sqlite':
+            for trigger in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_{trigger}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
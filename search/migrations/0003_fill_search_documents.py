@@ -0,0 +1,93 @@
+import re
+
+from django.db import migrations
+
+NON_WORD = re.compile(r'\W+')
+
+
+def build_body(values):
+    # A frozen copy of search.index.build_body() as it was when this migration was written
+    text = ' '.join(str(value) for value in values if value)
+    compact = {NON_WORD.sub('', word) for word in text.split() if NON_WORD.search(word)}
+    compact.discard('')
+    return ' '.join([text, *sorted(compact)])
+
+
+def trip_values(trip):
+    return [
+        trip.vehicle.license_plate, trip.vehicle.make, trip.vehicle.model,
+        trip.driver.first_name, trip.driver.last_name, trip.driver.username,
+        trip.origin, trip.destination, trip.purpose,
+    ]
+
+
+def vehicle_values(vehicle):
+    return [vehicle.license_plate, vehicle.make, vehicle.model, vehicle.vin]
+
+
+def fuel_transaction_values(transaction):
+    return [
+        transaction.vehicle.license_plate,
+        transaction.driver.first_name, transaction.driver.last_name, transaction.driver.username,
+        transaction.fuel_station.name if transaction.fuel_station else '',
+        transaction.notes,
+    ]
+
+
+def maintenance_values(record):
+    return [
+        record.vehicle.license_plate,
+        record.maintenance_type.name,
+        record.provider.name if record.provider else '',
+        record.description,
+        record.notes,
+    ]
+
+
+def document_values(document):
+    return [
+        document.vehicle.license_plate,
+        document.document_type.name,
+        document.document_number,
+        document.issuing_authority,
+    ]
+
+
+# (model, search document model, select_related, values)
+SOURCES = [
+    ('trips.Trip', 'TripSearchDocument', ('vehicle', 'driver'), trip_values),
+    ('vehicles.Vehicle', 'VehicleSearchDocument', (), vehicle_values),
+    ('fuel.FuelTransaction', 'FuelTransactionSearchDocument', ('vehicle', 'driver', 'fuel_station'),
+     fuel_transaction_values),
+    ('maintenance.Maintenance', 'MaintenanceSearchDocument', ('vehicle', 'maintenance_type', 'provider'),
+     maintenance_values),
+    ('documents.Document', 'DocumentSearchDocument', ('vehicle', 'document_type'), document_values),
+]
+
+
+def fill_search_documents(apps, schema_editor):
+    # Same documents as `manage.py rebuild_search_index`, against the historical models
+    for label, document_name, select_related, values in SOURCES:
+        Model = apps.get_model(label)
+        SearchDocument = apps.get_model('search', document_name)
+        rows = Model.objects.select_related(*select_related).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:1000])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            SearchDocument.objects.bulk_create(
+                [SearchDocument(object_id=obj.pk, body=build_body(values(obj))) for obj in batch]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalised searchable text for one row of an indexed model.
+
+    `body` has a FULLTEXT index on MySQL and an FTS5 shadow table on SQLite
+    (see migrations/0002_fulltext.py); search/index.py builds and queries it.
+    """
+    body = models.TextField()
+
+    class Meta:
+        abstract = True
+
+
+class TripSearchDocument(SearchDocument):
+    object = models.OneToOneField(
+        'trips.Trip', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+
+
+class VehicleSearchDocument(SearchDocument):
+    object = models.OneToOneField(
+        'vehicles.Vehicle', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+
+
+class FuelTransactionSearchDocument(SearchDocument):
+    object = models.OneToOneField(
+        'fuel.FuelTransaction', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+
+
+class MaintenanceSearchDocument(SearchDocument):
+    object = models.OneToOneField(
+        'maintenance.Maintenance', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+
+
+class DocumentSearchDocument(SearchDocument):
+    object = models.OneToOneField(
+        'documents.Document', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
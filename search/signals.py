@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save
+
+from .index import registry
+
+
+def update_search_document(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """Re-index a saved row, unless the save didn't touch any indexed field"""
+    if raw:
+        return
+    index = registry[sender]
+    if update_fields is not None and not index.fields.intersection(update_fields):
+        return
+    index.update([instance])
+
+
+def update_dependent_search_documents(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """Re-index rows whose document shows text from the saved row (e.g. a vehicle's trips)"""
+    if raw or created:
+        return
+    for index, lookup, fields in dependents[sender]:
+        if update_fields is not None and not fields.intersection(update_fields):
+            continue
+        for _ in index.update_queryset(index.model.objects.filter(**{lookup: instance})):
+            pass
+
+
+dependents = {}
+for model, index in registry.items():
+    post_save.connect(update_search_document, sender=model, dispatch_uid=f'search_{model._meta.label_lower}')
+    for related_model, lookup, fields in index.dependencies:
+        dependents.setdefault(related_model, []).append((index, lookup, fields))
+
+for related_model in dependents:
+    post_save.connect(
+        update_dependent_search_documents,
+        sender=related_model,
+        dispatch_uid=f'search_dependents_{related_model._meta.label_lower}'
+    )
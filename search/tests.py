@@ -0,0 +1,132 @@
+import datetime
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser
+from trips.models import Trip
+from vehicles.models import Vehicle, VehicleType
+from .index import ranked_ids
+from .models import TripSearchDocument, VehicleSearchDocument
+
+
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user(
+            'rajesh', 'rajesh@example.com', 'pw', user_type='driver',
+            first_name='Rajesh', last_name='Kumar', approval_status='approved',
+        )
+        cls.admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'pw', user_type='admin')
+        vehicle_type = VehicleType.objects.create(name='Car', category='car')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-AB-1234', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+        )
+        cls.other_vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Tata', model='Nexon', year=2022,
+            license_plate='TN-01-XY-9999', vin='VIN00000000000002', color='blue',
+            acquisition_date=datetime.date(2022, 1, 1), current_odometer=500,
+        )
+        cls.trip = Trip.objects.create(
+            vehicle=cls.vehicle, driver=cls.driver, start_time=timezone.now(), start_odometer=1000,
+            origin='Kochi Depot', destination='Ernakulam Market', purpose='Delivery',
+        )
+        cls.other_trip = Trip.objects.create(
+            vehicle=cls.other_vehicle, driver=cls.driver, start_time=timezone.now(), start_odometer=500,
+            origin='Chennai Yard', destination='Madurai', purpose='Pickup',
+        )
+
+    def test_saving_a_trip_indexes_it(self):
+        body = TripSearchDocument.objects.get(object=self.trip).body
+        self.assertIn('Kochi Depot', body)
+        self.assertIn('KL07AB1234', body)
+
+    def test_matches_word_prefixes(self):
+        self.assertEqual(ranked_ids(Trip, 'koch raj'), [self.trip.pk])
+        self.assertEqual(ranked_ids(Trip, 'KL07'), [self.trip.pk])
+        self.assertEqual(sorted(ranked_ids(Trip, 'rajesh')), sorted([self.trip.pk, self.other_trip.pk]))
+        self.assertEqual(ranked_ids(Trip, 'nowhere'), [])
+        self.assertEqual(ranked_ids(Vehicle, 'nexon'), [self.other_vehicle.pk])
+
+    def test_migration_indexes_existing_rows(self):
+        TripSearchDocument.objects.all().delete()
+        VehicleSearchDocument.objects.all().delete()
+        self.assertEqual(ranked_ids(Trip, 'koch'), [])
+
+        migration = import_module('search.migrations.0003_fill_search_documents')
+        migration.fill_search_documents(apps, None)
+        self.assertEqual(ranked_ids(Trip, 'koch raj'), [self.trip.pk])
+        self.assertEqual(ranked_ids(Vehicle, 'nexon'), [self.other_vehicle.pk])
+
+    def test_query_without_words_falls_back(self):
+        self.assertIsNone(ranked_ids(Trip, '-- !!'))
+
+    def test_renaming_a_vehicle_reindexes_its_trips(self):
+        self.vehicle.license_plate = 'KA-05-ZZ-4321'
+        self.vehicle.save()
+        self.assertEqual(ranked_ids(Trip, 'KA05'), [self.trip.pk])
+        self.assertEqual(ranked_ids(Trip, 'KL07'), [])
+
+    def test_unrelated_update_fields_skip_reindexing(self):
+        # Status/odometer changes happen on every trip start and end and don't affect the documents
+        with self.assertNumQueries(1):
+            self.vehicle.save(update_fields=['status', 'current_odometer'])
+
+    def test_rebuild_command_restores_missing_documents(self):
+        TripSearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', 'trips.trip', stdout=StringIO())
+        self.assertEqual(TripSearchDocument.objects.count(), 2)
+        self.assertEqual(ranked_ids(Trip, 'madurai'), [self.other_trip.pk])
+
+    def test_api_search_uses_the_index(self):
+        token = Token.objects.create(user=self.admin)
+        response = self.client.get(
+            '/api/v1/trips/', {'search': 'ernakulam'}, HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        results = results.get('results', results)
+        self.assertEqual([trip['id'] for trip in results], [self.trip.pk])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_scoped_searches_see_all_their_matches_past_the_limit(self):
+        other = CustomUser.objects.create_user(
+            'suresh', 'suresh@example.com', 'pw', user_type='driver', approval_status='approved'
+        )
+        for _ in range(3):
+            Trip.objects.create(
+                vehicle=self.other_vehicle, driver=other, start_time=timezone.now(), start_odometer=500,
+                origin='Kochi Port', destination='Aluva', purpose='Delivery', status='completed',
+            )
+        mine = [self.trip.pk] + [
+            Trip.objects.create(
+                vehicle=self.vehicle, driver=self.driver, start_time=timezone.now(), start_odometer=1000,
+                origin='Kochi Depot', destination='Aluva', purpose='Delivery', status='completed',
+            ).pk
+            for _ in range(2)
+        ]
+        self.assertEqual(len(ranked_ids(Trip, 'kochi')), 2)
+
+        # Web list: every match of the driver, counted in the tabs
+        self.client.force_login(self.driver)
+        context = self.client.get('/trips/', {'search': 'kochi'}).context
+        self.assertEqual((context['ongoing_count'], context['completed_count']), (1, 2))
+        context = self.client.get('/trips/', {'search': 'kochi', 'status': 'completed'}).context
+        self.assertEqual(sorted(trip.pk for trip in context['trips']), sorted(mine[1:]))
+
+        # API: the limit applies to the driver's own matches
+        token = Token.objects.create(user=self.driver)
+        response = self.client.get(
+            '/api/v1/trips/', {'search': 'kochi', 'status': 'completed'}, HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        results = response.json()
+        results = results.get('results', results)
+        self.assertEqual(sorted(trip['id'] for trip in results), sorted(mine[1:]))
@@ -1,16 +1,29 @@
-from django.core.management.base import BaseCommand
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from django.conf import settings
+from accounts.models import CustomUser
+from api import bootstrap
+from dashboard.models import Notification
 from trips.models import Trip
 from vehicles.models import Vehicle
 import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Default distance when a vehicle has no usable trip history, in km
+DEFAULT_DISTANCE = 50
+# How many of a vehicle's latest completed trips the distance estimate uses
+RECENT_TRIPS = 10
+
+
 class Command(BaseCommand):
     help = 'Automatically end trips that have been ongoing for too long'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--hours',
@@ -18,109 +31,172 @@ class Command(BaseCommand):
             default=24,
             help='Number of hours after which to auto-end a trip'
         )
-        
+
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Run the command without making actual changes'
         )
-    
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Trips ended per transaction (default: 500)'
+        )
+
+    def average_distances(self, vehicle_ids):
+        """
+        {vehicle_id: average distance of its latest completed trips}, from one
+        windowed query returning at most RECENT_TRIPS rows per vehicle.
+        """
+        recent = Trip.objects.filter(
+            vehicle_id__in=vehicle_ids,
+            status='completed',
+            distance_km__gt=0,
+        ).annotate(
+            recency=Window(RowNumber(), partition_by=F('vehicle_id'), order_by=F('start_time').desc()),
+        ).filter(recency__lte=RECENT_TRIPS).values_list('vehicle_id', 'distance_km')
+
+        distances = defaultdict(list)
+        for vehicle_id, distance in recent:
+            distances[vehicle_id].append(distance)
+        return {vehicle_id: sum(values) / len(values) for vehicle_id, values in distances.items()}
+
+    def estimate_end_odometer(self, trip, vehicle, averages):
+        # If the vehicle has a higher current odometer, use that
+        if vehicle.current_odometer and vehicle.current_odometer > trip.start_odometer:
+            return vehicle.current_odometer
+        # Otherwise, estimate based on the vehicle's average trip distance
+        return trip.start_odometer + max(1, int(averages.get(vehicle.pk, DEFAULT_DISTANCE)))
+
+    def end_chunk(self, trip_ids, end_time, dry_run):
+        """
+        End one chunk of stale trips with bulk updates; runs inside the caller's
+        transaction. Vehicles are locked first, as in trips.services, and trips
+        ended by their driver in the meantime are skipped. Returns the trips
+        that were (or would be) ended.
+        """
+        vehicle_ids = set(
+            Trip.objects.filter(pk__in=trip_ids, status='ongoing').values_list('vehicle_id', flat=True)
+        )
+        vehicle_queryset = Vehicle.objects.filter(pk__in=vehicle_ids).order_by('pk')
+        if not dry_run:
+            vehicle_queryset = vehicle_queryset.select_for_update()
+        vehicles = {vehicle.pk: vehicle for vehicle in vehicle_queryset}
+        # Read the trips after locking, so trips ended by their driver in the meantime drop out
+        trips = list(
+            Trip.objects.filter(pk__in=trip_ids, status='ongoing').select_related('driver').order_by('pk')
+        )
+        averages = self.average_distances(vehicle_ids)
+
+        changed_vehicles = {}
+        for trip in trips:
+            vehicle = vehicles[trip.vehicle_id]
+            trip.vehicle = vehicle
+            trip.end_odometer = self.estimate_end_odometer(trip, vehicle, averages)
+            trip.end_time = end_time
+            trip.status = 'completed'
+            trip.update_metrics()
+
+            vehicle.status = 'available'
+            if vehicle.current_odometer is None or trip.end_odometer > vehicle.current_odometer:
+                vehicle.current_odometer = trip.end_odometer
+            changed_vehicles[vehicle.pk] = vehicle
+
+        if not dry_run and trips:
+            Trip.objects.bulk_update(
+                trips, ['status', 'end_time', 'end_odometer', 'distance_km', 'duration_seconds']
+            )
+            Vehicle.objects.bulk_update(list(changed_vehicles.values()), ['status', 'current_odometer'])
+        return trips
+
+    def notify(self, trips, managers):
+        """Tell each driver and every manager about the auto-ended trips."""
+        notifications = []
+        for trip in trips:
+            plate = trip.vehicle.license_plate
+            link = f'/trips/{trip.id}/'
+            notifications.append(Notification(
+                user_id=trip.driver_id,
+                text=f"Your trip with {plate} was automatically ended due to inactivity",
+                link=link,
+                icon='clock',
+                level='warning'
+            ))
+            driver_name = trip.driver.get_full_name()
+            for manager_id in managers:
+                notifications.append(Notification(
+                    user_id=manager_id,
+                    text=f"Trip by {driver_name} with {plate} was auto-ended",
+                    link=link,
+                    icon='exclamation-triangle',
+                    level='warning'
+                ))
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        return len(notifications)
+
     def handle(self, *args, **options):
         hours = options['hours']
         dry_run = options['dry_run']
-        
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
         # Calculate the cutoff time
-        cutoff_time = timezone.now() - datetime.timedelta(hours=hours)
-        
-        # Get ongoing trips that started before the cutoff time
-        stale_trips = Trip.objects.filter(
-            status='ongoing',
-            start_time__lt=cutoff_time
-        ).select_related('vehicle', 'driver')
-        
-        self.stdout.write(f"Found {stale_trips.count()} ongoing trips that started more than {hours} hours ago")
-        
-        if stale_trips.count() == 0:
+        now = timezone.now()
+        cutoff_time = now - datetime.timedelta(hours=hours)
+
+        # Ongoing trips that started before the cutoff time, oldest id first
+        stale_ids = list(
+            Trip.objects.filter(status='ongoing', start_time__lt=cutoff_time)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+        self.stdout.write(f"Found {len(stale_ids)} ongoing trips that started more than {hours} hours ago")
+
+        if not stale_ids:
             return
-        
-        # Process each stale trip
-        for trip in stale_trips:
-            # Log the trip details
-            self.stdout.write(f"Processing trip #{trip.id}: Vehicle {trip.vehicle.license_plate}, "
-                             f"Driver {trip.driver.get_full_name()}, Start time: {trip.start_time}")
-            
-            if not dry_run:
-                try:
-                    # Mark the trip as completed
-                    trip.status = 'completed'
-                    trip.end_time = timezone.now()
-                    
-                    # Set a reasonable end odometer reading if none exists
-                    if not trip.end_odometer:
-                        # If the vehicle has a higher current odometer, use that
-                        if trip.vehicle.current_odometer > trip.start_odometer:
-                            trip.end_odometer = trip.vehicle.current_odometer
-                        else:
-                            # Otherwise, estimate based on average trip distance
-                            avg_distance = 50  # Default average distance in km
-                            
-                            # Try to calculate a better average from past trips
-                            past_trips = Trip.objects.filter(
-                                vehicle=trip.vehicle,
-                                status='completed'
-                            ).exclude(id=trip.id)[:10]
-                            
-                            if past_trips.exists():
-                                distances = []
-                                for past_trip in past_trips:
-                                    if past_trip.end_odometer and past_trip.start_odometer:
-                                        distances.append(past_trip.end_odometer - past_trip.start_odometer)
-                                
-                                if distances:
-                                    avg_distance = sum(distances) / len(distances)
-                            
-                            trip.end_odometer = trip.start_odometer + int(avg_distance)
-                    
-                    # Update the trip
-                    trip.save()
-                    
-                    # Update the vehicle status to available
-                    vehicle = trip.vehicle
-                    vehicle.status = 'available'
-                    vehicle.current_odometer = trip.end_odometer
-                    vehicle.save()
-                    
-                    self.stdout.write(self.style.SUCCESS(f"Auto-ended trip #{trip.id}"))
-                    
-                    # Create a notification about this auto-ended trip
-                    from dashboard.models import Notification
-                    
-                    # Notify the driver
-                    Notification.objects.create(
-                        user=trip.driver,
-                        text=f"Your trip with {trip.vehicle.license_plate} was automatically ended due to inactivity",
-                        link=f'/trips/{trip.id}/',
-                        icon='clock',
-                        level='warning'
+
+        managers = list(
+            CustomUser.objects.filter(user_type__in=['admin', 'manager', 'vehicle_manager']).values_list('pk', flat=True)
+        )
+
+        started = time.monotonic()
+        ended = notified = failed = 0
+        for offset in range(0, len(stale_ids), chunk_size):
+            chunk = stale_ids[offset:offset + chunk_size]
+            try:
+                with transaction.atomic():
+                    trips = self.end_chunk(chunk, now, dry_run)
+                    if not dry_run:
+                        notified += self.notify(trips, managers)
+            except Exception as e:
+                failed += len(chunk)
+                logger.error(f"Failed to auto-end trips #{chunk[0]}-#{chunk[-1]}: {str(e)}")
+                self.stdout.write(self.style.ERROR(f"Failed to auto-end trips #{chunk[0]}-#{chunk[-1]}: {str(e)}"))
+                continue
+
+            ended += len(trips)
+            if dry_run or options['verbosity'] > 1:
+                prefix = "[DRY RUN] Would auto-end" if dry_run else "Auto-ended"
+                for trip in trips:
+                    self.stdout.write(
+                        f"{prefix} trip #{trip.id}: Vehicle {trip.vehicle.license_plate}, "
+                        f"Driver {trip.driver.get_full_name()}, Start time: {trip.start_time}, "
+                        f"End odometer: {trip.end_odometer}"
                     )
-                    
-                    # Notify managers
-                    from accounts.models import CustomUser
-                    managers = CustomUser.objects.filter(user_type__in=['admin', 'manager', 'vehicle_manager'])
-                    
-                    for manager in managers:
-                        Notification.objects.create(
-                            user=manager,
-                            text=f"Trip by {trip.driver.get_full_name()} with {trip.vehicle.license_plate} was auto-ended",
-                            link=f'/trips/{trip.id}/',
-                            icon='exclamation-triangle',
-                            level='warning'
-                        )
-                    
-                except Exception as e:
-                    logger.error(f"Failed to auto-end trip #{trip.id}: {str(e)}")
-                    self.stdout.write(self.style.ERROR(f"Failed to auto-end trip #{trip.id}: {str(e)}"))
             else:
-                self.stdout.write(f"[DRY RUN] Would auto-end trip #{trip.id}")
-        
-        self.stdout.write(self.style.SUCCESS(f"Successfully processed {stale_trips.count()} stale trips"))
\ No newline at end of file
+                self.stdout.write(f"Auto-ended {ended}/{len(stale_ids)} trips")
+
+        if not dry_run and ended:
+            # Bulk updates skip post_save, so the bootstrap cache isn't invalidated per row
+            bootstrap.invalidate_all()
+
+        elapsed = time.monotonic() - started
+        rate = ended / elapsed if elapsed else 0
+        action = "Would auto-end" if dry_run else "Auto-ended"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {ended} trips in {elapsed:.2f}s ({rate:.0f} trips/s), "
+            f"{notified} notifications, {failed} failed, {len(stale_ids) - ended - failed} skipped"
+        ))
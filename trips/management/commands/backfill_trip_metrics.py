@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from trips.models import Trip, trip_metrics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Fill in Trip.distance_km and Trip.duration_seconds for trips saved before those columns existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Trips read and written per batch (default: 2000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every trip, not just the ones with missing values'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        trips = Trip.objects.all()
+        if not options['all']:
+            # Trips whose odometer or end time is set but not yet reflected in the stored columns.
+            # Safe to re-run: finished batches drop out of this filter.
+            trips = trips.filter(
+                Q(end_odometer__isnull=False, distance_km__isnull=True)
+                | Q(end_time__isnull=False, duration_seconds__isnull=True)
+            )
+        fields = ('pk', 'start_odometer', 'end_odometer', 'start_time', 'end_time')
+
+        started = time.monotonic()
+        updated = 0
+        last_pk = 0
+        while True:
+            rows = list(trips.filter(pk__gt=last_pk).order_by('pk').values_list(*fields)[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            batch = []
+            for pk, start_odometer, end_odometer, start_time, end_time in rows:
+                distance, duration = trip_metrics(start_odometer, end_odometer, start_time, end_time)
+                batch.append(Trip(pk=pk, distance_km=distance, duration_seconds=duration))
+            Trip.objects.bulk_update(batch, ['distance_km', 'duration_seconds'])
+
+            updated += len(batch)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"Updated {updated} trips ({updated / elapsed:.0f} trips/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} trips in {time.monotonic() - started:.1f}s"))
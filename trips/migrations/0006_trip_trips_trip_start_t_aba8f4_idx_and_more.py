@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_delete_triplocation'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['start_time'], name='trips_trip_start_t_aba8f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['status', 'start_time'], name='trips_trip_status_97120d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['driver', 'status', 'start_time'], name='trips_trip_driver__20a0ae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['vehicle', 'status'], name='trips_trip_vehicle_b6bc2f_idx'),
+        ),
+    ]
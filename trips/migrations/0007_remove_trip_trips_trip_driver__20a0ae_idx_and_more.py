@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_metrics(apps, schema_editor):
+    # Same as trips.models.trip_metrics(), against the historical model
+    Trip = apps.get_model('trips', 'Trip')
+    trips = Trip.objects.filter(Q(end_odometer__isnull=False) | Q(end_time__isnull=False))
+    last_pk = 0
+    while True:
+        batch = list(
+            trips.filter(pk__gt=last_pk).order_by('pk')
+            .only('start_odometer', 'end_odometer', 'start_time', 'end_time')[:2000]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for trip in batch:
+            # Both are always set: bulk_update would load unset deferred fields one trip at a time
+            trip.distance_km = trip.duration_seconds = None
+            if trip.end_odometer is not None and trip.start_odometer is not None:
+                trip.distance_km = max(0, trip.end_odometer - trip.start_odometer)
+            if trip.end_time and trip.start_time:
+                trip.duration_seconds = max(0, int((trip.end_time - trip.start_time).total_seconds()))
+        Trip.objects.bulk_update(batch, ['distance_km', 'duration_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_trip_trips_trip_start_t_aba8f4_idx_and_more'),
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trips_trip_driver__20a0ae_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trips_trip_vehicle_b6bc2f_idx',
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='distance_km',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['driver', 'status', 'start_time', 'distance_km', 'duration_seconds'], name='trips_trip_driver__65fef0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['vehicle', 'status', 'distance_km'], name='trips_trip_vehicle_ecf8d5_idx'),
+        ),
+    ]
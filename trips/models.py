@@ -3,6 +3,19 @@ from django.utils import timezone
 from vehicles.models import Vehicle
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from datetime import timedelta
+
+
+def trip_metrics(start_odometer, end_odometer, start_time, end_time):
+    """(distance_km, duration_seconds) for a trip; None for whatever isn't known yet."""
+    distance = None
+    if end_odometer is not None and start_odometer is not None:
+        distance = max(0, end_odometer - start_odometer)
+    duration = None
+    if end_time and start_time:
+        duration = max(0, int((end_time - start_time).total_seconds()))
+    return distance, duration
+
 
 class Trip(models.Model):
     """Record of a vehicle trip."""
@@ -50,8 +63,23 @@ class Trip(models.Model):
         default='ongoing'
     )
     
+    # Stored when the trip ends so reports can aggregate them in SQL
+    distance_km = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Manager trip list / reports: date range and default ordering
+            models.Index(fields=['start_time']),
+            # Dashboard counts, auto_end_trips, completed trips in a period
+            models.Index(fields=['status', 'start_time']),
+            # Driver dashboard, driver trip list, "has active trip" checks;
+            # covers the driver's distance and hours totals
+            models.Index(fields=['driver', 'status', 'start_time', 'distance_km', 'duration_seconds']),
+            # Vehicle.get_active_trip / has_active_trip; covers Vehicle.get_total_distance
+            models.Index(fields=['vehicle', 'status', 'distance_km']),
+        ]
     
     def __str__(self):
         return f"{self.vehicle} driven by {self.driver.get_full_name()} from {self.origin} to {self.destination} on {self.start_time.date()}"
@@ -67,69 +95,77 @@ class Trip(models.Model):
                     'end_odometer': f'End odometer ({self.end_odometer}) must be greater than start odometer ({self.start_odometer})'
                 })
     
-    def save(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can detect transitions without re-reading the row
+        if 'status' in instance.__dict__:
+            instance._loaded_status = instance.status
+        return instance
+    
+    def save(self, *args, sync_vehicle=True, **kwargs):
         """
         Override save to update related vehicle status and odometer.
-        """
-        # Store the original status to detect changes
-        original_status = None
-        if self.pk:
-            try:
-                original_trip = Trip.objects.get(pk=self.pk)
-                original_status = original_trip.status
-            except Trip.DoesNotExist:
-                pass
         
-        # For a new trip (starting)
-        if not self.pk:
-            # If starting a new trip, update vehicle status to in_use
-            if self.status == 'ongoing':
-                self.vehicle.status = 'in_use'
-                # Ensure vehicle's current_odometer is not None before saving
-                if self.vehicle.current_odometer is None:
-                    self.vehicle.current_odometer = self.start_odometer
-                self.vehicle.save()
-        else:
-            # For existing trip - check if status changed to completed or cancelled
-            if (original_status == 'ongoing' and 
-                self.status in ['completed', 'cancelled']):
-                
-                # Update vehicle status back to available
-                self.vehicle.status = 'available'
-                
-                # Update vehicle odometer if completed with valid end_odometer
-                if self.status == 'completed' and self.end_odometer:
-                    # CRITICAL FIX: Ensure we never set current_odometer to None
-                    if self.end_odometer > 0:
-                        self.vehicle.current_odometer = self.end_odometer
-                    else:
-                        # Fallback: use start_odometer if end_odometer is invalid
-                        self.vehicle.current_odometer = self.start_odometer
-                elif self.status == 'cancelled':
-                    # For cancelled trips, keep the original odometer or use start_odometer
-                    if self.vehicle.current_odometer is None:
-                        self.vehicle.current_odometer = self.start_odometer
-                
-                # Ensure current_odometer is never None before saving vehicle
-                if self.vehicle.current_odometer is None:
-                    self.vehicle.current_odometer = self.start_odometer
-                
-                self.vehicle.save()
+        trips.services does its own locked vehicle update and passes
+        sync_vehicle=False.
+        """
+        if sync_vehicle:
+            self._sync_vehicle()
         
         # Set end_time when trip is completed
         if self.status == 'completed' and not self.end_time:
             self.end_time = timezone.now()
         
+        self.update_metrics()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'end_time', 'distance_km', 'duration_seconds'}
+        
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
+    
+    def _sync_vehicle(self):
+        """Mirror a status change of this trip onto its vehicle."""
+        vehicle = self.vehicle
+        if not self.pk:
+            # New trip: the vehicle is now in use
+            if self.status != 'ongoing':
+                return
+            vehicle.status = 'in_use'
+        else:
+            if hasattr(self, '_loaded_status'):
+                original_status = self._loaded_status
+            else:
+                original_status = Trip.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            if original_status != 'ongoing' or self.status not in ['completed', 'cancelled']:
+                return
+            vehicle.status = 'available'
+            if self.status == 'completed' and self.end_odometer:
+                vehicle.current_odometer = self.end_odometer
+        
+        # Ensure we never set current_odometer to None
+        if vehicle.current_odometer is None:
+            vehicle.current_odometer = self.start_odometer
+        vehicle.save(update_fields=['status', 'current_odometer'])
+    
+    def update_metrics(self):
+        """Recompute distance_km and duration_seconds from the odometer and times."""
+        self.distance_km, self.duration_seconds = trip_metrics(
+            self.start_odometer, self.end_odometer, self.start_time, self.end_time
+        )
     
     def distance_traveled(self):
         """Calculate distance traveled during the trip."""
+        if self.distance_km is not None:
+            return self.distance_km
         if self.end_odometer is not None and self.start_odometer is not None:
             return max(0, self.end_odometer - self.start_odometer)
         return 0
     
     def get_duration_timedelta(self):
         """Calculate trip duration as a timedelta object."""
+        if self.duration_seconds is not None:
+            return timedelta(seconds=self.duration_seconds)
         if self.end_time and self.start_time:
             return self.end_time - self.start_time
         elif self.start_time and self.status == 'ongoing':
@@ -183,34 +219,12 @@ class Trip(models.Model):
         """
         Safely end a trip with proper validation.
         """
-        if self.status != 'ongoing':
-            raise ValidationError("Can only end ongoing trips")
-        
-        if not end_odometer or end_odometer <= self.start_odometer:
-            raise ValidationError(f"End odometer ({end_odometer}) must be greater than start odometer ({self.start_odometer})")
-        
-        self.end_odometer = end_odometer
-        self.end_time = timezone.now()
-        self.status = 'completed'
-        
-        if notes:
-            self.notes = notes
-        
-        # The save method will handle vehicle updates
-        self.save()
+        from .services import end_trip
+        return end_trip(self, end_odometer, notes=notes)
     
     def cancel_trip(self, reason=None):
         """
         Cancel an ongoing trip.
         """
-        if self.status != 'ongoing':
-            raise ValidationError("Can only cancel ongoing trips")
-        
-        self.status = 'cancelled'
-        self.end_time = timezone.now()
-        
-        if reason:
-            self.notes = f"Trip cancelled: {reason}" + (f"\n{self.notes}" if self.notes else "")
-        
-        # The save method will handle vehicle status update
-        self.save()
\ No newline at end of file
+        from .services import cancel_trip
+        return cancel_trip(self, reason=reason)
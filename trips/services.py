@@ -0,0 +1,100 @@
+"""
+Trip lifecycle: starting, ending and cancelling trips.
+
+Each transition runs in a transaction holding a row lock on the vehicle, so
+two requests can't start trips on the same vehicle or end the same trip
+twice. Only the columns that change are written.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from .models import Trip, trip_metrics
+
+
+def _lock_vehicle(vehicle_id):
+    return Vehicle.objects.select_for_update().get(pk=vehicle_id)
+
+
+def _release_vehicle(vehicle, odometer=None):
+    """Make the vehicle available again, moving its odometer forward if needed."""
+    vehicle.status = 'available'
+    if odometer and (vehicle.current_odometer is None or odometer > vehicle.current_odometer):
+        vehicle.current_odometer = odometer
+    vehicle.save(update_fields=['status', 'current_odometer'])
+
+
+def _finish(trip, status, end_odometer=None, notes=None, end_time=None):
+    """
+    Move an ongoing trip to `status` with a conditional UPDATE, so a trip that
+    was ended or cancelled in the meantime is left alone.
+    """
+    changes = {'status': status, 'end_time': end_time or timezone.now()}
+    if end_odometer is not None:
+        changes['end_odometer'] = end_odometer
+    changes['distance_km'], changes['duration_seconds'] = trip_metrics(
+        trip.start_odometer, end_odometer, trip.start_time, changes['end_time']
+    )
+    if notes is not None:
+        changes['notes'] = notes
+
+    with transaction.atomic():
+        vehicle = _lock_vehicle(trip.vehicle_id)
+        updated = Trip.objects.filter(pk=trip.pk, status='ongoing').update(**changes)
+        if not updated:
+            raise ValidationError(f"Can only {'end' if status == 'completed' else 'cancel'} ongoing trips")
+        _release_vehicle(vehicle, end_odometer or trip.start_odometer)
+
+    for field, value in changes.items():
+        setattr(trip, field, value)
+    # The stored status moved on, so a later save() must not sync the vehicle again
+    trip._loaded_status = status
+    trip.vehicle = vehicle
+    return trip
+
+
+def start_trip(*, vehicle, driver, start_odometer, origin, destination, purpose, notes='', start_time=None):
+    """Create an ongoing trip and mark the vehicle as in use."""
+    with transaction.atomic():
+        vehicle = _lock_vehicle(vehicle.pk)
+        if vehicle.status != 'available':
+            raise ValidationError(
+                f"Vehicle {vehicle.license_plate} is not available (current status: {vehicle.get_status_display()})"
+            )
+
+        trip = Trip(
+            vehicle=vehicle,
+            driver=driver,
+            start_time=start_time or timezone.now(),
+            start_odometer=start_odometer,
+            origin=origin,
+            destination=destination,
+            purpose=purpose,
+            notes=notes or '',
+            status='ongoing',
+        )
+        trip.save(sync_vehicle=False)
+
+        vehicle.status = 'in_use'
+        if vehicle.current_odometer is None or start_odometer > vehicle.current_odometer:
+            vehicle.current_odometer = start_odometer
+        vehicle.save(update_fields=['status', 'current_odometer'])
+    return trip
+
+
+def end_trip(trip, end_odometer, notes=None, end_time=None):
+    """Complete an ongoing trip and make its vehicle available."""
+    if not end_odometer or end_odometer <= trip.start_odometer:
+        raise ValidationError(
+            f"End odometer ({end_odometer}) must be greater than start odometer ({trip.start_odometer})"
+        )
+    return _finish(trip, 'completed', end_odometer=end_odometer, notes=notes or None, end_time=end_time)
+
+
+def cancel_trip(trip, reason=None):
+    """Cancel an ongoing trip and make its vehicle available."""
+    notes = None
+    if reason:
+        notes = f"Trip cancelled: {reason}" + (f"\n{trip.notes}" if trip.notes else "")
+    return _finish(trip, 'cancelled', notes=notes)
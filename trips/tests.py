@@ -1,3 +1,279 @@
+import datetime
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from dashboard.models import Notification
+from vehicles.models import Vehicle, VehicleType
+from .models import Trip
+from . import services
+
+
+class TripServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', user_type='driver',
+            first_name='Dan', last_name='Driver', approval_status='approved',
+        )
+        cls.vehicle_type = VehicleType.objects.create(name='Car', category='car')
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            vehicle_type=self.vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+        )
+
+    def start(self, **kwargs):
+        return services.start_trip(
+            vehicle=self.vehicle, driver=self.driver, start_odometer=kwargs.pop('start_odometer', 1000),
+            origin='Depot', destination='Site', purpose='Delivery', **kwargs
+        )
+
+    def test_start_marks_vehicle_in_use(self):
+        trip = self.start(start_odometer=1200)
+        self.vehicle.refresh_from_db()
+        self.assertEqual(trip.status, 'ongoing')
+        self.assertEqual(self.vehicle.status, 'in_use')
+        self.assertEqual(self.vehicle.current_odometer, 1200)
+
+    def test_cannot_start_on_vehicle_in_use(self):
+        self.start()
+        with self.assertRaises(ValidationError):
+            self.start()
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_end_updates_trip_and_vehicle(self):
+        trip = self.start()
+        # Vehicle lock, conditional trip UPDATE, vehicle UPDATE (+ savepoint bookkeeping)
+        with self.assertNumQueries(5):
+            services.end_trip(trip, 1080, notes='Done')
+        trip.refresh_from_db()
+        self.vehicle.refresh_from_db()
+        self.assertEqual((trip.status, trip.end_odometer, trip.notes), ('completed', 1080, 'Done'))
+        self.assertEqual(trip.distance_km, 80)
+        self.assertEqual(trip.duration_seconds, int((trip.end_time - trip.start_time).total_seconds()))
+        self.assertEqual((self.vehicle.status, self.vehicle.current_odometer), ('available', 1080))
+
+    def test_saving_an_ended_trip_leaves_the_vehicle_alone(self):
+        trip = services.end_trip(self.start(), 1080)
+        self.vehicle.refresh_from_db()
+        self.vehicle.status = 'maintenance'
+        self.vehicle.save()
+
+        trip.notes = 'Fuel receipt attached'
+        trip.save()
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.status, 'maintenance')
+
+    def test_end_rejects_trip_that_is_no_longer_ongoing(self):
+        trip = self.start()
+        stale_copy = Trip.objects.get(pk=trip.pk)
+        services.cancel_trip(trip, reason='Wrong vehicle')
+        with self.assertRaises(ValidationError):
+            services.end_trip(stale_copy, 1080)
+        stale_copy.refresh_from_db()
+        self.assertEqual(stale_copy.status, 'cancelled')
+        self.assertTrue(stale_copy.notes.startswith('Trip cancelled: Wrong vehicle'))
+
+    def test_end_rejects_odometer_below_start(self):
+        trip = self.start()
+        with self.assertRaises(ValidationError):
+            services.end_trip(trip, 900)
+
+    def test_model_save_still_syncs_vehicle(self):
+        trip = Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, start_time=timezone.now(), start_odometer=1000,
+            origin='Depot', destination='Site', purpose='Delivery',
+        )
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.status, 'in_use')
+
+        trip = Trip.objects.get(pk=trip.pk)
+        trip.status, trip.end_odometer = 'completed', 1050
+        trip.save()
+        self.vehicle.refresh_from_db()
+        self.assertEqual((self.vehicle.status, self.vehicle.current_odometer), ('available', 1050))
+
+
+class TripMetricsMigrationTests(TestCase):
+
+    def test_fills_in_trips_saved_before_the_columns_existed(self):
+        driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        vehicle = Vehicle.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Car', category='car'), make='Maruti', model='Swift',
+            year=2021, license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+        )
+        start = timezone.now() - datetime.timedelta(hours=2)
+        ended, ongoing = Trip.objects.bulk_create([
+            Trip(vehicle=vehicle, driver=driver, start_time=start, end_time=start + datetime.timedelta(hours=1),
+                 start_odometer=1000, end_odometer=1040, status='completed',
+                 origin='Depot', destination='Site', purpose='Delivery'),
+            Trip(vehicle=vehicle, driver=driver, start_time=start, start_odometer=1040, status='ongoing',
+                 origin='Site', destination='Depot', purpose='Delivery'),
+        ])
+        Trip.objects.bulk_create([
+            Trip(vehicle=vehicle, driver=driver, start_time=start, end_time=start + datetime.timedelta(minutes=5),
+                 start_odometer=1040, status='cancelled', origin='Site', destination='Depot', purpose='Delivery')
+            for _ in range(10)
+        ])
+        Trip.objects.update(distance_km=None, duration_seconds=None)
+
+        migration = import_module('trips.migrations.0007_remove_trip_trips_trip_driver__20a0ae_idx_and_more')
+        # A batch, its update and the empty next batch, however many trips lack an end odometer
+        with self.assertNumQueries(3):
+            migration.backfill_metrics(apps, None)
+
+        ended.refresh_from_db()
+        ongoing.refresh_from_db()
+        self.assertEqual((ended.distance_km, ended.duration_seconds), (40, 3600))
+        self.assertEqual((ongoing.distance_km, ongoing.duration_seconds), (None, None))
+        cancelled = Trip.objects.filter(status='cancelled').values_list('distance_km', 'duration_seconds')
+        self.assertEqual(set(cancelled), {(None, 300)})
+
+
+class AutoEndTripsCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', user_type='driver',
+            first_name='Dan', last_name='Driver', approval_status='approved',
+        )
+        cls.manager = CustomUser.objects.create_user('manager', 'manager@example.com', 'pw', user_type='manager')
+        vehicle_type = VehicleType.objects.create(name='Car', category='car')
+        now = timezone.now()
+
+        cls.trips = []
+        for i in range(3):
+            vehicle = Vehicle.objects.create(
+                vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+                license_plate=f'KL-07-{i:04d}', vin=f'VIN{i:014d}', color='white',
+                acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000, status='in_use',
+            )
+            if i == 0:
+                # History averaging 30 km; only the latest ten trips count
+                for j, distance in enumerate([500] + [20, 40] * 5):
+                    start = now - datetime.timedelta(days=20 - j)
+                    Trip.objects.create(
+                        vehicle=vehicle, driver=cls.driver, start_time=start, end_time=start,
+                        start_odometer=0, end_odometer=distance, status='completed',
+                        origin='Depot', destination='Site', purpose='Delivery',
+                    )
+            cls.trips.append(Trip.objects.bulk_create([Trip(
+                vehicle=vehicle, driver=cls.driver, start_time=now - datetime.timedelta(hours=30 if i < 2 else 1),
+                start_odometer=1000, status='ongoing', origin='Depot', destination='Site', purpose='Delivery',
+            )])[0])
+
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('auto_end_trips', '--dry-run', stdout=out)
+        self.assertIn('Would auto-end 2 trips', out.getvalue())
+        self.assertEqual(Trip.objects.filter(status='ongoing').count(), 3)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_ends_stale_trips_in_bulk(self):
+        call_command('auto_end_trips', '--chunk-size', '1', stdout=StringIO())
+
+        with_history, without_history, recent = [Trip.objects.get(pk=trip.pk) for trip in self.trips]
+        self.assertEqual((with_history.status, with_history.end_odometer), ('completed', 1030))
+        self.assertEqual((without_history.status, without_history.end_odometer), ('completed', 1050))
+        self.assertEqual(recent.status, 'ongoing')
+        self.assertEqual(with_history.vehicle.status, 'available')
+        self.assertEqual(with_history.vehicle.current_odometer, 1030)
+        self.assertEqual(with_history.distance_km, 30)
+        self.assertGreaterEqual(with_history.duration_seconds, 30 * 3600)
+        # One for the driver and one for the manager per trip
+        self.assertEqual(Notification.objects.count(), 4)
+
+
+class TripListViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver, cls.other = [
+            CustomUser.objects.create_user(
+                username, f'{username}@example.com', 'pw', user_type='driver', approval_status='approved'
+            )
+            for username in ['driver', 'other']
+        ]
+        cls.manager = CustomUser.objects.create_user('manager', 'manager@example.com', 'pw', user_type='manager')
+        vehicle_type = VehicleType.objects.create(name='Car', category='car')
+        cls.car, cls.van = [
+            Vehicle.objects.create(
+                vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+                license_plate=f'KL-07-000{i}', vin=f'VIN0000000000000{i}', color='white',
+                acquisition_date=datetime.date(2021, 1, 1), current_odometer=1000,
+            )
+            for i in range(2)
+        ]
+        now = timezone.now()
+        # The driver: 23 completed on the car (3 to Aluva), 2 on the van, one ongoing and one cancelled
+        for i in range(25):
+            Trip.objects.create(
+                vehicle=cls.car if i < 23 else cls.van, driver=cls.driver,
+                start_time=now - datetime.timedelta(days=30 - i), end_time=now - datetime.timedelta(days=30 - i),
+                start_odometer=0, end_odometer=10, status='completed',
+                origin='Depot', destination='Aluva' if i < 3 else 'Site', purpose='Delivery',
+            )
+        Trip.objects.create(
+            vehicle=cls.van, driver=cls.driver, start_time=now, start_odometer=1000, status='cancelled',
+            origin='Depot', destination='Site', purpose='Delivery',
+        )
+        Trip.objects.create(
+            vehicle=cls.car, driver=cls.driver, start_time=now, start_odometer=1000,
+            origin='Depot', destination='Aluva', purpose='Delivery',
+        )
+        Trip.objects.create(
+            vehicle=cls.van, driver=cls.other, start_time=now, start_odometer=1000,
+            origin='Depot', destination='Aluva', purpose='Delivery',
+        )
+
+    def trip_list(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get('/trips/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def counts(self, context):
+        return {tab['value']: tab['count'] for tab in context['status_tabs']}
+
+    def test_tab_counts_follow_the_user_and_filters(self):
+        context = self.trip_list(self.driver)
+        self.assertEqual(self.counts(context), {'ongoing': 1, 'completed': 25, 'cancelled': 1})
+        self.assertEqual(context['active_status'], 'ongoing')
+        self.assertEqual(self.counts(self.trip_list(self.manager)), {'ongoing': 2, 'completed': 25, 'cancelled': 1})
+
+        self.assertEqual(
+            self.counts(self.trip_list(self.driver, vehicle=self.van.pk)), {'ongoing': 0, 'completed': 2, 'cancelled': 1}
+        )
+        self.assertEqual(
+            self.counts(self.trip_list(self.driver, search='aluva')), {'ongoing': 1, 'completed': 3, 'cancelled': 0}
+        )
+        context = self.trip_list(self.manager, search='aluva', vehicle=self.car.pk)
+        self.assertEqual(self.counts(context), {'ongoing': 1, 'completed': 3, 'cancelled': 0})
+
+    def test_only_the_active_tab_is_paginated_and_loaded(self):
+        context = self.trip_list(self.driver, status='completed', vehicle=self.car.pk)
+        self.assertEqual(context['active_status'], 'completed')
+        self.assertEqual((len(context['completed_trips']), context['paginator'].count), (20, 23))
+        self.assertEqual((context['ongoing_trips'], context['ongoing_count']), ([], 1))
+
+        context = self.trip_list(self.driver, status='completed', vehicle=self.car.pk, page=2)
+        self.assertEqual(len(context['completed_trips']), 3)
+        self.assertTrue(all(trip.vehicle_id == self.car.pk for trip in context['completed_trips']))
+        # Tab links keep the filters but start again at page 1
+        self.assertEqual(context['filter_params'], {'vehicle': str(self.car.pk)})
+        self.assertEqual(context['search_params'], {'vehicle': str(self.car.pk), 'status': 'completed'})
 
-# Create your tests here.
+        context = self.trip_list(self.driver, status='cancelled')
+        self.assertEqual([trip.status for trip in context['trips']], ['cancelled'])
@@ -2,16 +2,18 @@ from django.forms import ValidationError
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, Exists, OuterRef, Q
 from django.core.exceptions import PermissionDenied
 from accounts.permissions import AdminRequiredMixin, ManagerRequiredMixin, VehicleManagerRequiredMixin, DriverRequiredMixin
 from .models import Trip
 from vehicles.models import Vehicle
 from accounts.models import CustomUser
 from .forms import TripForm, EndTripForm
+from .services import start_trip
+from fuel.proximity import nearest_stations
+from search.index import search
 
 class CanDriveVehicleMixin:
     """
@@ -32,12 +34,17 @@ class CanDriveVehicleMixin:
         return super().dispatch(request, *args, **kwargs)
 
 class TripListView(LoginRequiredMixin, ListView):
+    """
+    Trips split into ongoing/completed/cancelled tabs. Only the selected
+    tab's page of trips is loaded; the tab counts come from one grouped query.
+    """
     model = Trip
     template_name = 'trips/trip_list.html'
     context_object_name = 'trips'
     paginate_by = 20
     
-    def get_queryset(self):
+    def get_filtered_queryset(self):
+        """Trips the user can see, with the search and vehicle filters applied (no status filter)."""
         # Get base queryset based on user permissions
         if self.request.user.user_type == 'driver':
             queryset = Trip.objects.filter(driver=self.request.user)
@@ -49,64 +56,74 @@ class TripListView(LoginRequiredMixin, ListView):
         # Apply filters
         search_query = self.request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(
-                Q(vehicle__license_plate__icontains=search_query) |
-                Q(vehicle__make__icontains=search_query) |
-                Q(vehicle__model__icontains=search_query) |
-                Q(driver__first_name__icontains=search_query) |
-                Q(driver__last_name__icontains=search_query) |
-                Q(origin__icontains=search_query) |
-                Q(destination__icontains=search_query) |
-                Q(purpose__icontains=search_query)
-            )
+            matched = search(queryset, search_query)
+            if matched is not None:
+                queryset = matched
+            else:
+                queryset = queryset.filter(
+                    Q(vehicle__license_plate__icontains=search_query) |
+                    Q(vehicle__make__icontains=search_query) |
+                    Q(vehicle__model__icontains=search_query) |
+                    Q(driver__first_name__icontains=search_query) |
+                    Q(driver__last_name__icontains=search_query) |
+                    Q(origin__icontains=search_query) |
+                    Q(destination__icontains=search_query) |
+                    Q(purpose__icontains=search_query)
+                )
         
         vehicle_id = self.request.GET.get('vehicle', '')
         if vehicle_id:
             queryset = queryset.filter(vehicle_id=vehicle_id)
         
+        return queryset
+    
+    def get_status_counts(self):
+        """{status: count} for the filtered trips, from a single GROUP BY query."""
+        if not hasattr(self, '_status_counts'):
+            counts = dict(
+                self.get_filtered_queryset().order_by().values('status')
+                .annotate(count=Count('id')).values_list('status', 'count')
+            )
+            self._status_counts = {status: counts.get(status, 0) for status, _ in Trip.STATUS_CHOICES}
+        return self._status_counts
+    
+    def get_active_status(self):
+        """The selected tab; defaults to ongoing trips when there are any."""
         status = self.request.GET.get('status', '')
-        if status:
-            queryset = queryset.filter(status=status)
-        
-        return queryset.select_related('vehicle', 'driver').order_by('-start_time')
+        if status in dict(Trip.STATUS_CHOICES):
+            return status
+        return 'ongoing' if self.get_status_counts()['ongoing'] else 'completed'
+    
+    def get_queryset(self):
+        return self.get_filtered_queryset().filter(
+            status=self.get_active_status()
+        ).select_related('vehicle', 'driver').order_by('-start_time')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get all trips for separation (without pagination)
-        all_trips = self.get_queryset()
+        active_status = self.get_active_status()
+        counts = self.get_status_counts()
         
-        # Separate trips by status
-        ongoing_trips = []
-        completed_trips = []
-        cancelled_trips = []
-        
-        for trip in all_trips:
-            if trip.status == 'ongoing':
-                ongoing_trips.append(trip)
-            elif trip.status == 'completed':
-                completed_trips.append(trip)
-            elif trip.status == 'cancelled':
-                cancelled_trips.append(trip)
-        
-        # Add separated trips to context
-        context['ongoing_trips'] = ongoing_trips
-        context['completed_trips'] = completed_trips
-        context['cancelled_trips'] = cancelled_trips
-        
-        # Add counts
-        context['ongoing_count'] = len(ongoing_trips)
-        context['completed_count'] = len(completed_trips)
-        context['cancelled_count'] = len(cancelled_trips)
+        # Only the active tab's page is loaded; the other sections stay empty
+        page_trips = list(context['trips'])
+        for status, _ in Trip.STATUS_CHOICES:
+            context[f'{status}_trips'] = page_trips if status == active_status else []
+            context[f'{status}_count'] = counts[status]
+        context['active_status'] = active_status
+        context['status_tabs'] = [
+            {'value': status, 'label': label, 'count': counts[status]}
+            for status, label in Trip.STATUS_CHOICES
+        ]
         
         # Add vehicles for filter
         if self.request.user.user_type == 'driver':
             context['vehicles'] = Vehicle.objects.filter(
-                Q(assigned_driver=self.request.user) | 
-                Q(trips__driver=self.request.user)
-            ).distinct()
+                Q(assigned_driver__iexact=self.request.user.get_full_name()) |
+                Exists(Trip.objects.filter(vehicle=OuterRef('pk'), driver=self.request.user))
+            ).order_by('license_plate')
         else:
-            context['vehicles'] = Vehicle.objects.all()
+            context['vehicles'] = Vehicle.objects.order_by('license_plate')
         
         # Add search parameters for maintaining filters in pagination
         search_params = {}
@@ -114,9 +131,10 @@ class TripListView(LoginRequiredMixin, ListView):
             search_params['search'] = self.request.GET.get('search')
         if self.request.GET.get('vehicle'):
             search_params['vehicle'] = self.request.GET.get('vehicle')
-        if self.request.GET.get('status'):
-            search_params['status'] = self.request.GET.get('status')
         
+        # Tab links keep the filters but start again at page 1
+        context['filter_params'] = dict(search_params)
+        search_params['status'] = active_status
         context['search_params'] = search_params
         
         # Add user permissions context
@@ -174,8 +192,12 @@ class TripTrackingView(LoginRequiredMixin, CanDriveVehicleMixin, TemplateView):
         fleet_managers = CustomUser.objects.filter(user_type__in=['manager', 'vehicle_manager'])
         context['fleet_manager'] = fleet_managers.first() if fleet_managers.exists() else None
         
-        # Get nearby fuel stations (could be enhanced with geolocation API)
-        context['fuel_stations'] = True  # Placeholder for actual fuel station data
+        # Stations near the last reported position; the page refreshes them as new positions come in
+        context['station_type'] = 'charging' if trip.vehicle.is_electric() else 'fuel'
+        last_location = trip.locations.order_by('-timestamp').only('latitude', 'longitude').first()
+        context['fuel_stations'] = nearest_stations(
+            last_location.latitude, last_location.longitude, station_type=context['station_type']
+        ) if last_location else []
         
         return context
 
@@ -238,26 +260,29 @@ class StartTripView(LoginRequiredMixin, CanDriveVehicleMixin, CreateView):
             )
             return redirect('trip_list')
         
-        # Set the driver to the current user
-        form.instance.driver = self.request.user
-        form.instance.status = 'ongoing'
-        
-        # Set the start time to the current time
-        form.instance.start_time = timezone.now()
-        
-        # Update vehicle status to 'in_use'
-        vehicle = form.instance.vehicle
-        vehicle.status = 'in_use'
-        vehicle.save()
+        try:
+            self.object = start_trip(
+                vehicle=form.cleaned_data['vehicle'],
+                driver=self.request.user,
+                start_odometer=form.cleaned_data['start_odometer'],
+                origin=form.cleaned_data['origin'],
+                destination=form.cleaned_data['destination'],
+                purpose=form.cleaned_data['purpose'],
+                notes=form.cleaned_data.get('notes', ''),
+            )
+        except ValidationError as e:
+            # Someone else started a trip on this vehicle since the form was loaded
+            messages.error(self.request, ' '.join(e.messages))
+            return self.form_invalid(form)
         
         # Success message with user role indication
         user_role = self.request.user.get_user_type_display()
         messages.success(
             self.request, 
-            f'Trip started successfully by {user_role} from {form.instance.origin} to {form.instance.destination}!'
+            f'Trip started successfully by {user_role} from {self.object.origin} to {self.object.destination}!'
         )
         
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
     
     def form_invalid(self, form):
         messages.error(self.request, 'Please correct the errors below.')
@@ -280,7 +305,7 @@ class EndTripView(LoginRequiredMixin, UpdateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        trip = self.get_object()
+        trip = self.object
         context['trip'] = trip
         
         # Add user role information
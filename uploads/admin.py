@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import ChunkedUpload
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'purpose', 'object_id', 'user', 'offset', 'size', 'created_at', 'completed_at']
+    list_filter = ['purpose']
+    search_fields = ['filename', 'user__username']
+    list_select_related = ['user']
+    readonly_fields = ['id', 'user', 'purpose', 'object_id', 'filename', 'size', 'offset', 'stored_name',
+                       'created_at', 'completed_at']
@@ -0,0 +1,255 @@
+"""
+Resumable uploads of document files, fuel receipts and accident photos.
+
+A client on a poor connection creates an upload (target row, file name and
+length), then sends the file in pieces, each starting at the offset the
+server has (tus-style: PATCH with Upload-Offset). After a dropped
+connection it asks for the current offset and carries on from there.
+
+* The name and declared length are checked against ALLOWED_DOCUMENT_TYPES and
+  MAX_DOCUMENT_SIZE when the upload is created, and the first bytes against
+  the extension's file signature when the first chunk arrives.
+* Chunks are streamed from the request into a .part file under
+  UPLOAD_CHUNK_DIR, UPLOAD_BUFFER_SIZE bytes at a time, with the upload
+  claimed (writing_since) rather than locked, so a slow chunk holds no
+  transaction or row lock open.
+* With the last byte the .part file is moved into storage in one rename (so
+  no half-written file is ever visible under its final name) and attached
+  to the target in the same transaction.
+
+`manage.py purge_uploads` removes uploads left unfinished.
+"""
+import datetime
+import os
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accidents.models import Accident, AccidentImage
+from documents.models import Document
+from fuel.models import FuelTransaction
+from .models import ChunkedUpload
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png']
+
+# Leading bytes of each allowed extension
+SIGNATURES = {
+    'pdf': [b'%PDF-'],
+    'jpg': [b'\xff\xd8\xff'],
+    'jpeg': [b'\xff\xd8\xff'],
+    'png': [b'\x89PNG\r\n\x1a\n'],
+    # Legacy Office files are OLE2 compound files, the XML formats zip archives
+    'doc': [b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'],
+    'xls': [b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'],
+    'docx': [b'PK\x03\x04'],
+    'xlsx': [b'PK\x03\x04'],
+}
+
+
+class OffsetMismatch(Exception):
+    """A chunk didn't start where the upload is; the client should ask for the offset and resume."""
+
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+def is_manager(user):
+    return user.is_staff or getattr(user, 'user_type', None) in ['admin', 'manager', 'vehicle_manager']
+
+
+def allowed_extensions(purpose):
+    allowed = [ext.lower() for ext in settings.ALLOWED_DOCUMENT_TYPES]
+    if purpose == 'document':
+        return allowed
+    return [ext for ext in allowed if ext in IMAGE_EXTENSIONS]
+
+
+def extension(filename):
+    return os.path.splitext(filename)[1].lower()[1:]
+
+
+def get_target(user, purpose, object_id):
+    """The row the upload is for, if `user` may attach files to it."""
+    if purpose == 'document':
+        target = Document.objects.filter(pk=object_id).first()
+        allowed = is_manager(user)
+    elif purpose == 'fuel_receipt':
+        target = FuelTransaction.objects.filter(pk=object_id).first()
+        allowed = target is not None and (is_manager(user) or target.driver_id == user.pk)
+    else:
+        target = Accident.objects.filter(pk=object_id).first()
+        allowed = target is not None and (is_manager(user) or target.driver_id == user.pk)
+    if target is None:
+        raise ValidationError(f"No {dict(ChunkedUpload.PURPOSE_CHOICES)[purpose].lower()} target {object_id}")
+    if not allowed:
+        raise PermissionDenied("You can't attach files to this record.")
+    return target
+
+
+def part_path(upload):
+    return os.path.join(settings.UPLOAD_CHUNK_DIR, f'{upload.pk}.part')
+
+
+def start_upload(user, purpose, object_id, filename, size):
+    """Check the file's name and length against the allowed types, then create the upload."""
+    filename = os.path.basename(filename)
+    if extension(filename) not in allowed_extensions(purpose):
+        raise ValidationError(
+            f'File type not supported. Allowed types: {", ".join(allowed_extensions(purpose))}'
+        )
+    if size <= 0:
+        raise ValidationError('The file is empty.')
+    if size > settings.MAX_DOCUMENT_SIZE:
+        max_size_mb = settings.MAX_DOCUMENT_SIZE / (1024 * 1024)
+        raise ValidationError(f'File size exceeds the maximum allowed size ({max_size_mb} MB).')
+    get_target(user, purpose, object_id)
+
+    upload = ChunkedUpload.objects.create(
+        user=user, purpose=purpose, object_id=object_id, filename=filename, size=size
+    )
+    os.makedirs(settings.UPLOAD_CHUNK_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def check_signature(upload, head):
+    """
+    Check the start of the file, `head`. It is shorter than a signature while
+    only a short first chunk has arrived, and then has to match as far as it goes.
+    """
+    signatures = SIGNATURES.get(extension(upload.filename), [])
+    if signatures and not any(head.startswith(signature) or signature.startswith(head) for signature in signatures):
+        raise ValidationError(f"The file's contents don't look like a .{extension(upload.filename)} file.")
+
+
+def claim(upload_id, user, offset):
+    """
+    Mark the upload as being written from `offset` with one conditional
+    UPDATE and return the upload and the claim's timestamp. A chunk still
+    being written, or one that doesn't start at the upload's offset, gets
+    OffsetMismatch; a claim older than UPLOAD_CLAIM_SECONDS is taken to have
+    died with its request and may be taken over.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=getattr(settings, 'UPLOAD_CLAIM_SECONDS', 900))
+    claimed = ChunkedUpload.objects.filter(
+        Q(writing_since__isnull=True) | Q(writing_since__lt=stale),
+        pk=upload_id, user=user, offset=offset, completed_at__isnull=True,
+    ).update(writing_since=now)
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user=user).first()
+    if upload is None:
+        raise ChunkedUpload.DoesNotExist
+    if not claimed:
+        raise OffsetMismatch(upload.offset)
+    return upload, now
+
+
+def release(upload, claimed_at):
+    ChunkedUpload.objects.filter(pk=upload.pk, writing_since=claimed_at).update(writing_since=None)
+
+
+def append_chunk(upload_id, user, offset, stream):
+    """
+    Append the chunk read from `stream` at `offset` and return the upload.
+
+    The upload is claimed before the chunk is read, so a retried request
+    can't interleave with the original (it gets OffsetMismatch), but no
+    transaction or row lock is held while the bytes arrive. The new offset
+    is committed, and a finished file attached, in a short transaction
+    afterwards.
+    """
+    buffer_size = getattr(settings, 'UPLOAD_BUFFER_SIZE', 64 * 1024)
+    upload, claimed_at = claim(upload_id, user, offset)
+    head_length = max(map(len, SIGNATURES.get(extension(upload.filename), [b''])))
+    try:
+        remaining = upload.size - offset
+        with open(part_path(upload), 'r+b') as part:
+            # The bytes of the signature an earlier, short chunk already brought
+            head = part.read(min(offset, head_length))
+            part.seek(offset)
+            written = 0
+            while True:
+                # One byte past the declared end tells an over-long chunk
+                data = stream.read(min(buffer_size, remaining - written + 1))
+                if not data:
+                    break
+                if len(head) < head_length:
+                    head += data[:head_length - len(head)]
+                    check_signature(upload, head)
+                if written + len(data) > remaining:
+                    part.truncate(offset)
+                    raise ValidationError('The chunk runs past the declared file size.')
+                part.write(data)
+                written += len(data)
+            # Drop whatever an interrupted earlier attempt left past this point
+            part.truncate()
+
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.writing_since != claimed_at:
+                # Taken over by a retry after the claim went stale
+                raise OffsetMismatch(upload.offset)
+            upload.offset += written
+            upload.writing_since = None
+            if upload.offset == upload.size:
+                finish(upload)
+            else:
+                upload.save(update_fields=['offset', 'writing_since'])
+    except BaseException:
+        release(upload, claimed_at)
+        raise
+    return upload
+
+
+class PartFile(File):
+    """The finished .part file; FileSystemStorage moves files with a path instead of copying them."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finish(upload):
+    """Move the complete file into storage and attach it to the target (inside the caller's transaction)."""
+    target = get_target(upload.user, upload.purpose, upload.object_id)
+    if upload.purpose == 'accident_image':
+        target = AccidentImage(accident=target)
+        field_name = 'image'
+    else:
+        field_name = 'file' if upload.purpose == 'document' else 'receipt_image'
+
+    field = target._meta.get_field(field_name)
+    with open(part_path(upload), 'rb') as part:
+        name = field.storage.save(field.generate_filename(target, upload.filename), PartFile(part))
+    setattr(target, field_name, name)
+    if target.pk is None:
+        target.save()
+    else:
+        target.save(update_fields=[field_name])
+
+    upload.stored_name = name
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['offset', 'writing_since', 'stored_name', 'completed_at'])
+
+
+def cancel(upload):
+    if not upload.completed and os.path.exists(part_path(upload)):
+        os.remove(part_path(upload))
+    upload.delete()
+
+
+def purge(older_than=None):
+    """Remove unfinished uploads (and their .part files) started more than UPLOAD_EXPIRY_HOURS ago."""
+    hours = older_than if older_than is not None else getattr(settings, 'UPLOAD_EXPIRY_HOURS', 24)
+    stale = ChunkedUpload.objects.filter(
+        completed_at__isnull=True, created_at__lt=timezone.now() - datetime.timedelta(hours=hours)
+    )
+    purged = 0
+    for upload in stale.iterator():
+        cancel(upload)
+        purged += 1
+    return purged
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from uploads.chunked import purge
+
+
+class Command(BaseCommand):
+    help = 'Remove resumable uploads that were never finished (schedule daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Age in hours after which an unfinished upload is removed (default UPLOAD_EXPIRY_HOURS)'
+        )
+
+    def handle(self, *args, **options):
+        purged = purge(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {purged} unfinished uploads"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:27
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('document', 'Document file'), ('fuel_receipt', 'Fuel receipt'), ('accident_image', 'Accident photo')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(help_text="The document, fuel transaction or accident it's for")),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(help_text='Declared length in bytes')),
+                ('offset', models.PositiveBigIntegerField(default=0, help_text='Bytes received so far')),
+                ('stored_name', models.CharField(blank=True, help_text='Storage name once finished', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['completed_at', 'created_at'], name='uploads_chu_complet_bcfac7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='writing_since',
+            field=models.DateTimeField(blank=True, help_text='When the chunk being written now started', null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file sent in pieces (uploads/chunked.py). The bytes received so far are
+    kept in a .part file; once `offset` reaches `size` the file is moved into
+    place and attached to its target row.
+    """
+    PURPOSE_CHOICES = (
+        ('document', 'Document file'),
+        ('fuel_receipt', 'Fuel receipt'),
+        ('accident_image', 'Accident photo'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    object_id = models.PositiveBigIntegerField(help_text="The document, fuel transaction or accident it's for")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Declared length in bytes")
+    offset = models.PositiveBigIntegerField(default=0, help_text="Bytes received so far")
+    writing_since = models.DateTimeField(null=True, blank=True, help_text="When the chunk being written now started")
+    stored_name = models.CharField(max_length=255, blank=True, help_text="Storage name once finished")
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Purging unfinished uploads by age
+            models.Index(fields=['completed_at', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+    
+    @property
+    def completed(self):
+        return self.completed_at is not None
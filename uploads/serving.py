@@ -0,0 +1,141 @@
+"""
+Access-controlled downloads of uploaded files: document files, fuel
+receipts, maintenance invoices and accident photos.
+
+Pages and API responses link these through /files/<kind>/<pk>/ (file_url(),
+or variant_url() for image variants) instead of MEDIA_URL. The view checks
+the user may see the row (a manager, or its driver / reporter), then:
+
+* PROTECTED_MEDIA_SERVER = 'nginx'    - answers with X-Accel-Redirect to
+  PROTECTED_MEDIA_INTERNAL_URL, an `internal` nginx location over MEDIA_ROOT
+* PROTECTED_MEDIA_SERVER = 'sendfile' - answers with X-Sendfile (Apache
+  mod_xsendfile, lighttpd) and the file's path
+* otherwise                           - streams the file itself, honouring
+  single byte Range requests
+
+Either way the worker never holds the file in memory; with a front-end
+server it doesn't even read it.
+"""
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+Protected = namedtuple('Protected', 'model field owner')
+
+
+def _drives(user, vehicle):
+    # assigned_driver holds a name; matched without case like the rest of the driver scoping
+    name = user.get_full_name()
+    return bool(name) and (vehicle.assigned_driver or '').casefold() == name.casefold()
+
+
+# URL kind -> model, file field and who besides managers may download it
+PROTECTED_FILES = {
+    'document': Protected('documents.Document', 'file', lambda user, obj: _drives(user, obj.vehicle)),
+    'fuel-receipt': Protected('fuel.FuelTransaction', 'receipt_image', lambda user, obj: obj.driver_id == user.pk),
+    'maintenance-invoice': Protected('maintenance.Maintenance', 'invoice_image', lambda user, obj: obj.reported_by_id == user.pk),
+    'accident-image': Protected('accidents.AccidentImage', 'image', lambda user, obj: obj.accident.driver_id == user.pk),
+}
+_kinds = {(protected.model.lower(), protected.field): kind for kind, protected in PROTECTED_FILES.items()}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def protected_kind(field_file):
+    """The PROTECTED_FILES kind of an uploaded file, or None if it's public media."""
+    return _kinds.get((field_file.instance._meta.label_lower, field_file.field.name))
+
+
+def protected_url(field_file, variant=None):
+    """The download URL of a protected file (or of its image variant), or None for public media."""
+    kind = protected_kind(field_file)
+    if kind is None or field_file.instance.pk is None:
+        return None
+    url = reverse('protected_file', args=[kind, field_file.instance.pk])
+    return f'{url}?variant={variant}' if variant else url
+
+
+def file_url(field_file):
+    """Where to link an uploaded file: the protected download URL, or MEDIA_URL for public media."""
+    if not field_file:
+        return ''
+    return protected_url(field_file) or field_file.url
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single byte range, inclusive; None to send the whole
+    file (no or unsupported header, e.g. several ranges). ValueError if the
+    range can't be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(file, start, length, block_size):
+    with file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve(request, storage, name, filename):
+    """Hand `name` in `storage` to the front-end server, or stream it (with Range support)."""
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+    if server in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if server == 'nginx':
+            response['X-Accel-Redirect'] = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/') + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+    else:
+        try:
+            size = storage.size(name)
+        except FileNotFoundError:
+            raise Http404(name)
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = storage.open(name, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file, start, end - start + 1, FileResponse.block_size),
+                status=206, content_type=content_type,
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(os.path.basename(filename))}"
+    # Shared caches must not keep a permission-checked file
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
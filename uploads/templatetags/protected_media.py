@@ -0,0 +1,11 @@
+from django import template
+
+from uploads.serving import file_url
+
+register = template.Library()
+
+
+@register.filter
+def media_url(field_file):
+    """Link to an uploaded file, through the permission-checked download for protected ones: {{ document.file|media_url }}"""
+    return file_url(field_file)
@@ -0,0 +1,225 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from accidents.models import Accident
+from accounts.models import CustomUser
+from documents.models import Document, DocumentType
+from fuel.models import FuelTransaction
+from vehicles.models import Vehicle, VehicleType
+from .models import ChunkedUpload
+
+PDF = b'%PDF-1.4\n' + b'scanned page ' * 2000
+
+
+def jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ChunkedUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_user('manager', 'manager@example.com', 'pw', user_type='manager')
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+        cls.document = Document.objects.create(
+            vehicle=vehicle, document_type=DocumentType.objects.create(name='Permit'), document_number='P-1',
+            issue_date=datetime.date(2025, 1, 1), expiry_date=datetime.date(2030, 1, 1), issuing_authority='RTO',
+        )
+        cls.accident = Accident.objects.create(
+            vehicle=vehicle, driver=cls.driver, date_time=timezone.now(), location='Junction',
+            description='Minor scrape', damage_description='Bumper',
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root, UPLOAD_CHUNK_DIR=os.path.join(media_root, 'partial_uploads'),
+            UPLOAD_BUFFER_SIZE=1024, IMAGE_PIPELINE_WORKERS=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def login(self, user):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.get_or_create(user=user)[0].key}'
+
+    def start(self, purpose, object_id, filename, size):
+        return self.client.post(
+            '/api/v1/uploads/',
+            {'purpose': purpose, 'object_id': object_id, 'filename': filename, 'size': size},
+            content_type='application/json',
+        )
+
+    def send(self, upload_id, offset, data):
+        return self.client.patch(
+            f'/api/v1/uploads/{upload_id}/', data,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_resumes_from_the_server_offset_and_attaches_the_file(self):
+        self.login(self.manager)
+        response = self.start('document', self.document.pk, '../scan.pdf', len(PDF))
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+
+        self.assertEqual(self.send(upload_id, 0, PDF[:10000])['Upload-Offset'], '10000')
+        # A retry of a chunk that already arrived is refused with the offset to resume from
+        response = self.send(upload_id, 0, PDF[:10000])
+        self.assertEqual((response.status_code, response['Upload-Offset']), (409, '10000'))
+        self.assertEqual(self.client.head(f'/api/v1/uploads/{upload_id}/')['Upload-Offset'], '10000')
+        self.assertFalse(Document.objects.get(pk=self.document.pk).file)
+
+        response = self.send(upload_id, 10000, PDF[10000:])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['completed'])
+        document = Document.objects.get(pk=self.document.pk)
+        self.assertEqual(document.file.name, 'vehicle_documents/scan.pdf')
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), PDF)
+        self.assertEqual(os.listdir(os.path.join(document.file.storage.location, 'partial_uploads')), [])
+
+    def test_type_and_size_are_checked_before_the_bytes_are_kept(self):
+        self.login(self.manager)
+        self.assertEqual(self.start('document', self.document.pk, 'scan.exe', 100).status_code, 400)
+        self.assertEqual(self.start('document', self.document.pk, 'scan.pdf', 11 * 1024 * 1024).status_code, 400)
+        self.assertEqual(self.start('fuel_receipt', 999, 'receipt.jpg', 100).status_code, 400)
+
+        upload_id = self.start('document', self.document.pk, 'scan.pdf', len(PDF)).json()['id']
+        self.assertEqual(self.send(upload_id, 0, b'MZ' + PDF[2:100]).status_code, 400)
+        self.assertEqual(self.send(upload_id, 0, PDF + b'extra').status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload_id).offset, 0)
+
+        self.assertEqual(self.client.delete(f'/api/v1/uploads/{upload_id}/').status_code, 204)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_short_first_chunks_and_chunks_still_being_written(self):
+        self.login(self.manager)
+        upload_id = self.start('document', self.document.pk, 'scan.pdf', len(PDF)).json()['id']
+        # Fewer bytes than the signature are checked as far as they go, the rest by the next chunk
+        self.assertEqual(self.send(upload_id, 0, PDF[:3])['Upload-Offset'], '3')
+        self.assertEqual(self.send(upload_id, 3, b'XX' + PDF[5:100]).status_code, 400)
+        self.assertEqual(self.send(upload_id, 3, PDF[3:100])['Upload-Offset'], '100')
+
+        # Another request is still writing a chunk...
+        ChunkedUpload.objects.filter(pk=upload_id).update(writing_since=timezone.now())
+        self.assertEqual(self.send(upload_id, 100, PDF[100:]).status_code, 409)
+        # ...until its claim is too old for it to be alive
+        ChunkedUpload.objects.filter(pk=upload_id).update(writing_since=timezone.now() - datetime.timedelta(hours=1))
+        self.assertTrue(self.send(upload_id, 100, PDF[100:]).json()['completed'])
+        with Document.objects.get(pk=self.document.pk).file.open('rb') as stored:
+            self.assertEqual(stored.read(), PDF)
+
+    def test_drivers_attach_photos_to_their_own_accidents_only(self):
+        self.login(self.driver)
+        self.assertEqual(self.start('document', self.document.pk, 'scan.pdf', len(PDF)).status_code, 403)
+
+        photo = jpeg()
+        upload_id = self.start('accident_image', self.accident.pk, 'dent.jpg', len(photo)).json()['id']
+        self.assertEqual(self.send(upload_id, 0, photo).status_code, 200)
+        self.assertEqual(self.accident.images.get().image.name, 'accident_images/dent.jpg')
+
+        # Uploads are only visible to the user who started them
+        self.login(self.manager)
+        self.assertEqual(self.client.get(f'/api/v1/uploads/{upload_id}/').status_code, 404)
+
+
+class ProtectedFileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_user('manager', 'manager@example.com', 'pw', user_type='manager')
+        cls.driver, cls.other = [
+            CustomUser.objects.create_user(
+                username, f'{username}@example.com', 'pw', user_type='driver', approval_status='approved'
+            )
+            for username in ['driver', 'other']
+        ]
+        vehicle_type = VehicleType.objects.create(name='Car', category='personal')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1),
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_PIPELINE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.document = Document.objects.create(
+            vehicle=self.vehicle, document_type=DocumentType.objects.create(name='Permit'), document_number='P-1',
+            issue_date=datetime.date(2025, 1, 1), expiry_date=datetime.date(2030, 1, 1), issuing_authority='RTO',
+        )
+        self.document.file.save('permit.pdf', ContentFile(PDF))
+        self.url = f'/files/document/{self.document.pk}/'
+
+    def test_streams_the_file_and_single_byte_ranges(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-9')
+        self.assertEqual((response.status_code, response['Content-Range']), (206, f'bytes 5-9/{len(PDF)}'))
+        self.assertEqual(b''.join(response.streaming_content), PDF[5:10])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), PDF[-4:])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE=f'bytes={len(PDF)}-').status_code, 416)
+
+    def test_only_managers_and_the_owner_may_download(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.force_login(self.driver)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        transaction = FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, date=datetime.date(2025, 1, 1), fuel_type='Petrol',
+            quantity=10, cost_per_liter=100, total_cost=1000, odometer_reading=1000,
+        )
+        transaction.receipt_image.save('receipt.jpg', ContentFile(jpeg()))
+        url = f'/files/fuel-receipt/{transaction.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.get_or_create(user=self.driver)[0].key}'
+        self.client.logout()
+        response = self.client.get(f'/api/v1/fuel-transactions/{transaction.pk}/')
+        self.assertEqual(response.json()['receipt_image'], f'http://testserver{url}')
+
+    def test_assigned_driver_may_download_vehicle_documents(self):
+        self.driver.first_name, self.driver.last_name = 'Ravi', 'Kumar'
+        self.driver.save()
+        self.vehicle.assigned_driver = 'RAVI KUMAR'
+        self.vehicle.save()
+        self.client.force_login(self.driver)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx')
+    def test_hands_the_file_to_nginx(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/vehicle_documents/permit.pdf')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,8 @@
+from django.urls import path
+from django.views.decorators.clickjacking import xframe_options_sameorigin
+from .views import ProtectedFileView
+
+urlpatterns = [
+    # Same-origin framing for the PDF preview on the document page
+    path('<slug:kind>/<int:pk>/', xframe_options_sameorigin(ProtectedFileView.as_view()), name='protected_file'),
+]
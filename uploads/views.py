@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.http import Http404
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+
+from api.permissions import IsActiveUser
+from images.pipeline import variant_name, variant_sizes
+from .chunked import is_manager
+from .serving import PROTECTED_FILES, serve
+
+
+class ProtectedFileView(APIView):
+    """
+    Download a protected file, to managers and the row's own driver/reporter.
+    ?variant=thumb|web serves an image's resized variant once it exists.
+    Token authentication too, so the mobile app can load receipts and photos.
+    """
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsActiveUser]
+
+    def get(self, request, kind, pk):
+        protected = PROTECTED_FILES.get(kind)
+        if protected is None:
+            raise Http404
+        obj = apps.get_model(protected.model)._default_manager.filter(pk=pk).first()
+        if obj is None:
+            raise Http404
+        if not (is_manager(request.user) or protected.owner(request.user, obj)):
+            raise PermissionDenied("You can't view this file.")
+        field_file = getattr(obj, protected.field)
+        if not field_file:
+            raise Http404
+
+        name = field_file.name
+        variant = request.query_params.get('variant')
+        if variant in variant_sizes() and field_file.storage.exists(variant_name(name, variant)):
+            name = variant_name(name, variant)
+        return serve(request, field_file.storage, name, name)
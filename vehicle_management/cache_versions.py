@@ -0,0 +1,27 @@
+"""
+Version numbers kept in the cache, for data cached under keys (or in
+process memory) that can't be deleted one by one: readers put the version
+in their keys, writers bump it and every older copy is ignored.
+
+With the default per-process LocMemCache a bump only reaches the process
+that made it, so every user of these also caps how long a copy is trusted
+(see their *_CACHE_TIMEOUT / *_MAX_AGE settings). Configure a shared cache
+(Redis, Memcached) in CACHES for bumps to reach every worker at once.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """The current version under `key`."""
+    # A fresh number if the key was evicted, so no one mistakes it for a version they cached under
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def bump_version(key):
+    """Make every copy cached under an older version of `key` stale."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,94 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('vehicle_management.queries')
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that records every query run while it is installed.
+    Works with DEBUG off, unlike connection.queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are left out so N+1 lookups collapse into one statement
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """{sql: times_run} for statements run more than once."""
+        return {sql: n for sql, n in self.statements.items() if n > 1}
+
+    @property
+    def duplicate_count(self):
+        """Number of executions that repeated an earlier statement."""
+        return sum(n - 1 for n in self.duplicates.values())
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, duplicate SQL and DB time for each request.
+
+    Every request is logged to the 'vehicle_management.queries' logger as a
+    JSON line; requests over QUERY_COUNT_WARNING_THRESHOLD queries are logged
+    as warnings. With DEBUG on the numbers are also sent as X-DB-* response
+    headers so they show up in the browser's network tab.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.warning_threshold = getattr(settings, 'QUERY_COUNT_WARNING_THRESHOLD', 50)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+        request.query_stats = recorder
+
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(recorder.count)
+            response['X-DB-Duplicate-Queries'] = str(recorder.duplicate_count)
+            response['X-DB-Time-Ms'] = f"{db_ms:.1f}"
+
+        level = logging.WARNING if recorder.count > self.warning_threshold else logging.INFO
+        if logger.isEnabledFor(level):
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'duplicate_queries': recorder.duplicate_count,
+                'db_ms': round(db_ms, 1),
+                'total_ms': round(total_ms, 1),
+            }
+            if recorder.duplicates:
+                # The worst offenders are usually enough to find the N+1
+                worst = sorted(recorder.duplicates.items(), key=lambda item: -item[1])[:3]
+                record['top_duplicates'] = [{'sql': sql[:200], 'count': n} for sql, n in worst]
+            logger.log(level, json.dumps(record))
+
+        return response
@@ -74,10 +74,15 @@ INSTALLED_APPS = [
     'accidents',
     'reports',
     'api',  # Added for mobile app API
+    'search',  # Full-text search documents
+    'images',  # EXIF stripping and resized variants of uploaded photos
+    'uploads',  # Resumable chunked uploads of documents, receipts and accident photos
 ]
 
 MIDDLEWARE = [
+    'vehicle_management.middleware.QueryInstrumentationMiddleware',  # Outermost so it sees every query
     'corsheaders.middleware.CorsMiddleware',  # Add this at the top
+    'api.middleware.APICompressionMiddleware',  # gzip/brotli for /api/ responses
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -339,7 +344,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -347,6 +352,17 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.FormParser',
     ],
 }
+# API response compression (api.middleware.APICompressionMiddleware)
+API_COMPRESSION_PATH_PREFIX = '/api/'
+API_COMPRESSION_MIN_SIZE = 1024  # Bytes - smaller responses are sent as-is
+API_COMPRESSION_BROTLI_QUALITY = 5  # 0-11, higher is smaller but slower
+
+# Mobile bootstrap endpoint (/api/v1/bootstrap/)
+# Payloads are invalidated by signals; with the default per-process cache the
+# timeout bounds how stale another worker's copy can get.
+API_BOOTSTRAP_CACHE_TIMEOUT = 60  # Seconds
+API_BOOTSTRAP_RECENT_FUEL_COUNT = 10
+
 # Token authentication settings
 TOKEN_EXPIRY_DAYS = 7  # Token expiry in days
 
@@ -419,7 +435,16 @@ CSRF_TRUSTED_ORIGINS = [
 
 # StyleHR API Configuration
 STYLEHR_API_URL = 'https://stylehr.in/api/login/'
-STYLEHR_API_TIMEOUT = 30  # seconds
+# Connect and read timeouts of a login call, in seconds
+STYLEHR_CONNECT_TIMEOUT = 3
+STYLEHR_READ_TIMEOUT = 8
+# Keep-alive connections kept open to StyleHR per process
+STYLEHR_POOL_SIZE = 10
+# Failures in a row that open the circuit, and how long it stays open (seconds)
+STYLEHR_FAILURE_THRESHOLD = 5
+STYLEHR_RESET_SECONDS = 30
+# How long accepted credentials are trusted without asking StyleHR again (seconds, 0 to disable)
+STYLEHR_VERIFICATION_CACHE_SECONDS = 300
 
 
 LOGGING = {
@@ -471,6 +496,57 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 REQUESTS_TIMEOUT = 30
 REQUESTS_VERIFY_SSL = True  # Set to False only for development with self-signed certificates
 
+# Query instrumentation (vehicle_management.middleware.QueryInstrumentationMiddleware)
+QUERY_COUNT_WARNING_THRESHOLD = 50  # Requests running more queries are logged as warnings
+
+# Full-text search (search.index)
+SEARCH_MAX_RESULTS = 1000  # Most matches a search returns, best first
+SEARCH_MIN_WORD_LENGTH = 3  # Keep in line with MySQL's innodb_ft_min_token_size
+
+# Odometer consistency checks (vehicles.odometer, manage.py check_odometers)
+ODOMETER_MAX_SPEED_KMH = 150  # Faster implied speeds between readings are impossible jumps
+ODOMETER_UNTRACKED_KM = 50  # Distance covered outside any trip before it is reported
+ODOMETER_REGRESSION_TOLERANCE_KM = 0
+
+# Fuel efficiency (fuel.efficiency, manage.py rebuild_fuel_efficiency)
+FUEL_EFFICIENCY_WINDOW = 5  # Recent fills averaged for a vehicle's current efficiency
+
+# Nearest-station grid (fuel.proximity) and document expiry counts (documents.stats)
+# Writes are signalled through a version number in the cache; with the default
+# per-process cache these bound how stale another worker's copy can get.
+FUEL_STATION_GRID_MAX_AGE = 300  # Seconds
+DOCUMENT_STATS_CACHE_TIMEOUT = 300  # Seconds
+
+# Uploaded photo variants (images.pipeline, manage.py process_images)
+IMAGE_THUMBNAIL_SIZE = 240  # Square thumbnails for lists and avatars, in px
+IMAGE_WEB_SIZE = 1280  # Longest side of the variant shown on detail pages
+IMAGE_JPEG_QUALITY = 85
+IMAGE_PIPELINE_WORKERS = 2  # Background threads per process; 0 processes inline after commit
+IMAGE_UNPROCESSED_RECHECK_SECONDS = 60  # How long pages link an image's original before asking storage again for its variants
+
+# Fuel anomaly scan (fuel.anomalies, manage.py scan_fuel_anomalies)
+FUEL_ANOMALY_CAPACITY_TOLERANCE = 0.05  # Fraction over the tank/battery capacity allowed
+FUEL_ANOMALY_PRICE_TOLERANCE = 0.1  # Fraction a unit price may differ from the station's median that day
+FUEL_ANOMALY_ZSCORE = 3.0  # Efficiency outliers, against the vehicle's other fills
+FUEL_ANOMALY_MIN_FILLS = 5  # Fills a vehicle needs before its efficiency is scored
+FUEL_ANOMALY_DUPLICATE_KM = 10  # Same-day fills this close on the odometer are possible duplicates
+
+# Accident hotspots (accidents.hotspots, /api/v1/accident-hotspots/, manage.py rebuild_hotspots)
+HOTSPOT_RADIUS_METERS = 250  # Accidents this close are neighbours
+HOTSPOT_MIN_ACCIDENTS = 3  # Neighbours (itself included) that make an accident a hotspot core
+HOTSPOT_TILE_PRECISION = 6  # Geohash characters per heatmap tile; 6 is about 1.2 x 0.6 km
+
+# Resumable uploads (uploads.chunked, /api/v1/uploads/, manage.py purge_uploads)
+# Outside MEDIA_ROOT so partial files are never served, but on the same filesystem, so finishing is a rename
+UPLOAD_CHUNK_DIR = os.path.join(BASE_DIR, 'partial_uploads')
+UPLOAD_BUFFER_SIZE = 64 * 1024  # Bytes read from the request at a time
+UPLOAD_EXPIRY_HOURS = 24  # Unfinished uploads older than this are purged
+UPLOAD_CLAIM_SECONDS = 900  # A chunk still being written after this is taken to have died; a retry may take over
+
+# Protected media (uploads.serving, /files/)
+PROTECTED_MEDIA_SERVER = None  # 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile) or None to stream from Django
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'  # nginx `internal` location aliased to MEDIA_ROOT
+
 # Notification settings
 DRIVER_APPROVAL_NOTIFICATIONS = True
 DEFAULT_FROM_EMAIL = 'noreply@yourvms.com'
@@ -513,6 +589,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Per-request query stats from QueryInstrumentationMiddleware
+        'vehicle_management.queries': {
+            'handlers': ['console'],
+            'level': 'INFO' if DEBUG else 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,413 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accidents.models import Accident
+from accounts.models import CustomUser
+from dashboard.models import Notification
+from documents.models import Document, DocumentType, ExpiryEntry
+from fuel.models import FuelStation, FuelTransaction
+from geolocation.models import LocationLog
+from maintenance.models import Maintenance, MaintenanceProvider, MaintenanceType
+from trips.models import Trip
+from vehicles.models import Vehicle, VehicleType
+from .cache_versions import bump_version, get_version
+
+VEHICLE_COUNT = 12
+TRIPS_PER_VEHICLE = 3
+
+
+def walk_routes(patterns, prefix=''):
+    """Yield (route, name) for every URL pattern reachable from `patterns`."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from walk_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.name
+
+
+# Routes that are deliberately not budgeted, with the reason why.
+SKIPPED_ROUTES = {
+    'accounts/logout/': 'POST-only, ends the session',
+    'accounts/password_change/': 'stock django.contrib.auth view',
+    'accounts/password_change/done/': 'stock django.contrib.auth view',
+    'accounts/password_reset/': 'stock django.contrib.auth view',
+    'accounts/password_reset/done/': 'stock django.contrib.auth view',
+    'accounts/reset/<uidb64>/<token>/': 'stock django.contrib.auth view',
+    'accounts/reset/done/': 'stock django.contrib.auth view',
+    # Broken independently of query counts; budget them once they render
+    'accounts/drivers/<int:driver_id>/approve/': 'view does not accept the driver_id URL kwarg',
+    'accounts/drivers/<int:driver_id>/toggle-status/': 'view does not accept the driver_id URL kwarg',
+    'vehicles/<int:pk>/delete/': 'vehicles/vehicle_confirm_delete.html does not exist',
+    'maintenance/<int:pk>/delete/': 'maintenance/maintenance_confirm_delete.html does not exist',
+    'accidents/<int:pk>/delete/': 'accidents/accident_confirm_delete.html does not exist',
+}
+
+# Routes whose only difference from a budgeted route is a trailing format suffix.
+FORMAT_SUFFIX_MARKERS = (r'\.(?P<format>', '<drf_format_suffix:format>')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STYLEHR_API_URL='',
+)
+class QueryBudgetTests(TestCase):
+    """
+    Every page and API endpoint in vehicle_management/urls.py must stay under
+    a fixed number of queries against a seeded fleet. The dataset is large
+    enough that a per-row query in any list blows the budget, so a new N+1
+    fails here rather than in production.
+
+    Counts come from QueryInstrumentationMiddleware and include the session,
+    user and approval-check queries every request pays.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        today = now.date()
+
+        cls.admin = CustomUser.objects.create_user(
+            'admin', 'admin@example.com', 'pw', user_type='admin',
+            first_name='Ada', last_name='Admin',
+        )
+        cls.manager = CustomUser.objects.create_user(
+            'manager', 'manager@example.com', 'pw', user_type='manager',
+            first_name='Max', last_name='Manager',
+        )
+        cls.vehicle_manager = CustomUser.objects.create_user(
+            'fleet', 'fleet@example.com', 'pw', user_type='vehicle_manager',
+            first_name='Fay', last_name='Fleet',
+        )
+        cls.driver = CustomUser.objects.create_user(
+            'driver', 'driver@example.com', 'pw', user_type='driver',
+            first_name='Dan', last_name='Driver', approval_status='approved',
+            license_number='KL-123', license_expiry=today + datetime.timedelta(days=365),
+        )
+        cls.pending_driver = CustomUser.objects.create_user(
+            'pending', 'pending@example.com', 'pw', user_type='driver',
+            first_name='Pat', last_name='Pending', approval_status='pending',
+        )
+        cls.driver_token = Token.objects.create(user=cls.driver)
+
+        car = VehicleType.objects.create(name='Car', category='car')
+        ev = VehicleType.objects.create(name='EV', category='electric')
+        cls.vehicle_type = car
+
+        station = FuelStation.objects.create(
+            name='Central Fuels', address='MG Road', latitude=10, longitude=76,
+        )
+        FuelStation.objects.create(
+            name='Charge Point', address='Ring Road', latitude=10.1, longitude=76.1,
+            station_type='charging',
+        )
+        cls.station = station
+
+        insurance = DocumentType.objects.create(name='Insurance', required=True)
+        pollution = DocumentType.objects.create(name='Pollution', required=True)
+        cls.document_type = insurance
+
+        oil_change = MaintenanceType.objects.create(name='Oil Change')
+        cls.maintenance_type = oil_change
+        cls.provider = MaintenanceProvider.objects.create(name='City Garage', address='NH 66')
+
+        vehicles = []
+        for i in range(VEHICLE_COUNT):
+            electric = i % 4 == 0
+            vehicle = Vehicle.objects.create(
+                vehicle_type=ev if electric else car,
+                make='Tata' if electric else 'Maruti',
+                model='Nexon EV' if electric else 'Swift',
+                year=2021,
+                license_plate=f'KL-07-{i:04d}',
+                vin=f'VIN{i:014d}',
+                color='white',
+                acquisition_date=datetime.date(2021, 1, 1),
+                assigned_driver=cls.driver.get_full_name() if i % 3 == 0 else '',
+                current_odometer=1000,
+            )
+            vehicles.append(vehicle)
+
+            for j in range(TRIPS_PER_VEHICLE):
+                start = now - datetime.timedelta(days=j + 1, hours=i)
+                Trip.objects.create(
+                    vehicle=vehicle, driver=cls.driver, start_time=start,
+                    end_time=start + datetime.timedelta(hours=2),
+                    start_odometer=100 * j, end_odometer=100 * j + 40,
+                    origin='Depot', destination='Site', purpose='Delivery', status='completed',
+                )
+
+            FuelTransaction.objects.create(
+                vehicle=vehicle, driver=cls.driver, fuel_station=station,
+                date=today - datetime.timedelta(days=i % 7),
+                fuel_type='Electric' if electric else 'Petrol',
+                quantity=None if electric else Decimal('20'),
+                cost_per_liter=None if electric else Decimal('100'),
+                energy_consumed=Decimal('30') if electric else None,
+                cost_per_kwh=Decimal('10') if electric else None,
+                total_cost=Decimal('300') if electric else Decimal('2000'),
+                odometer_reading=1000,
+            )
+
+            Maintenance.objects.create(
+                vehicle=vehicle, maintenance_type=oil_change, provider=cls.provider,
+                reported_by=cls.vehicle_manager, date_reported=today - datetime.timedelta(days=i),
+                description='Routine service', odometer_reading=1000,
+                status='scheduled' if i % 2 else 'completed',
+                scheduled_date=today + datetime.timedelta(days=i % 5),
+                cost=Decimal('1500'),
+            )
+
+            for document_type, days in ((insurance, 200), (pollution, 10 - i)):
+                Document.objects.create(
+                    vehicle=vehicle, document_type=document_type,
+                    document_number=f'{document_type.name[:3]}-{i}',
+                    issue_date=today - datetime.timedelta(days=100),
+                    expiry_date=today + datetime.timedelta(days=days),
+                    issuing_authority='RTO',
+                )
+
+            Accident.objects.create(
+                vehicle=vehicle, driver=cls.driver,
+                date_time=now - datetime.timedelta(days=i + 1),
+                location='Junction', description='Minor scrape', damage_description='Bumper',
+                status='reported' if i % 2 else 'resolved',
+            )
+
+        cls.vehicle = vehicles[1]
+        cls.ongoing_trip = Trip.objects.create(
+            vehicle=vehicles[3], driver=cls.driver, start_time=now - datetime.timedelta(hours=1),
+            start_odometer=1000, origin='Depot', destination='Airport', purpose='Pickup',
+        )
+        cls.trip = Trip.objects.filter(status='completed').first()
+        cls.fuel_transaction = FuelTransaction.objects.first()
+        cls.maintenance = Maintenance.objects.first()
+        cls.document = Document.objects.first()
+        cls.expiry_entry = ExpiryEntry.objects.filter(vehicle=vehicles[0]).first()
+        cls.accident = Accident.objects.first()
+
+        for i in range(5):
+            LocationLog.objects.create(
+                trip=cls.ongoing_trip, latitude=Decimal('10.0') + i, longitude=Decimal('76.0') + i,
+            )
+        cls.location_log = LocationLog.objects.first()
+
+        for user in (cls.admin, cls.manager, cls.vehicle_manager, cls.driver):
+            for i in range(5):
+                Notification.objects.create(user=user, text=f'Notice {i}', read=i % 2 == 0)
+
+    def budgets(self):
+        """
+        (route, path, user, budget) for every budgeted route. `user` is the
+        attribute name of the seeded user to log in as, or 'token' for the
+        mobile API's token authentication. Budgets are the measured count plus
+        a little headroom; lower them when a view gets cheaper.
+        """
+        trip = self.trip.pk
+        vehicle = self.vehicle.pk
+        return [
+            # Dashboard
+            ('', '/', 'admin', 39),
+            ('', '/', 'vehicle_manager', 33),
+            ('', '/', 'driver', 28),
+
+            # Accounts
+            ('accounts/login/', '/accounts/login/', None, 2),
+            ('accounts/notifications/data/', '/accounts/notifications/data/', 'driver', 4),
+            ('accounts/pending-approval/', '/accounts/pending-approval/', 'pending_driver', 5),
+            ('accounts/access-rejected/', '/accounts/access-rejected/', 'pending_driver', 4),
+            ('accounts/pending-employees/', '/accounts/pending-employees/', 'manager', 11),
+            ('accounts/all-employees/', '/accounts/all-employees/', 'manager', 15),
+            ('accounts/employees/<int:employee_id>/approve/',
+             f'/accounts/employees/{self.pending_driver.pk}/approve/', 'manager', 9),
+            ('accounts/employees/<int:employee_id>/toggle-status/',
+             f'/accounts/employees/{self.pending_driver.pk}/toggle-status/', 'manager', 4),
+            ('accounts/pending-drivers/', '/accounts/pending-drivers/', 'manager', 11),
+            ('accounts/all-drivers/', '/accounts/all-drivers/', 'manager', 15),
+            ('accounts/users/', '/accounts/users/', 'admin', 9),
+            ('accounts/users/add/', '/accounts/users/add/', 'admin', 8),
+            ('accounts/users/<int:pk>/edit/', f'/accounts/users/{self.driver.pk}/edit/', 'admin', 9),
+            ('accounts/users/<int:pk>/', f'/accounts/users/{self.driver.pk}/', 'admin', 9),
+            ('accounts/users/<int:pk>/deactivate/',
+             f'/accounts/users/{self.pending_driver.pk}/deactivate/', 'admin', 4),
+            ('accounts/profile/', '/accounts/profile/', 'driver', 5),
+
+            # Vehicles
+            ('vehicles/', '/vehicles/', 'admin', 16),
+            ('vehicles/<int:pk>/', f'/vehicles/{vehicle}/', 'admin', 25),
+            ('vehicles/add/', '/vehicles/add/', 'admin', 10),
+            ('vehicles/<int:pk>/edit/', f'/vehicles/{vehicle}/edit/', 'admin', 11),
+            ('vehicles/types/', '/vehicles/types/', 'admin', 13),
+            ('vehicles/types/add/', '/vehicles/types/add/', 'admin', 8),
+            ('vehicles/types/<int:pk>/edit/', f'/vehicles/types/{self.vehicle_type.pk}/edit/', 'admin', 13),
+            ('vehicles/import/', '/vehicles/import/', 'admin', 8),
+            ('vehicles/api/<int:vehicle_id>/details/', f'/vehicles/api/{vehicle}/details/', 'admin', 6),
+
+            # Trips
+            ('trips/', '/trips/', 'admin', 11),
+            ('trips/', '/trips/', 'driver', 8),
+            ('trips/<int:pk>/', f'/trips/{trip}/', 'admin', 15),
+            ('trips/start/', '/trips/start/', 'driver', 8),
+            ('trips/<int:pk>/end/', f'/trips/{self.ongoing_trip.pk}/end/', 'driver', 10),
+            ('trips/<int:pk>/track/', f'/trips/{self.ongoing_trip.pk}/track/', 'driver', 13),
+
+            # Maintenance
+            ('maintenance/', '/maintenance/', 'admin', 17),
+            ('maintenance/<int:pk>/', f'/maintenance/{self.maintenance.pk}/', 'admin', 14),
+            ('maintenance/add/', '/maintenance/add/', 'admin', 11),
+            ('maintenance/<int:pk>/edit/', f'/maintenance/{self.maintenance.pk}/edit/', 'admin', 12),
+            ('maintenance/types/', '/maintenance/types/', 'admin', 9),
+            ('maintenance/types/add/', '/maintenance/types/add/', 'admin', 8),
+            ('maintenance/types/<int:pk>/edit/',
+             f'/maintenance/types/{self.maintenance_type.pk}/edit/', 'admin', 9),
+            ('maintenance/types/<int:pk>/delete/',
+             f'/maintenance/types/{self.maintenance_type.pk}/delete/', 'admin', 9),
+            ('maintenance/providers/', '/maintenance/providers/', 'admin', 9),
+            ('maintenance/providers/add/', '/maintenance/providers/add/', 'admin', 8),
+            ('maintenance/providers/<int:pk>/edit/',
+             f'/maintenance/providers/{self.provider.pk}/edit/', 'admin', 9),
+            ('maintenance/providers/<int:pk>/delete/',
+             f'/maintenance/providers/{self.provider.pk}/delete/', 'admin', 9),
+
+            # Fuel
+            ('fuel/', '/fuel/', 'admin', 13),
+            ('fuel/', '/fuel/', 'driver', 10),
+            ('fuel/<int:pk>/', f'/fuel/{self.fuel_transaction.pk}/', 'admin', 15),
+            ('fuel/add/', '/fuel/add/', 'driver', 9),
+            ('fuel/<int:pk>/edit/', f'/fuel/{self.fuel_transaction.pk}/edit/', 'admin', 12),
+            ('fuel/<int:pk>/delete/', f'/fuel/{self.fuel_transaction.pk}/delete/', 'admin', 13),
+            ('fuel/stations/', '/fuel/stations/', 'admin', 9),
+            ('fuel/stations/add/', '/fuel/stations/add/', 'admin', 8),
+            ('fuel/stations/<int:pk>/edit/', f'/fuel/stations/{self.station.pk}/edit/', 'admin', 25),
+            ('fuel/stations/<int:pk>/delete/', f'/fuel/stations/{self.station.pk}/delete/', 'admin', 11),
+
+            # Documents
+            ('documents/', '/documents/', 'admin', 15),
+            ('documents/<int:pk>/', f'/documents/{self.document.pk}/', 'admin', 15),
+            ('documents/add/', '/documents/add/', 'admin', 10),
+            ('documents/<int:pk>/edit/', f'/documents/{self.document.pk}/edit/', 'admin', 13),
+            ('documents/<int:pk>/delete/', f'/documents/{self.document.pk}/delete/', 'admin', 11),
+            ('documents/types/', '/documents/types/', 'admin', 15),
+            ('documents/types/add/', '/documents/types/add/', 'admin', 8),
+            ('documents/types/<int:pk>/edit/',
+             f'/documents/types/{self.document_type.pk}/edit/', 'admin', 15),
+            ('documents/types/<int:pk>/delete/',
+             f'/documents/types/{self.document_type.pk}/delete/', 'admin', 9),
+
+            # Accidents
+            ('accidents/', '/accidents/', 'admin', 18),
+            ('accidents/<int:pk>/', f'/accidents/{self.accident.pk}/', 'admin', 14),
+            ('accidents/add/', '/accidents/add/', 'driver', 10),
+            ('accidents/<int:pk>/edit/', f'/accidents/{self.accident.pk}/edit/', 'admin', 14),
+            ('accidents/image/<int:pk>/remove/', '/accidents/image/999999/remove/', 'admin', 8),
+
+            # Reports
+            ('reports/vehicles/', '/reports/vehicles/', 'manager', 26),
+            ('reports/drivers/', '/reports/drivers/', 'manager', 13),
+            ('reports/maintenance/', '/reports/maintenance/', 'manager', 11),
+            ('reports/fuel/', '/reports/fuel/', 'manager', 19),
+
+            # Geolocation API
+            ('api/', '/api/', 'admin', 4),
+            ('api/^location-logs/$', '/api/location-logs/', 'admin', 6),
+            ('api/^location-logs/(?P<pk>[^/.]+)/$',
+             f'/api/location-logs/{self.location_log.pk}/', 'admin', 5),
+            ('api/location/update/', '/api/location/update/', 'driver', 4),
+
+            # Mobile API
+            ('api/v1/', '/api/v1/', 'token', 4),
+            ('api/v1/login/', '/api/v1/login/', None, 2),
+            ('api/v1/bootstrap/', '/api/v1/bootstrap/', 'token', 12),
+            ('api/v1/^vehicles/$', '/api/v1/vehicles/', 'token', 8),
+            ('api/v1/^vehicles/(?P<pk>[^/.]+)/$', f'/api/v1/vehicles/{vehicle}/', 'token', 8),
+            ('api/v1/^vehicles/(?P<pk>[^/.]+)/active_trip/$',
+             f'/api/v1/vehicles/{self.ongoing_trip.vehicle_id}/active_trip/', 'token', 10),
+            ('api/v1/^vehicles/(?P<pk>[^/.]+)/fuel/$', f'/api/v1/vehicles/{vehicle}/fuel/', 'token', 10),
+            ('api/v1/^vehicles/(?P<pk>[^/.]+)/maintenance/$',
+             f'/api/v1/vehicles/{vehicle}/maintenance/', 'token', 10),
+            ('api/v1/^vehicles/(?P<pk>[^/.]+)/trips/$', f'/api/v1/vehicles/{vehicle}/trips/', 'token', 10),
+            ('api/v1/^vehicle-types/$', '/api/v1/vehicle-types/', 'token', 5),
+            ('api/v1/^vehicle-types/(?P<pk>[^/.]+)/$',
+             f'/api/v1/vehicle-types/{self.vehicle_type.pk}/', 'token', 4),
+            ('api/v1/^trips/$', '/api/v1/trips/', 'token', 8),
+            ('api/v1/^trips/(?P<pk>[^/.]+)/$', f'/api/v1/trips/{trip}/', 'token', 8),
+            ('api/v1/^trips/(?P<pk>[^/.]+)/cancel_trip/$',
+             f'/api/v1/trips/{self.ongoing_trip.pk}/cancel_trip/', 'token', 3),
+            ('api/v1/^trips/(?P<pk>[^/.]+)/end_trip/$',
+             f'/api/v1/trips/{self.ongoing_trip.pk}/end_trip/', 'token', 3),
+            ('api/v1/^maintenance/$', '/api/v1/maintenance/', 'token', 8),
+            ('api/v1/^maintenance/(?P<pk>[^/.]+)/$',
+             f'/api/v1/maintenance/{self.maintenance.pk}/', 'token', 8),
+            ('api/v1/^fuel-transactions/$', '/api/v1/fuel-transactions/', 'token', 8),
+            ('api/v1/^fuel-transactions/(?P<pk>[^/.]+)/$',
+             f'/api/v1/fuel-transactions/{self.fuel_transaction.pk}/', 'token', 8),
+            ('api/v1/^fuel-stations/$', '/api/v1/fuel-stations/', 'token', 5),
+            ('api/v1/^fuel-stations/(?P<pk>[^/.]+)/$',
+             f'/api/v1/fuel-stations/{self.station.pk}/', 'token', 4),
+            ('api/v1/^fuel-stations/nearby/$', '/api/v1/fuel-stations/nearby/?lat=9.9&lng=76.3', 'token', 3),
+            ('api/v1/^users/$', '/api/v1/users/', 'token', 5),
+            ('api/v1/^users/me/$', '/api/v1/users/me/', 'token', 3),
+            ('api/v1/^users/(?P<pk>[^/.]+)/$', f'/api/v1/users/{self.driver.pk}/', 'token', 4),
+            ('api/v1/^expiries/$', '/api/v1/expiries/?days=366', 'token', 3),
+            ('api/v1/^expiries/(?P<pk>[^/.]+)/$', f'/api/v1/expiries/{self.expiry_entry.pk}/', 'token', 2),
+            ('api/v1/accident-hotspots/', '/api/v1/accident-hotspots/?window=all', 'token', 3),
+            ('api/v1/uploads/', '/api/v1/uploads/', 'token', 1),
+            ('api/v1/uploads/<uuid:pk>/', f'/api/v1/uploads/{uuid.UUID(int=0)}/', 'token', 2),
+            ('files/<slug:kind>/<int:pk>/', f'/files/document/{self.document.pk}/', 'admin', 3),
+        ]
+
+    def measure(self, path, user):
+        """GET `path` as `user` and return (status_code, query_count)."""
+        self.client.logout()
+        headers = {}
+        if user == 'token':
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.driver_token.key}'
+        elif user:
+            self.client.force_login(getattr(self, user))
+        response = self.client.get(path, **headers)
+        return response.status_code, response.wsgi_request.query_stats.count
+
+    def test_views_stay_within_query_budget(self):
+        over_budget = []
+        for route, path, user, budget in self.budgets():
+            with self.subTest(route=route, user=user):
+                status, queries = self.measure(path, user)
+                self.assertLess(status, 500, f"GET {path} as {user} failed with {status}")
+                if queries > budget:
+                    over_budget.append(f"{path} as {user}: {queries} queries (budget {budget})")
+
+        self.assertFalse(over_budget, "Over query budget:\n" + "\n".join(over_budget))
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {route for route, *_ in self.budgets()}
+        missing = []
+        for route, name in walk_routes(get_resolver().url_patterns):
+            if route.startswith('admin/') or route in budgeted or route in SKIPPED_ROUTES:
+                continue
+            if any(marker in route for marker in FORMAT_SUFFIX_MARKERS):
+                continue
+            missing.append(f"{route} ({name})")
+
+        self.assertFalse(
+            missing,
+            "Routes without a query budget - add them to QueryBudgetTests.budgets() "
+            "or SKIPPED_ROUTES:\n" + "\n".join(missing)
+        )
+
+
+class CacheVersionTests(SimpleTestCase):
+
+    def test_bumps_and_evictions_give_new_versions(self):
+        first = get_version('test_version')
+        self.assertEqual(get_version('test_version'), first)
+        bump_version('test_version')
+        second = get_version('test_version')
+        self.assertNotEqual(second, first)
+        cache.delete('test_version')
+        self.assertNotIn(get_version('test_version'), (first, second))
@@ -35,6 +35,9 @@ urlpatterns = [
     # Reports
     path('reports/', include('reports.urls')),
     
+    # Permission-checked downloads of documents, receipts, invoices and accident photos
+    path('files/', include('uploads.urls')),
+    
     # API Endpoints
     path('api/', include('geolocation.urls')),
     
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import VehicleType, Vehicle
+from .models import VehicleType, Vehicle, OdometerAnomaly, OdometerCheck
 
 @admin.register(VehicleType)
 class VehicleTypeAdmin(admin.ModelAdmin):
@@ -94,4 +94,22 @@ class VehicleAdmin(admin.ModelAdmin):
                 "Select vehicle type. This determines which additional fields are required."
             )
         
-        return form
\ No newline at end of file
+        return form
+@admin.register(OdometerAnomaly)
+class OdometerAnomalyAdmin(admin.ModelAdmin):
+    list_display = [
+        'vehicle', 'kind', 'previous_odometer', 'odometer', 'previous_source',
+        'source', 'observed_at', 'resolved'
+    ]
+    list_filter = ['kind', 'source', 'resolved']
+    search_fields = ['vehicle__license_plate']
+    list_select_related = ['vehicle']
+    list_editable = ['resolved']
+    readonly_fields = [
+        'vehicle', 'kind', 'source', 'object_id', 'observed_at', 'odometer', 'previous_source',
+        'previous_object_id', 'previous_observed_at', 'previous_odometer', 'detected_at'
+    ]
+
+@admin.register(OdometerCheck)
+class OdometerCheckAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'finished_at', 'full', 'vehicles_checked', 'readings_checked', 'anomalies_found']
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from vehicles.odometer import run_check
+import time
+
+
+class Command(BaseCommand):
+    help = 'Cross-check odometer readings from trips, fuel, maintenance and vehicles and record anomalies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Check every vehicle, not just those with readings added since the last run'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Vehicles loaded and checked together (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        started = time.monotonic()
+
+        def progress(vehicles, readings):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"Checked {vehicles} vehicles, {readings} readings ({readings / elapsed:.0f} readings/s)")
+
+        check = run_check(full=options['full'], chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full' if check.full else 'Incremental'} check of {check.vehicles_checked} vehicles "
+            f"({check.readings_checked} readings) found {check.anomalies_found} anomalies "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
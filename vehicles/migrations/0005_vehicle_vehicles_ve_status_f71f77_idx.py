@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0004_vehicle_battery_capacity_kwh_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['status'], name='vehicles_ve_status_f71f77_idx'),
+        ),
+    ]
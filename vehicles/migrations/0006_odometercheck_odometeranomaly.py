@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0005_vehicle_vehicles_ve_status_f71f77_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OdometerCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('full', models.BooleanField(default=False)),
+                ('last_trip_id', models.PositiveBigIntegerField(default=0)),
+                ('last_fuel_transaction_id', models.PositiveBigIntegerField(default=0)),
+                ('last_maintenance_id', models.PositiveBigIntegerField(default=0)),
+                ('vehicles_checked', models.PositiveIntegerField(default=0)),
+                ('readings_checked', models.PositiveIntegerField(default=0)),
+                ('anomalies_found', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'get_latest_by': 'started_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='OdometerAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('regression', 'Odometer went backwards'), ('jump', 'Impossible jump'), ('gap', 'Untracked distance')], max_length=20)),
+                ('source', models.CharField(choices=[('trip_start', 'Trip start'), ('trip_end', 'Trip end'), ('fuel', 'Fuel transaction'), ('maintenance', 'Maintenance'), ('vehicle', 'Vehicle current odometer')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('observed_at', models.DateTimeField()),
+                ('odometer', models.PositiveIntegerField()),
+                ('previous_source', models.CharField(choices=[('trip_start', 'Trip start'), ('trip_end', 'Trip end'), ('fuel', 'Fuel transaction'), ('maintenance', 'Maintenance'), ('vehicle', 'Vehicle current odometer')], max_length=20)),
+                ('previous_object_id', models.PositiveBigIntegerField()),
+                ('previous_observed_at', models.DateTimeField()),
+                ('previous_odometer', models.PositiveIntegerField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved', models.BooleanField(default=False, help_text='Reviewed; kept out of later checks')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='odometer_anomalies', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name_plural': 'odometer anomalies',
+                'ordering': ['-observed_at'],
+                'indexes': [models.Index(fields=['vehicle', 'resolved'], name='vehicles_od_vehicle_5ec8db_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source', 'object_id', 'previous_source', 'previous_object_id'), name='unique_odometer_anomaly')],
+            },
+        ),
+    ]
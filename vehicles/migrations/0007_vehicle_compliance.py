@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:17
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def backfill_compliance(apps, schema_editor):
+    # Same rules as documents.compliance, against the historical models
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    Document = apps.get_model('documents', 'Document')
+    DocumentType = apps.get_model('documents', 'DocumentType')
+
+    today = timezone.localdate()
+    required = set(DocumentType.objects.filter(required=True).values_list('pk', flat=True))
+    latest = {pk: {} for pk in Vehicle.objects.values_list('pk', flat=True)}
+    rows = Document.objects.filter(document_type_id__in=required).values(
+        'vehicle_id', 'document_type_id'
+    ).annotate(latest=Max('expiry_date')).order_by()
+    for row in rows:
+        latest[row['vehicle_id']][row['document_type_id']] = row['latest']
+
+    vehicles = []
+    for pk, expiry_dates in latest.items():
+        next_expiry = min(expiry_dates.values()) if expiry_dates else None
+        if len(expiry_dates) < len(required) or (next_expiry is not None and next_expiry <= today):
+            status = 'expired'
+        elif next_expiry is not None and next_expiry <= today + datetime.timedelta(days=30):
+            status = 'expiring'
+        else:
+            status = 'valid'
+        vehicles.append(Vehicle(pk=pk, compliance_status=status, compliance_next_expiry=next_expiry))
+    Vehicle.objects.bulk_update(vehicles, ['compliance_status', 'compliance_next_expiry'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0006_odometercheck_odometeranomaly'),
+        ('documents', '0003_document_documents_d_expiry__1d702a_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='compliance_next_expiry',
+            field=models.DateField(blank=True, editable=False, help_text='When the first required document runs out', null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='compliance_status',
+            field=models.CharField(choices=[('valid', 'Valid'), ('expiring', 'Expiring Soon'), ('expired', 'Expired')], default='expired', editable=False, help_text='Expired when a required document is missing or out of date', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['compliance_status', 'compliance_next_expiry'], name='vehicles_ve_complia_1eea74_idx'),
+        ),
+        migrations.RunPython(backfill_compliance, migrations.RunPython.noop),
+    ]
@@ -169,8 +169,29 @@ class Vehicle(models.Model):
     notes = models.TextField(blank=True)
     image = models.ImageField(upload_to='vehicles/', null=True, blank=True)
     
+    # Document compliance, kept current by documents/compliance.py
+    COMPLIANCE_CHOICES = (
+        ('valid', 'Valid'),
+        ('expiring', 'Expiring Soon'),
+        ('expired', 'Expired'),
+    )
+    compliance_status = models.CharField(
+        max_length=10, choices=COMPLIANCE_CHOICES, default='expired', editable=False,
+        help_text="Expired when a required document is missing or out of date"
+    )
+    compliance_next_expiry = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text="When the first required document runs out"
+    )
+    
     class Meta:
         ordering = ['license_plate']
+        indexes = [
+            # Status counts on the dashboard and vehicle list, available vehicle pickers
+            models.Index(fields=['status']),
+            # Compliance filters, and the daily rollover of vehicles whose documents run out
+            models.Index(fields=['compliance_status', 'compliance_next_expiry']),
+        ]
     
     def __str__(self):
         return f"{self.make} {self.model} ({self.license_plate})"
@@ -244,12 +265,12 @@ class Vehicle(models.Model):
     
     def get_total_distance(self):
         """Calculate total distance traveled by this vehicle."""
-        from django.db.models import Sum, F
+        from django.db.models import Sum
         
         total = self.trips.filter(
             status='completed'
         ).aggregate(
-            total=Sum(F('end_odometer') - F('start_odometer'))
+            total=Sum('distance_km')
         )
         
         return total['total'] or 0
@@ -262,16 +283,14 @@ class Vehicle(models.Model):
         return total['quantity__sum'] or 0
     
     def get_fuel_efficiency(self):
-        """Calculate fuel efficiency (km/L) for this vehicle."""
+        """Recent fill-to-fill fuel efficiency (km/L) for this vehicle."""
+        from fuel.efficiency import rolling_efficiency
+        
         if self.is_electric():
             return None  # Not applicable for electric vehicles
         
-        total_distance = self.get_total_distance()
-        total_fuel = self.get_total_fuel_consumption()
-        
-        if total_fuel > 0:
-            return total_distance / total_fuel
-        return 0
+        efficiency = rolling_efficiency([self.pk], energy_kind='fuel').get(self.pk)
+        return efficiency[0] if efficiency else 0
     
     def get_upcoming_maintenance(self):
         """Get upcoming scheduled maintenance."""
@@ -282,21 +301,7 @@ class Vehicle(models.Model):
     
     def get_document_status(self):
         """Check if all required documents are valid."""
-        from documents.models import Document, DocumentType
-        
-        required_types = DocumentType.objects.filter(required=True)
-        for doc_type in required_types:
-            # Check if there's a valid document of this type
-            today = timezone.now().date()
-            valid_doc = self.documents.filter(
-                document_type=doc_type,
-                expiry_date__gt=today
-            ).exists()
-            
-            if not valid_doc:
-                return False
-        
-        return True
+        return self.compliance_status != 'expired'
     
     def clean(self):
         """Validate model fields based on vehicle type."""
@@ -322,4 +327,81 @@ class Vehicle(models.Model):
             # Remove the fuel requirement validation for now to allow saving
         
         if errors:
-            raise ValidationError(errors)
\ No newline at end of file
+            raise ValidationError(errors)
+
+class OdometerAnomaly(models.Model):
+    """
+    An inconsistent pair of consecutive odometer readings of a vehicle, found
+    by the check_odometers command (see vehicles/odometer.py).
+    """
+
+    KIND_CHOICES = (
+        ('regression', 'Odometer went backwards'),
+        ('jump', 'Impossible jump'),
+        ('gap', 'Untracked distance'),
+    )
+    SOURCE_CHOICES = (
+        ('trip_start', 'Trip start'),
+        ('trip_end', 'Trip end'),
+        ('fuel', 'Fuel transaction'),
+        ('maintenance', 'Maintenance'),
+        ('vehicle', 'Vehicle current odometer'),
+    )
+
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='odometer_anomalies')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+
+    # The reading that doesn't fit...
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    observed_at = models.DateTimeField()
+    odometer = models.PositiveIntegerField()
+    # ...and the reading before it
+    previous_source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    previous_object_id = models.PositiveBigIntegerField()
+    previous_observed_at = models.DateTimeField()
+    previous_odometer = models.PositiveIntegerField()
+
+    detected_at = models.DateTimeField(auto_now_add=True)
+    resolved = models.BooleanField(default=False, help_text="Reviewed; kept out of later checks")
+
+    class Meta:
+        ordering = ['-observed_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'source', 'object_id', 'previous_source', 'previous_object_id'],
+                name='unique_odometer_anomaly'
+            ),
+        ]
+        indexes = [
+            # Open anomalies per vehicle
+            models.Index(fields=['vehicle', 'resolved']),
+        ]
+        verbose_name_plural = 'odometer anomalies'
+
+    def __str__(self):
+        return f"{self.get_kind_display()} on {self.vehicle}: {self.previous_odometer} → {self.odometer} km"
+
+    @property
+    def distance(self):
+        return self.odometer - self.previous_odometer
+
+
+class OdometerCheck(models.Model):
+    """One run of check_odometers; incremental runs pick up rows added since the last one."""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    full = models.BooleanField(default=False)
+    last_trip_id = models.PositiveBigIntegerField(default=0)
+    last_fuel_transaction_id = models.PositiveBigIntegerField(default=0)
+    last_maintenance_id = models.PositiveBigIntegerField(default=0)
+    vehicles_checked = models.PositiveIntegerField(default=0)
+    readings_checked = models.PositiveIntegerField(default=0)
+    anomalies_found = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+        get_latest_by = 'started_at'
+
+    def __str__(self):
+        return f"Odometer check at {self.started_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,241 @@
+"""
+Odometer consistency checks across every source of readings: trip start/end,
+fuel transactions, maintenance records and the vehicle's current odometer.
+
+Readings are loaded into flat NumPy arrays (one row per reading, many vehicles
+at once), sorted by vehicle and time, and every consecutive pair of a vehicle
+is checked in a few vectorised passes:
+
+* regression - the odometer went backwards
+* jump       - more distance than the vehicle could cover at
+               ODOMETER_MAX_SPEED_KMH in the time between the readings
+* gap        - more than ODOMETER_UNTRACKED_KM covered outside any trip
+
+Fuel and maintenance readings only have a date, so they're placed at noon. The
+real order within that day is unknown, so a backwards step between two dated
+readings of a day, or between a dated reading and a timed one of the same day,
+is not reported as long as the dated reading lies within that day's timed
+readings. A dated reading below (or above) all of them is still a regression.
+"""
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from fuel.models import FuelTransaction
+from maintenance.models import Maintenance
+from trips.models import Trip
+from .models import OdometerAnomaly, OdometerCheck, Vehicle
+
+SOURCES = ['trip_start', 'trip_end', 'fuel', 'maintenance', 'vehicle']
+TRIP_START, TRIP_END, FUEL, MAINTENANCE, VEHICLE = range(len(SOURCES))
+DAY = 24 * 3600
+
+
+class Readings:
+    """Odometer readings of one or more vehicles as parallel arrays."""
+    FIELDS = ('vehicle', 'time', 'odometer', 'source', 'object_id', 'depth')
+
+    def __init__(self):
+        self.columns = {field: [] for field in self.FIELDS}
+
+    def add(self, vehicle, time, odometer, source, object_id, depth=0):
+        for field, value in zip(self.FIELDS, (vehicle, time, odometer, source, object_id, depth)):
+            self.columns[field].append(value)
+
+    def __len__(self):
+        return len(self.columns['vehicle'])
+
+    def arrays(self):
+        """Columns as int64 arrays, sorted by vehicle, time and odometer."""
+        arrays = {field: np.asarray(values, dtype=np.int64) for field, values in self.columns.items()}
+        # At equal times a trip end comes before the next trip's start
+        end_first = arrays['source'] != TRIP_END
+        order = np.lexsort((end_first, arrays['odometer'], arrays['time'], arrays['vehicle']))
+        return {field: values[order] for field, values in arrays.items()}
+
+
+def load_readings(vehicle_ids):
+    """Every odometer reading of `vehicle_ids`."""
+    now = timezone.now()
+    utc_offset = int(timezone.localtime(now).utcoffset().total_seconds())
+    # Local noon of a date, in Unix seconds
+    epoch_ordinal = datetime.date(1970, 1, 1).toordinal()
+    noon = lambda day: (day.toordinal() - epoch_ordinal) * DAY + DAY // 2 - utc_offset
+
+    readings = Readings()
+    trips = Trip.objects.filter(vehicle_id__in=vehicle_ids).values_list(
+        'pk', 'vehicle_id', 'start_time', 'start_odometer', 'end_time', 'end_odometer', 'status'
+    )
+    for pk, vehicle_id, start_time, start_odometer, end_time, end_odometer, status in trips:
+        ended = end_time is not None and end_odometer is not None
+        # `depth` counts trips in progress: readings between a start and its end are inside a trip
+        in_trip = ended or status == 'ongoing'
+        readings.add(vehicle_id, int(start_time.timestamp()), start_odometer, TRIP_START, pk, 1 if in_trip else 0)
+        if ended:
+            readings.add(vehicle_id, int(end_time.timestamp()), end_odometer, TRIP_END, pk, -1)
+
+    fuel = FuelTransaction.objects.filter(vehicle_id__in=vehicle_ids).values_list(
+        'pk', 'vehicle_id', 'date', 'odometer_reading'
+    )
+    for pk, vehicle_id, date, odometer in fuel:
+        readings.add(vehicle_id, noon(date), odometer, FUEL, pk)
+
+    maintenance = Maintenance.objects.filter(vehicle_id__in=vehicle_ids).exclude(status='cancelled').values_list(
+        'pk', 'vehicle_id', 'date_reported', 'odometer_reading'
+    )
+    for pk, vehicle_id, date, odometer in maintenance:
+        readings.add(vehicle_id, noon(date), odometer, MAINTENANCE, pk)
+
+    # 0 is the field default, i.e. never recorded
+    vehicles = Vehicle.objects.filter(pk__in=vehicle_ids, current_odometer__gt=0).values_list('pk', 'current_odometer')
+    for pk, odometer in vehicles:
+        readings.add(pk, int(now.timestamp()), odometer, VEHICLE, pk)
+
+    return readings, utc_offset
+
+
+def find_anomalies(arrays, utc_offset=0):
+    """
+    (kind, index of previous reading) for every inconsistent consecutive pair
+    in sorted `arrays`. The suspect reading is the one after that index.
+    """
+    max_speed = getattr(settings, 'ODOMETER_MAX_SPEED_KMH', 150)
+    untracked_km = getattr(settings, 'ODOMETER_UNTRACKED_KM', 50)
+    tolerance = getattr(settings, 'ODOMETER_REGRESSION_TOLERANCE_KM', 0)
+
+    vehicle, time, odometer, source = arrays['vehicle'], arrays['time'], arrays['odometer'], arrays['source']
+    if len(vehicle) < 2:
+        return []
+
+    same_vehicle = vehicle[1:] == vehicle[:-1]
+    distance = odometer[1:] - odometer[:-1]
+    hours = (time[1:] - time[:-1]) / 3600
+
+    dated = (source == FUEL) | (source == MAINTENANCE)
+    dated_pair = dated[1:] | dated[:-1]
+    local_day = (time + utc_offset) // DAY
+    same_day = local_day[1:] == local_day[:-1]
+
+    # Lowest and highest timed reading of each vehicle-day; rows are sorted, so days are contiguous
+    new_day = np.concatenate(([True], ~(same_vehicle & same_day)))
+    day_start, day = np.flatnonzero(new_day), np.cumsum(new_day) - 1
+    limit = np.iinfo(np.int64)
+    day_min = np.minimum.reduceat(np.where(dated, limit.max, odometer), day_start)[day]
+    day_max = np.maximum.reduceat(np.where(dated, limit.min, odometer), day_start)[day]
+    # A dated reading that fits among the day's timed ones could have been taken between them
+    fits = dated & (odometer >= day_min - tolerance) & (odometer <= day_max + tolerance)
+    unordered = same_day & ((dated[1:] & dated[:-1]) | fits[1:] | fits[:-1])
+
+    regression = same_vehicle & (distance < -tolerance) & ~unordered
+
+    # A single low reading shows up twice: going down to it and back up from it. Report it once.
+    after_regression = np.concatenate(([False], regression[:-1]))
+
+    # An hour of slack for clock differences, a day either way for date-only readings
+    slack_hours = np.where(dated_pair, 24.0, 1.0)
+    jump = same_vehicle & ~after_regression & (distance > max_speed * (hours + slack_hours))
+
+    # Trips in progress after each reading, restarting from zero for every vehicle
+    depth = np.cumsum(arrays['depth'])
+    group_start = np.concatenate(([True], ~same_vehicle))
+    before_group = (depth - arrays['depth'])[group_start]
+    depth -= before_group[np.cumsum(group_start) - 1]
+    outside_trip = depth[:-1] <= 0
+    gap = same_vehicle & outside_trip & ~after_regression & ~jump & (distance > untracked_km)
+
+    found = []
+    for kind, mask in (('regression', regression), ('jump', jump), ('gap', gap)):
+        found.extend((kind, int(index)) for index in np.flatnonzero(mask))
+    return found
+
+
+def build_anomalies(arrays, found):
+    to_datetime = lambda seconds: datetime.datetime.fromtimestamp(int(seconds), tz=datetime.timezone.utc)
+    anomalies = []
+    for kind, index in found:
+        previous, current = index, index + 1
+        anomalies.append(OdometerAnomaly(
+            vehicle_id=int(arrays['vehicle'][current]),
+            kind=kind,
+            source=SOURCES[arrays['source'][current]],
+            object_id=int(arrays['object_id'][current]),
+            observed_at=to_datetime(arrays['time'][current]),
+            odometer=int(arrays['odometer'][current]),
+            previous_source=SOURCES[arrays['source'][previous]],
+            previous_object_id=int(arrays['object_id'][previous]),
+            previous_observed_at=to_datetime(arrays['time'][previous]),
+            previous_odometer=int(arrays['odometer'][previous]),
+        ))
+    return anomalies
+
+
+def check_vehicles(vehicle_ids):
+    """
+    Re-check every reading of `vehicle_ids` and replace their open anomalies.
+    Resolved anomalies are kept and not reported again. Returns (readings, anomalies).
+    """
+    readings, utc_offset = load_readings(vehicle_ids)
+    arrays = readings.arrays()
+    anomalies = build_anomalies(arrays, find_anomalies(arrays, utc_offset))
+    with transaction.atomic():
+        OdometerAnomaly.objects.filter(vehicle_id__in=vehicle_ids, resolved=False).delete()
+        OdometerAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+    return len(readings), len(anomalies)
+
+
+def changed_vehicle_ids(since):
+    """Vehicles with readings added (or trips ended) since the OdometerCheck `since`."""
+    changed = set(Trip.objects.filter(
+        Q(pk__gt=since.last_trip_id) | Q(end_time__gte=since.started_at)
+    ).values_list('vehicle_id', flat=True).distinct())
+    changed.update(FuelTransaction.objects.filter(
+        pk__gt=since.last_fuel_transaction_id
+    ).values_list('vehicle_id', flat=True).distinct())
+    changed.update(Maintenance.objects.filter(
+        pk__gt=since.last_maintenance_id
+    ).values_list('vehicle_id', flat=True).distinct())
+    return sorted(changed)
+
+
+def run_check(full=False, chunk_size=200, progress=None):
+    """
+    Check the vehicles with new readings since the last run (or every vehicle
+    if `full` or on the first run) and record the run. `progress` is called
+    with (vehicles done, readings done) after each chunk of vehicles.
+    """
+    started_at = timezone.now()
+    # Taken before reading, so rows added while this runs are picked up next time
+    marks = {
+        'last_trip_id': Trip.objects.aggregate(last=Max('pk'))['last'] or 0,
+        'last_fuel_transaction_id': FuelTransaction.objects.aggregate(last=Max('pk'))['last'] or 0,
+        'last_maintenance_id': Maintenance.objects.aggregate(last=Max('pk'))['last'] or 0,
+    }
+    previous = OdometerCheck.objects.order_by('-started_at').first()
+    full = full or previous is None
+    if full:
+        vehicle_ids = list(Vehicle.objects.order_by('pk').values_list('pk', flat=True))
+    else:
+        vehicle_ids = changed_vehicle_ids(previous)
+
+    readings_checked = anomalies_found = 0
+    for offset in range(0, len(vehicle_ids), chunk_size):
+        chunk = vehicle_ids[offset:offset + chunk_size]
+        readings, anomalies = check_vehicles(chunk)
+        readings_checked += readings
+        anomalies_found += anomalies
+        if progress:
+            progress(offset + len(chunk), readings_checked)
+
+    return OdometerCheck.objects.create(
+        started_at=started_at,
+        finished_at=timezone.now(),
+        full=full,
+        vehicles_checked=len(vehicle_ids),
+        readings_checked=readings_checked,
+        anomalies_found=anomalies_found,
+        **marks
+    )
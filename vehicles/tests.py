@@ -1,3 +1,93 @@
+import datetime
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from fuel.models import FuelTransaction
+from trips.models import Trip
+from .models import OdometerAnomaly, OdometerCheck, Vehicle, VehicleType
+from .odometer import run_check
+
+
+class OdometerCheckTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = CustomUser.objects.create_user('driver', 'driver@example.com', 'pw', user_type='driver')
+        vehicle_type = VehicleType.objects.create(name='Car', category='car')
+        cls.vehicle = Vehicle.objects.create(
+            vehicle_type=vehicle_type, make='Maruti', model='Swift', year=2021,
+            license_plate='KL-07-0001', vin='VIN00000000000001', color='white',
+            acquisition_date=datetime.date(2021, 1, 1), current_odometer=1300,
+        )
+        # Local midnight of a fixed day, so which readings share a day doesn't depend on the clock
+        cls.start = timezone.make_aware(datetime.datetime(2025, 3, 10))
+
+    def trip(self, day, start_odometer, end_odometer, hours=2, hour=18):
+        start_time = self.start + datetime.timedelta(days=day, hours=hour)
+        return Trip.objects.create(
+            vehicle=self.vehicle, driver=self.driver, start_time=start_time,
+            end_time=start_time + datetime.timedelta(hours=hours), status='completed',
+            start_odometer=start_odometer, end_odometer=end_odometer,
+            origin='Depot', destination='Site', purpose='Delivery',
+        )
+
+    def fuel(self, day, odometer):
+        return FuelTransaction.objects.create(
+            vehicle=self.vehicle, driver=self.driver, odometer_reading=odometer, total_cost=Decimal('1000'),
+            date=timezone.localdate(self.start + datetime.timedelta(days=day)),
+        )
+
+    def anomalies(self):
+        return sorted(OdometerAnomaly.objects.values_list('kind', 'previous_odometer', 'odometer'))
+
+    def test_consistent_history_has_no_anomalies(self):
+        self.trip(0, 1000, 1100)
+        self.fuel(1, 1110)
+        self.trip(2, 1110, 1300)
+        check = run_check()
+        self.assertEqual(self.anomalies(), [])
+        self.assertEqual((check.full, check.readings_checked), (True, 6))
+
+    def test_finds_regressions_jumps_and_gaps(self):
+        self.trip(0, 1000, 1100)
+        self.trip(1, 1050, 1080)           # starts below the previous trip's end
+        self.trip(2, 1080, 2000, hours=1)  # 920 km in an hour
+        self.trip(3, 2100, 2150)           # 100 km driven outside any trip
+        self.vehicle.current_odometer = 2150
+        self.vehicle.save(update_fields=['current_odometer'])
+        run_check()
+        self.assertEqual(self.anomalies(), [('gap', 2000, 2100), ('jump', 1080, 2000), ('regression', 1100, 1050)])
+
+    def test_same_day_dated_readings_are_not_regressions(self):
+        # Filled up in the morning before the evening trip; only the date is known
+        self.trip(0, 1000, 1100)
+        self.fuel(0, 1040)
+        self.trip(1, 1100, 1300)
+        run_check()
+        self.assertEqual(self.anomalies(), [])
+
+    def test_dated_readings_below_the_days_trips_are_regressions(self):
+        # Fuel dated the day of a morning trip, with a reading below anything that day
+        self.trip(0, 1000, 1300, hour=7)
+        self.fuel(0, 900)
+        run_check()
+        self.assertEqual(self.anomalies(), [('regression', 1300, 900)])
+
+    def test_incremental_run_checks_changed_vehicles_and_keeps_resolved_anomalies(self):
+        self.trip(0, 1000, 1100)
+        self.trip(1, 1050, 1300)
+        run_check()
+        OdometerAnomaly.objects.update(resolved=True)
+
+        self.assertEqual(run_check().vehicles_checked, 0)
 
-# Create your tests here.
+        self.fuel(2, 900)
+        check = run_check()
+        self.assertFalse(check.full)
+        self.assertEqual(check.vehicles_checked, 1)
+        self.assertEqual(self.anomalies(), [('regression', 1100, 1050), ('regression', 1300, 900)])
+        self.assertEqual(OdometerAnomaly.objects.filter(resolved=True).count(), 1)
+        self.assertEqual(OdometerCheck.objects.count(), 3)
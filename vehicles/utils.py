@@ -6,7 +6,7 @@ from datetime import datetime
 import re
 from django.db import transaction
 from .models import Vehicle, VehicleType
-from documents.models import Document
+from documents.sync import sync_vehicle_documents
 
 def import_vehicles_from_excel(file_path):
     """
@@ -70,6 +70,7 @@ def import_vehicles_from_excel(file_path):
         error_count = 0
         errors = []
         imported_vehicles = []
+        saved_vehicles = []
         
         for index, row in df.iterrows():
             try:
@@ -369,13 +370,7 @@ def import_vehicles_from_excel(file_path):
                     # Save the vehicle
                     vehicle.save()
                     
-                    # Create documents for this vehicle
-                    try:
-                        Document.create_from_vehicle(vehicle)
-                    except Exception as doc_error:
-                        # Don't fail the import if document creation fails
-                        print(f"Warning: Could not create documents for {license_plate}: {doc_error}")
-                    
+                    saved_vehicles.append(vehicle)
                     imported_vehicles.append(license_plate)
                     success_count += 1
                     
@@ -400,6 +395,13 @@ def import_vehicles_from_excel(file_path):
                 
                 continue
         
+        # Create documents for the imported vehicles in one go
+        try:
+            sync_vehicle_documents(saved_vehicles)
+        except Exception as doc_error:
+            # Don't fail the import if document creation fails
+            print(f"Warning: Could not create documents for the imported vehicles: {doc_error}")
+        
         return {
             'success_count': success_count,
             'error_count': error_count,
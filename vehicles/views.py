@@ -15,6 +15,7 @@ import io
 from django.db.models import Q
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
+from search.index import search
 
 class VehicleListView(LoginRequiredMixin, ListView):
     model = Vehicle
@@ -23,18 +24,23 @@ class VehicleListView(LoginRequiredMixin, ListView):
     paginate_by = 10 # Optional: if you want pagination
 
     def get_queryset(self):
-        queryset = super().get_queryset().order_by('license_plate') # Start with the base queryset
+        queryset = super().get_queryset().select_related('vehicle_type').order_by('license_plate') # Start with the base queryset
 
         search_query = self.request.GET.get('search', '').strip()
         vehicle_type_filter = self.request.GET.get('vehicle_type', '').strip()
         status_filter = self.request.GET.get('status', '').strip()
+        compliance_filter = self.request.GET.get('compliance', '').strip()
 
         if search_query:
-            queryset = queryset.filter(
-                Q(license_plate__icontains=search_query) |
-                Q(make__icontains=search_query) |
-                Q(model__icontains=search_query)
-            )
+            matched = search(queryset, search_query)
+            if matched is not None:
+                queryset = matched
+            else:
+                queryset = queryset.filter(
+                    Q(license_plate__icontains=search_query) |
+                    Q(make__icontains=search_query) |
+                    Q(model__icontains=search_query)
+                )
         
         if vehicle_type_filter:
             queryset = queryset.filter(vehicle_type_id=vehicle_type_filter)
@@ -42,6 +48,9 @@ class VehicleListView(LoginRequiredMixin, ListView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
             
+        if compliance_filter:
+            queryset = queryset.filter(compliance_status=compliance_filter)
+            
         return queryset
 
     def get_context_data(self, **kwargs):